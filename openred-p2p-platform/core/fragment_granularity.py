@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+🧩 GRANULARITÉ DES FRAGMENTS - Phantom URN
+==========================================
+Taille des cendres produites par un burn:
+- "1x1" / "pixel"        : un fragment par pixel (historique)
+- "16" / "16x16" / "8x4" : tuiles NxN (ou LxH)
+- "scanline" / "scanline:4" : bandes de lignes complètes (1 ou N lignes)
+
+La taille de tuile résolue est enregistrée dans les métadonnées de l'URN pour
+que la reconstruction place des tuiles entières par slicing NumPy.
+"""
+
+from dataclasses import dataclass
+from typing import Tuple, Union
+
+import numpy as np
+
+GRANULARITY_PIXEL = "1x1"
+GRANULARITY_SCANLINE = "scanline"
+
+# Limite imposée par l'en-tête des enregistrements (u16)
+MAX_TILE_SIDE = 0xFFFF
+
+
+@dataclass(frozen=True)
+class FragmentGranularity:
+    """Taille de fragment; tile_width = 0 signifie largeur complète (scanline)"""
+    tile_width: int = 1
+    tile_height: int = 1
+
+    @classmethod
+    def parse(cls, spec: Union[None, int, str, "FragmentGranularity"]) -> "FragmentGranularity":
+        if spec is None:
+            return cls()
+        if isinstance(spec, FragmentGranularity):
+            return spec
+        if isinstance(spec, int):
+            return cls._checked(spec, spec)
+
+        text = str(spec).strip().lower()
+        if text in ("", "pixel", GRANULARITY_PIXEL):
+            return cls()
+        if text.startswith(GRANULARITY_SCANLINE) or text.startswith("strip"):
+            _, _, rows = text.partition(":")
+            return cls._checked(0, int(rows) if rows else 1, allow_full_width=True)
+        if "x" in text:
+            width, _, height = text.partition("x")
+            return cls._checked(int(width), int(height))
+        if text.isdigit():
+            return cls._checked(int(text), int(text))
+
+        raise ValueError(f"Granularité de fragment invalide: {spec}")
+
+    @classmethod
+    def _checked(cls, width: int, height: int, allow_full_width: bool = False) -> "FragmentGranularity":
+        if (width < 1 and not allow_full_width) or height < 1:
+            raise ValueError(f"Taille de tuile invalide: {width}x{height}")
+        if width > MAX_TILE_SIDE or height > MAX_TILE_SIDE:
+            raise ValueError(f"Tuile trop grande: {width}x{height}")
+        return cls(width, height)
+
+    @property
+    def is_pixel(self) -> bool:
+        return self.tile_width == 1 and self.tile_height == 1
+
+    @property
+    def label(self) -> str:
+        if self.tile_width == 0:
+            return GRANULARITY_SCANLINE if self.tile_height == 1 else f"{GRANULARITY_SCANLINE}:{self.tile_height}"
+        return f"{self.tile_width}x{self.tile_height}"
+
+    def resolve(self, width: int, height: int) -> Tuple[int, int]:
+        """Taille de tuile effective (tw, th) pour une image donnée"""
+        tile_width = width if self.tile_width == 0 else min(self.tile_width, width)
+        tile_height = min(self.tile_height, height)
+        if tile_width > MAX_TILE_SIDE:
+            raise ValueError(f"Scanline trop large: {tile_width} pixels")
+        return tile_width, tile_height
+
+
+def split_tiles(img_array: np.ndarray, tile_width: int, tile_height: int):
+    """
+    Découpe une image (H, W, 3) en tuiles de taille fixe (bords complétés à zéro).
+    Retourne (tuiles (n, th, tw, 3), x, y, largeurs, hauteurs) en ordre ligne par ligne.
+    """
+    height, width, channels = img_array.shape
+    tiles_y = -(-height // tile_height)
+    tiles_x = -(-width // tile_width)
+
+    padded_height = tiles_y * tile_height
+    padded_width = tiles_x * tile_width
+    if (padded_height, padded_width) != (height, width):
+        padded = np.zeros((padded_height, padded_width, channels), dtype=img_array.dtype)
+        padded[:height, :width] = img_array
+    else:
+        padded = img_array
+
+    tiles = (padded.reshape(tiles_y, tile_height, tiles_x, tile_width, channels)
+             .swapaxes(1, 2)
+             .reshape(tiles_y * tiles_x, tile_height, tile_width, channels))
+
+    grid_y, grid_x = np.divmod(np.arange(tiles_y * tiles_x), tiles_x)
+    xs = (grid_x * tile_width).astype(np.uint32)
+    ys = (grid_y * tile_height).astype(np.uint32)
+    widths = np.minimum(tile_width, width - xs).astype(np.uint16)
+    heights = np.minimum(tile_height, height - ys).astype(np.uint16)
+    return tiles, xs, ys, widths, heights
+
+
+def place_tiles(target: np.ndarray, xs: np.ndarray, ys: np.ndarray, tiles: np.ndarray):
+    """
+    Place des tuiles entières dans l'image cible: les tuiles intérieures en une
+    seule affectation NumPy, les tuiles de bord (tronquées) par slicing.
+    """
+    if len(tiles) == 0:
+        return
+
+    height, width = target.shape[:2]
+    tile_height, tile_width = tiles.shape[1:3]
+    xs = xs.astype(np.int64)
+    ys = ys.astype(np.int64)
+
+    in_bounds = (xs < width) & (ys < height) & (xs % tile_width == 0) & (ys % tile_height == 0)
+    interior = in_bounds & (xs + tile_width <= width) & (ys + tile_height <= height)
+
+    full_x = width // tile_width
+    full_y = height // tile_height
+    if interior.any():
+        # Vue (ty, th, tx, tw, 3) de la zone couverte par des tuiles complètes
+        grid = target[:full_y * tile_height, :full_x * tile_width].reshape(
+            full_y, tile_height, full_x, tile_width, target.shape[2]
+        )
+        grid[ys[interior] // tile_height, :, xs[interior] // tile_width] = tiles[interior]
+
+    for index in np.flatnonzero(in_bounds & ~interior):
+        x, y = xs[index], ys[index]
+        w = min(tile_width, width - x)
+        h = min(tile_height, height - y)
+        target[y:y + h, x:x + w] = tiles[index, :h, :w]
@@ -0,0 +1,401 @@
+# === OpenRed P2P : Transport asyncio ===
+# Remplace le thread par connexion de DirectP2PConnection:
+# une seule boucle asyncio sert le listener et toutes les connexions sortantes
+# Protocole 3 phases inchangé, signatures RSA exécutées dans un pool dédié
+# Messages encodés avec le codec négocié au handshake (orpack/1 ou JSON)
+
+import asyncio
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Union
+
+from core.p2p_security.binary_codec import JSON_CODEC, decode_frame, encode_message_frame
+from core.p2p_security.message_framing import (
+    FrameError, MAX_FRAME_SIZE, read_frame_async, read_json_async, send_json_async
+)
+from core.p2p_security.three_phase_protocol import ThreePhaseHandshake
+
+# Délai maximal pour chaque échange du handshake
+HANDSHAKE_TIMEOUT = 30.0
+
+# Threads de signature/vérification RSA (le GIL est relâché par OpenSSL)
+DEFAULT_CRYPTO_WORKERS = 2
+
+# Corrélation requête/réponse (clés distinctes des champs applicatifs comme request_id)
+REQUEST_ID_KEY = "p2p_request_id"
+REPLY_TO_KEY = "p2p_reply_to"
+
+# Message de maintien de connexion, consommé par le transport
+KEEPALIVE_TYPE = "p2p_keepalive"
+
+DEFAULT_REQUEST_TIMEOUT = 30.0
+
+# Handler de messages: (session_id, message) → réponse éventuelle, synchrone ou coroutine
+MessageHandler = Callable[[str, Dict], Union[Optional[Dict], Awaitable[Optional[Dict]]]]
+
+
+@dataclass
+class AsyncP2PConnection:
+    """Connexion P2P établie (entrante ou sortante) servie par la boucle asyncio"""
+    session_id: str
+    peer_ip: str
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    inbound: bool
+    codec: str = JSON_CODEC
+    established_at: float = field(default_factory=time.time)
+    last_activity: float = field(default_factory=time.time)
+    reader_task: Optional[asyncio.Task] = None
+    request_tasks: Set[asyncio.Task] = field(default_factory=set)
+    # Requêtes locales en attente de réponse sur CETTE connexion (request_id → future)
+    pending_requests: Dict[str, asyncio.Future] = field(default_factory=dict)
+
+    async def send(self, message: Dict):
+        """Envoie un message tramé avec le codec négocié"""
+        self.writer.write(encode_message_frame(message, self.codec))
+        await self.writer.drain()
+        self.last_activity = time.time()
+
+    def close(self):
+        if self.reader_task is not None and self.reader_task is not asyncio.current_task():
+            self.reader_task.cancel()
+        for task in list(self.request_tasks):
+            task.cancel()
+        # Connexion perdue: les requêtes en attente échouent sans attendre le délai
+        for future in self.pending_requests.values():
+            if not future.done():
+                future.set_result(None)
+        self.writer.close()
+
+
+class AsyncP2PTransport:
+    """
+    Listener et connexions P2P sur asyncio streams
+    - API équivalente à DirectP2PConnection (connect_to_peer, send_secure_message...)
+      mais en coroutines, à démarrer dans la boucle de l'application (FastAPI)
+    - Chaque message reçu est confié au handler; sa réponse éventuelle est renvoyée
+      sur la même connexion
+    """
+
+    def __init__(self, security_protocol: ThreePhaseHandshake, listen_port: int,
+                 host: str = "0.0.0.0", crypto_workers: int = DEFAULT_CRYPTO_WORKERS,
+                 max_frame_size: int = MAX_FRAME_SIZE):
+        self.security_protocol = security_protocol
+        self.listen_port = listen_port
+        self.host = host
+        self.max_frame_size = max_frame_size
+        self.crypto_executor = ThreadPoolExecutor(max_workers=crypto_workers,
+                                                  thread_name_prefix="p2p_crypto")
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.active_connections: Dict[str, AsyncP2PConnection] = {}
+        self.message_handler: Optional[MessageHandler] = None
+        self.running = False
+
+    def set_message_handler(self, handler: MessageHandler):
+        """Handler appelé pour chaque message reçu sur une connexion établie"""
+        self.message_handler = handler
+
+    async def start(self):
+        """Démarre le listener P2P dans la boucle courante"""
+        self.server = await asyncio.start_server(self._handle_incoming_connection,
+                                                 self.host, self.listen_port)
+        self.running = True
+        print(f"🔗 P2P Server (asyncio) started on port {self.listen_port}")
+
+    async def stop(self):
+        """Arrête le listener et ferme toutes les connexions"""
+        self.running = False
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        connections = list(self.active_connections.values())
+        for connection in connections:
+            connection.close()
+        self.active_connections.clear()
+        tasks = [c.reader_task for c in connections if c.reader_task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.crypto_executor.shutdown(wait=False)
+
+    async def _run_crypto(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.crypto_executor, function, *args)
+
+    async def _handle_incoming_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Traite une connexion P2P entrante avec protocole 3 phases"""
+        peer_ip = writer.get_extra_info("peername", ("unknown", 0))[0]
+        try:
+            print(f"🔗 Incoming P2P connection from {peer_ip}")
+
+            # Recevoir Phase 1: REQUEST, ou demande de reprise de session
+            request_packet = await asyncio.wait_for(
+                read_json_async(reader, self.max_frame_size), HANDSHAKE_TIMEOUT
+            )
+            if isinstance(request_packet, dict) and "resume" in request_packet:
+                # Reprise: HMAC seulement, pas de RSA (vérifiée dans la boucle)
+                resumed, resume_response = self.security_protocol.verify_resume(request_packet, peer_ip)
+                await send_json_async(writer, resume_response)
+                if resumed:
+                    session_id = request_packet["resume"]["session_id"]
+                    connection = AsyncP2PConnection(session_id, peer_ip, reader, writer, inbound=True,
+                                                    codec=self._session_codec(session_id),
+                                                    reader_task=asyncio.current_task())
+                    self.active_connections[session_id] = connection
+                    await self._read_messages(connection)
+                    return
+                # Refus: le pair enchaîne avec un handshake complet sur la même connexion
+                request_packet = await asyncio.wait_for(
+                    read_json_async(reader, self.max_frame_size), HANDSHAKE_TIMEOUT
+                )
+            if not isinstance(request_packet, dict) or request_packet.get("security_protocol") != "openred_three_phase":
+                print("❌ Unknown security protocol")
+                writer.close()
+                return
+
+            # Phase 2: VERIFY (vérification et signature hors boucle)
+            verified, response_packet = await self._run_crypto(
+                self.security_protocol.phase2_verify, request_packet, peer_ip
+            )
+            if not verified:
+                writer.close()
+                return
+
+            await send_json_async(writer, response_packet)
+
+            session_id = request_packet["data"]["session_id"]
+            connection = AsyncP2PConnection(session_id, peer_ip, reader, writer, inbound=True,
+                                            codec=self._session_codec(session_id),
+                                            reader_task=asyncio.current_task())
+            self.active_connections[session_id] = connection
+            print(f"✅ P2P connection established from {peer_ip}")
+
+            # Messages continus: servis directement par cette tâche
+            await self._read_messages(connection)
+
+        except asyncio.CancelledError:
+            # Arrêt du transport: fin normale de la tâche de connexion
+            writer.close()
+        except Exception as e:
+            print(f"❌ Error handling P2P connection: {e}")
+            writer.close()
+
+    async def connect_to_peer(self, peer_ip: str, peer_port: int, peer_fingerprint: str) -> Optional[str]:
+        """Initie connexion P2P: reprise de session si un ticket est disponible, sinon protocole 3 phases"""
+        writer = None
+        attempted_sessions = []   # sessions en attente côté protocole, libérées en cas d'échec
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(peer_ip, peer_port), HANDSHAKE_TIMEOUT
+            )
+
+            resume_packet = self.security_protocol.create_resume_request(peer_fingerprint)
+            if resume_packet is not None:
+                attempted_sessions.append(resume_packet["resume"]["session_id"])
+                await send_json_async(writer, resume_packet)
+                resume_response = await asyncio.wait_for(
+                    read_json_async(reader, self.max_frame_size), HANDSHAKE_TIMEOUT
+                )
+                session_id = self.security_protocol.finalize_resume(resume_packet, resume_response)
+                if session_id:
+                    self._register_outbound(session_id, peer_ip, reader, writer)
+                    return session_id
+                if resume_response is None:
+                    writer.close()
+                    return None
+
+            # Phase 1: REQUEST (signature hors boucle)
+            request_packet = await self._run_crypto(
+                self.security_protocol.phase1_request, peer_fingerprint, peer_ip, peer_port
+            )
+            attempted_sessions.append(request_packet["data"]["session_id"])
+            await send_json_async(writer, request_packet)
+
+            # Recevoir Phase 2: VERIFY
+            verify_response = await asyncio.wait_for(
+                read_json_async(reader, self.max_frame_size), HANDSHAKE_TIMEOUT
+            )
+
+            # Phase 3: FINALIZE
+            if verify_response is None or not await self._run_crypto(
+                self.security_protocol.phase3_finalize, verify_response
+            ):
+                writer.close()
+                return None
+
+            session_id = request_packet["data"]["session_id"]
+            self._register_outbound(session_id, peer_ip, reader, writer)
+            return session_id
+
+        except Exception as e:
+            print(f"❌ P2P connection failed: {e}")
+            if writer is not None:
+                writer.close()
+            return None
+        finally:
+            # Sans effet sur une session finalisée; délai ou annulation compris
+            for session_id in attempted_sessions:
+                self.security_protocol.abandon_handshake(session_id)
+
+    def _register_outbound(self, session_id: str, peer_ip: str,
+                           reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = AsyncP2PConnection(session_id, peer_ip, reader, writer, inbound=False,
+                                        codec=self._session_codec(session_id))
+        self.active_connections[session_id] = connection
+        connection.reader_task = asyncio.ensure_future(self._read_messages(connection))
+
+    def _session_codec(self, session_id: str) -> str:
+        context = self.security_protocol.get_security_context(session_id)
+        return context.codec if context is not None else JSON_CODEC
+
+    async def send_secure_message(self, session_id: str, message: Dict) -> bool:
+        """Envoie message sécurisé via connexion P2P"""
+        connection = self.active_connections.get(session_id)
+        if connection is None:
+            return False
+
+        if not self.security_protocol.is_connection_secure(session_id):
+            return False
+
+        try:
+            # Message avec métadonnées de sécurité
+            await connection.send({
+                "session_id": session_id,
+                "timestamp": time.time(),
+                "content": message
+            })
+            return True
+
+        except FrameError as e:
+            print(f"❌ Secure message rejected: {e}")
+            return False
+        except Exception as e:
+            print(f"❌ Error sending secure message: {e}")
+            self._drop_connection(connection)
+            return False
+
+    async def request(self, session_id: str, message: Dict,
+                      timeout: float = DEFAULT_REQUEST_TIMEOUT) -> Optional[Dict]:
+        """
+        Envoie une requête sur une session finalisée et attend la réponse du handler distant
+        (None si session inconnue, connexion perdue ou délai dépassé)
+        FrameError si le message dépasse la taille de trame: rien n'est envoyé, la session reste utilisable
+        """
+        connection = self.active_connections.get(session_id)
+        if connection is None or not self.security_protocol.is_connection_secure(session_id):
+            return None
+
+        request_id = secrets.token_hex(8)
+        future = asyncio.get_running_loop().create_future()
+        connection.pending_requests[request_id] = future
+        try:
+            await connection.send({**message, REQUEST_ID_KEY: request_id})
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            print(f"⏱️ P2P request timed out ({message.get('type')})")
+            return None
+        except FrameError as e:
+            print(f"❌ P2P request rejected: {e}")
+            raise
+        except Exception as e:
+            print(f"❌ P2P request failed: {e}")
+            self._drop_connection(connection)
+            return None
+        finally:
+            connection.pending_requests.pop(request_id, None)
+
+    async def send_keepalive(self, session_id: str) -> bool:
+        """Maintien de connexion (NAT, détection des pairs disparus)"""
+        connection = self.active_connections.get(session_id)
+        if connection is None:
+            return False
+        try:
+            await connection.send({"type": KEEPALIVE_TYPE})
+            return True
+        except Exception:
+            self._drop_connection(connection)
+            return False
+
+    def is_connected(self, session_id: str) -> bool:
+        return session_id in self.active_connections
+
+    def close_connection(self, session_id: str):
+        connection = self.active_connections.get(session_id)
+        if connection is not None:
+            self._drop_connection(connection)
+
+    async def _read_messages(self, connection: AsyncP2PConnection):
+        """Boucle de lecture d'une connexion: une tâche asyncio, pas un thread"""
+        try:
+            while True:
+                frame = await read_frame_async(connection.reader, self.max_frame_size)
+                if frame is None:
+                    break
+                connection.last_activity = time.time()
+
+                # JSON ou orpack/1 acceptés quel que soit le codec négocié
+                try:
+                    message = decode_frame(frame)
+                except ValueError as e:
+                    print(f"⚠️ Undecodable frame received ({len(frame.payload)} bytes), ignoring: {e}")
+                    continue
+                if not isinstance(message, dict):
+                    continue
+
+                # Réponse à une requête locale envoyée sur cette même connexion
+                reply_to = message.pop(REPLY_TO_KEY, None)
+                if reply_to is not None:
+                    future = connection.pending_requests.get(reply_to)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                    continue
+
+                if message.get("type") == KEEPALIVE_TYPE or self.message_handler is None:
+                    continue
+
+                request_id = message.pop(REQUEST_ID_KEY, None)
+                if request_id is None:
+                    # Notification: traitée dans l'ordre d'arrivée
+                    await self._dispatch(connection, message, None)
+                else:
+                    # Requête: flux concurrent sur la même connexion (borné côté demandeur)
+                    task = asyncio.ensure_future(self._dispatch(connection, message, request_id))
+                    connection.request_tasks.add(task)
+                    task.add_done_callback(connection.request_tasks.discard)
+
+        except FrameError as e:
+            print(f"❌ Invalid P2P frame, closing connection: {e}")
+        except ConnectionError:
+            pass
+        finally:
+            self._drop_connection(connection)
+
+    async def _dispatch(self, connection: AsyncP2PConnection, message: Dict, request_id: Optional[str]):
+        try:
+            response = self.message_handler(connection.session_id, message)
+            if asyncio.iscoroutine(response):
+                response = await response
+            if request_id is not None:
+                # Le demandeur attend une réponse, même vide
+                await connection.send({**(response or {}), REPLY_TO_KEY: request_id})
+            elif response:
+                await connection.send(response)
+        except Exception as msg_error:
+            print(f"⚠️ Error processing individual message: {msg_error}")
+
+    def _drop_connection(self, connection: AsyncP2PConnection):
+        if self.active_connections.get(connection.session_id) is connection:
+            del self.active_connections[connection.session_id]
+        connection.close()
+
+    def get_transport_stats(self) -> Dict[str, Any]:
+        """Statistiques du transport"""
+        return {
+            "transport": "asyncio",
+            "listening": self.running,
+            "listen_port": self.listen_port,
+            "active_connections": len(self.active_connections),
+            "inbound": sum(1 for c in self.active_connections.values() if c.inbound),
+            "outbound": sum(1 for c in self.active_connections.values() if not c.inbound),
+            "binary_codec": sum(1 for c in self.active_connections.values() if c.codec != JSON_CODEC),
+        }
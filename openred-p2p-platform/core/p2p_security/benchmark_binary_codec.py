@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+⚡ BENCHMARK - Codec binaire orpack/1 contre JSON
+================================================
+Octets sur le fil (trame complète) et débit d'encodage/décodage pour des
+messages P2P typiques, tels que le transport les envoie:
+- demande d'amitié (requête du pool, signature RSA 2048 en base64)
+- message texte chiffré (send_secure_message)
+- partage de photo (contenu base64 ~48 Ko)
+- requête URN et réponse matrice quantique (64x64 flottants)
+
+Usage:
+    python core/p2p_security/benchmark_binary_codec.py
+    python core/p2p_security/benchmark_binary_codec.py --iterations 5000
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import secrets
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(REPO_ROOT)
+
+from core.p2p_security.binary_codec import BINARY_CODEC, JSON_CODEC, decode_frame, encode_message_frame
+from core.p2p_security.message_framing import FRAME_HEADER_SIZE, Frame
+
+
+def _fingerprint() -> str:
+    return secrets.token_hex(8)
+
+
+def _envelope(content):
+    """Enveloppe de send_secure_message"""
+    return {"session_id": secrets.token_hex(16), "timestamp": time.time(), "content": content}
+
+
+def _payloads():
+    alice, bob = _fingerprint(), _fingerprint()
+    friend_request = {
+        "type": "friendship_request",
+        "request_id": secrets.token_hex(8),
+        "from_fingerprint": alice,
+        "to_fingerprint": bob,
+        "from_node_id": "node_alice",
+        "to_node_id": "node_bob",
+        "message": "Salut ! On se connecte sur OpenRed ?",
+        "timestamp": time.time(),
+        "signature": base64.b64encode(os.urandom(256)).decode(),
+        "requested_permissions": {
+            "messaging": True, "urn_access": True, "photo_sharing": True,
+            "file_sharing": False, "presence_info": True
+        },
+        "p2p_request_id": secrets.token_hex(8)
+    }
+
+    def social_message(message_type, content, metadata):
+        return _envelope({
+            "type": "message",
+            "message_id": secrets.token_hex(8),
+            "from_fingerprint": alice,
+            "to_fingerprint": bob,
+            "message_type": message_type,
+            "content": content,
+            "metadata": metadata,
+            "timestamp": time.time(),
+            "encrypted": True,
+            "signature": None,
+            "reply_to": None
+        })
+
+    text_message = social_message(
+        "text", base64.b64encode("Rendez-vous demain à 18h près du phare 🌊".encode() * 3).decode(), {}
+    )
+    photo_message = social_message(
+        "photo_share", base64.b64encode(os.urandom(48 * 1024)).decode(),
+        {"filename": "coucher_de_soleil.jpg", "size": 48 * 1024, "caption": "Vue du phare"}
+    )
+    urn_query = {
+        "type": "urn_query",
+        "urn_id": f"urn:phantom:{secrets.token_hex(16)}",
+        "requester": alice,
+        "timestamp": time.time(),
+        "resurrection_type": "full",
+        "p2p_request_id": secrets.token_hex(8)
+    }
+    rng = random.Random(42)
+    matrix_response = {
+        "urn_id": urn_query["urn_id"],
+        "quantum_matrix": {
+            "data": [[rng.random() for _ in range(64)] for _ in range(64)],
+            "metadata": {"shape": [64, 64], "algorithm": "schrodinger_phoenix"}
+        },
+        "provider": bob,
+        "timestamp": time.time(),
+        "p2p_reply_to": urn_query["p2p_request_id"]
+    }
+    return {
+        "demande d'amitié": friend_request,
+        "message texte": text_message,
+        "partage photo": photo_message,
+        "requête URN": urn_query,
+        "matrice URN": matrix_response,
+    }
+
+
+def _measure(message, codec: str, iterations: int):
+    frame_bytes = encode_message_frame(message, codec)
+    frame = Frame(frame_bytes[FRAME_HEADER_SIZE - 1], frame_bytes[FRAME_HEADER_SIZE:])
+    if decode_frame(frame) != message:
+        raise RuntimeError(f"Aller-retour {codec} inexact")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode_message_frame(message, codec)
+    encode_us = (time.perf_counter() - start) * 1e6 / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode_frame(frame)
+    decode_us = (time.perf_counter() - start) * 1e6 / iterations
+    return len(frame_bytes), encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark codec binaire P2P")
+    parser.add_argument("--iterations", type=int, default=2000, help="Encodages/décodages par mesure")
+    args = parser.parse_args()
+
+    print(f"{'':17} {'codec':9} {'octets':>9} {'encode':>11} {'decode':>11} {'Mo/s enc.':>10} {'Mo/s déc.':>10}")
+    for name, message in _payloads().items():
+        iterations = args.iterations if len(json.dumps(message)) < 16384 else max(1, args.iterations // 20)
+        sizes = {}
+        for codec in (JSON_CODEC, BINARY_CODEC):
+            size, encode_us, decode_us = _measure(message, codec, iterations)
+            sizes[codec] = size
+            print(f"{name:17} {codec:9} {size:9d} {encode_us:8.1f} µs {decode_us:8.1f} µs "
+                  f"{size / encode_us:10.1f} {size / decode_us:10.1f}")
+        print(f"{'':17} {'gain':9} {sizes[JSON_CODEC] / sizes[BINARY_CODEC]:8.2f}x\n")
+
+
+if __name__ == "__main__":
+    main()
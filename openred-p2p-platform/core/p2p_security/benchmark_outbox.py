@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+⚡ BENCHMARK - Boîte d'envoi durable (P2POutbox)
+===============================================
+Messages sociaux mis en attente pour un pair hors ligne, puis délivrés
+quand il réapparaît (pair loopback AsyncP2PTransport + P2PConnectionPool):
+- débit de mise en file (journal sur disque)
+- redémarrage: relecture du journal, aucun message perdu
+- vidage par lots vers un pair récent, message par message vers un ancien pair
+- déduplication: chaque message traité une seule fois par le destinataire
+
+Usage:
+    python core/p2p_security/benchmark_outbox.py
+    python core/p2p_security/benchmark_outbox.py --messages 50000 --batch-size 500
+"""
+
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(REPO_ROOT)
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core.p2p_security.async_transport import AsyncP2PTransport
+from core.p2p_security.connection_pool import P2PConnectionPool
+from core.p2p_security.outbox import BATCH_TYPE, OUTBOX_ID_KEY, P2POutbox, RecentIds
+from core.p2p_security.three_phase_protocol import ThreePhaseHandshake
+
+
+def _handshake(fingerprint: str) -> ThreePhaseHandshake:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    return ThreePhaseHandshake(fingerprint, private_key, private_key.public_key())
+
+
+def _social_message(sender: str, recipient: str, index: int) -> dict:
+    return {
+        "type": "message",
+        "message_id": f"{index:08d}-{secrets.token_hex(4)}",
+        "from_fingerprint": sender,
+        "to_fingerprint": recipient,
+        "message_type": "text",
+        "content": f"Message hors ligne n°{index} 🌊",
+        "timestamp": time.time(),
+    }
+
+
+async def _start_peer(fingerprint: str, port: int, batches: bool, received: list):
+    """Pair destinataire: lots traités comme le nœud (_handle_outbox_batch) ou ancien pair"""
+    transport = AsyncP2PTransport(_handshake(fingerprint), port, host="127.0.0.1")
+    seen = RecentIds()
+
+    async def handle(session_id, message):
+        if message.get("type") == BATCH_TYPE:
+            if not batches:
+                return None
+            delivered = []
+            for item in message["messages"]:
+                outbox_id = item.pop(OUTBOX_ID_KEY)
+                if outbox_id not in seen:
+                    received.append(item["message_id"])
+                    seen.add(outbox_id)
+                delivered.append(outbox_id)
+            return {"delivered": delivered}
+        received.append(message["message_id"])
+        return None
+
+    transport.set_message_handler(handle)
+    await transport.start()
+    return transport
+
+
+async def _wait_drained(outbox: P2POutbox, fingerprint: str, timeout: float = 300.0):
+    deadline = time.perf_counter() + timeout
+    while outbox.pending_count(fingerprint) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+
+
+async def _run(args, directory: str):
+    sender = "f" * 16
+    recent_fp, legacy_fp = "1" * 16, "2" * 16
+    endpoints = {}   # pairs hors ligne: aucune adresse connue
+    results = []
+
+    client = AsyncP2PTransport(_handshake(sender), 0, host="127.0.0.1")
+    pool = P2PConnectionPool(client, resolve_endpoint=endpoints.get)
+    outbox = P2POutbox(directory, pool.request, batch_size=args.batch_size)
+
+    # Mise en file pendant que les pairs sont hors ligne
+    messages = [_social_message(sender, recent_fp, i) for i in range(args.messages)]
+    legacy_messages = [_social_message(sender, legacy_fp, i) for i in range(args.legacy_messages)]
+    start = time.perf_counter()
+    for message in messages:
+        outbox.enqueue(recent_fp, message)
+    for message in legacy_messages:
+        outbox.enqueue(legacy_fp, message)
+    elapsed = time.perf_counter() - start
+    results.append(("mise en file", len(messages) + len(legacy_messages), elapsed))
+
+    for message in messages[:1000]:
+        outbox.enqueue(recent_fp, message)   # doublons ignorés
+    deduplicated = outbox.stats["deduplicated"]
+    assert deduplicated == min(1000, len(messages)), "doublons mis en file"
+    await asyncio.sleep(0.2)                  # tentatives échouées: backoff
+    await outbox.close()
+
+    # Redémarrage: journal relu
+    start = time.perf_counter()
+    outbox = P2POutbox(directory, pool.request, batch_size=args.batch_size)
+    results.append(("redémarrage (relecture)", outbox.pending_count(), time.perf_counter() - start))
+    assert outbox.pending_count() == len(messages) + len(legacy_messages), "messages perdus"
+
+    # Les pairs réapparaissent
+    recent_received, legacy_received = [], []
+    peers = [
+        await _start_peer(recent_fp, args.port, True, recent_received),
+        await _start_peer(legacy_fp, args.port + 1, False, legacy_received),
+    ]
+    endpoints.update({recent_fp: ("127.0.0.1", args.port), legacy_fp: ("127.0.0.1", args.port + 1)})
+    try:
+        # Connexions établies avant la mesure (pool persistant)
+        await pool.request(recent_fp, {"type": "ping"})
+        await pool.request(legacy_fp, {"type": "ping"})
+        recent_received.clear()
+        legacy_received.clear()
+
+        for fingerprint, label, count in ((recent_fp, "vidage par lots", len(messages)),
+                                          (legacy_fp, "vidage ancien pair", len(legacy_messages))):
+            start = time.perf_counter()
+            outbox.notify_peer_online(fingerprint)
+            await _wait_drained(outbox, fingerprint)
+            results.append((label, count, time.perf_counter() - start))
+
+        assert sorted(recent_received) == sorted(m["message_id"] for m in messages), "lot incomplet ou dupliqué"
+        assert sorted(legacy_received) == sorted(m["message_id"] for m in legacy_messages), "ancien pair incomplet"
+        return results, {**outbox.get_outbox_stats(), "deduplicated": deduplicated}
+    finally:
+        await outbox.close()
+        await pool.close()
+        await client.stop()
+        for peer in peers:
+            await peer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark boîte d'envoi durable")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages pour le pair récent")
+    parser.add_argument("--legacy-messages", type=int, default=2000, help="Messages pour l'ancien pair")
+    parser.add_argument("--batch-size", type=int, default=200, help="Messages par lot")
+    parser.add_argument("--port", type=int, default=47800, help="Premier port loopback")
+    args = parser.parse_args()
+
+    # Handshakes et tentatives journalisés: sortie silencieuse pendant la mesure
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results, stats = asyncio.run(_run(args, directory))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    for label, count, elapsed in results:
+        print(f"{label:26} {count:7d} messages {elapsed * 1000:9.1f} ms {count / elapsed:10.0f} msg/s")
+    print(f"\nBoîte d'envoi: delivered={stats['delivered']} deduplicated={stats['deduplicated']} "
+          f"batches={stats['batches_sent']} compactions={stats['compactions']} "
+          f"journal={stats['journal_bytes']} octets")
+
+
+if __name__ == "__main__":
+    main()
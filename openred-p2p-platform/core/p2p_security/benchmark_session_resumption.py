@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+⚡ BENCHMARK - Reprise de session du handshake 3 phases
+======================================================
+Latence et temps CPU d'établissement d'une connexion P2P contre un pair
+loopback (AsyncP2PTransport, même processus: le CPU compte les deux côtés):
+- complet : REQUEST → VERIFY → FINALIZE (signatures/vérifications RSA 2048)
+- reprise : ticket de session, un aller-retour HMAC
+
+Usage:
+    python core/p2p_security/benchmark_session_resumption.py
+    python core/p2p_security/benchmark_session_resumption.py --connections 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(REPO_ROOT)
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core.p2p_security.async_transport import AsyncP2PTransport
+from core.p2p_security.three_phase_protocol import ThreePhaseHandshake
+
+
+def _handshake(fingerprint: str) -> ThreePhaseHandshake:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    return ThreePhaseHandshake(fingerprint, private_key, private_key.public_key())
+
+
+async def _measure(client: AsyncP2PTransport, port: int, connections: int, resume: bool):
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(connections):
+        if not resume:
+            client.security_protocol.resumption_tickets.clear()
+        start = time.perf_counter()
+        session_id = await client.connect_to_peer("127.0.0.1", port, "bench_server")
+        latencies.append((time.perf_counter() - start) * 1000)
+        if session_id is None:
+            raise RuntimeError("Connexion refusée par le pair loopback")
+        client.close_connection(session_id)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / connections
+    return latencies, cpu_ms
+
+
+async def _run(connections: int, port: int):
+    server = AsyncP2PTransport(_handshake("bench_server"), port, host="127.0.0.1")
+    client = AsyncP2PTransport(_handshake("bench_client"), 0, host="127.0.0.1")
+    await server.start()
+    try:
+        # Premier handshake complet: fournit le ticket initial
+        await _measure(client, port, 1, resume=True)
+
+        results = {}
+        for mode, resume in (("complet", False), ("reprise", True)):
+            latencies, cpu_ms = await _measure(client, port, connections, resume)
+            results[mode] = (latencies, cpu_ms)
+        return results, client.security_protocol.handshake_stats, server.security_protocol.handshake_stats
+    finally:
+        await client.stop()
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reprise de session P2P")
+    parser.add_argument("--connections", type=int, default=100, help="Connexions mesurées par mode")
+    parser.add_argument("--port", type=int, default=47650, help="Port loopback du pair")
+    args = parser.parse_args()
+
+    # Les deux pairs journalisent chaque phase: sortie silencieuse pendant la mesure
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results, client_stats, server_stats = asyncio.run(_run(args.connections, args.port))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"{'':8} {'moyenne':>10} {'p50':>10} {'p95':>10} {'CPU/conn.':>12}")
+    for mode, (latencies, cpu_ms) in results.items():
+        ordered = sorted(latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(f"{mode:8} {statistics.mean(latencies):7.2f} ms {statistics.median(latencies):7.2f} ms "
+              f"{p95:7.2f} ms {cpu_ms:9.2f} ms")
+
+    full_cpu, resumed_cpu = results["complet"][1], results["reprise"][1]
+    print(f"\nGain CPU: x{full_cpu / resumed_cpu:.1f}   client: {client_stats}   serveur: {server_stats}")
+
+
+if __name__ == "__main__":
+    main()
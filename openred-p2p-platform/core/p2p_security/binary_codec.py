@@ -0,0 +1,445 @@
+# === OpenRed P2P : Codec binaire compact "orpack/1" ===
+# Encodage des valeurs compatible msgpack (nil, bool, int, float64, str, bin,
+# array, map), écrit ici sans dépendance externe, plus trois extensions:
+# - chaînes hexadécimales (fingerprints, session_id, MAC) transportées en octets bruts
+# - chaînes base64 (signatures, contenus chiffrés, images) transportées en octets bruts
+# - enregistrements à schéma: messages typés connus sans répéter les noms de champs
+# decode(encode(m)) == m pour tout message JSON (à l'ordre des clés près):
+# le handler ne voit pas la différence
+# Négocié pendant le handshake 3 phases; JSON reste le repli
+
+import base64
+import binascii
+import re
+import struct
+from typing import Any, Dict, Iterable, List, Tuple
+
+from core.p2p_security.message_framing import (
+    FRAME_BINARY, FRAME_JSON, MAX_FRAME_SIZE, Frame, FrameError, encode_frame, encode_json_frame
+)
+
+# Noms de codec annoncés dans les capacités du handshake (ordre de préférence)
+BINARY_CODEC = "orpack/1"
+JSON_CODEC = "json"
+SUPPORTED_CODECS = (BINARY_CODEC, JSON_CODEC)
+
+# Premier octet de chaque charge utile binaire
+CODEC_VERSION = 1
+
+# Types d'extension (msgpack ext)
+EXT_HEX = 1      # chaîne hexadécimale minuscule → octets
+EXT_BASE64 = 2   # chaîne base64 canonique → octets
+EXT_RECORD = 3   # message typé: id de schéma + valeurs dans l'ordre du schéma
+
+# En dessous, le gain ne couvre pas l'en-tête d'extension
+MIN_PACKED_STRING = 16
+
+# Champ absent d'un enregistrement (octet 0xc1, jamais utilisé par msgpack)
+_ABSENT = 0xC1
+
+# Schémas des messages P2P typés: identifiants stables sur le réseau, ne jamais renuméroter
+RECORD_SCHEMAS: Tuple[Tuple[int, str, Tuple[str, ...]], ...] = (
+    (1, "friendship_request", ("request_id", "from_fingerprint", "to_fingerprint", "from_node_id",
+                               "to_node_id", "message", "timestamp", "signature",
+                               "requested_permissions")),
+    (2, "message", ("message_id", "from_fingerprint", "to_fingerprint", "message_type", "content",
+                    "metadata", "timestamp", "encrypted", "signature", "reply_to")),
+    (3, "urn_query", ("urn_id", "requester", "timestamp", "resurrection_type")),
+    (4, "quantum_matrix_request", ("urn_id", "requester", "timestamp")),
+    (5, "urn_announcement", ("urn_id", "provider", "timestamp", "metadata")),
+    (6, "friendship_request_ack", ("status",)),
+)
+
+_SCHEMAS_BY_TYPE = {name: (schema_id, fields) for schema_id, name, fields in RECORD_SCHEMAS}
+_SCHEMAS_BY_ID = {schema_id: (name, fields) for schema_id, name, fields in RECORD_SCHEMAS}
+
+_HEX_RE = re.compile(r"[0-9a-f]+")
+_BASE64_RE = re.compile(r"[A-Za-z0-9+/]+={0,2}")
+
+_H = struct.Struct(">H")
+_I = struct.Struct(">I")
+_Q = struct.Struct(">Q")
+_b = struct.Struct(">b")
+_h = struct.Struct(">h")
+_i = struct.Struct(">i")
+_q = struct.Struct(">q")
+_D = struct.Struct(">d")
+
+
+class CodecError(ValueError):
+    """Valeur non encodable (entier > 64 bits, type inconnu) ou charge utile invalide"""
+
+
+def negotiate_codec(offered: Iterable[str]) -> str:
+    """Premier codec proposé par l'initiateur que nous supportons, sinon JSON"""
+    for codec in offered or ():
+        if codec in SUPPORTED_CODECS:
+            return codec
+    return JSON_CODEC
+
+
+# ============ ENCODAGE ============
+
+def _pack_string(value: str, out: bytearray):
+    length = len(value)
+    if length >= MIN_PACKED_STRING:
+        if not length % 2 and _HEX_RE.fullmatch(value):
+            _pack_ext(EXT_HEX, bytes.fromhex(value), out)
+            return
+        if not length % 4 and _BASE64_RE.fullmatch(value):
+            raw = binascii.a2b_base64(value)
+            # Forme canonique uniquement (bits de bourrage nuls): aller-retour exact
+            if binascii.b2a_base64(raw, newline=False) == value.encode():
+                _pack_ext(EXT_BASE64, raw, out)
+                return
+
+    data = value.encode()
+    size = len(data)
+    if size < 32:
+        out.append(0xA0 | size)
+    elif size < 0x100:
+        out.append(0xD9)
+        out.append(size)
+    elif size < 0x10000:
+        out.append(0xDA)
+        out += _H.pack(size)
+    else:
+        out.append(0xDB)
+        out += _I.pack(size)
+    out += data
+
+
+def _pack_ext(ext_type: int, data: bytes, out: bytearray):
+    size = len(data)
+    if size < 0x100:
+        out.append(0xC7)
+        out.append(size)
+    elif size < 0x10000:
+        out.append(0xC8)
+        out += _H.pack(size)
+    else:
+        out.append(0xC9)
+        out += _I.pack(size)
+    out.append(ext_type)
+    out += data
+
+
+def _pack_int(value: int, out: bytearray):
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xFF)
+    elif value >= 0:
+        if value < 0x100:
+            out.append(0xCC)
+            out.append(value)
+        elif value < 0x10000:
+            out.append(0xCD)
+            out += _H.pack(value)
+        elif value < 0x100000000:
+            out.append(0xCE)
+            out += _I.pack(value)
+        elif value < 0x10000000000000000:
+            out.append(0xCF)
+            out += _Q.pack(value)
+        else:
+            raise CodecError(f"Entier hors plage 64 bits: {value}")
+    elif value >= -0x80:
+        out.append(0xD0)
+        out += _b.pack(value)
+    elif value >= -0x8000:
+        out.append(0xD1)
+        out += _h.pack(value)
+    elif value >= -0x80000000:
+        out.append(0xD2)
+        out += _i.pack(value)
+    elif value >= -0x8000000000000000:
+        out.append(0xD3)
+        out += _q.pack(value)
+    else:
+        raise CodecError(f"Entier hors plage 64 bits: {value}")
+
+
+def _pack_bytes(data: bytes, out: bytearray):
+    size = len(data)
+    if size < 0x100:
+        out.append(0xC4)
+        out.append(size)
+    elif size < 0x10000:
+        out.append(0xC5)
+        out += _H.pack(size)
+    else:
+        out.append(0xC6)
+        out += _I.pack(size)
+    out += data
+
+
+def _pack_header(size: int, fix: int, tag16: int, out: bytearray):
+    """En-tête de tableau (0x90/0xdc) ou de map (0x80/0xde)"""
+    if size < 16:
+        out.append(fix | size)
+    elif size < 0x10000:
+        out.append(tag16)
+        out += _H.pack(size)
+    else:
+        out.append(tag16 + 1)
+        out += _I.pack(size)
+
+
+def _pack_map(value: Dict, out: bytearray):
+    message_type = value.get("type")
+    schema = _SCHEMAS_BY_TYPE.get(message_type) if type(message_type) is str else None
+    if schema is not None:
+        _pack_record(value, schema, out)
+        return
+    _pack_header(len(value), 0x80, 0xDE, out)
+    for key, item in value.items():
+        _pack(key, out)
+        _pack(item, out)
+
+
+def _pack_record(value: Dict, schema: Tuple[int, Tuple[str, ...]], out: bytearray):
+    schema_id, fields = schema
+    body = bytearray((schema_id,))
+    _pack_header(len(fields), 0x90, 0xDC, body)
+    for name in fields:
+        if name in value:
+            _pack(value[name], body)
+        else:
+            body.append(_ABSENT)
+    # Champs hors schéma (extensions, clés de corrélation du transport)
+    extra = [key for key in value if key != "type" and key not in fields]
+    _pack_header(len(extra), 0x80, 0xDE, body)
+    for key in extra:
+        _pack(key, body)
+        _pack(value[key], body)
+    _pack_ext(EXT_RECORD, body, out)
+
+
+def _pack(value: Any, out: bytearray):
+    value_type = type(value)
+    if value_type is str:
+        _pack_string(value, out)
+    elif value_type is dict:
+        _pack_map(value, out)
+    elif value_type is int:
+        _pack_int(value, out)
+    elif value_type is float:
+        out.append(0xCB)
+        out += _D.pack(value)
+    elif value is None:
+        out.append(0xC0)
+    elif value is True:
+        out.append(0xC3)
+    elif value is False:
+        out.append(0xC2)
+    elif value_type is list or value_type is tuple:
+        _pack_header(len(value), 0x90, 0xDC, out)
+        for item in value:
+            _pack(item, out)
+    elif value_type is bytes or value_type is bytearray:
+        _pack_bytes(value, out)
+    # Sous-classes (IntEnum, str Enum...): même encodage que JSON
+    elif isinstance(value, str):
+        _pack_string(str.__str__(value), out)
+    elif isinstance(value, bool):
+        out.append(0xC3 if value else 0xC2)
+    elif isinstance(value, int):
+        _pack_int(int(value), out)
+    elif isinstance(value, float):
+        out.append(0xCB)
+        out += _D.pack(value)
+    elif isinstance(value, dict):
+        _pack_map(value, out)
+    elif isinstance(value, (list, tuple)):
+        _pack_header(len(value), 0x90, 0xDC, out)
+        for item in value:
+            _pack(item, out)
+    else:
+        raise CodecError(f"Type non encodable: {value_type.__name__}")
+
+
+def encode(message: Any) -> bytes:
+    """Message → charge utile orpack/1 (CodecError si non encodable)"""
+    out = bytearray((CODEC_VERSION,))
+    try:
+        _pack(message, out)
+    except RecursionError:
+        raise CodecError("Structure trop profonde")
+    return bytes(out)
+
+
+# ============ DÉCODAGE ============
+
+def _unpack(data: bytes, pos: int) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+
+    if tag < 0x80:
+        return tag, pos
+    if tag >= 0xE0:
+        return tag - 0x100, pos
+    if 0xA0 <= tag <= 0xBF:
+        end = pos + (tag & 0x1F)
+        return data[pos:end].decode(), end
+    if 0x90 <= tag <= 0x9F:
+        return _unpack_array(data, pos, tag & 0x0F)
+    if 0x80 <= tag <= 0x8F:
+        return _unpack_map(data, pos, tag & 0x0F)
+
+    if tag == 0xC0:
+        return None, pos
+    if tag == 0xC2:
+        return False, pos
+    if tag == 0xC3:
+        return True, pos
+    if tag == 0xCB:
+        return _D.unpack_from(data, pos)[0], pos + 8
+    if tag == 0xCA:
+        return struct.unpack_from(">f", data, pos)[0], pos + 4
+
+    if tag == 0xCC:
+        return data[pos], pos + 1
+    if tag == 0xCD:
+        return _H.unpack_from(data, pos)[0], pos + 2
+    if tag == 0xCE:
+        return _I.unpack_from(data, pos)[0], pos + 4
+    if tag == 0xCF:
+        return _Q.unpack_from(data, pos)[0], pos + 8
+    if tag == 0xD0:
+        return _b.unpack_from(data, pos)[0], pos + 1
+    if tag == 0xD1:
+        return _h.unpack_from(data, pos)[0], pos + 2
+    if tag == 0xD2:
+        return _i.unpack_from(data, pos)[0], pos + 4
+    if tag == 0xD3:
+        return _q.unpack_from(data, pos)[0], pos + 8
+
+    if tag in (0xD9, 0xDA, 0xDB):
+        size, pos = _unpack_size(data, pos, tag - 0xD9)
+        end = pos + size
+        return data[pos:end].decode(), end
+    if tag in (0xC4, 0xC5, 0xC6):
+        size, pos = _unpack_size(data, pos, tag - 0xC4)
+        end = pos + size
+        return data[pos:end], end
+    if tag in (0xDC, 0xDD):
+        size, pos = _unpack_size(data, pos, tag - 0xDC + 1)
+        return _unpack_array(data, pos, size)
+    if tag in (0xDE, 0xDF):
+        size, pos = _unpack_size(data, pos, tag - 0xDE + 1)
+        return _unpack_map(data, pos, size)
+    if tag in (0xC7, 0xC8, 0xC9):
+        size, pos = _unpack_size(data, pos, tag - 0xC7)
+        ext_type = data[pos]
+        start = pos + 1
+        end = start + size
+        return _unpack_ext(ext_type, data, start, end), end
+
+    raise CodecError(f"Octet de type inconnu: 0x{tag:02x}")
+
+
+def _unpack_size(data: bytes, pos: int, width: int) -> Tuple[int, int]:
+    """Taille sur 1, 2 ou 4 octets (width 0, 1, 2)"""
+    if width == 0:
+        return data[pos], pos + 1
+    if width == 1:
+        return _H.unpack_from(data, pos)[0], pos + 2
+    return _I.unpack_from(data, pos)[0], pos + 4
+
+
+def _unpack_array(data: bytes, pos: int, size: int) -> Tuple[List, int]:
+    items = []
+    for _ in range(size):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(data: bytes, pos: int, size: int) -> Tuple[Dict, int]:
+    result = {}
+    for _ in range(size):
+        key, pos = _unpack(data, pos)
+        value, pos = _unpack(data, pos)
+        result[key] = value
+    return result, pos
+
+
+def _unpack_ext(ext_type: int, data: bytes, start: int, end: int) -> Any:
+    if end > len(data):
+        raise CodecError("Extension tronquée")
+    if ext_type == EXT_HEX:
+        return data[start:end].hex()
+    if ext_type == EXT_BASE64:
+        return base64.b64encode(data[start:end]).decode()
+    if ext_type == EXT_RECORD:
+        return _unpack_record(data, start, end)
+    raise CodecError(f"Extension inconnue: {ext_type}")
+
+
+def _unpack_record(data: bytes, pos: int, end: int) -> Dict:
+    schema = _SCHEMAS_BY_ID.get(data[pos])
+    if schema is None:
+        raise CodecError(f"Schéma inconnu: {data[pos]}")
+    name, fields = schema
+    pos += 1
+
+    tag = data[pos]
+    if 0x90 <= tag <= 0x9F:
+        size, pos = tag & 0x0F, pos + 1
+    elif tag == 0xDC:
+        size, pos = _unpack_size(data, pos + 1, 1)
+    else:
+        raise CodecError("Enregistrement invalide")
+    if size != len(fields):
+        raise CodecError(f"Enregistrement {name}: {size} champs, {len(fields)} attendus")
+
+    record = {"type": name}
+    for field_name in fields:
+        if data[pos] == _ABSENT:
+            pos += 1
+            continue
+        record[field_name], pos = _unpack(data, pos)
+
+    extra, pos = _unpack(data, pos)
+    if not isinstance(extra, dict) or pos != end:
+        raise CodecError("Enregistrement invalide")
+    record.update(extra)
+    return record
+
+
+def decode(payload: bytes) -> Any:
+    """Charge utile orpack/1 → message (CodecError si invalide ou tronquée)"""
+    if not payload or payload[0] != CODEC_VERSION:
+        raise CodecError("Version de codec inconnue")
+    try:
+        message, pos = _unpack(payload, 1)
+    except CodecError:
+        raise
+    except (IndexError, TypeError, struct.error, UnicodeDecodeError, RecursionError) as e:
+        raise CodecError(f"Charge utile invalide: {e}")
+    if pos != len(payload):
+        raise CodecError("Charge utile tronquée ou octets superflus")
+    return message
+
+
+# ============ TRAMES ============
+
+def encode_message_frame(message: Any, codec: str = JSON_CODEC,
+                         max_frame_size: int = MAX_FRAME_SIZE) -> bytes:
+    """Message tramé avec le codec négocié (repli JSON si non encodable en binaire)"""
+    if codec == BINARY_CODEC:
+        try:
+            return encode_frame(encode(message), FRAME_BINARY, max_frame_size)
+        except CodecError:
+            pass
+    return encode_json_frame(message, max_frame_size)
+
+
+def decode_frame(frame: Frame) -> Any:
+    """Message d'une trame JSON ou orpack/1 (ValueError si invalide)"""
+    if frame.frame_type == FRAME_JSON:
+        return frame.json()
+    if frame.frame_type == FRAME_BINARY:
+        return decode(frame.payload)
+    raise FrameError(f"Type de trame inconnu: {frame.frame_type}")
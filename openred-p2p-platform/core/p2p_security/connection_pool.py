@@ -0,0 +1,237 @@
+# === OpenRed P2P : Pool de connexions persistantes ===
+# Une connexion 3 phases par pair (clé: fingerprint), réutilisée pour
+# toutes les requêtes URN et messages sociaux au lieu d'un handshake RSA
+# complet par message
+# Keepalive, fermeture des connexions inactives, flux concurrents bornés
+# par pair, reconnexion avec backoff exponentiel + jitter
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.p2p_security.async_transport import AsyncP2PTransport, DEFAULT_REQUEST_TIMEOUT
+
+Endpoint = Tuple[str, int]
+
+# Résolution fingerprint → (ip, port) P2P (découverte lighthouse)
+EndpointResolver = Callable[[str], Optional[Endpoint]]
+
+DEFAULT_MAX_STREAMS_PER_PEER = 8
+DEFAULT_KEEPALIVE_INTERVAL = 25.0   # sous les délais NAT usuels (30s+)
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_CONNECT_ATTEMPTS = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 60.0
+
+
+def backoff_delay(failures: int, base: float = DEFAULT_BACKOFF_BASE,
+                  maximum: float = DEFAULT_BACKOFF_MAX) -> float:
+    """Backoff exponentiel plafonné, jitter ±50% (évite les reconnexions synchronisées)"""
+    delay = min(maximum, base * (2 ** min(32, max(0, failures - 1))))
+    return delay * random.uniform(0.5, 1.5)
+
+
+@dataclass
+class PooledPeer:
+    """État du pool pour un pair"""
+    fingerprint: str
+    streams: asyncio.Semaphore
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    session_id: Optional[str] = None
+    endpoint: Optional[Endpoint] = None
+    in_use: int = 0
+    last_used: float = field(default_factory=time.time)
+    failures: int = 0
+    retry_after: float = 0.0
+
+
+class P2PConnectionPool:
+    """
+    Pool de connexions P2P persistantes au-dessus d'AsyncP2PTransport
+    - acquire(fingerprint): session réutilisée (hit) ou handshake (miss)
+    - send / request: raccourcis qui empruntent une connexion du pool
+    """
+
+    def __init__(self, transport: AsyncP2PTransport, resolve_endpoint: Optional[EndpointResolver] = None,
+                 max_streams_per_peer: int = DEFAULT_MAX_STREAMS_PER_PEER,
+                 keepalive_interval: float = DEFAULT_KEEPALIVE_INTERVAL,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 connect_attempts: int = DEFAULT_CONNECT_ATTEMPTS,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX):
+        self.transport = transport
+        self.resolve_endpoint = resolve_endpoint
+        self.max_streams_per_peer = max_streams_per_peer
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.connect_attempts = connect_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.peers: Dict[str, PooledPeer] = {}
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "handshakes": 0,
+            "handshake_failures": 0,
+            "reconnects": 0,
+            "backoff_rejections": 0,
+            "idle_closed": 0,
+            "keepalives_sent": 0,
+            "keepalive_failures": 0,
+        }
+
+    def start(self):
+        """Démarre la maintenance (keepalive, inactivité) dans la boucle courante"""
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.ensure_future(self._maintenance_loop())
+
+    async def close(self):
+        """Arrête la maintenance et ferme toutes les connexions du pool"""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+            self._maintenance_task = None
+        for peer in self.peers.values():
+            if peer.session_id:
+                self.transport.close_connection(peer.session_id)
+                peer.session_id = None
+
+    def _peer(self, fingerprint: str) -> PooledPeer:
+        peer = self.peers.get(fingerprint)
+        if peer is None:
+            peer = PooledPeer(fingerprint, asyncio.Semaphore(self.max_streams_per_peer))
+            self.peers[fingerprint] = peer
+        return peer
+
+    @asynccontextmanager
+    async def acquire(self, fingerprint: str, endpoint: Optional[Endpoint] = None):
+        """
+        Emprunte la session du pair (au plus max_streams_per_peer emprunts simultanés)
+        Fournit l'identifiant de session, ou None si le pair est injoignable
+        """
+        peer = self._peer(fingerprint)
+        async with peer.streams:
+            session_id = await self._ensure_connected(peer, endpoint)
+            peer.in_use += 1
+            try:
+                yield session_id
+            finally:
+                peer.in_use -= 1
+                peer.last_used = time.time()
+
+    async def send(self, fingerprint: str, message: Dict, endpoint: Optional[Endpoint] = None) -> bool:
+        """Message sécurisé via la connexion persistante du pair"""
+        async with self.acquire(fingerprint, endpoint) as session_id:
+            if session_id is None:
+                return False
+            return await self.transport.send_secure_message(session_id, message)
+
+    async def request(self, fingerprint: str, message: Dict, endpoint: Optional[Endpoint] = None,
+                      timeout: float = DEFAULT_REQUEST_TIMEOUT) -> Optional[Dict]:
+        """Requête/réponse via la connexion persistante du pair"""
+        async with self.acquire(fingerprint, endpoint) as session_id:
+            if session_id is None:
+                return None
+            return await self.transport.request(session_id, message, timeout)
+
+    def _usable(self, session_id: Optional[str]) -> bool:
+        """Connexion ouverte et contexte de sécurité encore valide (durée de vie des sessions)"""
+        return (session_id is not None and self.transport.is_connected(session_id)
+                and self.transport.security_protocol.is_connection_secure(session_id))
+
+    async def _ensure_connected(self, peer: PooledPeer, endpoint: Optional[Endpoint]) -> Optional[str]:
+        if self._usable(peer.session_id):
+            self.stats["hits"] += 1
+            return peer.session_id
+
+        # Un seul handshake à la fois par pair: les autres emprunteurs attendent son résultat
+        async with peer.lock:
+            if self._usable(peer.session_id):
+                self.stats["hits"] += 1
+                return peer.session_id
+
+            self.stats["misses"] += 1
+            if peer.session_id is not None:
+                # Connexion perdue ou session expirée depuis le dernier emprunt
+                self.stats["reconnects"] += 1
+                self.transport.close_connection(peer.session_id)
+                peer.session_id = None
+
+            if time.time() < peer.retry_after:
+                self.stats["backoff_rejections"] += 1
+                return None
+
+            # Adresse explicite, sinon découverte la plus récente, sinon dernière adresse connue
+            endpoint = endpoint or (
+                self.resolve_endpoint(peer.fingerprint) if self.resolve_endpoint else None
+            ) or peer.endpoint
+            if endpoint is None:
+                print(f"❌ No known endpoint for peer {peer.fingerprint[:8]}...")
+                return None
+            peer.endpoint = endpoint
+
+            for attempt in range(1, self.connect_attempts + 1):
+                self.stats["handshakes"] += 1
+                session_id = await self.transport.connect_to_peer(endpoint[0], endpoint[1], peer.fingerprint)
+                if session_id:
+                    peer.session_id = session_id
+                    peer.failures = 0
+                    peer.retry_after = 0.0
+                    return session_id
+
+                self.stats["handshake_failures"] += 1
+                peer.failures += 1
+                delay = backoff_delay(peer.failures, self.backoff_base, self.backoff_max)
+                if attempt < self.connect_attempts:
+                    await asyncio.sleep(delay)
+                else:
+                    # Pair injoignable: échec immédiat jusqu'à la fin du backoff
+                    peer.retry_after = time.time() + delay
+                    print(f"⚠️ Peer {peer.fingerprint[:8]}... unreachable, retry in {delay:.1f}s")
+            return None
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await self._maintain()
+            except Exception as e:
+                print(f"⚠️ Connection pool maintenance error: {e}")
+
+    async def _maintain(self):
+        now = time.time()
+        for peer in list(self.peers.values()):
+            if not peer.session_id or not self.transport.is_connected(peer.session_id):
+                continue
+
+            if peer.in_use == 0 and now - peer.last_used > self.idle_timeout:
+                self.transport.close_connection(peer.session_id)
+                peer.session_id = None
+                self.stats["idle_closed"] += 1
+                continue
+
+            connection = self.transport.active_connections[peer.session_id]
+            if now - connection.last_activity >= self.keepalive_interval:
+                if await self.transport.send_keepalive(peer.session_id):
+                    self.stats["keepalives_sent"] += 1
+                else:
+                    self.stats["keepalive_failures"] += 1
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Statistiques du pool (taux de réutilisation, handshakes...)"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "peers": len(self.peers),
+            "open_connections": sum(
+                1 for peer in self.peers.values()
+                if peer.session_id and self.transport.is_connected(peer.session_id)
+            ),
+            "streams_in_use": sum(peer.in_use for peer in self.peers.values()),
+        }
@@ -0,0 +1,193 @@
+# === OpenRed P2P : Distribution des messages entrants ===
+# Tous les messages P2P entrants sont traités dans une seule boucle asyncio
+# longue durée (celle de FastAPI quand le nœud est embarqué), jamais dans
+# une boucle créée pour l'occasion
+# - sources dans la boucle (transport asyncio): dispatch() attendu directement
+# - sources dans des threads (serveurs à threads, callbacks): submit(),
+#   file bornée, le thread appelant attend si la file est pleine
+# Latence des handlers mesurée par type de message
+
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Union
+
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_WORKERS = 4
+LATENCY_WINDOW = 512   # dernières mesures conservées par type (percentiles)
+
+# Handler de messages: (session_id, message) → réponse éventuelle, synchrone ou coroutine
+MessageHandler = Callable[[str, Dict], Union[Optional[Dict], Awaitable[Optional[Dict]]]]
+
+
+@dataclass
+class HandlerLatency:
+    """Latences d'un type de message"""
+    count: int = 0
+    errors: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def record(self, elapsed: float, failed: bool):
+        self.count += 1
+        self.errors += int(failed)
+        self.total += elapsed
+        self.maximum = max(self.maximum, elapsed)
+        self.recent.append(elapsed)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.recent)
+
+        def percentile(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": self.maximum * 1000,
+        }
+
+
+class InboundDispatcher:
+    """
+    Boucle unique pour les messages entrants
+    - start() lie le distributeur à la boucle courante et lance les workers
+    - dispatch(session_id, message): handler attendu dans la boucle, latence mesurée
+    - submit(label, fonction, *args): depuis n'importe quel thread, exécuté par un worker
+    """
+
+    def __init__(self, handler: Optional[MessageHandler] = None,
+                 max_pending: int = DEFAULT_MAX_PENDING, workers: int = DEFAULT_WORKERS):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.worker_count = workers
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._pending = 0
+        self._not_full = threading.Condition()
+        self.latency: Dict[str, HandlerLatency] = {}
+        self.stats = {
+            "dispatched": 0,
+            "submitted": 0,
+            "rejected": 0,
+            "queue_wait_total": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and not self.loop.is_closed()
+
+    def start(self):
+        """Lie le distributeur à la boucle courante (à appeler depuis cette boucle)"""
+        if self._workers:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        """Arrête les workers; les éléments encore en file sont abandonnés"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.loop = None
+        with self._not_full:
+            self._pending = 0
+            self._not_full.notify_all()
+
+    async def run(self, label: str, function: Callable, *args) -> Any:
+        """Exécute un handler (fonction ou coroutine) dans la boucle en mesurant sa latence"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            result = function(*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            stats = self.latency.get(label)
+            if stats is None:
+                stats = self.latency[label] = HandlerLatency()
+            stats.record(time.perf_counter() - start, failed)
+
+    async def dispatch(self, session_id: str, message: Dict) -> Optional[Dict]:
+        """Handler de messages pour une source déjà dans la boucle (transport asyncio)"""
+        self.stats["dispatched"] += 1
+        return await self.run(str(message.get("type", "unknown")), self.handler, session_id, message)
+
+    def submit(self, label: str, function: Callable, *args, timeout: Optional[float] = None) -> bool:
+        """
+        Remet un traitement à la boucle depuis n'importe quel thread (sans attendre son résultat)
+        File pleine: le thread appelant attend jusqu'à timeout; depuis la boucle, refus immédiat
+        False si le distributeur n'est pas démarré ou si la file est restée pleine
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return False
+
+        on_loop = False
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            pass
+
+        with self._not_full:
+            if self._pending >= self.max_pending and not on_loop and timeout:
+                self._not_full.wait_for(lambda: self._pending < self.max_pending or self.loop is None,
+                                        timeout)
+            if self._pending >= self.max_pending or self.loop is None:
+                self.stats["rejected"] += 1
+                return False
+            self._pending += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._pending)
+
+        try:
+            loop.call_soon_threadsafe(self._queue.put_nowait, (label, function, args, time.perf_counter()))
+        except RuntimeError:
+            # Boucle fermée entre-temps
+            self._release()
+            self.stats["rejected"] += 1
+            return False
+        self.stats["submitted"] += 1
+        return True
+
+    def _release(self):
+        with self._not_full:
+            self._pending -= 1
+            self._not_full.notify()
+
+    async def _worker(self):
+        while True:
+            label, function, args, queued_at = await self._queue.get()
+            self._release()
+            self.stats["queue_wait_total"] += time.perf_counter() - queued_at
+            try:
+                await self.run(label, function, *args)
+            except Exception as e:
+                print(f"⚠️ Error processing inbound {label} message: {e}")
+
+    def get_dispatch_stats(self) -> Dict[str, Any]:
+        """Statistiques: profondeur de file, refus, latence par type de message"""
+        queued = self.stats["submitted"]
+        return {
+            "running": self.running,
+            "dispatched": self.stats["dispatched"],
+            "submitted": queued,
+            "rejected": self.stats["rejected"],
+            "queue_depth": self._pending,
+            "max_queue_depth": self.stats["max_queue_depth"],
+            "avg_queue_wait_ms": self.stats["queue_wait_total"] / queued * 1000 if queued else 0.0,
+            "handlers": {label: stats.summary() for label, stats in sorted(self.latency.items())},
+        }
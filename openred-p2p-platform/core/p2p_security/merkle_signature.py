@@ -0,0 +1,191 @@
+# === OpenRed P2P Security : Signature Merkle des Cendres Phantom ===
+# Une seule signature RSA par URN (racine d'un arbre de Merkle des fragments)
+# au lieu d'une signature RSA-PSS par pixel.
+# Chaque fragment porte sa preuve d'inclusion (hashes frères, feuille → racine).
+
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+# Séparation de domaine feuille / nœud interne (pas de seconde préimage)
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+MerkleProof = Tuple[bytes, ...]
+
+
+def hash_leaf(data: bytes) -> bytes:
+    """Hash d'une feuille (contenu d'un fragment)"""
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    """Hash d'un nœud interne"""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def level_widths(total_leaves: int) -> List[int]:
+    """Largeur de chaque niveau, des feuilles à la racine (nœud impair promu tel quel)"""
+    widths = [total_leaves]
+    while widths[-1] > 1:
+        widths.append((widths[-1] + 1) // 2)
+    return widths
+
+
+class MerkleTree:
+    """
+    Arbre de Merkle des fragments d'une URN.
+    Un nœud sans frère (niveau impair) est promu au niveau supérieur sans
+    duplication. Les preuves référencent les hashes de l'arbre (pas de copie).
+    """
+
+    def __init__(self, leaf_hashes: Sequence[bytes]):
+        if not leaf_hashes:
+            raise ValueError("Arbre de Merkle vide")
+
+        self.levels: List[List[bytes]] = [list(leaf_hashes)]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+    @property
+    def total_leaves(self) -> int:
+        return len(self.levels[0])
+
+    def proof(self, index: int) -> MerkleProof:
+        """Preuve d'inclusion: hashes frères de la feuille jusqu'à la racine"""
+        siblings = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                siblings.append(level[sibling])
+            index //= 2
+        return tuple(siblings)
+
+
+def root_from_proof(leaf_hash: bytes, index: int, total_leaves: int, proof: MerkleProof) -> Optional[bytes]:
+    """Racine recalculée depuis une feuille et sa preuve (None si preuve mal formée)"""
+    node = leaf_hash
+    position = 0
+    for width in level_widths(total_leaves)[:-1]:
+        sibling = index ^ 1
+        if sibling < width:
+            if position >= len(proof):
+                return None
+            node = hash_node(proof[position], node) if index & 1 else hash_node(node, proof[position])
+            position += 1
+        index //= 2
+    return node if position == len(proof) else None
+
+
+def verify_inclusion(leaf_hash: bytes, index: int, total_leaves: int,
+                     proof: MerkleProof, root: bytes) -> bool:
+    """Vérifie qu'une feuille appartient à l'arbre de racine donnée"""
+    return 0 <= index < total_leaves and root_from_proof(leaf_hash, index, total_leaves, proof) == root
+
+
+class MerkleBatchVerifier:
+    """
+    Vérification par lots des preuves d'une même URN.
+    Les nœuds internes déjà validés jusqu'à la racine sont mémorisés: une
+    preuve s'arrête dès qu'elle rejoint un nœud validé (≈ 1-2 hashes par
+    fragment sur un parcours complet au lieu de log2(n)).
+    """
+
+    def __init__(self, root: bytes, total_leaves: int):
+        self.root = root
+        self.total_leaves = total_leaves
+        self.widths = level_widths(total_leaves)
+        # (niveau, index) → hash validé
+        self.verified: Dict[Tuple[int, int], bytes] = {(len(self.widths) - 1, 0): root}
+
+    def verify(self, leaf_hash: bytes, index: int, proof: MerkleProof) -> bool:
+        if not 0 <= index < self.total_leaves:
+            return False
+
+        path: List[Tuple[Tuple[int, int], bytes]] = []
+        node = leaf_hash
+        position = 0
+        for level, width in enumerate(self.widths):
+            known = self.verified.get((level, index))
+            if known is not None:
+                if known != node:
+                    return False
+                break
+            path.append(((level, index), node))
+
+            sibling = index ^ 1
+            if sibling < width:
+                if position >= len(proof):
+                    return False
+                node = hash_node(proof[position], node) if index & 1 else hash_node(node, proof[position])
+                position += 1
+            index //= 2
+
+        # Chemin rattaché à un nœud validé: tous ses nœuds sont validés
+        self.verified.update(path)
+        return True
+
+    def verify_many(self, items: Sequence[Tuple[bytes, int, MerkleProof]]) -> List[bool]:
+        """items: (hash feuille, index, preuve) → résultats dans le même ordre"""
+        return [self.verify(leaf_hash, index, proof) for leaf_hash, index, proof in items]
+
+
+def _root_message(root: bytes, context: bytes) -> bytes:
+    return b"openred-merkle-root:" + context + b":" + root
+
+
+def sign_merkle_root(private_key, root: bytes, context: bytes) -> bytes:
+    """Signature RSA-PSS unique de la racine (context = identifiant de l'URN)"""
+    return private_key.sign(
+        _root_message(root, context),
+        padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.MAX_LENGTH
+        ),
+        hashes.SHA256()
+    )
+
+
+def verify_merkle_root(public_key, root: bytes, signature: bytes, context: bytes) -> bool:
+    """Vérifie la signature du propriétaire sur la racine"""
+    try:
+        public_key.verify(
+            signature,
+            _root_message(root, context),
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            hashes.SHA256()
+        )
+        return True
+    except InvalidSignature:
+        return False
+
+
+class VerifiedRootCache:
+    """Racines dont la signature a déjà été vérifiée (une vérification RSA par URN)"""
+
+    def __init__(self):
+        self._verified: Dict[bytes, bytes] = {}  # context → racine validée
+
+    def verify(self, public_key, root: bytes, signature: bytes, context: bytes) -> bool:
+        if self._verified.get(context) == root:
+            return True
+        if not verify_merkle_root(public_key, root, signature, context):
+            return False
+        self._verified[context] = root
+        return True
+
+    def forget(self, context: bytes):
+        self._verified.pop(context, None)
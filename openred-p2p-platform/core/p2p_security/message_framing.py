@@ -0,0 +1,138 @@
+# === OpenRed P2P : Tramage des messages TCP ===
+# Préfixe de longueur + octet de type devant chaque message
+# Un recv() peut livrer un morceau de message ou plusieurs messages:
+# recv_frame lit exactement une trame (en-tête puis charge utile annoncée)
+# Variantes asyncio (StreamReader/StreamWriter) pour le transport asynchrone
+
+import asyncio
+import json
+import struct
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# En-tête: longueur de la charge utile (uint32 big-endian) + type (uint8)
+FRAME_HEADER = struct.Struct("!IB")
+FRAME_HEADER_SIZE = FRAME_HEADER.size
+
+# Types de trame
+FRAME_JSON = 1
+FRAME_BINARY = 2
+
+FRAME_TYPES = (FRAME_JSON, FRAME_BINARY)
+
+# Taille maximale d'une trame (matrices quantiques, photos de profil...)
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+RECV_BUFFER_SIZE = 65536
+
+
+class FrameError(ValueError):
+    """Flux P2P invalide (trame trop grande, type inconnu): la connexion doit être fermée"""
+
+
+@dataclass
+class Frame:
+    """Trame complète reçue"""
+    frame_type: int
+    payload: bytes
+
+    def json(self) -> Any:
+        """Charge utile JSON décodée (json.JSONDecodeError si invalide)"""
+        return json.loads(self.payload.decode())
+
+
+def encode_frame(payload: bytes, frame_type: int = FRAME_BINARY,
+                 max_frame_size: int = MAX_FRAME_SIZE) -> bytes:
+    """En-tête + charge utile, prêts à être envoyés"""
+    if frame_type not in FRAME_TYPES:
+        raise FrameError(f"Type de trame inconnu: {frame_type}")
+    if len(payload) > max_frame_size:
+        raise FrameError(f"Trame trop grande: {len(payload)} octets (max {max_frame_size})")
+    return FRAME_HEADER.pack(len(payload), frame_type) + payload
+
+
+def encode_json_frame(message: Any, max_frame_size: int = MAX_FRAME_SIZE) -> bytes:
+    """Message JSON tramé"""
+    return encode_frame(json.dumps(message).encode(), FRAME_JSON, max_frame_size)
+
+
+def _parse_header(header: bytes, max_frame_size: int):
+    length, frame_type = FRAME_HEADER.unpack(header)
+    if frame_type not in FRAME_TYPES:
+        raise FrameError(f"Type de trame inconnu: {frame_type}")
+    if length > max_frame_size:
+        raise FrameError(f"Trame annoncée trop grande: {length} octets (max {max_frame_size})")
+    return length, frame_type
+
+
+def send_json(sock, message: Any, max_frame_size: int = MAX_FRAME_SIZE):
+    """Envoie un message JSON tramé"""
+    sock.sendall(encode_json_frame(message, max_frame_size))
+
+
+def _recv_exact(sock, size: int) -> Optional[bytes]:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, RECV_BUFFER_SIZE))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock, max_frame_size: int = MAX_FRAME_SIZE) -> Optional[Frame]:
+    """
+    Lit exactement une trame, sans consommer les octets du message suivant
+    La taille annoncée est vérifiée dès l'en-tête; None si le pair a fermé la connexion
+    """
+    header = _recv_exact(sock, FRAME_HEADER_SIZE)
+    if header is None:
+        return None
+    length, frame_type = _parse_header(header, max_frame_size)
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        return None
+    return Frame(frame_type, payload)
+
+
+def recv_json(sock, max_frame_size: int = MAX_FRAME_SIZE) -> Optional[Any]:
+    """Lit exactement un message JSON tramé; None si le pair a fermé la connexion"""
+    frame = recv_frame(sock, max_frame_size)
+    if frame is None:
+        return None
+    if frame.frame_type != FRAME_JSON:
+        raise FrameError(f"Trame JSON attendue, type {frame.frame_type} reçu")
+    return frame.json()
+
+
+# ============ VARIANTES ASYNCIO ============
+
+async def read_frame_async(reader, max_frame_size: int = MAX_FRAME_SIZE) -> Optional[Frame]:
+    """Lit une trame sur un asyncio.StreamReader; None si le pair a fermé la connexion"""
+    try:
+        header = await reader.readexactly(FRAME_HEADER_SIZE)
+        length, frame_type = _parse_header(header, max_frame_size)
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            print(f"⚠️ Connection closed mid-frame ({len(e.partial)} bytes dropped)")
+        return None
+    return Frame(frame_type, payload)
+
+
+async def read_json_async(reader, max_frame_size: int = MAX_FRAME_SIZE) -> Optional[Any]:
+    """Lit un message JSON tramé sur un asyncio.StreamReader; None si connexion fermée"""
+    frame = await read_frame_async(reader, max_frame_size)
+    if frame is None:
+        return None
+    if frame.frame_type != FRAME_JSON:
+        raise FrameError(f"Trame JSON attendue, type {frame.frame_type} reçu")
+    return frame.json()
+
+
+async def send_json_async(writer, message: Any, max_frame_size: int = MAX_FRAME_SIZE):
+    """Envoie un message JSON tramé sur un asyncio.StreamWriter (attend la vidange du tampon)"""
+    writer.write(encode_json_frame(message, max_frame_size))
+    await writer.drain()
@@ -0,0 +1,521 @@
+# === OpenRed P2P : Boîte d'envoi durable ===
+# Messages sociaux non délivrés conservés sur disque (journal append-only)
+# au lieu d'un dict en mémoire perdu au redémarrage
+# Une file par pair, nouvelles tentatives avec backoff exponentiel + jitter,
+# vidage par lots dès que le lighthouse revoit le pair
+# Dédupliqués par identifiant de message, occupation disque bornée
+# Lots bornés en nombre et en octets (une trame P2P ne dépasse pas MAX_FRAME_SIZE)
+
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.p2p_security.binary_codec import CodecError, decode, encode
+from core.p2p_security.connection_pool import backoff_delay
+from core.p2p_security.message_framing import MAX_FRAME_SIZE, FrameError
+
+JOURNAL_FILENAME = "outbox.log"
+JOURNAL_MAGIC = b"OROUT1\n"
+
+# Enregistrement du journal: opération (B) + longueur du corps (I) + corps
+_RECORD = struct.Struct("<BI")
+OP_ENQUEUE = 1   # corps: message et métadonnées (orpack/1)
+OP_DONE = 2      # corps: pair et identifiants terminés (délivrés ou expirés)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+DEFAULT_BATCH_SIZE = 200
+# Octets (journal orpack) par lot, et taille maximale d'un message: marge sous MAX_FRAME_SIZE
+# pour le repli JSON, plus verbeux que l'orpack
+DEFAULT_MAX_BATCH_BYTES = MAX_FRAME_SIZE // 4
+DEFAULT_RETRY_INTERVAL = 5.0
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 300.0
+COMPACT_MIN_BYTES = 1024 * 1024   # journal compacté au-delà, s'il est majoritairement mort
+RECENT_IDS_CAPACITY = 50000
+
+# Lot de messages pour un pair: le destinataire répond {"delivered": [identifiants]}
+BATCH_TYPE = "p2p_outbox_batch"
+OUTBOX_ID_KEY = "outbox_id"
+
+# Requête P2P: (fingerprint du pair, message) → réponse, ou None si injoignable
+RequestFunction = Callable[[str, Dict], Awaitable[Optional[Dict]]]
+
+
+def message_id_of(message: Dict) -> str:
+    """Identifiant de déduplication: message_id / request_id, sinon empreinte du contenu"""
+    for key in ("message_id", "request_id"):
+        if message.get(key):
+            return f"{message.get('type', 'message')}:{message[key]}"
+    return hashlib.sha256(json.dumps(message, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class RecentIds:
+    """Identifiants déjà traités (côté destinataire): une relivraison est acquittée sans retraitement"""
+
+    def __init__(self, capacity: int = RECENT_IDS_CAPACITY):
+        self.capacity = capacity
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._ids
+
+    def add(self, message_id: str):
+        self._ids[message_id] = None
+        self._ids.move_to_end(message_id)
+        while len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+
+
+@dataclass
+class OutboxEntry:
+    message_id: str
+    peer: str
+    message: Dict
+    queued_at: float
+    size: int   # octets occupés dans le journal
+
+
+@dataclass
+class PeerQueue:
+    """File d'un pair et état de ses tentatives"""
+    fingerprint: str
+    entries: "OrderedDict[str, OutboxEntry]" = field(default_factory=OrderedDict)
+    failures: int = 0
+    next_attempt: float = 0.0
+    flushing: bool = False
+    flush_task: Optional[asyncio.Task] = None
+    batch_supported: Optional[bool] = None   # None: pas encore testé
+
+
+class P2POutbox:
+    """
+    Boîte d'envoi persistante (à utiliser depuis la boucle du nœud)
+    - enqueue(pair, message): journalisé puis tentative d'envoi immédiate
+    - notify_peer_online(pair): backoff remis à zéro, vidage prioritaire
+    - boucle de reprise: pairs dont le backoff est écoulé, messages expirés
+    """
+
+    def __init__(self, directory: str, request: RequestFunction,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+                 retry_interval: float = DEFAULT_RETRY_INTERVAL, backoff_base: float = DEFAULT_BACKOFF_BASE, backoff_max: float = DEFAULT_BACKOFF_MAX):
+        self.directory = directory
+        self.request = request
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.retry_interval = retry_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.peers: Dict[str, PeerQueue] = {}
+        self.live_bytes = 0
+        self.journal_bytes = 0
+        self._journal = None
+        self._retry_task: Optional[asyncio.Task] = None
+        self._flush_tasks = set()
+        self.stats = {
+            "queued": 0,
+            "deduplicated": 0,
+            "delivered": 0,
+            "expired": 0,
+            "rejected_full": 0,
+            "rejected_too_large": 0,
+            "frame_rejections": 0,
+            "batches_sent": 0,
+            "send_failures": 0,
+            "compactions": 0,
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_journal()
+
+    # ============ JOURNAL ============
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, JOURNAL_FILENAME)
+
+    def _load_journal(self):
+        """Rejoue le journal; tronque un éventuel enregistrement incomplet (crash)"""
+        if not os.path.exists(self.journal_path):
+            self._open_journal()
+            return
+
+        with open(self.journal_path, "rb") as f:
+            data = f.read()
+        if not data.startswith(JOURNAL_MAGIC):
+            raise ValueError(f"Journal de boîte d'envoi invalide: {self.journal_path}")
+
+        pos = valid_end = len(JOURNAL_MAGIC)
+        while pos + _RECORD.size <= len(data):
+            op, length = _RECORD.unpack_from(data, pos)
+            body_start = pos + _RECORD.size
+            record_end = body_start + length
+            if record_end > len(data):
+                break
+            body = data[body_start:record_end]
+            if op == OP_ENQUEUE:
+                try:
+                    record = decode(body)
+                    entry = OutboxEntry(record["id"], record["peer"], record["message"],
+                                        record["queued_at"], record_end - pos)
+                except (CodecError, KeyError, TypeError):
+                    print(f"⚠️ Corrupted outbox record skipped at offset {pos}")
+                else:
+                    self._add_entry(entry)
+            elif op == OP_DONE:
+                try:
+                    record = decode(body)
+                    for message_id in record["ids"]:
+                        self._remove_entry(record["peer"], message_id)
+                except (CodecError, KeyError, TypeError):
+                    print(f"⚠️ Corrupted outbox record skipped at offset {pos}")
+            pos = valid_end = record_end
+
+        if valid_end < len(data):
+            print(f"⚠️ Outbox journal truncated ({len(data) - valid_end} bytes dropped)")
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_end)
+
+        self._open_journal()
+        pending = self.pending_count()
+        if pending:
+            print(f"📬 Outbox restored: {pending} message(s) for {len(self._non_empty_peers())} peer(s)")
+        self._maybe_compact()
+
+    def _open_journal(self):
+        is_new = not os.path.exists(self.journal_path)
+        self._journal = open(self.journal_path, "ab")
+        if is_new:
+            self._journal.write(JOURNAL_MAGIC)
+            self._journal.flush()
+        self.journal_bytes = self._journal.tell()
+
+    def _append(self, record: bytes):
+        self._journal.write(record)
+        self._journal.flush()
+        self.journal_bytes += len(record)
+
+    def _maybe_compact(self):
+        if self.journal_bytes > COMPACT_MIN_BYTES and self.journal_bytes > 2 * (self.live_bytes + len(JOURNAL_MAGIC)):
+            self._compact()
+
+    def _compact(self):
+        """Réécrit le journal avec les seuls messages en attente (remplacement atomique)"""
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(JOURNAL_MAGIC)
+            for queue in self.peers.values():
+                for entry in queue.entries.values():
+                    f.write(self._enqueue_record(entry))
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal.close()
+        os.replace(temp_path, self.journal_path)
+        self._open_journal()
+        self.stats["compactions"] += 1
+
+    @staticmethod
+    def _enqueue_record(entry: OutboxEntry) -> bytes:
+        body = encode({"id": entry.message_id, "peer": entry.peer,
+                       "queued_at": entry.queued_at, "message": entry.message})
+        return _RECORD.pack(OP_ENQUEUE, len(body)) + body
+
+    # ============ FILES PAR PAIR ============
+
+    def _queue(self, fingerprint: str) -> PeerQueue:
+        queue = self.peers.get(fingerprint)
+        if queue is None:
+            queue = self.peers[fingerprint] = PeerQueue(fingerprint)
+        return queue
+
+    def _add_entry(self, entry: OutboxEntry) -> bool:
+        queue = self._queue(entry.peer)
+        if entry.message_id in queue.entries:
+            return False
+        queue.entries[entry.message_id] = entry
+        self.live_bytes += entry.size
+        return True
+
+    def _remove_entry(self, peer: str, message_id: str) -> Optional[OutboxEntry]:
+        queue = self.peers.get(peer)
+        entry = queue.entries.pop(message_id, None) if queue else None
+        if entry is not None:
+            self.live_bytes -= entry.size
+        return entry
+
+    def _append_done(self, peer: str, message_ids: List[str]):
+        """Messages délivrés ou expirés: un seul enregistrement pour tout le lot"""
+        body = encode({"peer": peer, "ids": message_ids})
+        self._append(_RECORD.pack(OP_DONE, len(body)) + body)
+
+    def _non_empty_peers(self) -> List[PeerQueue]:
+        return [queue for queue in self.peers.values() if queue.entries]
+
+    def pending_count(self, fingerprint: Optional[str] = None) -> int:
+        if fingerprint is not None:
+            queue = self.peers.get(fingerprint)
+            return len(queue.entries) if queue else 0
+        return sum(len(queue.entries) for queue in self.peers.values())
+
+    def enqueue(self, fingerprint: str, message: Dict, message_id: Optional[str] = None) -> bool:
+        """
+        Journalise un message pour un pair puis tente l'envoi (boucle en cours)
+        Un message déjà en attente (même identifiant) n'est pas dupliqué
+        False si la limite disque est atteinte ou si le message ne tient pas dans un lot
+        """
+        message_id = message_id or message_id_of(message)
+        queue = self._queue(fingerprint)
+        if message_id in queue.entries:
+            self.stats["deduplicated"] += 1
+            return True
+
+        entry = OutboxEntry(message_id, fingerprint, message, time.time(), 0)
+        record = self._enqueue_record(entry)
+        entry.size = len(record)
+
+        if entry.size > self.max_batch_bytes:
+            self.stats["rejected_too_large"] += 1
+            print(f"❌ Outbox message for {fingerprint[:8]}... too large ({entry.size} bytes), refused")
+            return False
+
+        if self.journal_bytes + len(record) > self.max_bytes:
+            self._expire_all()
+            if self.journal_bytes > self.live_bytes + len(JOURNAL_MAGIC):
+                self._compact()
+            if self.journal_bytes + len(record) > self.max_bytes:
+                self.stats["rejected_full"] += 1
+                print(f"❌ Outbox full ({self.journal_bytes} bytes), message for {fingerprint[:8]}... refused")
+                return False
+
+        self._append(record)
+        queue.entries[message_id] = entry
+        self.live_bytes += entry.size
+        self.stats["queued"] += 1
+
+        self._schedule_flush(queue)
+        return True
+
+    def notify_peer_online(self, fingerprint: str):
+        """Pair revu par le lighthouse: backoff oublié, vidage immédiat"""
+        queue = self.peers.get(fingerprint)
+        if queue is None or not queue.entries:
+            return
+        queue.failures = 0
+        queue.next_attempt = 0.0
+        print(f"📤 Peer {fingerprint[:8]}... online, flushing {len(queue.entries)} queued message(s)")
+        self._schedule_flush(queue)
+
+    def _schedule_flush(self, queue: PeerQueue):
+        """Un seul vidage en cours ou planifié par pair (les messages ajoutés entre-temps le suivent)"""
+        if queue.flush_task is not None and not queue.flush_task.done():
+            return
+        if time.time() < queue.next_attempt:
+            return
+        try:
+            queue.flush_task = asyncio.get_running_loop().create_task(self.flush_peer(queue.fingerprint))
+        except RuntimeError:
+            return  # hors boucle: la boucle de reprise s'en chargera
+        self._flush_tasks.add(queue.flush_task)
+        queue.flush_task.add_done_callback(self._flush_tasks.discard)
+
+    # ============ ENVOI ============
+
+    def _expire(self, queue: PeerQueue):
+        limit = time.time() - self.max_age
+        expired = []
+        for mid, entry in queue.entries.items():   # ordre d'arrivée: les plus anciens d'abord
+            if entry.queued_at >= limit:
+                break
+            expired.append(mid)
+        if expired:
+            for mid in expired:
+                self.live_bytes -= queue.entries.pop(mid).size
+            self._append_done(queue.fingerprint, expired)
+            self.stats["expired"] += len(expired)
+            print(f"⌛ {len(expired)} outbox message(s) for {queue.fingerprint[:8]}... expired")
+
+    def _expire_all(self):
+        for queue in self._non_empty_peers():
+            self._expire(queue)
+
+    def _delivered(self, queue: PeerQueue, message_ids: List[str]):
+        done = []
+        for mid in message_ids:
+            entry = queue.entries.pop(mid, None)
+            if entry is not None:
+                self.live_bytes -= entry.size
+                done.append(mid)
+        if done:
+            self._append_done(queue.fingerprint, done)
+            self.stats["delivered"] += len(done)
+
+    async def flush_peer(self, fingerprint: str) -> int:
+        """Envoie la file d'un pair par lots; échec → backoff exponentiel avec jitter"""
+        queue = self.peers.get(fingerprint)
+        if queue is None or queue.flushing:
+            return 0
+        queue.flushing = True
+        delivered = 0
+        try:
+            self._expire(queue)
+            while queue.entries:
+                batch = self._next_batch(queue)
+                if queue.batch_supported is False:
+                    acked = await self._send_individually(queue, batch)
+                else:
+                    acked = await self._send_batch(queue, batch)
+                    if acked is None:
+                        continue   # pair sans lots: renvoi message par message
+                self._delivered(queue, acked)
+                delivered += len(acked)
+                if any(entry.message_id in queue.entries for entry in batch):   # ni acquitté ni écarté
+                    self._record_failure(queue)
+                    break
+                queue.failures = 0
+        finally:
+            queue.flushing = False
+            self._maybe_compact()
+        return delivered
+
+    def _next_batch(self, queue: PeerQueue) -> List[OutboxEntry]:
+        """Tête de file: au plus batch_size messages et max_batch_bytes octets (au moins un message)"""
+        batch, batch_bytes = [], 0
+        for entry in queue.entries.values():
+            if batch and (len(batch) >= self.batch_size or batch_bytes + entry.size > self.max_batch_bytes):
+                break
+            batch.append(entry)
+            batch_bytes += entry.size
+        return batch
+
+    def _drop_unsendable(self, queue: PeerQueue, entry: OutboxEntry):
+        """Message refusé par le tramage même seul: jamais délivrable, retiré de la file"""
+        if queue.entries.pop(entry.message_id, None) is not None:
+            self.live_bytes -= entry.size
+            self._append_done(queue.fingerprint, [entry.message_id])
+            self.stats["rejected_too_large"] += 1
+            print(f"❌ Outbox message for {queue.fingerprint[:8]}... exceeds the frame size, dropped")
+
+    async def _send_batch(self, queue: PeerQueue, batch: List[OutboxEntry]) -> Optional[List[str]]:
+        """
+        Identifiants acquittés; None si le pair ne connaît pas les lots
+        Lot refusé par le tramage (trop grand): coupé en deux, sans backoff (le pair n'y est pour rien)
+        """
+        try:
+            response = await self._request(queue.fingerprint, {
+                "type": BATCH_TYPE,
+                "messages": [{**entry.message, OUTBOX_ID_KEY: entry.message_id} for entry in batch]
+            })
+        except FrameError:
+            self.stats["frame_rejections"] += 1
+            if len(batch) == 1:
+                self._drop_unsendable(queue, batch[0])
+                return []
+            half = len(batch) // 2
+            first = await self._send_batch(queue, batch[:half])
+            if first is None or len(first) < half:
+                return first
+            second = await self._send_batch(queue, batch[half:])
+            return None if second is None else first + second
+        if response is None:
+            return []
+        self.stats["batches_sent"] += 1
+        delivered = response.get("delivered")
+        if not isinstance(delivered, list):
+            queue.batch_supported = False
+            return None
+        queue.batch_supported = True
+        sent = {entry.message_id for entry in batch}
+        return [mid for mid in delivered if mid in sent]
+
+    async def _send_individually(self, queue: PeerQueue, batch: List[OutboxEntry]) -> List[str]:
+        """Pairs sans lots: requêtes concurrentes (bornées par le pool), une par message"""
+        responses = await asyncio.gather(
+            *(self._request(queue.fingerprint, entry.message) for entry in batch), return_exceptions=True
+        )
+        acked = []
+        for entry, response in zip(batch, responses):
+            if isinstance(response, FrameError):
+                self.stats["frame_rejections"] += 1
+                self._drop_unsendable(queue, entry)
+            elif isinstance(response, BaseException):
+                raise response
+            elif response is not None:
+                acked.append(entry.message_id)
+        return acked
+
+    async def _request(self, fingerprint: str, message: Dict) -> Optional[Dict]:
+        """Réponse du pair, None s'il est injoignable; FrameError propagée (message trop grand)"""
+        try:
+            return await self.request(fingerprint, message)
+        except FrameError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Outbox send to {fingerprint[:8]}... failed: {e}")
+            return None
+
+    def _record_failure(self, queue: PeerQueue):
+        queue.failures += 1
+        self.stats["send_failures"] += 1
+        delay = backoff_delay(queue.failures, self.backoff_base, self.backoff_max)
+        queue.next_attempt = time.time() + delay
+
+    # ============ BOUCLE DE REPRISE ============
+
+    def start(self):
+        """Démarre la boucle de reprise dans la boucle courante (et vide les files restaurées)"""
+        if self._retry_task is None:
+            self._retry_task = asyncio.ensure_future(self._retry_loop())
+
+    async def close(self):
+        if self._retry_task is not None:
+            self._retry_task.cancel()
+            await asyncio.gather(self._retry_task, return_exceptions=True)
+            self._retry_task = None
+        for task in list(self._flush_tasks):
+            task.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            self._journal = None
+
+    async def _retry_loop(self):
+        while True:
+            try:
+                self._expire_all()
+                for queue in self._non_empty_peers():
+                    self._schedule_flush(queue)
+                self._maybe_compact()
+            except Exception as e:
+                print(f"⚠️ Outbox retry error: {e}")
+            await asyncio.sleep(self.retry_interval)
+
+    def get_outbox_stats(self) -> Dict[str, Any]:
+        """Statistiques: messages en attente par pair, disque, livraisons"""
+        now = time.time()
+        return {
+            **self.stats,
+            "pending": self.pending_count(),
+            "peers": {
+                queue.fingerprint: {
+                    "pending": len(queue.entries),
+                    "failures": queue.failures,
+                    "retry_in": max(0.0, queue.next_attempt - now),
+                }
+                for queue in self._non_empty_peers()
+            },
+            "journal_bytes": self.journal_bytes,
+            "live_bytes": self.live_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -6,6 +6,7 @@
 
 import json
 import time
+import asyncio
 import hashlib
 import socket
 from typing import Dict, Optional, Tuple
@@ -13,6 +14,15 @@ from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 import base64
 
+try:
+    from core.p2p_security.message_framing import recv_json, send_json, read_json_async, send_json_async
+except ImportError:
+    # Chargé directement depuis core/p2p_security (simple_protocol_helper)
+    from message_framing import recv_json, send_json, read_json_async, send_json_async
+
+# Délai maximal d'un échange (connexion, réponse VERIFY)
+EXCHANGE_TIMEOUT = 10.0
+
 class SimpleThreePhase:
     """
     Protocole simple et efficace en 3 phases :
@@ -26,6 +36,7 @@ class SimpleThreePhase:
         self.private_key = private_key
         self.public_key = public_key
         self.active_links = {}  # Liens mutuels établis
+        self.inbound_dispatcher = None  # InboundDispatcher du nœud: traitement dans sa boucle
         
         print(f"🔐 Simple Three-Phase Protocol initialized for {node_id}")
         
@@ -220,16 +231,14 @@ class SimpleThreePhase:
                 sock.settimeout(10)
                 sock.connect((target_ip, target_port))
                 
-                # Envoie la requête
-                message = json.dumps(request_packet) + "\n"
-                sock.send(message.encode())
+                # Envoie la requête (trame: photos de profil, gros messages)
+                send_json(sock, request_packet)
                 
                 # Attend la réponse VERIFY
-                response = sock.recv(4096).decode().strip()
-                verify_packet = json.loads(response)
+                verify_packet = recv_json(sock)
                 
                 # Phase 3: FINALIZE
-                if self.phase3_finalize(verify_packet, request_packet["data"]["timestamp"]):
+                if verify_packet is not None and self.phase3_finalize(verify_packet, request_packet["data"]["timestamp"]):
                     print(f"🎉 Message sent successfully to {target_node}")
                     return True
                 else:
@@ -246,32 +255,115 @@ class SimpleThreePhase:
         """
         try:
             # Reçoit le message
-            data = client_socket.recv(4096).decode().strip()
-            request_packet = json.loads(data)
+            request_packet = recv_json(client_socket)
             
-            if request_packet.get("phase") == "REQUEST":
+            if isinstance(request_packet, dict) and request_packet.get("phase") == "REQUEST":
                 # Phase 2: VERIFY
                 success, verify_packet = self.phase2_verify(request_packet)
                 
                 if success and verify_packet:
-                    # Envoie la réponse VERIFY
-                    response = json.dumps(verify_packet) + "\n"
-                    client_socket.send(response.encode())
-                    
-                    # Traite le message reçu
+                    # Traitement remis à la boucle du nœud; file pleine: l'émetteur est prévenu
                     message_data = request_packet["data"]["message"]
-                    self._process_received_message(message_data, request_packet["data"]["from"])
+                    if not self._hand_off_received_message(message_data, request_packet["data"]["from"]):
+                        send_json(client_socket, {"phase": "ERROR", "message": "Node busy"})
+                        return
+                    
+                    # Envoie la réponse VERIFY
+                    send_json(client_socket, verify_packet)
                     
                 else:
                     # Envoie une erreur
                     error_response = {"phase": "ERROR", "message": "Verification failed"}
-                    client_socket.send(json.dumps(error_response).encode())
+                    send_json(client_socket, error_response)
                     
         except Exception as e:
             print(f"❌ Error handling incoming message: {e}")
         finally:
             client_socket.close()
 
+    # ============ TRANSMISSION ASYNCIO ============
+    async def send_simple_message_async(self, target_ip: str, target_port: int, target_node: str,
+                                        message_data: Dict) -> bool:
+        """
+        Variante asyncio de send_simple_message: la boucle n'est jamais bloquée,
+        signatures et vérifications RSA exécutées dans le pool par défaut
+        """
+        loop = asyncio.get_running_loop()
+        writer = None
+        try:
+            # Phase 1: REQUEST
+            request_packet = await loop.run_in_executor(None, self.phase1_request, target_node, message_data)
+            
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(target_ip, target_port), EXCHANGE_TIMEOUT
+            )
+            await send_json_async(writer, request_packet)
+            
+            # Attend la réponse VERIFY
+            verify_packet = await asyncio.wait_for(read_json_async(reader), EXCHANGE_TIMEOUT)
+            
+            # Phase 3: FINALIZE
+            if verify_packet is not None and await loop.run_in_executor(
+                None, self.phase3_finalize, verify_packet, request_packet["data"]["timestamp"]
+            ):
+                print(f"🎉 Message sent successfully to {target_node}")
+                return True
+            
+            print(f"❌ Failed to finalize connection with {target_node}")
+            return False
+            
+        except Exception as e:
+            print(f"❌ Failed to send message to {target_node}: {e}")
+            return False
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def handle_incoming_stream(self, reader, writer):
+        """Variante asyncio de handle_incoming_message (asyncio.start_server)"""
+        loop = asyncio.get_running_loop()
+        try:
+            request_packet = await asyncio.wait_for(read_json_async(reader), EXCHANGE_TIMEOUT)
+            
+            if isinstance(request_packet, dict) and request_packet.get("phase") == "REQUEST":
+                # Phase 2: VERIFY
+                success, verify_packet = await loop.run_in_executor(None, self.phase2_verify, request_packet)
+                
+                if success and verify_packet:
+                    await send_json_async(writer, verify_packet)
+                    
+                    # Traite le message reçu (latence mesurée par le distributeur du nœud)
+                    message_data = request_packet["data"]["message"]
+                    sender = request_packet["data"]["from"]
+                    if self.inbound_dispatcher is not None and self.inbound_dispatcher.running:
+                        await self.inbound_dispatcher.run(str(message_data.get("type")),
+                                                          self._process_received_message, message_data, sender)
+                    else:
+                        self._process_received_message(message_data, sender)
+                    
+                else:
+                    await send_json_async(writer, {"phase": "ERROR", "message": "Verification failed"})
+                    
+        except Exception as e:
+            print(f"❌ Error handling incoming message: {e}")
+        finally:
+            writer.close()
+
+    def _hand_off_received_message(self, message_data: Dict, sender: str) -> bool:
+        """
+        Thread du serveur historique: message remis à la boucle du nœud (file bornée,
+        attente au plus EXCHANGE_TIMEOUT); sans nœud démarré, traité dans ce thread
+        """
+        dispatcher = self.inbound_dispatcher
+        if dispatcher is None or not dispatcher.running:
+            self._process_received_message(message_data, sender)
+            return True
+        if dispatcher.submit(str(message_data.get("type")), self._process_received_message,
+                             message_data, sender, timeout=EXCHANGE_TIMEOUT):
+            return True
+        print(f"⚠️ Inbound queue full, message from {sender} refused")
+        return False
+        
     def _process_received_message(self, message_data: Dict, sender: str):
         """Traite un message reçu avec succès"""
         print(f"📥 Message received from {sender}: {message_data}")
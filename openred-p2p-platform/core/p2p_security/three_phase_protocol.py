@@ -4,6 +4,7 @@
 
 import json
 import time
+import hmac
 import hashlib
 import secrets
 import socket
@@ -15,6 +16,9 @@ from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.backends import default_backend
 import base64
 
+from core.p2p_security.binary_codec import JSON_CODEC, SUPPORTED_CODECS, encode_message_frame, negotiate_codec
+from core.p2p_security.message_framing import FrameError, recv_json, send_json
+
 @dataclass
 class P2PSecurityContext:
     """Contexte de sécurité pour connexion P2P"""
@@ -24,6 +28,25 @@ class P2PSecurityContext:
     established_at: float
     last_activity: float
     security_level: str  # "basic", "enhanced", "quantum"
+    resumed: bool = False  # établi par reprise de session (ticket) plutôt que RSA
+    codec: str = JSON_CODEC  # encodage des messages négocié pendant le handshake
+
+# Reprise de session: durée de vie d'un ticket, et âge maximal depuis le dernier
+# handshake RSA complet au-delà duquel la reprise est refusée
+TICKET_LIFETIME = 3600
+MAX_RESUMPTION_AGE = 24 * 3600
+RESUME_MAX_SKEW = 300  # écart d'horloge toléré (secondes)
+MAX_ISSUED_TICKETS = 4096
+
+@dataclass
+class SessionTicket:
+    """Ticket de reprise: secret partagé établi par un handshake complet"""
+    ticket_id: str
+    secret: bytes
+    peer_fingerprint: str
+    peer_public_key: Any
+    expires_at: float
+    auth_time: float  # date du dernier handshake RSA complet
     
 class ThreePhaseHandshake:
     """
@@ -41,6 +64,17 @@ class ThreePhaseHandshake:
         # Contextes de sécurité actifs
         self.security_contexts: Dict[str, P2PSecurityContext] = {}
         
+        # Reprise de session: tickets émis (côté répondeur, usage unique) et reçus (côté initiateur)
+        self.issued_tickets: Dict[str, SessionTicket] = {}
+        self.resumption_tickets: Dict[str, SessionTicket] = {}
+        self._pending_resumes: Dict[str, Tuple[SessionTicket, str]] = {}
+        self.handshake_stats = {
+            "full_handshakes": 0,
+            "resumed_sessions": 0,
+            "resume_rejections": 0,
+            "tickets_issued": 0
+        }
+        
         print(f"🔐 Three-Phase Security Protocol initialized")
         print(f"   Fingerprint: {node_fingerprint}")
         print(f"   🚫 NO CENTRAL VALIDATION - Pure P2P Trust")
@@ -100,7 +134,9 @@ class ThreePhaseHandshake:
             "capabilities": {
                 "schrodinger_phoenix": True,
                 "urn_phantom": True,
-                "encryption_level": "rsa_2048"
+                "encryption_level": "rsa_2048",
+                "session_resumption": True,
+                "codecs": list(SUPPORTED_CODECS)
             },
             "challenge": secrets.token_hex(32)
         }
@@ -121,6 +157,16 @@ class ThreePhaseHandshake:
             "public_key": public_key_pem
         }
         
+        # Contexte en attente: la Phase 3 ne finalise qu'une session initiée ici
+        self.security_contexts[session_id] = P2PSecurityContext(
+            session_id=session_id,
+            peer_fingerprint=target_fingerprint,
+            peer_public_key=None,
+            established_at=timestamp,
+            last_activity=timestamp,
+            security_level="pending"
+        )
+        
         print(f"📤 Phase 1: Sending REQUEST to {target_fingerprint[:8]}...")
         print(f"   Session: {session_id}")
         print(f"   Target: {target_ip}:{target_port}")
@@ -163,6 +209,7 @@ class ThreePhaseHandshake:
             
             # Génération réponse Phase 2
             session_id = data["session_id"]
+            codec = negotiate_codec(data.get("capabilities", {}).get("codecs"))
             response_data = {
                 "phase": 2,
                 "session_id": session_id,
@@ -174,10 +221,17 @@ class ThreePhaseHandshake:
                 "capabilities": {
                     "schrodinger_phoenix": True,
                     "urn_phantom": True,
-                    "encryption_level": "rsa_2048"
+                    "encryption_level": "rsa_2048",
+                    "codec": codec
                 }
             }
             
+            # Ticket de reprise (secret chiffré RSA-OAEP pour le demandeur, couvert par la signature)
+            if data.get("capabilities", {}).get("session_resumption"):
+                response_data["session_ticket"] = self._issue_ticket(
+                    data["source_fingerprint"], peer_public_key
+                )
+            
             # Signature de la réponse
             response_signature = self.sign_data(response_data)
             
@@ -201,9 +255,11 @@ class ThreePhaseHandshake:
                 peer_public_key=peer_public_key,
                 established_at=time.time(),
                 last_activity=time.time(),
-                security_level="enhanced"
+                security_level="enhanced",
+                codec=codec
             )
             
+            self.handshake_stats["full_handshakes"] += 1
             print(f"📤 Phase 2: Sending VERIFY response")
             return True, response_packet
             
@@ -245,6 +301,13 @@ class ThreePhaseHandshake:
             context.peer_public_key = peer_public_key
             context.last_activity = time.time()
             context.security_level = "quantum"  # Connexion finalisée
+            # Codec choisi par le répondeur (absent chez les anciens pairs: JSON)
+            context.codec = negotiate_codec([data.get("capabilities", {}).get("codec", JSON_CODEC)])
+            self.handshake_stats["full_handshakes"] += 1
+            
+            # Ticket de reprise pour les reconnexions suivantes
+            if data.get("session_ticket"):
+                self._store_ticket(data["source_fingerprint"], peer_public_key, data["session_ticket"])
             
             print(f"✅ Phase 3: Connection FINALIZED")
             print(f"   Session: {session_id}")
@@ -257,6 +320,236 @@ class ThreePhaseHandshake:
             print(f"❌ Phase 3 error: {e}")
             return False
             
+    # ============ REPRISE DE SESSION ============
+    
+    @staticmethod
+    def _mac(secret: bytes, data: Dict) -> str:
+        return hmac.new(secret, json.dumps(data, sort_keys=True).encode(), hashlib.sha256).hexdigest()
+        
+    @staticmethod
+    def _next_secret(secret: bytes, client_nonce: str, server_nonce: str) -> bytes:
+        """Secret du ticket suivant (rotation à chaque reprise)"""
+        return hmac.new(secret, f"openred-resume:{client_nonce}:{server_nonce}".encode(), hashlib.sha256).digest()
+        
+    def _issue_ticket(self, peer_fingerprint: str, peer_public_key) -> Dict:
+        """Répondeur: nouveau ticket après un handshake complet"""
+        now = time.time()
+        secret = secrets.token_bytes(32)
+        ticket = SessionTicket(
+            ticket_id=secrets.token_hex(16),
+            secret=secret,
+            peer_fingerprint=peer_fingerprint,
+            peer_public_key=peer_public_key,
+            expires_at=now + TICKET_LIFETIME,
+            auth_time=now
+        )
+        self._remember_ticket(ticket)
+        
+        encrypted_secret = peer_public_key.encrypt(
+            secret,
+            padding.OAEP(mgf=padding.MGF1(hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+        )
+        return {
+            "ticket_id": ticket.ticket_id,
+            "encrypted_secret": base64.b64encode(encrypted_secret).decode(),
+            "expires_at": ticket.expires_at
+        }
+        
+    def _remember_ticket(self, ticket: SessionTicket):
+        now = time.time()
+        if len(self.issued_tickets) >= MAX_ISSUED_TICKETS:
+            for ticket_id in [t for t, tk in self.issued_tickets.items() if tk.expires_at <= now]:
+                del self.issued_tickets[ticket_id]
+            while len(self.issued_tickets) >= MAX_ISSUED_TICKETS:
+                del self.issued_tickets[next(iter(self.issued_tickets))]  # plus ancien
+        self.issued_tickets[ticket.ticket_id] = ticket
+        self.handshake_stats["tickets_issued"] += 1
+        
+    def _store_ticket(self, peer_fingerprint: str, peer_public_key, ticket_info: Dict):
+        """Initiateur: déchiffre et conserve le ticket reçu en Phase 2"""
+        try:
+            secret = self.private_key.decrypt(
+                base64.b64decode(ticket_info["encrypted_secret"]),
+                padding.OAEP(mgf=padding.MGF1(hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+            )
+            self.resumption_tickets[peer_fingerprint] = SessionTicket(
+                ticket_id=ticket_info["ticket_id"],
+                secret=secret,
+                peer_fingerprint=peer_fingerprint,
+                peer_public_key=peer_public_key,
+                expires_at=float(ticket_info["expires_at"]),
+                auth_time=time.time()
+            )
+        except Exception as e:
+            print(f"⚠️ Invalid session ticket ignored: {e}")
+            
+    def create_resume_request(self, target_fingerprint: str) -> Optional[Dict]:
+        """
+        Initiateur: demande de reprise (un seul aller-retour, HMAC au lieu de RSA)
+        None si aucun ticket valide pour ce pair; le ticket est consommé (usage unique)
+        """
+        ticket = self.resumption_tickets.pop(target_fingerprint, None)
+        now = time.time()
+        if ticket is None or ticket.expires_at <= now:
+            return None
+            
+        session_id = self.generate_session_id()
+        nonce = secrets.token_hex(16)
+        resume_data = {
+            "ticket_id": ticket.ticket_id,
+            "session_id": session_id,
+            "source_fingerprint": self.node_fingerprint,
+            "target_fingerprint": target_fingerprint,
+            "timestamp": now,
+            "nonce": nonce,
+            "codecs": list(SUPPORTED_CODECS)
+        }
+        self._pending_resumes[session_id] = (ticket, nonce)
+        return {
+            "security_protocol": "openred_three_phase",
+            "resume": resume_data,
+            "mac": self._mac(ticket.secret, resume_data)
+        }
+        
+    def _reject_resume(self, reason: str) -> Tuple[bool, Dict]:
+        self.handshake_stats["resume_rejections"] += 1
+        print(f"❌ Session resumption rejected: {reason}")
+        return False, {"security_protocol": "openred_three_phase", "resume_rejected": reason}
+        
+    def verify_resume(self, resume_packet: Dict, sender_ip: str) -> Tuple[bool, Dict]:
+        """
+        Répondeur: vérifie une demande de reprise
+        Ticket à usage unique (rejeu impossible), fenêtre d'horodatage, HMAC du secret partagé
+        Le ticket n'est consommé qu'après un HMAC valide: une demande forgée ne peut pas le révoquer
+        """
+        try:
+            data = resume_packet["resume"]
+            ticket = self.issued_tickets.get(data["ticket_id"])
+            now = time.time()
+            
+            if ticket is None:
+                return self._reject_resume("unknown_ticket")
+            if ticket.expires_at <= now:
+                self.issued_tickets.pop(data["ticket_id"], None)
+                return self._reject_resume("ticket_expired")
+            if (ticket.peer_fingerprint != data["source_fingerprint"]
+                    or data["target_fingerprint"] != self.node_fingerprint):
+                return self._reject_resume("wrong_peer")
+            if abs(now - data["timestamp"]) > RESUME_MAX_SKEW:
+                return self._reject_resume("stale_request")
+            if not hmac.compare_digest(self._mac(ticket.secret, data), resume_packet.get("mac", "")):
+                return self._reject_resume("bad_mac")
+            if self.issued_tickets.pop(data["ticket_id"], None) is None:
+                return self._reject_resume("unknown_ticket")   # consommé entre-temps
+                
+            session_id = data["session_id"]
+            server_nonce = secrets.token_hex(16)
+            codec = negotiate_codec(data.get("codecs"))
+            response_data = {
+                "session_id": session_id,
+                "source_fingerprint": self.node_fingerprint,
+                "target_fingerprint": ticket.peer_fingerprint,
+                "timestamp": now,
+                "client_nonce": data["nonce"],
+                "nonce": server_nonce,
+                "codec": codec
+            }
+            
+            # Ticket suivant, dans la limite de l'âge maximal depuis le dernier handshake complet
+            if now < ticket.auth_time + MAX_RESUMPTION_AGE:
+                next_ticket = SessionTicket(
+                    ticket_id=secrets.token_hex(16),
+                    secret=self._next_secret(ticket.secret, data["nonce"], server_nonce),
+                    peer_fingerprint=ticket.peer_fingerprint,
+                    peer_public_key=ticket.peer_public_key,
+                    expires_at=min(now + TICKET_LIFETIME, ticket.auth_time + MAX_RESUMPTION_AGE),
+                    auth_time=ticket.auth_time
+                )
+                self._remember_ticket(next_ticket)
+                response_data["next_ticket_id"] = next_ticket.ticket_id
+                response_data["next_expires_at"] = next_ticket.expires_at
+                
+            self.security_contexts[session_id] = P2PSecurityContext(
+                session_id=session_id,
+                peer_fingerprint=ticket.peer_fingerprint,
+                peer_public_key=ticket.peer_public_key,
+                established_at=now,
+                last_activity=now,
+                security_level="enhanced",
+                resumed=True,
+                codec=codec
+            )
+            self.handshake_stats["resumed_sessions"] += 1
+            print(f"⚡ Session resumed from {ticket.peer_fingerprint[:8]}... ({sender_ip})")
+            
+            return True, {
+                "security_protocol": "openred_three_phase",
+                "resume_accepted": response_data,
+                "mac": self._mac(ticket.secret, response_data)
+            }
+            
+        except Exception as e:
+            return self._reject_resume(f"invalid_request: {e}")
+            
+    def finalize_resume(self, resume_packet: Dict, response_packet: Optional[Dict]) -> Optional[str]:
+        """Initiateur: valide la réponse de reprise; identifiant de session, ou None si refusée"""
+        pending = self._pending_resumes.pop(resume_packet["resume"]["session_id"], None)
+        try:
+            data = (response_packet or {}).get("resume_accepted")
+            if not data:
+                # Refus: le ticket est consommé, handshake complet à suivre
+                print(f"ℹ️ Session resumption refused: {(response_packet or {}).get('resume_rejected')}")
+                return None
+                
+            if pending is None or data["session_id"] != resume_packet["resume"]["session_id"]:
+                print("❌ Resume: unknown session")
+                return None
+            ticket, client_nonce = pending
+            
+            if (not hmac.compare_digest(self._mac(ticket.secret, data), response_packet.get("mac", ""))
+                    or data["client_nonce"] != client_nonce
+                    or data["source_fingerprint"] != ticket.peer_fingerprint):
+                print("❌ Resume: invalid response")
+                return None
+                
+            now = time.time()
+            session_id = data["session_id"]
+            self.security_contexts[session_id] = P2PSecurityContext(
+                session_id=session_id,
+                peer_fingerprint=ticket.peer_fingerprint,
+                peer_public_key=ticket.peer_public_key,
+                established_at=now,
+                last_activity=now,
+                security_level="quantum",
+                resumed=True,
+                codec=negotiate_codec([data.get("codec", JSON_CODEC)])
+            )
+            
+            if data.get("next_ticket_id"):
+                self.resumption_tickets[ticket.peer_fingerprint] = SessionTicket(
+                    ticket_id=data["next_ticket_id"],
+                    secret=self._next_secret(ticket.secret, client_nonce, data["nonce"]),
+                    peer_fingerprint=ticket.peer_fingerprint,
+                    peer_public_key=ticket.peer_public_key,
+                    expires_at=float(data["next_expires_at"]),
+                    auth_time=ticket.auth_time
+                )
+                
+            self.handshake_stats["resumed_sessions"] += 1
+            print(f"⚡ Session resumed with {ticket.peer_fingerprint[:8]}...")
+            return session_id
+            
+        except Exception as e:
+            print(f"❌ Resume error: {e}")
+            return None
+            
+    def abandon_handshake(self, session_id: str):
+        """Initiateur: handshake ou reprise sans issue (refus, délai, connexion perdue), état en attente libéré"""
+        self._pending_resumes.pop(session_id, None)
+        context = self.security_contexts.get(session_id)
+        if context is not None and context.security_level == "pending":
+            del self.security_contexts[session_id]
+            
     def get_security_context(self, session_id: str) -> Optional[P2PSecurityContext]:
         """Récupère le contexte de sécurité d'une session"""
         return self.security_contexts.get(session_id)
@@ -305,7 +598,10 @@ class ThreePhaseHandshake:
             "total_contexts": len(self.security_contexts),
             "active_contexts": active_contexts,
             "finalized_connections": finalized_connections,
-            "security_level": "rsa_2048_quantum_ready"
+            "security_level": "rsa_2048_quantum_ready",
+            "handshakes": dict(self.handshake_stats),
+            "resumption_tickets": len(self.resumption_tickets),
+            "issued_tickets": len(self.issued_tickets)
         }
 
 class DirectP2PConnection:
@@ -362,11 +658,10 @@ class DirectP2PConnection:
         try:
             print(f"🔗 Incoming P2P connection from {addr[0]}")
             
-            # Recevoir Phase 1: REQUEST
-            data = client_sock.recv(8192)
-            request_packet = json.loads(data.decode())
+            # Recevoir Phase 1: REQUEST (trame complète)
+            request_packet = recv_json(client_sock)
             
-            if request_packet.get("security_protocol") != "openred_three_phase":
+            if not isinstance(request_packet, dict) or request_packet.get("security_protocol") != "openred_three_phase":
                 print("❌ Unknown security protocol")
                 client_sock.close()
                 return
@@ -378,7 +673,7 @@ class DirectP2PConnection:
             
             if verified:
                 # Envoyer réponse Phase 2
-                client_sock.send(json.dumps(response_packet).encode())
+                send_json(client_sock, response_packet)
                 
                 # Attendre Phase 3 ou continuer avec communication
                 session_id = request_packet["data"]["session_id"]
@@ -403,6 +698,7 @@ class DirectP2PConnection:
             
     def connect_to_peer(self, peer_ip: str, peer_port: int, peer_fingerprint: str) -> Optional[str]:
         """Initie connexion P2P avec protocole 3 phases"""
+        request_packet = None
         try:
             # Phase 1: REQUEST
             request_packet = self.security_protocol.phase1_request(
@@ -415,14 +711,13 @@ class DirectP2PConnection:
             sock.connect((peer_ip, peer_port))
             
             # Envoyer Phase 1
-            sock.send(json.dumps(request_packet).encode())
+            send_json(sock, request_packet)
             
             # Recevoir Phase 2: VERIFY
-            response = sock.recv(8192)
-            verify_response = json.loads(response.decode())
+            verify_response = recv_json(sock)
             
             # Phase 3: FINALIZE
-            if self.security_protocol.phase3_finalize(verify_response):
+            if verify_response is not None and self.security_protocol.phase3_finalize(verify_response):
                 session_id = request_packet["data"]["session_id"]
                 
                 self.active_connections[session_id] = {
@@ -439,6 +734,10 @@ class DirectP2PConnection:
         except Exception as e:
             print(f"❌ P2P connection failed: {e}")
             return None
+        finally:
+            # Sans effet si la session a été finalisée
+            if request_packet is not None:
+                self.security_protocol.abandon_handshake(request_packet["data"]["session_id"])
             
     def send_secure_message(self, session_id: str, message: Dict) -> bool:
         """Envoie message sécurisé via connexion P2P"""
@@ -459,9 +758,14 @@ class DirectP2PConnection:
                 "content": message
             }
             
-            socket_conn.send(json.dumps(secure_message).encode())
+            # Codec négocié pendant le handshake (JSON pour les anciens pairs)
+            codec = self.security_protocol.get_security_context(session_id).codec
+            socket_conn.sendall(encode_message_frame(secure_message, codec))
             return True
             
+        except FrameError as e:
+            print(f"❌ Secure message rejected: {e}")
+            return False
         except Exception as e:
             print(f"❌ Error sending secure message: {e}")
             return False
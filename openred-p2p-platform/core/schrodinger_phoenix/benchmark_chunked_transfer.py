@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+⚡ BENCHMARK - Transfert URN par morceaux entre pairs loopback
+=============================================================
+Pairs fournisseurs en processus (AsyncP2PTransport + UrnChunkProvider),
+demandeur via P2PConnectionPool + ChunkedUrnFetcher:
+- débit avec 1 puis N fournisseurs
+- coupure en cours de transfert, puis reprise au dernier morceau vérifié
+- fournisseur qui altère ses morceaux: rejetés, récupérés chez les autres
+
+Usage:
+    python core/schrodinger_phoenix/benchmark_chunked_transfer.py
+    python core/schrodinger_phoenix/benchmark_chunked_transfer.py --matrix 1024 --peers 4
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(REPO_ROOT)
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core.p2p_security.async_transport import AsyncP2PTransport
+from core.p2p_security.binary_codec import encode
+from core.p2p_security.connection_pool import P2PConnectionPool
+from core.p2p_security.three_phase_protocol import ThreePhaseHandshake
+from core.schrodinger_phoenix.chunked_transfer import (
+    CHUNK_REQUEST_TYPE, MANIFEST_REQUEST_TYPE, ChunkedUrnFetcher, UrnChunkProvider
+)
+
+URN_ID = "urn:phantom:benchmark"
+
+
+def _handshake(fingerprint: str) -> ThreePhaseHandshake:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    return ThreePhaseHandshake(fingerprint, private_key, private_key.public_key())
+
+
+def _matrix_payload(size: int) -> bytes:
+    rng = random.Random(7)
+    return encode({"data": [[rng.random() for _ in range(size)] for _ in range(size)],
+                   "metadata": {"shape": [size, size]}})
+
+
+def _corrupting(handler):
+    """Fournisseur défaillant: morceaux altérés"""
+    def handle(message):
+        response = handler(message)
+        if "data" in response:
+            data = bytearray(base64.b64decode(response["data"]))
+            data[0] ^= 0xFF
+            response["data"] = base64.b64encode(bytes(data)).decode()
+        return response
+    return handle
+
+
+async def _start_provider(fingerprint: str, port: int, payload: bytes, corrupt: bool = False):
+    transport = AsyncP2PTransport(_handshake(fingerprint), port, host="127.0.0.1")
+    provider = UrnChunkProvider(lambda urn_id: payload if urn_id == URN_ID else None)
+    chunk_handler = _corrupting(provider.handle_chunk_request) if corrupt else provider.handle_chunk_request
+    loop = asyncio.get_running_loop()
+
+    async def handle(session_id, message):
+        if message.get("type") == MANIFEST_REQUEST_TYPE:
+            return await loop.run_in_executor(None, provider.handle_manifest_request, message)
+        if message.get("type") == CHUNK_REQUEST_TYPE:
+            return await loop.run_in_executor(None, chunk_handler, message)
+        return None
+
+    transport.set_message_handler(handle)
+    await transport.start()
+    return transport
+
+
+async def _run(args, payload: bytes, state_dir: str):
+    fingerprints = [f"{i:016x}" for i in range(1, args.peers + 2)]
+    endpoints = {fp: ("127.0.0.1", args.port + i) for i, fp in enumerate(fingerprints)}
+    corrupt_fp = fingerprints[-1]
+    providers = [
+        await _start_provider(fp, endpoints[fp][1], payload, corrupt=(fp == corrupt_fp))
+        for fp in fingerprints
+    ]
+    client = AsyncP2PTransport(_handshake("f" * 16), 0, host="127.0.0.1")
+    pool = P2PConnectionPool(client, resolve_endpoint=endpoints.get)
+    results = []
+    try:
+        async def request(fingerprint, message):
+            return await pool.request(fingerprint, message)
+
+        fetcher = ChunkedUrnFetcher(request, state_dir, chunk_size=args.chunk_size)
+        healthy = fingerprints[:-1]
+
+        # Connexions établies avant la mesure (pool persistant)
+        manifest, _ = await fetcher.fetch_manifest(URN_ID, fingerprints)
+        # Coupure au milieu du transfert, quel que soit le nombre de morceaux
+        drop_after = manifest.chunk_count // 2 if args.drop_after is None else args.drop_after
+        drop_after = min(drop_after, manifest.chunk_count - 1)
+
+        for label, peers in (("1 pair", healthy[:1]), (f"{len(healthy)} pairs", healthy)):
+            start = time.perf_counter()
+            data = await fetcher.fetch(URN_ID, peers)
+            elapsed = time.perf_counter() - start
+            assert data == payload, "charge utile invalide"
+            results.append((label, elapsed))
+
+        # Coupure: le lien tombe après quelques morceaux
+        served = {"count": 0}
+
+        async def dropping_request(fingerprint, message):
+            if message.get("type") == CHUNK_REQUEST_TYPE:
+                served["count"] += 1
+                if served["count"] > drop_after:
+                    return None
+            return await pool.request(fingerprint, message)
+
+        interrupted = ChunkedUrnFetcher(dropping_request, state_dir, chunk_size=args.chunk_size)
+        assert await interrupted.fetch(URN_ID, healthy) is None, "le transfert aurait dû échouer"
+        kept = interrupted.stats["chunks_fetched"]
+
+        start = time.perf_counter()
+        resumed = ChunkedUrnFetcher(request, state_dir, chunk_size=args.chunk_size)
+        assert await resumed.fetch(URN_ID, healthy) == payload, "reprise invalide"
+        results.append((f"reprise ({kept} morceaux gardés)", time.perf_counter() - start))
+
+        # Fournisseur défaillant parmi les sources
+        start = time.perf_counter()
+        checked = ChunkedUrnFetcher(request, state_dir, chunk_size=args.chunk_size)
+        assert await checked.fetch(URN_ID, fingerprints) == payload, "vérification inefficace"
+        results.append(("avec pair défaillant", time.perf_counter() - start))
+
+        return results, resumed.stats, checked.stats, pool.get_pool_stats()
+    finally:
+        await pool.close()
+        await client.stop()
+        for provider in providers:
+            await provider.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transfert URN par morceaux")
+    parser.add_argument("--matrix", type=int, default=512, help="Côté de la matrice quantique")
+    parser.add_argument("--peers", type=int, default=3, help="Fournisseurs sains")
+    parser.add_argument("--chunk-size", type=int, default=256 * 1024, help="Taille des morceaux")
+    parser.add_argument("--drop-after", type=int, default=None,
+                        help="Morceaux servis avant la coupure (défaut: la moitié du manifeste)")
+    parser.add_argument("--port", type=int, default=47700, help="Premier port loopback")
+    args = parser.parse_args()
+
+    payload = _matrix_payload(args.matrix)
+
+    # Handshakes et transferts journalisés: sortie silencieuse pendant la mesure
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            results, resume_stats, checked_stats, pool_stats = asyncio.run(_run(args, payload, state_dir))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    size_mb = len(payload) / (1024 * 1024)
+    print(f"Charge utile: {size_mb:.2f} Mo, morceaux de {args.chunk_size // 1024} Ko")
+    for label, elapsed in results:
+        print(f"{label:32} {elapsed * 1000:8.1f} ms {size_mb / elapsed:8.1f} Mo/s")
+    print(f"\nReprise: {resume_stats}")
+    print(f"Pair défaillant: {checked_stats}")
+    print(f"Pool: handshakes={pool_stats['handshakes']} hit_rate={pool_stats['hit_rate']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
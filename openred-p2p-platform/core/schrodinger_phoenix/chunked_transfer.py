@@ -0,0 +1,386 @@
+# === Schrödinger Phoenix P2P : Transfert URN par morceaux ===
+# Charge utile d'un URN (matrice quantique sérialisée) découpée en morceaux
+# de taille configurable, décrits par un manifeste d'empreintes SHA-256
+# Morceaux récupérés en parallèle auprès de tous les pairs détenant l'URN,
+# vérifiés un par un et conservés sur disque: une coupure reprend au
+# dernier morceau vérifié au lieu de repartir de zéro
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024   # bien en dessous de MAX_FRAME_SIZE, même en JSON/base64
+
+DEFAULT_STREAMS_PER_PEER = 2
+MAX_PEER_FAILURES = 3       # échecs consécutifs avant d'écarter un pair du transfert
+MAX_TRANSFER_ROUNDS = 5     # passes sur les morceaux manquants
+MAX_CACHED_PAYLOADS = 16    # charges utiles sérialisées gardées côté fournisseur
+CHUNK_REQUEST_TIMEOUT = 30.0
+
+MANIFEST_REQUEST_TYPE = "urn_manifest_request"
+CHUNK_REQUEST_TYPE = "urn_chunk_request"
+
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+# Requête P2P: (fingerprint du pair, message) → réponse, ou None si injoignable
+RequestFunction = Callable[[str, Dict], Awaitable[Optional[Dict]]]
+
+# Fournisseur: urn_id → charge utile sérialisée, ou None si l'URN n'est pas détenu
+PayloadLoader = Callable[[str], Optional[bytes]]
+
+
+def clamp_chunk_size(chunk_size) -> int:
+    """Taille de morceau demandée, ramenée dans [MIN_CHUNK_SIZE, MAX_CHUNK_SIZE]"""
+    try:
+        chunk_size = int(chunk_size)
+    except (TypeError, ValueError):
+        return DEFAULT_CHUNK_SIZE
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+
+
+@dataclass
+class UrnManifest:
+    """Description d'une charge utile URN: taille, découpage, empreintes"""
+    urn_id: str
+    payload_hash: str
+    total_size: int
+    chunk_size: int
+    chunk_hashes: List[str]
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunk_hashes)
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> Optional["UrnManifest"]:
+        """Manifeste reçu d'un pair; None s'il est incohérent"""
+        try:
+            manifest = cls(
+                urn_id=str(data["urn_id"]),
+                payload_hash=str(data["payload_hash"]),
+                total_size=int(data["total_size"]),
+                chunk_size=int(data["chunk_size"]),
+                chunk_hashes=[str(h) for h in data["chunk_hashes"]]
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+        # Empreintes SHA-256 hexadécimales (payload_hash nomme le répertoire de reprise)
+        if not all(_SHA256_RE.fullmatch(h) for h in [manifest.payload_hash, *manifest.chunk_hashes]):
+            return None
+        if manifest.total_size < 0 or not MIN_CHUNK_SIZE <= manifest.chunk_size <= MAX_CHUNK_SIZE:
+            return None
+        expected_chunks = -(-manifest.total_size // manifest.chunk_size)
+        if manifest.chunk_count != expected_chunks:
+            return None
+        return manifest
+
+
+def build_manifest(urn_id: str, payload: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> UrnManifest:
+    """Découpe une charge utile et calcule les empreintes de ses morceaux"""
+    chunk_size = clamp_chunk_size(chunk_size)
+    view = memoryview(payload)
+    return UrnManifest(
+        urn_id=urn_id,
+        payload_hash=hashlib.sha256(payload).hexdigest(),
+        total_size=len(payload),
+        chunk_size=chunk_size,
+        chunk_hashes=[
+            hashlib.sha256(view[offset:offset + chunk_size]).hexdigest()
+            for offset in range(0, len(payload), chunk_size)
+        ]
+    )
+
+
+class UrnChunkProvider:
+    """
+    Côté fournisseur: répond aux demandes de manifeste et de morceaux
+    La charge utile n'est sérialisée et découpée qu'une fois par (URN, taille de morceau)
+    Appelé depuis le pool d'exécution du nœud: cache protégé par un verrou
+    """
+
+    def __init__(self, load_payload: PayloadLoader, max_cached: int = MAX_CACHED_PAYLOADS):
+        self.load_payload = load_payload
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[bytes, UrnManifest]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "manifests_served": 0,
+            "chunks_served": 0,
+            "bytes_served": 0,
+            "stale_requests": 0,
+        }
+
+    def _prepared(self, urn_id: str, chunk_size: int) -> Optional[Tuple[bytes, UrnManifest]]:
+        key = (urn_id, chunk_size)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                return entry
+
+        payload = self.load_payload(urn_id)
+        if payload is None:
+            return None
+        entry = (payload, build_manifest(urn_id, payload, chunk_size))
+
+        with self._lock:
+            self._cache[key] = entry
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return entry
+
+    def invalidate(self, urn_id: str):
+        """URN réindexé ou supprimé: manifestes et charges utiles à recalculer"""
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == urn_id]:
+                del self._cache[key]
+
+    def handle_manifest_request(self, message: Dict) -> Dict:
+        urn_id = message.get("urn_id")
+        if not urn_id:
+            return {"error": "missing_urn_id"}
+        entry = self._prepared(urn_id, clamp_chunk_size(message.get("chunk_size", DEFAULT_CHUNK_SIZE)))
+        if entry is None:
+            return {"urn_id": urn_id, "error": "not_found"}
+        self.stats["manifests_served"] += 1
+        return {"urn_id": urn_id, "manifest": entry[1].to_dict()}
+
+    def handle_chunk_request(self, message: Dict) -> Dict:
+        urn_id = message.get("urn_id")
+        if not urn_id:
+            return {"error": "missing_urn_id"}
+        entry = self._prepared(urn_id, clamp_chunk_size(message.get("chunk_size", DEFAULT_CHUNK_SIZE)))
+        if entry is None:
+            return {"urn_id": urn_id, "error": "not_found"}
+        payload, manifest = entry
+
+        # Charge utile modifiée depuis le manifeste du demandeur: il doit recommencer
+        if message.get("payload_hash") != manifest.payload_hash:
+            self.stats["stale_requests"] += 1
+            return {"urn_id": urn_id, "error": "stale_manifest"}
+
+        index = message.get("index")
+        if not isinstance(index, int) or not 0 <= index < manifest.chunk_count:
+            return {"urn_id": urn_id, "error": "invalid_index"}
+
+        offset = index * manifest.chunk_size
+        chunk = payload[offset:offset + manifest.chunk_size]
+        self.stats["chunks_served"] += 1
+        self.stats["bytes_served"] += len(chunk)
+        # base64: valide en JSON, transporté en octets bruts par orpack/1
+        return {"urn_id": urn_id, "index": index, "data": base64.b64encode(chunk).decode()}
+
+
+class ChunkedUrnFetcher:
+    """
+    Côté demandeur: récupère une charge utile URN morceau par morceau
+    - manifeste demandé à tous les fournisseurs, version majoritaire retenue
+    - morceaux répartis entre les fournisseurs (streams_per_peer requêtes chacun)
+    - chaque morceau vérifié (SHA-256) puis écrit dans state_dir/<payload_hash>/
+    - un transfert interrompu reprend avec les morceaux déjà vérifiés
+    """
+
+    def __init__(self, request: RequestFunction, state_dir: str,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 streams_per_peer: int = DEFAULT_STREAMS_PER_PEER):
+        self.request = request
+        self.state_dir = state_dir
+        self.chunk_size = clamp_chunk_size(chunk_size)
+        self.streams_per_peer = streams_per_peer
+        self.stats = {
+            "transfers_completed": 0,
+            "transfers_failed": 0,
+            "transfers_resumed": 0,
+            "chunks_fetched": 0,
+            "chunks_resumed": 0,
+            "chunks_rejected": 0,
+            "chunk_request_failures": 0,
+            "bytes_fetched": 0,
+        }
+        os.makedirs(state_dir, exist_ok=True)
+
+    async def fetch(self, urn_id: str, providers: List[str]) -> Optional[bytes]:
+        """Charge utile vérifiée de l'URN, ou None (morceaux vérifiés conservés pour reprise)"""
+        manifest, holders = await self.fetch_manifest(urn_id, providers)
+        if manifest is None:
+            return None
+        return await self.download(manifest, holders)
+
+    async def download(self, manifest: UrnManifest, providers: List[str]) -> Optional[bytes]:
+        """Morceaux manquants du manifeste, répartis entre les fournisseurs qui le partagent"""
+        urn_id = manifest.urn_id
+        directory = os.path.join(self.state_dir, manifest.payload_hash)
+        loop = asyncio.get_running_loop()
+        verified = await loop.run_in_executor(None, self._load_verified_chunks, manifest, directory)
+        if verified:
+            self.stats["transfers_resumed"] += 1
+            self.stats["chunks_resumed"] += len(verified)
+            print(f"♻️ Resuming URN {urn_id}: {len(verified)}/{manifest.chunk_count} chunks already verified")
+
+        start_time = time.time()
+        failures = {provider: 0 for provider in providers}
+        for _ in range(MAX_TRANSFER_ROUNDS):
+            missing = [i for i in range(manifest.chunk_count) if i not in verified]
+            alive = [p for p in providers if failures[p] < MAX_PEER_FAILURES]
+            if not missing or not alive:
+                break
+
+            queue: asyncio.Queue = asyncio.Queue()
+            for index in missing:
+                queue.put_nowait(index)
+            workers = [
+                self._worker(provider, manifest, directory, queue, verified, failures)
+                for provider in alive for _ in range(self.streams_per_peer)
+            ]
+            await asyncio.gather(*workers)
+
+        if len(verified) < manifest.chunk_count:
+            self.stats["transfers_failed"] += 1
+            print(f"❌ URN {urn_id} transfer incomplete: {len(verified)}/{manifest.chunk_count} chunks "
+                  f"(kept for resume)")
+            return None
+
+        payload = await loop.run_in_executor(None, self._assemble, manifest, directory)
+        if payload is None:
+            self.stats["transfers_failed"] += 1
+            return None
+
+        self.stats["transfers_completed"] += 1
+        elapsed = time.time() - start_time
+        print(f"✅ URN {urn_id} transferred: {manifest.total_size} bytes, {manifest.chunk_count} chunks "
+              f"from {len(providers)} peer(s) in {elapsed:.2f}s")
+        return payload
+
+    async def fetch_manifest(self, urn_id: str, providers: List[str]) -> Tuple[Optional[UrnManifest], List[str]]:
+        """Manifeste partagé par le plus grand nombre de fournisseurs, et ces fournisseurs"""
+        message = {"type": MANIFEST_REQUEST_TYPE, "urn_id": urn_id, "chunk_size": self.chunk_size}
+        responses = await asyncio.gather(
+            *(self.request(provider, message) for provider in providers), return_exceptions=True
+        )
+
+        groups: Dict[Tuple[str, int], List[str]] = {}
+        manifests: Dict[Tuple[str, int], UrnManifest] = {}
+        for provider, response in zip(providers, responses):
+            if not isinstance(response, dict) or not isinstance(response.get("manifest"), dict):
+                continue
+            manifest = UrnManifest.from_dict(response["manifest"])
+            if manifest is None or manifest.urn_id != urn_id:
+                print(f"⚠️ Invalid manifest for {urn_id} from {provider[:8]}...")
+                continue
+            key = (manifest.payload_hash, manifest.chunk_size)
+            groups.setdefault(key, []).append(provider)
+            manifests[key] = manifest
+
+        if not groups:
+            return None, []
+        key = max(groups, key=lambda k: len(groups[k]))
+        return manifests[key], groups[key]
+
+    async def _worker(self, provider: str, manifest: UrnManifest, directory: str,
+                      queue: asyncio.Queue, verified: Set[int], failures: Dict[str, int]):
+        loop = asyncio.get_running_loop()
+        while failures[provider] < MAX_PEER_FAILURES:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            chunk = await self._request_chunk(provider, manifest, index)
+            if chunk is not None and await loop.run_in_executor(
+                None, self._store_chunk, manifest, directory, index, chunk
+            ):
+                verified.add(index)
+                failures[provider] = 0
+                self.stats["chunks_fetched"] += 1
+                self.stats["bytes_fetched"] += len(chunk)
+            else:
+                # Morceau laissé manquant: repris par la passe suivante, chez un autre pair si besoin
+                failures[provider] += 1
+                self.stats["chunk_request_failures"] += 1
+
+    async def _request_chunk(self, provider: str, manifest: UrnManifest, index: int) -> Optional[bytes]:
+        try:
+            response = await self.request(provider, {
+                "type": CHUNK_REQUEST_TYPE,
+                "urn_id": manifest.urn_id,
+                "payload_hash": manifest.payload_hash,
+                "chunk_size": manifest.chunk_size,
+                "index": index
+            })
+        except Exception as e:
+            print(f"⚠️ Chunk {index} request to {provider[:8]}... failed: {e}")
+            return None
+        if not response or response.get("index") != index or not isinstance(response.get("data"), str):
+            if response and response.get("error"):
+                print(f"⚠️ Chunk {index} refused by {provider[:8]}...: {response['error']}")
+            return None
+        try:
+            return base64.b64decode(response["data"], validate=True)
+        except (binascii.Error, ValueError):
+            return None
+
+    def _store_chunk(self, manifest: UrnManifest, directory: str, index: int, chunk: bytes) -> bool:
+        """Vérifie le morceau contre le manifeste et l'écrit (écriture atomique)"""
+        if (len(chunk) != manifest.chunk_length(index)
+                or hashlib.sha256(chunk).hexdigest() != manifest.chunk_hashes[index]):
+            self.stats["chunks_rejected"] += 1
+            print(f"❌ Chunk {index} of {manifest.urn_id} failed verification")
+            return False
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{index}.chunk")
+        with open(path + ".tmp", "wb") as f:
+            f.write(chunk)
+        os.replace(path + ".tmp", path)
+        return True
+
+    def _load_verified_chunks(self, manifest: UrnManifest, directory: str) -> Set[int]:
+        """Morceaux d'un transfert précédent encore valides (revérifiés)"""
+        verified = set()
+        if not os.path.isdir(directory):
+            return verified
+        for index in range(manifest.chunk_count):
+            path = os.path.join(directory, f"{index}.chunk")
+            try:
+                with open(path, "rb") as f:
+                    chunk = f.read()
+            except OSError:
+                continue
+            if hashlib.sha256(chunk).hexdigest() == manifest.chunk_hashes[index]:
+                verified.add(index)
+            else:
+                os.remove(path)
+        return verified
+
+    def _assemble(self, manifest: UrnManifest, directory: str) -> Optional[bytes]:
+        """Concatène les morceaux, vérifie l'empreinte globale et libère l'état de reprise"""
+        chunks = []
+        for index in range(manifest.chunk_count):
+            with open(os.path.join(directory, f"{index}.chunk"), "rb") as f:
+                chunks.append(f.read())
+        payload = b"".join(chunks)
+        shutil.rmtree(directory, ignore_errors=True)
+        if hashlib.sha256(payload).hexdigest() != manifest.payload_hash:
+            print(f"❌ URN {manifest.urn_id} payload hash mismatch")
+            return None
+        return payload
+
+    def discard(self, payload_hash: str):
+        """Abandonne l'état de reprise d'un transfert"""
+        shutil.rmtree(os.path.join(self.state_dir, payload_hash), ignore_errors=True)
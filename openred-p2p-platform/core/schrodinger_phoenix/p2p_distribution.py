@@ -11,6 +11,11 @@ import asyncio
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 
+from core.p2p_security.binary_codec import CodecError, decode as decode_payload, encode as encode_payload
+from core.schrodinger_phoenix.chunked_transfer import (
+    CHUNK_REQUEST_TIMEOUT, ChunkedUrnFetcher, UrnChunkProvider
+)
+
 # Import du système Phantom URN révolutionnaire
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'phantom-images-demo'))
 try:
@@ -76,6 +81,13 @@ class P2PPhantomUrnEngine:
         self.network_urn_index = {}    # Index URN sur le réseau
         self.pending_requests = {}     # Requêtes en cours
         
+        # Pool de connexions persistantes (P2PConnectionPool, fourni par le nœud)
+        self.connection_pool = None
+        
+        # Transfert des matrices par morceaux vérifiés (fournisseur et demandeur)
+        self.chunk_provider = UrnChunkProvider(self._serialize_matrix)
+        self.chunk_fetcher = ChunkedUrnFetcher(self._pool_request, os.path.join(cache_dir, "transfers"))
+        
         # Statistiques
         self.stats = {
             "local_resurrections": 0,
@@ -114,6 +126,7 @@ class P2PPhantomUrnEngine:
                     quantum_matrix = await self.local_engine.generate_schrodinger_from_ashes(urn_path)
                     
                     if quantum_matrix:
+                        self.chunk_provider.invalidate(urn_id)
                         self.local_urn_cache[urn_id] = {
                             "file_path": urn_path,
                             "quantum_matrix": quantum_matrix,
@@ -169,17 +182,15 @@ class P2PPhantomUrnEngine:
         network_result = await self._search_urn_on_network(urn_id)
         
         if network_result:
-            print(f"🔍 URN found on network node: {network_result['provider'][:8]}...")
+            print(f"🔍 URN found on {len(network_result['providers'])} network node(s), "
+                  f"first: {network_result['provider'][:8]}...")
             
-            # Demande de la matrice quantique
-            quantum_matrix = await self._request_quantum_matrix(
-                urn_id, 
-                network_result['provider'],
-                network_result['endpoint']
-            )
+            # Demande de la matrice quantique (morceaux répartis entre les fournisseurs)
+            quantum_matrix = await self._request_quantum_matrix(urn_id, network_result['providers'])
             
             if quantum_matrix:
-                # Cache local pour accès futurs
+                # Cache local pour accès futurs (ce nœud devient fournisseur à son tour)
+                self.chunk_provider.invalidate(urn_id)
                 self.local_urn_cache[urn_id] = {
                     "file_path": None,  # URN distant
                     "quantum_matrix": quantum_matrix,
@@ -218,25 +229,33 @@ class P2PPhantomUrnEngine:
             timestamp=time.time()
         )
         
-        # Diffusion requête à tous les nœuds connectés
+        # Diffusion requête à tous les nœuds connectés (en parallèle: tous les détenteurs
+        # de l'URN servent ensuite de sources pour le transfert par morceaux)
         active_nodes = self.p2p_network.get_discovered_nodes()
+        fingerprints = list(active_nodes)
+        responses = await asyncio.gather(
+            *(self._query_node_for_urn(active_nodes[fp], request) for fp in fingerprints),
+            return_exceptions=True
+        )
         
-        for node_fingerprint, node_info in active_nodes.items():
-            try:
-                # Envoi requête via connexion P2P directe
-                response = await self._query_node_for_urn(node_info, request)
-                
-                if response and response.available:
-                    return {
-                        "provider": node_fingerprint,
-                        "endpoint": node_info,
-                        "content_hash": response.metadata.get("content_hash") if response.metadata else None
-                    }
+        providers = []
+        content_hash = None
+        for node_fingerprint, response in zip(fingerprints, responses):
+            if isinstance(response, Exception):
+                print(f"⚠️ Error querying node {node_fingerprint[:8]}: {response}")
+            elif response and response.available:
+                providers.append(node_fingerprint)
+                if content_hash is None and response.metadata:
+                    content_hash = response.metadata.get("content_hash")
                     
-            except Exception as e:
-                print(f"⚠️ Error querying node {node_fingerprint[:8]}: {e}")
-                
-        return None
+        if not providers:
+            return None
+        return {
+            "provider": providers[0],
+            "providers": providers,
+            "endpoint": active_nodes[providers[0]],
+            "content_hash": content_hash
+        }
         
     async def _query_node_for_urn(self, node_info: Dict, request: P2PUrnRequest) -> Optional[P2PUrnResponse]:
         """Interroge un nœud spécifique pour un URN"""
@@ -250,22 +269,59 @@ class P2PPhantomUrnEngine:
                 "resurrection_type": request.resurrection_type
             }
             
-            # Envoi via connexion P2P sécurisée
-            # (Implémentation dépend du système de connexions P2P)
-            # Pour cette version, simulation de la réponse
-            
-            # TODO: Intégrer avec le système de connexions P2P réel
             print(f"🔍 Querying node for URN {request.urn_id}...")
-            
-            # Simulation réponse (à remplacer par vraie communication P2P)
-            return None
+            if self.connection_pool is None:
+                return None
+            
+            # Envoi via la connexion P2P persistante du nœud (pas de handshake par requête)
+            provider_fingerprint = node_info["beacon"].fingerprint
+            response = await self.connection_pool.request(provider_fingerprint, query_message)
+            if not response:
+                return None
+            
+            return P2PUrnResponse(
+                urn_id=response.get("urn_id", request.urn_id),
+                provider_fingerprint=response.get("provider", provider_fingerprint),
+                available=bool(response.get("available")),
+                metadata=response.get("metadata"),
+                timestamp=response.get("timestamp", 0)
+            )
             
         except Exception as e:
             print(f"❌ Node query error: {e}")
             return None
             
-    async def _request_quantum_matrix(self, urn_id: str, provider_fingerprint: str, provider_endpoint: Dict) -> Optional[QuantumMatrix]:
-        """Demande la matrice quantique à un nœud fournisseur"""
+    async def _pool_request(self, provider_fingerprint: str, message: Dict) -> Optional[Dict]:
+        """Requête via la connexion persistante du fournisseur"""
+        if self.connection_pool is None:
+            return None
+        return await self.connection_pool.request(provider_fingerprint, message, timeout=CHUNK_REQUEST_TIMEOUT)
+        
+    async def _request_quantum_matrix(self, urn_id: str, providers: List[str]) -> Optional[QuantumMatrix]:
+        """
+        Demande la matrice quantique aux nœuds fournisseurs
+        Transfert par morceaux vérifiés et reprenables; message unique pour les anciens pairs
+        """
+        if self.connection_pool is None:
+            return None
+            
+        manifest, holders = await self.chunk_fetcher.fetch_manifest(urn_id, providers)
+        if manifest is None:
+            return await self._request_whole_matrix(urn_id, providers[0])
+            
+        print(f"🔱 Fetching quantum matrix for {urn_id}: {manifest.total_size} bytes "
+              f"in {manifest.chunk_count} chunks from {len(holders)} peer(s)")
+        payload = await self.chunk_fetcher.download(manifest, holders)
+        if payload is None:
+            return None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._deserialize_matrix, payload)
+        except (CodecError, KeyError, TypeError) as e:
+            print(f"❌ Invalid quantum matrix payload for {urn_id}: {e}")
+            return None
+            
+    async def _request_whole_matrix(self, urn_id: str, provider_fingerprint: str) -> Optional[QuantumMatrix]:
+        """Matrice complète en un seul message (pairs sans transfert par morceaux)"""
         try:
             # Message de demande de matrice
             matrix_request = {
@@ -275,11 +331,13 @@ class P2PPhantomUrnEngine:
                 "timestamp": time.time()
             }
             
-            # TODO: Intégrer avec le système de connexions P2P réel
             print(f"🔱 Requesting quantum matrix for {urn_id} from {provider_fingerprint[:8]}...")
+            response = await self.connection_pool.request(provider_fingerprint, matrix_request)
+            matrix = (response or {}).get("quantum_matrix")
+            if not matrix:
+                return None
             
-            # Simulation (à remplacer par vraie communication P2P)
-            return None
+            return QuantumMatrix(matrix.get("data"), matrix.get("metadata", {}))
             
         except Exception as e:
             print(f"❌ Matrix request error: {e}")
@@ -347,6 +405,34 @@ class P2PPhantomUrnEngine:
             print(f"❌ Error serializing quantum matrix: {e}")
             return None
             
+    def _serialize_matrix(self, urn_id: str) -> Optional[bytes]:
+        """Matrice quantique locale sérialisée (orpack/1) pour le transfert par morceaux"""
+        urn_data = self.local_urn_cache.get(urn_id)
+        if not urn_data:
+            return None
+        quantum_matrix = urn_data["quantum_matrix"]
+        try:
+            return encode_payload({
+                "data": quantum_matrix.data.tolist() if hasattr(quantum_matrix.data, 'tolist') else quantum_matrix.data,
+                "metadata": quantum_matrix.metadata if hasattr(quantum_matrix, 'metadata') else {}
+            })
+        except CodecError as e:
+            print(f"❌ Error serializing quantum matrix: {e}")
+            return None
+            
+    @staticmethod
+    def _deserialize_matrix(payload: bytes) -> QuantumMatrix:
+        matrix = decode_payload(payload)
+        return QuantumMatrix(matrix["data"], matrix.get("metadata", {}))
+        
+    def handle_manifest_request(self, request_message: Dict, requester_fingerprint: str) -> Dict:
+        """Traite une demande de manifeste (transfert par morceaux)"""
+        return self.chunk_provider.handle_manifest_request(request_message)
+        
+    def handle_chunk_request(self, request_message: Dict, requester_fingerprint: str) -> Dict:
+        """Traite une demande de morceau de matrice quantique"""
+        return self.chunk_provider.handle_chunk_request(request_message)
+        
     def get_p2p_stats(self) -> Dict:
         """Statistiques du système P2P Schrödinger"""
         return {
@@ -355,6 +441,10 @@ class P2PPhantomUrnEngine:
             "network_index": len(self.network_urn_index),
             "pending_requests": len(self.pending_requests),
             "statistics": self.stats,
+            "chunked_transfer": {
+                "fetched": self.chunk_fetcher.stats,
+                "served": self.chunk_provider.stats
+            },
             "cache_efficiency": (
                 self.stats["cache_hits"] / 
                 (self.stats["cache_hits"] + self.stats["cache_misses"])
@@ -0,0 +1,220 @@
+# === OpenRed P2P : Vérification des beacons "Phare dans la Nuit" ===
+# Signature RSA-PSS de chaque beacon vérifiée (hors du thread d'écoute), avec:
+# - cache des beacons déjà jugés, clé (fingerprint, IP, hash du beacon reçu en entier):
+#   doublons multicast/broadcast et rejeux sans nouvelle opération crypto; un beacon
+#   dont l'endpoint, le profil ou l'émetteur diffère n'hérite pas du verdict
+# - cache des clés publiques vérifiées par nœud (fingerprint = sha256(PEM)[:16])
+# - limitation de débit des émetteurs inconnus (par IP et globale) avant toute crypto
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+
+# Verdicts
+VERIFIED = "verified"           # signature vérifiée
+CACHED = "cached"               # beacon identique déjà vérifié
+INVALID = "invalid"             # signature ou clé invalide
+UNVERIFIABLE = "unverifiable"   # aucune clé publique connue (ancien nœud)
+RATE_LIMITED = "rate_limited"   # émetteur inconnu trop bavard
+
+ACCEPTED_VERDICTS = (VERIFIED, CACHED)
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_KEY_CACHE_SIZE = 1024
+UNKNOWN_SENDER_LIMIT = 16        # vérifications par IP et par fenêtre pour un nœud inconnu
+UNKNOWN_GLOBAL_LIMIT = 100       # toutes IP confondues (IP usurpées)
+UNKNOWN_WINDOW = 30.0            # secondes (intervalle des beacons)
+MAX_TRACKED_SENDERS = 4096
+
+PUBLIC_KEY_CAPABILITY = "public_key"   # PEM transporté dans beacon.capabilities
+
+
+def beacon_signed_payload(beacon) -> bytes:
+    """Données signées d'un beacon (identiques à la génération et à la vérification)"""
+    beacon_data = {
+        "fingerprint": beacon.fingerprint,
+        "node_id": beacon.node_id,
+        "sector": beacon.sector,
+        "services": beacon.services,
+        "timestamp": beacon.timestamp
+    }
+    return json.dumps(beacon_data, sort_keys=True).encode()
+
+
+def beacon_hash(beacon) -> str:
+    """Empreinte du beacon reçu en entier (endpoint, capacités, profil et signature compris)"""
+    return hashlib.sha256(json.dumps(asdict(beacon), sort_keys=True, default=str).encode()).hexdigest()
+
+
+def public_key_fingerprint(public_pem: bytes) -> str:
+    """Fingerprint d'un nœud, comme calculé par LighthouseProtocol"""
+    return hashlib.sha256(public_pem).hexdigest()[:16]
+
+
+class BeaconVerifier:
+    """
+    Vérification des beacons, sûre entre threads (workers du lighthouse)
+    verify(beacon, ip) → verdict; seuls VERIFIED et CACHED sont à accepter
+    """
+
+    def __init__(self, verify_signature: Callable[[Any, Any], bool],
+                 cache_size: int = DEFAULT_CACHE_SIZE, key_cache_size: int = DEFAULT_KEY_CACHE_SIZE,
+                 unknown_sender_limit: int = UNKNOWN_SENDER_LIMIT,
+                 unknown_global_limit: int = UNKNOWN_GLOBAL_LIMIT,
+                 unknown_window: float = UNKNOWN_WINDOW):
+        self.verify_signature = verify_signature
+        self.cache_size = cache_size
+        self.key_cache_size = key_cache_size
+        self.unknown_sender_limit = unknown_sender_limit
+        self.unknown_global_limit = unknown_global_limit
+        self.unknown_window = unknown_window
+
+        self._lock = threading.Lock()
+        self._verdicts: "OrderedDict[Tuple[str, str, str], bool]" = OrderedDict()
+        self._public_keys: "OrderedDict[str, Any]" = OrderedDict()
+        self._unknown_senders: Dict[str, Tuple[float, int]] = {}
+        self._unknown_global: Tuple[float, int] = (0.0, 0)
+        self.stats = {
+            "verified": 0,
+            "cache_hits": 0,
+            "invalid": 0,
+            "unverifiable": 0,
+            "rate_limited": 0,
+            "verify_time_total": 0.0,
+        }
+
+    # ============ CACHES ============
+
+    def _cached_verdict(self, key: Tuple[str, str, str]) -> Optional[bool]:
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+            return verdict
+
+    def _remember_verdict(self, key: Tuple[str, str, str], valid: bool):
+        with self._lock:
+            self._verdicts[key] = valid
+            while len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+
+    def _known_key(self, fingerprint: str):
+        with self._lock:
+            public_key = self._public_keys.get(fingerprint)
+            if public_key is not None:
+                self._public_keys.move_to_end(fingerprint)
+            return public_key
+
+    def _remember_key(self, fingerprint: str, public_key):
+        with self._lock:
+            self._public_keys[fingerprint] = public_key
+            while len(self._public_keys) > self.key_cache_size:
+                self._public_keys.popitem(last=False)
+
+    def forget(self, fingerprint: str):
+        """Oublie la clé d'un nœud (rotation de clé, nœud banni)"""
+        with self._lock:
+            self._public_keys.pop(fingerprint, None)
+
+    # ============ LIMITATION ÉMETTEURS INCONNUS ============
+
+    def _allow_unknown(self, sender_ip: str) -> bool:
+        """Fenêtre fixe par IP, plus un plafond global contre les IP usurpées"""
+        now = time.time()
+        with self._lock:
+            start, count = self._unknown_global
+            if now - start >= self.unknown_window:
+                start, count = now, 0
+            if count >= self.unknown_global_limit:
+                return False
+
+            sender_start, sender_count = self._unknown_senders.get(sender_ip, (now, 0))
+            if now - sender_start >= self.unknown_window:
+                sender_start, sender_count = now, 0
+            if sender_count >= self.unknown_sender_limit:
+                return False
+
+            self._unknown_global = (start, count + 1)
+            if len(self._unknown_senders) >= MAX_TRACKED_SENDERS and sender_ip not in self._unknown_senders:
+                self._prune_senders(now)
+            self._unknown_senders[sender_ip] = (sender_start, sender_count + 1)
+            return True
+
+    def _prune_senders(self, now: float):
+        expired = [ip for ip, (start, _) in self._unknown_senders.items() if now - start >= self.unknown_window]
+        for ip in expired:
+            del self._unknown_senders[ip]
+        if len(self._unknown_senders) >= MAX_TRACKED_SENDERS:
+            self._unknown_senders.clear()
+
+    # ============ VÉRIFICATION ============
+
+    def verify(self, beacon, sender_ip: str) -> str:
+        """Verdict pour un beacon reçu de sender_ip"""
+        cache_key = (beacon.fingerprint, sender_ip, beacon_hash(beacon))
+        cached = self._cached_verdict(cache_key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return CACHED if cached else INVALID
+
+        public_key = self._known_key(beacon.fingerprint)
+        if public_key is None:
+            public_pem = (beacon.capabilities or {}).get(PUBLIC_KEY_CAPABILITY)
+            if not isinstance(public_pem, str):
+                self.stats["unverifiable"] += 1
+                return UNVERIFIABLE
+            if not self._allow_unknown(sender_ip):
+                self.stats["rate_limited"] += 1
+                return RATE_LIMITED
+            public_key = self._load_public_key(beacon.fingerprint, public_pem)
+            if public_key is None:
+                self.stats["invalid"] += 1
+                self._remember_verdict(cache_key, False)
+                return INVALID
+
+        start = time.perf_counter()
+        valid = self.verify_signature(beacon, public_key)
+        self.stats["verify_time_total"] += time.perf_counter() - start
+        self._remember_verdict(cache_key, valid)
+        if not valid:
+            self.stats["invalid"] += 1
+            return INVALID
+
+        self.stats["verified"] += 1
+        self._remember_key(beacon.fingerprint, public_key)
+        return VERIFIED
+
+    @staticmethod
+    def _load_public_key(fingerprint: str, public_pem: str):
+        """Clé publique annoncée, acceptée seulement si elle correspond au fingerprint"""
+        pem_bytes = public_pem.encode()
+        if public_key_fingerprint(pem_bytes) != fingerprint:
+            print(f"❌ Beacon public key does not match fingerprint {fingerprint[:8]}...")
+            return None
+        try:
+            return serialization.load_pem_public_key(pem_bytes)
+        except ValueError as e:
+            print(f"❌ Invalid beacon public key from {fingerprint[:8]}...: {e}")
+            return None
+
+    def get_verification_stats(self) -> Dict[str, Any]:
+        """Statistiques: vérifications, cache, refus"""
+        verified = self.stats["verified"] + self.stats["invalid"]
+        with self._lock:
+            cached_verdicts, known_keys = len(self._verdicts), len(self._public_keys)
+        return {
+            "verified": self.stats["verified"],
+            "cache_hits": self.stats["cache_hits"],
+            "invalid": self.stats["invalid"],
+            "unverifiable": self.stats["unverifiable"],
+            "rate_limited": self.stats["rate_limited"],
+            "avg_verify_ms": self.stats["verify_time_total"] / verified * 1000 if verified else 0.0,
+            "cached_verdicts": cached_verdicts,
+            "known_public_keys": known_keys,
+        }
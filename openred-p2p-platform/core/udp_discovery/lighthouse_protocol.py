@@ -9,8 +9,9 @@ import time
 import hashlib
 import secrets
 import struct
+import queue
 from typing import Dict, List, Optional, Tuple, Callable
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes, serialization
@@ -20,6 +21,11 @@ from cryptography.hazmat.backends import default_backend
 import base64
 import os
 
+from core.p2p_security.message_framing import recv_json, send_json
+from core.udp_discovery.beacon_verification import (
+    ACCEPTED_VERDICTS, PUBLIC_KEY_CAPABILITY, UNVERIFIABLE, BeaconVerifier, beacon_hash, beacon_signed_payload
+)
+
 @dataclass
 class P2PNodeBeacon:
     """Beacon cryptographique pour découverte P2P "phare dans la nuit" """
@@ -47,6 +53,11 @@ class LighthouseProtocol:
     MULTICAST_PORT = 5354                 # Port découverte standard
     BEACON_INTERVAL = 30                  # Intervalle beacon (secondes)
     DISCOVERY_TIMEOUT = 60                # Timeout découverte
+    NODE_ACTIVE_WINDOW = 180              # Nœud actif si vu récemment (secondes)
+    MAX_BEACON_SIZE = 65535               # Datagramme UDP maximal (beacon + clé publique + profil)
+    VERIFY_WORKERS = 2                    # Threads de vérification des signatures
+    VERIFY_QUEUE_SIZE = 256               # Beacons en attente de vérification (au-delà: ignorés)
+    VERIFY_BATCH_SIZE = 32                # Beacons traités par lot (un seul par nœud)
     
     def __init__(self, node_id: str, private_key, public_key, sector: str = "general", profile_manager=None):
         self.node_id = node_id
@@ -61,6 +72,7 @@ class LighthouseProtocol:
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
         self.fingerprint = hashlib.sha256(public_pem).hexdigest()[:16]
+        self.public_pem = public_pem.decode()
         
         # État du protocole
         self.discovered_nodes = {}      # Nœuds découverts
@@ -69,9 +81,18 @@ class LighthouseProtocol:
         self.listener_thread = None     # Thread écoute réseau
         self.running = False
         
+        # Vérification des signatures hors du thread d'écoute (caches + limitation des inconnus)
+        self.beacon_verifier = BeaconVerifier(self.verify_beacon_signature)
+        self.require_signed_beacons = True   # False: beacons d'anciens nœuds (sans clé) acceptés
+        self.beacon_queue: "queue.Queue[Tuple[bytes, str]]" = queue.Queue(maxsize=self.VERIFY_QUEUE_SIZE)
+        self.verify_threads: List[threading.Thread] = []
+        self._nodes_lock = threading.Lock()
+        self.beacon_stats = {"received": 0, "dropped": 0, "superseded": 0, "rejected": 0}
+        
         # Callbacks pour événements réseau
         self.on_node_discovered: Optional[Callable] = None
         self.on_node_lost: Optional[Callable] = None
+        self.on_node_online: Optional[Callable] = None   # nœud nouveau ou de retour après inactivité
         self.on_connection_established: Optional[Callable] = None
         
         print(f"🌟 Lighthouse Protocol initialized")
@@ -100,7 +121,8 @@ class LighthouseProtocol:
                 "schrodinger_phoenix": True,
                 "urn_support": True,
                 "phantom_support": True,
-                "p2p_direct": True
+                "p2p_direct": True,
+                PUBLIC_KEY_CAPABILITY: self.public_pem  # Vérification de signature par les pairs
             },
             p2p_endpoint={
                 "port": p2p_port,
@@ -115,17 +137,8 @@ class LighthouseProtocol:
         )
         
         # Signature RSA du beacon
-        beacon_data = {
-            "fingerprint": beacon.fingerprint,
-            "node_id": beacon.node_id,
-            "sector": beacon.sector,
-            "services": beacon.services,
-            "timestamp": beacon.timestamp
-        }
-        
-        beacon_json = json.dumps(beacon_data, sort_keys=True)
         signature = self.private_key.sign(
-            beacon_json.encode(),
+            beacon_signed_payload(beacon),
             padding.PSS(
                 mgf=padding.MGF1(hashes.SHA256()),
                 salt_length=padding.PSS.MAX_LENGTH
@@ -139,22 +152,12 @@ class LighthouseProtocol:
     def verify_beacon_signature(self, beacon: P2PNodeBeacon, sender_public_key) -> bool:
         """Vérifie la signature RSA d'un beacon"""
         try:
-            # Reconstruction des données signées
-            beacon_data = {
-                "fingerprint": beacon.fingerprint,
-                "node_id": beacon.node_id,
-                "sector": beacon.sector,
-                "services": beacon.services,
-                "timestamp": beacon.timestamp
-            }
-            
-            beacon_json = json.dumps(beacon_data, sort_keys=True)
             signature = base64.b64decode(beacon.signature)
             
-            # Vérification signature
+            # Vérification signature (données signées reconstruites)
             sender_public_key.verify(
                 signature,
-                beacon_json.encode(),
+                beacon_signed_payload(beacon),
                 padding.PSS(
                     mgf=padding.MGF1(hashes.SHA256()),
                     salt_length=padding.PSS.MAX_LENGTH
@@ -190,6 +193,14 @@ class LighthouseProtocol:
         )
         self.listener_thread.start()
         
+        # Démarrage workers de vérification des beacons
+        self.verify_threads = [
+            threading.Thread(target=self._beacon_verification_worker, daemon=True)
+            for _ in range(self.VERIFY_WORKERS)
+        ]
+        for thread in self.verify_threads:
+            thread.start()
+        
         print(f"✅ Lighthouse Protocol active - Broadcasting beacon every {self.BEACON_INTERVAL}s")
         
     def stop_lighthouse(self):
@@ -291,9 +302,9 @@ class LighthouseProtocol:
                 try:
                     # Ajouter timeout pour debug
                     sock.settimeout(1.0)
-                    data, addr = sock.recvfrom(4096)
+                    data, addr = sock.recvfrom(self.MAX_BEACON_SIZE)
                     print(f"📡 DEBUG: Received UDP data from {addr}: {len(data)} bytes")
-                    self._process_discovered_beacon(data.decode('utf-8'), addr[0])
+                    self._enqueue_beacon(data, addr[0])
                     
                 except socket.timeout:
                     # Timeout normal, continue
@@ -307,25 +318,102 @@ class LighthouseProtocol:
         finally:
             sock.close()
             
-    def _process_discovered_beacon(self, beacon_data: str, sender_ip: str):
-        """Traite un beacon découvert"""
+    def _enqueue_beacon(self, data: bytes, sender_ip: str):
+        """Remet un datagramme aux workers sans bloquer l'écoute (file pleine: ignoré)"""
+        self.beacon_stats["received"] += 1
         try:
-            beacon_dict = json.loads(beacon_data)
+            self.beacon_queue.put_nowait((data, sender_ip))
+        except queue.Full:
+            self.beacon_stats["dropped"] += 1
             
-            # Support rétrocompatibilité : ajouter discovery_info si manquant
-            if 'discovery_info' not in beacon_dict:
-                beacon_dict['discovery_info'] = None
+    def _beacon_verification_worker(self):
+        """Thread de vérification: beacons traités par lots, seul le plus récent de chaque nœud"""
+        while self.running:
+            try:
+                batch = [self.beacon_queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.VERIFY_BATCH_SIZE:
+                try:
+                    batch.append(self.beacon_queue.get_nowait())
+                except queue.Empty:
+                    break
             
-            beacon = P2PNodeBeacon(**beacon_dict)
+            latest = {}
+            for data, sender_ip in batch:
+                beacon = self._parse_beacon(data)
+                if beacon is None:
+                    continue
+                current = latest.get(beacon.fingerprint)
+                if current is not None:
+                    # Beacon remplacé dans le même lot: une seule vérification par nœud
+                    self.beacon_stats["superseded"] += 1
+                    if current[0].timestamp >= beacon.timestamp:
+                        continue
+                latest[beacon.fingerprint] = (beacon, sender_ip)
+            
+            for beacon, sender_ip in latest.values():
+                self._process_discovered_beacon(beacon, sender_ip)
+                
+    def _parse_beacon(self, data: bytes) -> Optional[P2PNodeBeacon]:
+        """Décode un beacon; ignore le nôtre et les beacons périmés"""
+        try:
+            beacon_dict = json.loads(data.decode('utf-8'))
+            
+            # Support rétrocompatibilité : ajouter discovery_info si manquant, ignorer les champs inconnus
+            beacon_dict.setdefault('discovery_info', None)
+            known_fields = {beacon_field.name for beacon_field in fields(P2PNodeBeacon)}
+            beacon = P2PNodeBeacon(**{k: v for k, v in beacon_dict.items() if k in known_fields})
             
             # Ignorer notre propre beacon
             if beacon.fingerprint == self.fingerprint:
-                return
+                return None
                 
             # Vérifier âge du beacon (anti-replay)
             if time.time() - beacon.timestamp > 120:  # 2 minutes max
+                return None
+            
+            return beacon
+            
+        except Exception as e:
+            print(f"⚠️ Error processing beacon: {e}")
+            return None
+            
+    def _process_discovered_beacon(self, beacon: P2PNodeBeacon, sender_ip: str):
+        """Traite un beacon découvert (signature vérifiée avant tout enregistrement)"""
+        try:
+            verdict = self.beacon_verifier.verify(beacon, sender_ip)
+            if verdict not in ACCEPTED_VERDICTS and not (verdict == UNVERIFIABLE and not self.require_signed_beacons):
+                self.beacon_stats["rejected"] += 1
+                if verdict == UNVERIFIABLE:
+                    print(f"🚫 Unsigned beacon ignored: {beacon.node_id} ({beacon.fingerprint[:8]}...)")
                 return
                 
+            # Ajouter/mettre à jour nœud découvert
+            node_info = {
+                "beacon": beacon,
+                "ip": sender_ip,
+                "last_seen": time.time(),
+                "connection_attempts": 0
+            }
+            
+            with self._nodes_lock:
+                previous = self.discovered_nodes.get(beacon.fingerprint)
+                if previous is not None and beacon.timestamp <= previous["beacon"].timestamp:
+                    # Seul un beacon strictement plus récent remplace l'entrée; même horodatage:
+                    # doublon, ou rejeu modifié (endpoint, profil ou IP) à refuser
+                    conflicting = (beacon.timestamp == previous["beacon"].timestamp
+                                   and (sender_ip != previous["ip"]
+                                        or beacon_hash(beacon) != beacon_hash(previous["beacon"])))
+                    if conflicting:
+                        self.beacon_stats["rejected"] += 1
+                        print(f"🚫 Conflicting beacon ignored: {beacon.node_id} "
+                              f"({beacon.fingerprint[:8]}...) from {sender_ip}")
+                    return
+                is_new_node = previous is None
+                was_active = not is_new_node and node_info["last_seen"] - previous["last_seen"] < self.NODE_ACTIVE_WINDOW
+                self.discovered_nodes[beacon.fingerprint] = node_info
+            
             print(f"🔍 Discovered node: {beacon.node_id} ({beacon.fingerprint[:8]}...)")
             print(f"   IP: {sender_ip}")
             print(f"   Sector: {beacon.sector}")
@@ -343,20 +431,13 @@ class LighthouseProtocol:
                 if profile_info.get('profile_picture'):
                     print(f"   📷 Photo de profil disponible")
             
-            # Ajouter/mettre à jour nœud découvert
-            node_info = {
-                "beacon": beacon,
-                "ip": sender_ip,
-                "last_seen": time.time(),
-                "connection_attempts": 0
-            }
-            
-            is_new_node = beacon.fingerprint not in self.discovered_nodes
-            self.discovered_nodes[beacon.fingerprint] = node_info
-            
             # Callback nouveau nœud
             if is_new_node and self.on_node_discovered:
                 self.on_node_discovered(beacon, sender_ip)
+            
+            # Callback nœud (re)joignable: messages en attente à lui délivrer
+            if not was_active and self.on_node_online:
+                self.on_node_online(beacon.fingerprint)
                 
         except Exception as e:
             print(f"⚠️ Error processing beacon: {e}")
@@ -368,7 +449,7 @@ class LighthouseProtocol:
         
         for fingerprint, node_info in self.discovered_nodes.items():
             # Nœud actif si vu dans les 3 dernières minutes
-            if current_time - node_info["last_seen"] < 180:
+            if current_time - node_info["last_seen"] < self.NODE_ACTIVE_WINDOW:
                 active_nodes[fingerprint] = node_info
                 
         return active_nodes
@@ -402,11 +483,10 @@ class LighthouseProtocol:
                 "protocol_version": "1.0"
             }
             
-            sock.send(json.dumps(handshake).encode())
+            send_json(sock, handshake)
             
-            # Attendre réponse
-            response = sock.recv(4096)
-            response_data = json.loads(response.decode())
+            # Attendre réponse (trame complète)
+            response_data = recv_json(sock) or {}
             
             if response_data.get("status") == "accepted":
                 print(f"✅ P2P connection established with {beacon.node_id}")
@@ -446,5 +526,10 @@ class LighthouseProtocol:
             "urn_phantom_nodes": len([
                 node for node in active_nodes.values()
                 if node["beacon"].urn_phantom_support
-            ])
+            ]),
+            "beacon_verification": {
+                **self.beacon_stats,
+                **self.beacon_verifier.get_verification_stats(),
+                "queue_depth": self.beacon_queue.qsize()
+            }
         }
\ No newline at end of file
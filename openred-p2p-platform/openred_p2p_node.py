@@ -9,14 +9,17 @@ import time
 import asyncio
 import threading
 import argparse
-import socket
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
 
 # Import des composants P2P révolutionnaires
 from core.udp_discovery.lighthouse_protocol import LighthouseProtocol
-from core.p2p_security.three_phase_protocol import ThreePhaseHandshake, DirectP2PConnection
+from core.p2p_security.three_phase_protocol import ThreePhaseHandshake
+from core.p2p_security.async_transport import AsyncP2PTransport
+from core.p2p_security.connection_pool import P2PConnectionPool
+from core.p2p_security.inbound_dispatch import InboundDispatcher
+from core.p2p_security.outbox import BATCH_TYPE as OUTBOX_BATCH_TYPE, OUTBOX_ID_KEY, P2POutbox, RecentIds
 from core.schrodinger_phoenix.p2p_distribution import P2PPhantomUrnEngine, P2PUrnDistributionManager
 
 # Pas d'import direct du protocole simple ici pour éviter import circulaire
@@ -60,10 +63,17 @@ class OpenRedP2PNode:
             public_key=self.public_key
         )
         
-        self.p2p_connection = DirectP2PConnection(
+        # Transport asyncio: listener et connexions servis par la boucle du nœud (pas de thread par pair)
+        self.p2p_transport = AsyncP2PTransport(
             security_protocol=self.security_protocol,
             listen_port=p2p_port
         )
+        # Messages entrants traités dans la boucle du nœud (FastAPI si embarqué), latence par type
+        self.inbound_dispatcher = InboundDispatcher(self._handle_urn_messages)
+        self.p2p_transport.set_message_handler(self.inbound_dispatcher.dispatch)
+        
+        # Connexions persistantes vers les pairs (une session 3 phases par fingerprint)
+        self.connection_pool = P2PConnectionPool(self.p2p_transport, self._resolve_peer_endpoint)
         
         # Système Phantom URN avec composant Schrödinger Phoenix P2P
         self.phantom_urn_engine = P2PPhantomUrnEngine(
@@ -71,6 +81,11 @@ class OpenRedP2PNode:
             p2p_network=self.lighthouse,
             cache_dir=f"./phantom_urn_cache_{node_id}"
         )
+        self.phantom_urn_engine.connection_pool = self.connection_pool
+        
+        # Boîte d'envoi durable: messages sociaux non délivrés, relivrés par lots via le pool
+        self.outbox = P2POutbox(f"./p2p_outbox_{node_id}", self.connection_pool.request)
+        self.delivered_outbox_ids = RecentIds()   # côté destinataire: relivraisons ignorées
         
         self.urn_distribution = P2PUrnDistributionManager(self.phantom_urn_engine)
         
@@ -122,138 +137,124 @@ class OpenRedP2PNode:
         def on_connection_established(fingerprint, socket_conn):
             print(f"🔗 P2P connection established with {fingerprint[:8]}...")
             
-            # Enregistrer handler pour messages URN et sociaux
-            session_id = f"session_{fingerprint[:8]}"
-            self.p2p_connection.register_connection_handler(
-                session_id, 
-                self._handle_urn_messages
-            )
-            
-            # Vérifier s'il y a des messages sociaux en attente pour ce fingerprint
-            if hasattr(self, 'pending_social_messages'):
-                pending = self.pending_social_messages.get(fingerprint, [])
-                for message_data in pending:
-                    print(f"📤 Sending pending social message to {fingerprint[:8]}...")
-                    try:
-                        # Envoyer via la connexion socket directement
-                        message_json = json.dumps(message_data)
-                        socket_conn.send(message_json.encode())
-                        print(f"✅ Pending message sent successfully")
-                    except Exception as e:
-                        print(f"❌ Failed to send pending message: {e}")
-                
-                # Nettoyer les messages envoyés
-                if fingerprint in self.pending_social_messages:
-                    del self.pending_social_messages[fingerprint]
+        def on_node_online(fingerprint):
+            # Thread du lighthouse: vidage de la boîte d'envoi remis à la boucle du nœud
+            if self.outbox.pending_count(fingerprint):
+                self.inbound_dispatcher.submit("outbox_flush", self.outbox.notify_peer_online, fingerprint)
             
         self.lighthouse.on_node_discovered = on_node_discovered
         self.lighthouse.on_connection_established = on_connection_established
+        self.lighthouse.on_node_online = on_node_online
         
-    def _handle_urn_messages(self, socket_conn, session_id):
-        """Gestionnaire messages URN et sociaux via connexions P2P"""
-        try:
-            while True:
+    def _resolve_peer_endpoint(self, fingerprint: str) -> Optional[Tuple[str, int]]:
+        """Adresse P2P (ip, port) d'un pair découvert par le lighthouse"""
+        node_info = self.lighthouse.discovered_nodes.get(fingerprint)
+        if not node_info:
+            return None
+        return node_info["ip"], node_info["beacon"].p2p_endpoint["port"]
+        
+    async def _handle_urn_messages(self, session_id: str, message: Dict) -> Optional[Dict]:
+        """
+        Gestionnaire messages URN et sociaux via connexions P2P
+        Appelé par le transport asyncio dans la boucle du nœud; retourne la réponse éventuelle
+        """
+        # Message sécurisé (send_secure_message): contenu dans "content"
+        if "type" not in message and isinstance(message.get("content"), dict):
+            message = message["content"]
+        
+        message_type = message.get("type")
+        print(f"📨 Received message type: {message_type}")
+        loop = asyncio.get_running_loop()
+        
+        if message_type == "urn_query":
+            # Traiter requête URN (hors boucle: lecture du cache local)
+            return await loop.run_in_executor(
+                None, self.phantom_urn_engine.handle_urn_query,
+                message, message.get("requester", "unknown")
+            )
+            
+        elif message_type == "quantum_matrix_request":
+            # Traiter demande matrice quantique Schrödinger Phoenix
+            matrix_data = await loop.run_in_executor(
+                None, self.phantom_urn_engine.handle_matrix_request,
+                message, message.get("requester", "unknown")
+            )
+            return matrix_data or None
+            
+        elif message_type in ("urn_manifest_request", "urn_chunk_request"):
+            # Transfert de matrice par morceaux (hachage et découpage hors boucle)
+            handler = (self.phantom_urn_engine.handle_manifest_request
+                       if message_type == "urn_manifest_request"
+                       else self.phantom_urn_engine.handle_chunk_request)
+            return await loop.run_in_executor(None, handler, message, message.get("requester", "unknown"))
+            
+        elif message_type == "urn_announcement":
+            # Traiter annonce nouvel URN
+            urn_id = message.get("urn_id")
+            provider = message.get("provider") or "unknown"
+            print(f"📢 New URN announced: {urn_id} by {provider[:8]}...")
+            
+        elif message_type == "friendship_request":
+            # Traiter demande d'amitié directement
+            print(f"👥 Received friendship request directly")
+            print(f"   From: {message.get('from_node_id')}")
+            print(f"   Message: {message.get('message')}")
+            
+            await self._call_social_handler(session_id, message)
+            
+            # Accusé de réception
+            return {"status": "received", "type": "friendship_request_ack"}
+            
+        elif message_type in ["friendship_response", "message", "urn_share"]:
+            # Autres messages sociaux
+            await self._call_social_handler(session_id, message)
+            
+        elif message_type == OUTBOX_BATCH_TYPE:
+            # Lot relivré par la boîte d'envoi d'un pair: identifiants traités en retour
+            return {"delivered": await self._handle_outbox_batch(session_id, message.get("messages") or [])}
+            
+        return None
+        
+    async def _handle_outbox_batch(self, session_id: str, messages: list) -> list:
+        """Traite un lot dans l'ordre; un message déjà reçu est acquitté sans être retraité"""
+        delivered = []
+        for item in messages:
+            if not isinstance(item, dict) or not item.get(OUTBOX_ID_KEY):
+                continue
+            outbox_id = item.pop(OUTBOX_ID_KEY)
+            if outbox_id not in self.delivered_outbox_ids:
                 try:
-                    data = socket_conn.recv(4096)
-                    if not data:
-                        break
-                    
-                    # Tenter de parser le JSON
-                    try:
-                        message = json.loads(data.decode())
-                    except json.JSONDecodeError:
-                        # Peut-être un message sécurisé, essayer de le traiter différemment
-                        print(f"⚠️ Non-JSON message received, ignoring")
-                        continue
-                    
-                    message_type = message.get("type")
-                    print(f"📨 Received message type: {message_type}")
-                    
-                    if message_type == "urn_query":
-                        # Traiter requête URN
-                        response = self.phantom_urn_engine.handle_urn_query(
-                            message, 
-                            message.get("requester", "unknown")
-                        )
-                        socket_conn.send(json.dumps(response).encode())
-                        
-                    elif message_type == "quantum_matrix_request":
-                        # Traiter demande matrice quantique Schrödinger Phoenix
-                        matrix_data = self.phantom_urn_engine.handle_matrix_request(
-                            message,
-                            message.get("requester", "unknown")
-                        )
-                        if matrix_data:
-                            socket_conn.send(json.dumps(matrix_data).encode())
-                            
-                    elif message_type == "urn_announcement":
-                        # Traiter annonce nouvel URN
-                        urn_id = message.get("urn_id")
-                        provider = message.get("provider")
-                        print(f"📢 New URN announced: {urn_id} by {provider[:8]}...")
-                        
-                    elif message_type == "friendship_request":
-                        # Traiter demande d'amitié directement
-                        print(f"👥 Received friendship request directly")
-                        print(f"   From: {message.get('from_node_id')}")
-                        print(f"   Message: {message.get('message')}")
-                        
-                        # Utiliser le callback si disponible
-                        if hasattr(self, 'social_message_handler') and self.social_message_handler:
-                            # Appeler le handler de manière synchrone avec un wrapper async
-                            import asyncio
-                            if asyncio.iscoroutinefunction(self.social_message_handler):
-                                # Handler async - l'exécuter en background
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                loop.run_until_complete(self.social_message_handler(session_id, message))
-                            else:
-                                # Handler sync
-                                self.social_message_handler(session_id, message)
-                        
-                        # Envoyer accusé de réception
-                        response = {"status": "received", "type": "friendship_request_ack"}
-                        socket_conn.send(json.dumps(response).encode())
-                        
-                    elif message_type in ["friendship_response", "message", "urn_share"]:
-                        # Autres messages sociaux
-                        if hasattr(self, 'social_message_handler') and self.social_message_handler:
-                            if asyncio.iscoroutinefunction(self.social_message_handler):
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                loop.run_until_complete(self.social_message_handler(session_id, message))
-                            else:
-                                self.social_message_handler(session_id, message)
-                                
-                except socket.timeout:
+                    await self._handle_urn_messages(session_id, item)
+                except Exception as e:
+                    print(f"⚠️ Outbox message {outbox_id} failed: {e}")
                     continue
-                except Exception as msg_error:
-                    print(f"⚠️ Error processing individual message: {msg_error}")
-                    
-        except Exception as e:
-            print(f"⚠️ P2P message handler error: {e}")
+                self.delivered_outbox_ids.add(outbox_id)
+            delivered.append(outbox_id)
+        return delivered
+        
+    async def _call_social_handler(self, session_id: str, message: Dict):
+        """Handler social dans la boucle courante (coroutine attendue, fonction appelée)"""
+        handler = getattr(self, 'social_message_handler', None)
+        if not handler:
+            return
+        result = handler(session_id, message)
+        if asyncio.iscoroutine(result):
+            await result
             
     def set_social_message_handler(self, handler_func):
         """Définit le handler pour messages sociaux"""
         self.social_message_handler = handler_func
         print("📡 Social message handler registered")
         
-    def queue_social_message(self, target_fingerprint: str, message_data: dict):
-        """Met en file d'attente un message social pour envoi dès connexion"""
-        if not hasattr(self, 'pending_social_messages'):
-            self.pending_social_messages = {}
-        
-        if target_fingerprint not in self.pending_social_messages:
-            self.pending_social_messages[target_fingerprint] = []
-        
-        self.pending_social_messages[target_fingerprint].append(message_data)
-        print(f"📬 Queued social message for {target_fingerprint[:8]}...")
-        
-        # Essayer d'établir la connexion immédiatement
-        try:
-            self.lighthouse.initiate_p2p_connection(target_fingerprint)
-        except Exception as e:
-            print(f"⚠️ Could not initiate immediate connection: {e}")
+    def queue_social_message(self, target_fingerprint: str, message_data: dict) -> bool:
+        """
+        Met un message social dans la boîte d'envoi durable (survit au redémarrage)
+        Envoi immédiat tenté, puis nouvelles tentatives avec backoff et dès que le pair réapparaît
+        """
+        queued = self.outbox.enqueue(target_fingerprint, message_data)
+        if queued:
+            print(f"📬 Queued social message for {target_fingerprint[:8]}...")
+        return queued
             
     async def start_node(self):
         """Démarre le nœud P2P autonome"""
@@ -261,8 +262,11 @@ class OpenRedP2PNode:
         
         self.running = True
         
-        # Démarrage serveur P2P
-        self.p2p_connection.start_p2p_server()
+        # Démarrage serveur P2P (dans la boucle courante)
+        self.inbound_dispatcher.start()
+        await self.p2p_transport.start()
+        self.connection_pool.start()
+        self.outbox.start()
         
         # Démarrage protocole "Phare dans la Nuit"
         self.lighthouse.start_lighthouse(self.p2p_port)
@@ -286,7 +290,10 @@ class OpenRedP2PNode:
         
         self.running = False
         self.lighthouse.stop_lighthouse()
-        self.p2p_connection.stop_p2p_server()
+        await self.outbox.close()
+        await self.connection_pool.close()
+        await self.p2p_transport.stop()
+        await self.inbound_dispatcher.stop()
         
         print(f"✅ Node stopped gracefully")
         
@@ -321,6 +328,10 @@ class OpenRedP2PNode:
             },
             "network": lighthouse_stats,
             "security": security_stats,
+            "transport": self.p2p_transport.get_transport_stats(),
+            "connection_pool": self.connection_pool.get_pool_stats(),
+            "inbound_dispatch": self.inbound_dispatcher.get_dispatch_stats(),
+            "outbox": self.outbox.get_outbox_stats(),
             "urn_phantom_system": urn_stats,
             "architecture": "openred_pure_p2p_v1.0"
         }
@@ -345,7 +356,7 @@ class OpenRedP2PNode:
             print(f"     Last Seen: {last_seen:.0f}s ago")
             print()
             
-        active_connections = len(self.p2p_connection.active_connections)
+        active_connections = len(self.p2p_transport.active_connections)
         print(f"🔐 Active P2P Connections: {active_connections}")
         print(f"═" * 50)
 
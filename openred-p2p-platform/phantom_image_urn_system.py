@@ -6,6 +6,7 @@ Implémentation CORRECTE du protocole Phantom URN pour images:
 1. Images → Cendres cryptées atomiques (pas de stockage physique)
 2. URN Phoenix de Schrödinger (reconstruction dynamique)
 3. Cryptage atomique par pixel avec chaînage
+   (une signature propriétaire par URN: racine Merkle + preuves d'inclusion)
 4. Demande obligatoire au nœud propriétaire
 5. Jamais d'image réelle stockée
 
@@ -13,6 +14,7 @@ Copyright (C) 2025 Diego Morales Magri - OpenRed Project
 """
 
 import os
+import io
 import json
 import hashlib
 import secrets
@@ -22,22 +24,28 @@ from typing import Dict, List, Tuple, Optional, Any
 from PIL import Image
 import numpy as np
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
 import base64
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
+from core.fragment_granularity import GRANULARITY_PIXEL, FragmentGranularity, split_tiles
+from core.p2p_security.merkle_signature import (
+    MerkleBatchVerifier, MerkleProof, MerkleTree, VerifiedRootCache, hash_leaf, sign_merkle_root
+)
+
 @dataclass
 class PhantomAshFragment:
-    """Fragment de cendre - un pixel crypté atomique"""
-    encrypted_color: bytes          # Couleur RGB cryptée
+    """Fragment de cendre - un pixel (ou une tuile) crypté atomique"""
+    encrypted_color: bytes          # Couleur RGB (ou pixels de la tuile) cryptée
     position_hash: str             # Hash position pour validation
     next_fragment_id: str          # ID du fragment suivant dans la chaîne
     next_decrypt_key: bytes        # Clé pour décrypter le fragment suivant
     creation_timestamp: float      # Timestamp création
-    owner_signature: bytes         # Signature cryptographique du propriétaire
+    merkle_index: int = 0          # Position de la feuille dans l'arbre de Merkle de l'URN
+    merkle_proof: MerkleProof = () # Preuve d'inclusion vers la racine signée par le propriétaire
 
 @dataclass
 class PhantomURNConfig:
@@ -51,6 +59,9 @@ class PhantomURNConfig:
     authorization_required: bool = True  # Autorisation obligatoire
     burn_after_access: int = 3     # Destruction après N accès
     atomic_encryption: bool = True # Cryptage atomique par pixel
+    tile_size: Tuple[int, int] = (1, 1)  # Granularité des cendres (largeur, hauteur)
+    merkle_root: bytes = b""       # Racine Merkle des fragments
+    root_signature: bytes = b""    # Signature RSA-PSS unique du propriétaire sur la racine
 
 class PhantomImageURNEngine:
     """
@@ -63,9 +74,11 @@ class PhantomImageURNEngine:
     - Résurrection Phoenix dynamique
     """
     
-    def __init__(self, phantom_urn_engine, node_id: str, ash_storage_path: str = "phantom_ashes"):
+    def __init__(self, phantom_urn_engine, node_id: str, ash_storage_path: str = "phantom_ashes",
+                 granularity: str = GRANULARITY_PIXEL):
         self.phantom_urn_engine = phantom_urn_engine
         self.node_id = node_id
+        self.granularity = FragmentGranularity.parse(granularity)
         self.ash_storage_path = Path(ash_storage_path)
         self.ash_storage_path.mkdir(exist_ok=True)
         
@@ -74,6 +87,7 @@ class PhantomImageURNEngine:
         self.ash_fragments: Dict[str, Dict[str, PhantomAshFragment]] = {}  # urn_id -> {fragment_id -> fragment}
         self.access_counts: Dict[str, int] = {}
         self.authorized_sessions: Dict[str, Dict] = {}  # Autorisations temporaires
+        self.verified_roots = VerifiedRootCache()  # Racines Merkle déjà vérifiées
         
         # Clés cryptographiques
         self.node_private_key = self._generate_node_keys()
@@ -94,10 +108,10 @@ class PhantomImageURNEngine:
         )
     
     async def burn_image_to_phantom_urn(self, image_data: bytes, filename: str, 
-                                       owner_id: str) -> Dict[str, Any]:
+                                       owner_id: str, granularity: Optional[str] = None) -> Dict[str, Any]:
         """
         🔥 BRÛLE une image en URN Phantom
-        Chaque pixel devient une cendre cryptée atomique
+        Chaque pixel (ou tuile, selon la granularité) devient une cendre cryptée atomique
         """
         try:
             # Charger image
@@ -108,6 +122,9 @@ class PhantomImageURNEngine:
             img_array = np.array(image)
             height, width, _ = img_array.shape
             
+            tile_size = FragmentGranularity.parse(granularity or self.granularity).resolve(width, height)
+            tiles, tile_xs, tile_ys, tile_widths, tile_heights = split_tiles(img_array, *tile_size)
+            
             # Générer URN ID unique
             image_hash = hashlib.sha256(image_data).hexdigest()
             urn_id = f"phantom_urn_{image_hash[:16]}"
@@ -116,16 +133,17 @@ class PhantomImageURNEngine:
             config = PhantomURNConfig(
                 urn_id=urn_id,
                 image_hash=image_hash,
-                total_fragments=width * height,
+                total_fragments=len(tiles),
                 image_dimensions=(width, height),
                 creation_time=time.time(),
-                owner_node_id=owner_id
+                owner_node_id=owner_id,
+                tile_size=tile_size
             )
             
             print(f"🔥 Burning image {filename} to Phantom URN...")
             print(f"   URN ID: {urn_id}")
             print(f"   Dimensions: {width}x{height}")
-            print(f"   Fragments: {config.total_fragments}")
+            print(f"   Fragments: {config.total_fragments} ({tile_size[0]}x{tile_size[1]})")
             
             # Génération des noms de fragments aléatoires
             fragment_ids = [f"ash_{secrets.token_hex(16)}" for _ in range(config.total_fragments)]
@@ -137,45 +155,48 @@ class PhantomImageURNEngine:
             # Création chaîne de cendres cryptées
             fragments = {}
             
-            for i in range(height):
-                for j in range(width):
-                    pixel_index = i * width + j
-                    color = tuple(img_array[i, j].tolist())
-                    
-                    # Clé pour fragment suivant
-                    next_index = (pixel_index + 1) % config.total_fragments
-                    next_key = Fernet.generate_key()
-                    next_fragment_id = fragment_ids[next_index]
-                    
-                    # Cryptage atomique du pixel
-                    fernet = Fernet(Fernet.generate_key())
-                    encrypted_color = fernet.encrypt(json.dumps(color).encode())
-                    
-                    # Hash position pour validation
-                    position_hash = hashlib.sha256(f"{j}:{i}:{urn_id}".encode()).hexdigest()[:16]
-                    
-                    # Signature propriétaire
-                    signature_data = f"{urn_id}:{fragment_ids[pixel_index]}:{pixel_index}".encode()
-                    owner_signature = self.node_private_key.sign(
-                        signature_data,
-                        padding.PSS(
-                            mgf=padding.MGF1(hashes.SHA256()),
-                            salt_length=padding.PSS.MAX_LENGTH
-                        ),
-                        hashes.SHA256()
-                    )
-                    
-                    # Créer fragment de cendre
-                    fragment = PhantomAshFragment(
-                        encrypted_color=encrypted_color,
-                        position_hash=position_hash,
-                        next_fragment_id=next_fragment_id,
-                        next_decrypt_key=next_key,
-                        creation_timestamp=time.time(),
-                        owner_signature=owner_signature
-                    )
-                    
-                    fragments[fragment_ids[pixel_index]] = fragment
+            for pixel_index in range(config.total_fragments):
+                j, i = int(tile_xs[pixel_index]), int(tile_ys[pixel_index])
+                tile = tiles[pixel_index, :tile_heights[pixel_index], :tile_widths[pixel_index]]
+                
+                # Clé pour fragment suivant
+                next_index = (pixel_index + 1) % config.total_fragments
+                next_key = Fernet.generate_key()
+                next_fragment_id = fragment_ids[next_index]
+                
+                # Cryptage atomique du pixel (ou des octets bruts de la tuile)
+                fernet = Fernet(Fernet.generate_key())
+                if tile_size == (1, 1):
+                    encrypted_color = fernet.encrypt(json.dumps(tuple(tile[0, 0].tolist())).encode())
+                else:
+                    encrypted_color = fernet.encrypt(tile.tobytes())
+                
+                # Hash position (origine de la tuile) pour validation
+                position_hash = hashlib.sha256(f"{j}:{i}:{urn_id}".encode()).hexdigest()[:16]
+                
+                # Créer fragment de cendre
+                fragment = PhantomAshFragment(
+                    encrypted_color=encrypted_color,
+                    position_hash=position_hash,
+                    next_fragment_id=next_fragment_id,
+                    next_decrypt_key=next_key,
+                    creation_timestamp=time.time(),
+                    merkle_index=pixel_index
+                )
+                
+                fragments[fragment_ids[pixel_index]] = fragment
+            
+            # Signature propriétaire: une seule signature RSA sur la racine Merkle
+            merkle_tree = MerkleTree([
+                self._fragment_leaf_hash(urn_id, fragment_id, fragment)
+                for fragment_id, fragment in fragments.items()
+            ])
+            for fragment in fragments.values():
+                fragment.merkle_proof = merkle_tree.proof(fragment.merkle_index)
+            
+            config.merkle_root = merkle_tree.root
+            config.root_signature = sign_merkle_root(self.node_private_key, merkle_tree.root, urn_id.encode())
+            print(f"   🌳 Merkle root signed: {merkle_tree.root.hex()[:16]}...")
             
             # Sauvegarder dans le système Phantom URN
             self.active_urns[urn_id] = config
@@ -186,7 +207,7 @@ class PhantomImageURNEngine:
             await self._register_in_phantom_engine(urn_id, config)
             
             # Détruire l'image originale de la mémoire
-            del image_data, image, img_array
+            del image_data, image, img_array, tiles
             
             print(f"✅ Image burned to Phantom URN successfully")
             print(f"   🔥 {len(fragments)} atomic ash fragments created")
@@ -196,6 +217,8 @@ class PhantomImageURNEngine:
                 "urn_id": urn_id,
                 "total_fragments": config.total_fragments,
                 "first_fragment_id": fragment_ids[0],
+                "tile_size": list(tile_size),
+                "merkle_root": config.merkle_root.hex(),
                 "authorization_required": True,
                 "owner_node": owner_id,
                 "burn_timestamp": config.creation_time
@@ -205,6 +228,42 @@ class PhantomImageURNEngine:
             print(f"❌ Error burning image to Phantom URN: {e}")
             raise
     
+    @staticmethod
+    def _fragment_leaf_hash(urn_id: str, fragment_id: str, fragment: PhantomAshFragment) -> bytes:
+        """Feuille Merkle: contenu complet du fragment lié à l'URN et à sa position"""
+        return hash_leaf(b"|".join((
+            urn_id.encode(),
+            fragment_id.encode(),
+            str(fragment.merkle_index).encode(),
+            fragment.position_hash.encode(),
+            fragment.next_fragment_id.encode(),
+            fragment.next_decrypt_key,
+            fragment.encrypted_color
+        )))
+    
+    def _verify_fragments(self, urn_id: str, config: PhantomURNConfig,
+                          fragments: Dict[str, PhantomAshFragment]) -> Dict[str, PhantomAshFragment]:
+        """
+        Vérifie la racine signée (une fois par URN, puis en cache) et les
+        preuves d'inclusion par lots. Retourne les fragments authentiques.
+        """
+        if not self.verified_roots.verify(self.node_public_key, config.merkle_root,
+                                          config.root_signature, urn_id.encode()):
+            print(f"❌ Invalid owner signature on Merkle root: {urn_id}")
+            return {}
+        
+        verifier = MerkleBatchVerifier(config.merkle_root, config.total_fragments)
+        items = list(fragments.items())
+        results = verifier.verify_many([
+            (self._fragment_leaf_hash(urn_id, fragment_id, fragment), fragment.merkle_index, fragment.merkle_proof)
+            for fragment_id, fragment in items
+        ])
+        
+        rejected = results.count(False)
+        if rejected:
+            print(f"⚠️ {rejected} fragment(s) failed Merkle inclusion proof")
+        return {fragment_id: fragment for (fragment_id, fragment), valid in zip(items, results) if valid}
+    
     async def _register_in_phantom_engine(self, urn_id: str, config: PhantomURNConfig):
         """Enregistre l'URN dans le moteur Phantom principal"""
         urn_metadata = {
@@ -212,7 +271,9 @@ class PhantomImageURNEngine:
             'type': 'phantom_image',
             'size': config.total_fragments,
             'metadata': {
-                'dimensions': config.dimensions,
+                'dimensions': config.image_dimensions,
+                'tile_size': config.tile_size,
+                'merkle_root': config.merkle_root.hex(),
                 'owner': config.owner_node_id,
                 'fragments': config.total_fragments
             },
@@ -297,9 +358,14 @@ class PhantomImageURNEngine:
             
             print(f"🔥🦅 Phoenix resurrection starting for URN: {urn_id}")
             
-            # Récupérer fragments
-            fragments = self.ash_fragments[urn_id]
+            # Récupérer fragments authentifiés (racine signée + preuves par lots)
+            fragments = self._verify_fragments(urn_id, config, self.ash_fragments[urn_id])
+            if not fragments:
+                print("❌ No authentic fragments - resurrection aborted")
+                return None
             width, height = config.image_dimensions
+            tile_width, tile_height = config.tile_size
+            tiles_per_row = -(-width // tile_width)
             
             # Reconstruction dynamique image
             reconstructed_image = np.zeros((height, width, 3), dtype=np.uint8)
@@ -309,13 +375,13 @@ class PhantomImageURNEngine:
             for fragment_id, fragment in fragments.items():
                 # Décrypter couleur (simulation - en réalité il faut suivre la chaîne)
                 try:
-                    # Position approximative basée sur l'index
-                    pos_x = fragment_count % width
-                    pos_y = fragment_count // width
+                    # Position de la tuile = index de feuille Merkle (authentifié)
+                    pos_x = (fragment.merkle_index % tiles_per_row) * tile_width
+                    pos_y = (fragment.merkle_index // tiles_per_row) * tile_height
                     
                     if pos_y < height:
-                        # Simulation couleur décryptée
-                        reconstructed_image[pos_y, pos_x] = [128, 128, 128]  # Gris pour simulation
+                        # Simulation couleur décryptée (tuile entière par slicing)
+                        reconstructed_image[pos_y:pos_y + tile_height, pos_x:pos_x + tile_width] = [128, 128, 128]  # Gris pour simulation
                     
                     fragment_count += 1
                     
@@ -359,6 +425,8 @@ class PhantomImageURNEngine:
         if urn_id in self.access_counts:
             del self.access_counts[urn_id]
         
+        self.verified_roots.forget(urn_id.encode())
+        
         # Invalider toutes les sessions pour cet URN
         expired_tokens = []
         for token, session in self.authorized_sessions.items():
@@ -384,12 +452,14 @@ class PhantomImageURNEngine:
             'total_fragments': config.total_fragments,
             'stored_fragments': fragment_count,
             'dimensions': config.image_dimensions,
+            'tile_size': config.tile_size,
             'owner_node': config.owner_node_id,
             'access_count': self.access_counts.get(urn_id, 0),
             'max_access': config.burn_after_access,
             'creation_time': config.creation_time,
             'authorization_required': config.authorization_required,
-            'atomic_encryption': config.atomic_encryption
+            'atomic_encryption': config.atomic_encryption,
+            'merkle_root': config.merkle_root.hex()
         }
     
     def get_system_stats(self) -> Dict:
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+📦 CONTENEUR DE CENDRES PACKÉ - Phantom URN
+===========================================
+Stockage des cendres cryptées d'une URN dans quelques segments append-only
+au lieu d'un fichier `ash_<hex>.pxl` par pixel.
+
+Format sur disque (dans le dossier de l'URN):
+- `ashes_<n>.seg`  : segments append-only, cendres cryptées concaténées
+- `ashes.idx`      : index append-only (nom logique → segment, offset, taille)
+
+Les noms aléatoires des fragments restent les clés logiques: la dérivation
+des clés de décryptage (`_derive_fragment_key`) ne change pas.
+"""
+
+import os
+import struct
+import shutil
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "ashes.idx"
+SEGMENT_PATTERN = "ashes_{:04d}.seg"
+INDEX_MAGIC = b"ORASH1\n"
+LEGACY_SUFFIX = ".pxl"
+
+# Enregistrement d'index: longueur nom (B) + nom + segment (H) + offset (Q) + taille (I)
+_NAME_LEN = struct.Struct("<B")
+_LOCATION = struct.Struct("<HQI")
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024  # 64 Mo par segment
+DEFAULT_READ_CHUNK_SIZE = 4 * 1024 * 1024  # lecture groupée (iter_chunks)
+
+
+class AshContainer:
+    """
+    Conteneur packé de cendres pour une URN Phantom.
+    Écritures append-only, lectures aléatoires via l'index en mémoire.
+    """
+
+    def __init__(self, urn_dir: Path, max_segment_size: int = DEFAULT_SEGMENT_SIZE):
+        self.urn_dir = Path(urn_dir)
+        self.max_segment_size = max_segment_size
+
+        # nom logique → (segment, offset, taille)
+        self.index: Dict[str, Tuple[int, int, int]] = {}
+
+        self._lock = threading.RLock()
+        self._index_file = None
+        self._segment_file = None
+        self._segment_id = 0
+        self._segment_size = 0
+
+        self._load_index()
+
+    @classmethod
+    def exists(cls, urn_dir: Path) -> bool:
+        """Le dossier contient-il un conteneur packé ?"""
+        return (Path(urn_dir) / INDEX_FILENAME).exists()
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _load_index(self):
+        """Charge l'index; tronque un éventuel enregistrement incomplet (crash)"""
+        index_path = self.urn_dir / INDEX_FILENAME
+        if not index_path.exists():
+            return
+
+        with open(index_path, 'rb') as f:
+            data = f.read()
+
+        if not data.startswith(INDEX_MAGIC):
+            raise ValueError(f"Index de cendres invalide: {index_path}")
+
+        pos = len(INDEX_MAGIC)
+        valid_end = pos
+        while pos < len(data):
+            if pos + _NAME_LEN.size > len(data):
+                break
+            (name_len,) = _NAME_LEN.unpack_from(data, pos)
+            record_end = pos + _NAME_LEN.size + name_len + _LOCATION.size
+            if record_end > len(data):
+                break
+            name = data[pos + _NAME_LEN.size:pos + _NAME_LEN.size + name_len].decode()
+            self.index[name] = _LOCATION.unpack_from(data, record_end - _LOCATION.size)
+            pos = valid_end = record_end
+
+        if valid_end < len(data):
+            logger.warning(f"⚠️ Index de cendres tronqué ({len(data) - valid_end} octets ignorés): {index_path}")
+            with open(index_path, 'r+b') as f:
+                f.truncate(valid_end)
+
+        if self.index:
+            self._segment_id = max(location[0] for location in self.index.values())
+            segment = self.segment_path(self._segment_id)
+            self._segment_size = segment.stat().st_size if segment.exists() else 0
+
+    def segment_path(self, segment_id: int) -> Path:
+        return self.urn_dir / SEGMENT_PATTERN.format(segment_id)
+
+    def _open_for_append(self):
+        """Ouvre (paresseusement) l'index et le segment courant en ajout"""
+        if self._index_file is None:
+            index_path = self.urn_dir / INDEX_FILENAME
+            is_new = not index_path.exists()
+            self._index_file = open(index_path, 'ab')
+            if is_new:
+                self._index_file.write(INDEX_MAGIC)
+
+        if self._segment_file is None:
+            self._segment_file = open(self.segment_path(self._segment_id), 'ab')
+            self._segment_size = self._segment_file.tell()
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def put(self, name: str, data: bytes):
+        """Ajoute une cendre cryptée sous son nom logique"""
+        self.put_many(((name, data),))
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]):
+        """Ajoute un lot de cendres (un seul verrou, écritures bufferisées)"""
+        with self._lock:
+            self._open_for_append()
+            records = []
+
+            for name, data in items:
+                encoded_name = name.encode()
+                if len(encoded_name) > 255:
+                    raise ValueError(f"Nom de fragment trop long: {name}")
+
+                if self._segment_size and self._segment_size + len(data) > self.max_segment_size:
+                    self._rotate_segment()
+
+                offset = self._segment_size
+                self._segment_file.write(data)
+                self._segment_size += len(data)
+
+                location = (self._segment_id, offset, len(data))
+                self.index[name] = location
+                records.append(_NAME_LEN.pack(len(encoded_name)) + encoded_name + _LOCATION.pack(*location))
+
+            # Données avant index: un index ne pointe jamais vers des octets absents
+            self._segment_file.flush()
+            self._index_file.write(b"".join(records))
+            self._index_file.flush()
+
+    def _rotate_segment(self):
+        """Ferme le segment courant et en ouvre un nouveau"""
+        self._segment_file.close()
+        self._segment_id += 1
+        self._segment_file = open(self.segment_path(self._segment_id), 'ab')
+        self._segment_size = 0
+
+    def flush(self):
+        """Force l'écriture disque (fsync) du segment courant et de l'index"""
+        with self._lock:
+            for handle in (self._segment_file, self._index_file):
+                if handle is not None:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[bytes]:
+        """Lit une cendre par son nom logique (None si absente)"""
+        location = self.index.get(name)
+        if location is None:
+            return None
+
+        segment_id, offset, length = location
+        with self._lock:
+            if self._segment_file is not None and segment_id == self._segment_id:
+                self._segment_file.flush()
+        with open(self.segment_path(segment_id), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def iter_items(self, names: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, bytes]]:
+        """
+        Itère (nom, données) dans l'ordre physique des segments:
+        lecture séquentielle, un seul open() par segment
+        """
+        if names is None:
+            wanted = list(self.index.items())
+        else:
+            wanted = [(name, self.index[name]) for name in names if name in self.index]
+        wanted.sort(key=lambda item: (item[1][0], item[1][1]))
+
+        with self._lock:
+            if self._segment_file is not None:
+                self._segment_file.flush()
+
+        current_segment = None
+        handle = None
+        try:
+            for name, (segment_id, offset, length) in wanted:
+                if segment_id != current_segment:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(self.segment_path(segment_id), 'rb')
+                    current_segment = segment_id
+                handle.seek(offset)
+                yield name, handle.read(length)
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def iter_chunks(self, names: Optional[Iterable[str]] = None,
+                    max_bytes: int = DEFAULT_READ_CHUNK_SIZE) -> Iterator[List[Tuple[str, bytes]]]:
+        """
+        Itère des lots de (nom, données) d'au plus max_bytes (une cendre plus
+        grande forme un lot à elle seule). Les cendres contiguës d'un segment
+        sont lues en un seul read() puis découpées.
+        """
+        if names is None:
+            wanted = list(self.index.items())
+        else:
+            wanted = [(name, self.index[name]) for name in names if name in self.index]
+        wanted.sort(key=lambda item: (item[1][0], item[1][1]))
+
+        with self._lock:
+            if self._segment_file is not None:
+                self._segment_file.flush()
+
+        current_segment = None
+        handle = None
+        try:
+            start = 0
+            while start < len(wanted):
+                segment_id, span_start, _ = wanted[start][1]
+                # Étendre le lot tant qu'il reste dans le segment et sous max_bytes
+                end = start + 1
+                while end < len(wanted):
+                    next_segment, next_offset, next_length = wanted[end][1]
+                    if next_segment != segment_id or next_offset + next_length - span_start > max_bytes:
+                        break
+                    end += 1
+
+                if segment_id != current_segment:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(self.segment_path(segment_id), 'rb')
+                    current_segment = segment_id
+
+                _, last_offset, last_length = wanted[end - 1][1]
+                handle.seek(span_start)
+                span = memoryview(handle.read(last_offset + last_length - span_start))
+                yield [
+                    (name, bytes(span[offset - span_start:offset - span_start + length]))
+                    for name, (_, offset, length) in wanted[start:end]
+                ]
+                start = end
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def names(self) -> List[str]:
+        return list(self.index.keys())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def segment_paths(self) -> List[Path]:
+        return sorted(self.urn_dir.glob("ashes_*.seg"))
+
+    def stats(self) -> Dict[str, int]:
+        """Statistiques disque du conteneur"""
+        segments = self.segment_paths()
+        index_path = self.urn_dir / INDEX_FILENAME
+        return {
+            "fragments": len(self.index),
+            "segments": len(segments),
+            "segment_bytes": sum(p.stat().st_size for p in segments),
+            "index_bytes": index_path.stat().st_size if index_path.exists() else 0,
+        }
+
+    def close_writer(self):
+        """
+        Fin d'écriture (burn terminé): ferme l'index et le segment ouverts en ajout.
+        Le conteneur reste lisible (un open() par lecture); un put rouvre à la demande.
+        """
+        with self._lock:
+            for handle in (self._segment_file, self._index_file):
+                if handle is not None:
+                    handle.close()
+            self._segment_file = None
+            self._index_file = None
+
+    def close(self):
+        self.close_writer()
+
+    def destroy(self):
+        """Supprime segments et index (le dossier de l'URN est conservé)"""
+        self.close()
+        for segment in self.segment_paths():
+            segment.unlink()
+        index_path = self.urn_dir / INDEX_FILENAME
+        if index_path.exists():
+            index_path.unlink()
+        self.index.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def migrate_urn_directory(urn_dir: Path, remove_legacy: bool = True,
+                          max_segment_size: int = DEFAULT_SEGMENT_SIZE) -> int:
+    """
+    Migre un dossier URN historique (un `ash_<hex>.pxl` par pixel) vers le
+    conteneur packé. Les noms de fichiers deviennent les clés logiques.
+    Retourne le nombre de cendres migrées.
+    """
+    urn_dir = Path(urn_dir)
+    migrated = 0
+
+    with AshContainer(urn_dir, max_segment_size=max_segment_size) as container:
+        batch: List[Tuple[str, bytes]] = []
+        legacy_files: List[Path] = []
+
+        # os.scandir: pas de stat() par entrée sur des millions de fichiers
+        with os.scandir(urn_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(LEGACY_SUFFIX) or entry.name in container:
+                    continue
+                with open(entry.path, 'rb') as f:
+                    batch.append((entry.name, f.read()))
+                legacy_files.append(Path(entry.path))
+
+                if len(batch) >= 4096:
+                    container.put_many(batch)
+                    migrated += len(batch)
+                    batch = []
+
+        if batch:
+            container.put_many(batch)
+            migrated += len(batch)
+        container.flush()
+
+    # Suppression uniquement après fsync du conteneur
+    if remove_legacy:
+        for path in legacy_files:
+            path.unlink()
+
+    return migrated
+
+
+def migrate_storage_dir(storage_dir: Path, remove_legacy: bool = True) -> Dict[str, int]:
+    """Migre toutes les URNs d'un dossier `phantom_urns/`"""
+    results = {}
+    for urn_dir in sorted(Path(storage_dir).iterdir()):
+        if not urn_dir.is_dir():
+            continue
+        count = migrate_urn_directory(urn_dir, remove_legacy=remove_legacy)
+        results[urn_dir.name] = count
+        logger.info(f"📦 {urn_dir.name}: {count} cendres migrées")
+    return results
+
+
+def remove_urn_directory(urn_dir: Path, container: Optional[AshContainer] = None):
+    """Destruction complète du dossier d'une URN (conteneur + fichiers annexes)"""
+    if container is not None:
+        container.close()
+    if Path(urn_dir).exists():
+        shutil.rmtree(urn_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(
+        description="Migre des URNs Phantom (un fichier .pxl par pixel) vers le conteneur de cendres packé"
+    )
+    parser.add_argument("storage_dir", help="Dossier phantom_urns/ à migrer")
+    parser.add_argument("--keep-legacy", action="store_true",
+                        help="Conserver les fichiers .pxl après migration")
+    args = parser.parse_args()
+
+    results = migrate_storage_dir(Path(args.storage_dir), remove_legacy=not args.keep_legacy)
+    print(f"✅ {len(results)} URNs migrées, {sum(results.values())} cendres packées")
@@ -1,27 +1,43 @@
 #!/usr/bin/env python3
 """
 Système de traitement asynchrone pour les URN Phantom
+
+- Plusieurs jobs traités en parallèle (max_concurrent_jobs)
+- Chaque burn découpe l'image en bandes de lignes cryptées par un pool de
+  processus partagé (burn_workers), fusionnées dans une seule URN
+- Limite de jobs simultanés par utilisateur + ordonnancement tourniquet
+  entre utilisateurs: un gros uploader n'affame pas les autres
+- Progression réelle (cendres écrites), durées par étape et annulation
 """
 
 import asyncio
 import uuid
 import time
 import threading
-from typing import Dict, Optional
+from collections import deque
+from typing import Deque, Dict, Optional
 from enum import Enum
 import json
 import os
 
+from parallel_burn import DEFAULT_BURN_WORKERS, BurnCancelled, BurnProgress, ParallelBurnPool
+
+DEFAULT_MAX_CONCURRENT_JOBS = 4
+DEFAULT_JOBS_PER_USER = 1
+
 class JobStatus(Enum):
     PENDING = "pending"
     PROCESSING = "processing" 
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class PhantomJob:
-    def __init__(self, job_id: str, user_id: str, filename: str, file_path: str):
+    def __init__(self, job_id: str, user_id: str, filename: str, file_path: str,
+                 authorized_node: Optional[str] = None):
         self.job_id = job_id
-        self.user_id = user_id
+        self.user_id = user_id  # utilisateur authentifié: clé de la limite et du tourniquet
+        self.authorized_node = authorized_node or user_id  # nœud autorisé de l'URN produite
         self.filename = filename
         self.file_path = file_path
         self.status = JobStatus.PENDING
@@ -32,6 +48,28 @@ class PhantomJob:
         self.result = None
         self.error = None
         
+        # Suivi du burn: cendres écrites, durées par étape, annulation
+        self.burn_progress = BurnProgress(callback=self._on_burn_progress)
+    
+    def _on_burn_progress(self, done: int, total: int):
+        """Callback de progression (thread du burn): 100% réservé à la finalisation"""
+        if total:
+            self.progress = min(99, done * 100 // total)
+    
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+    
+    def timings(self) -> Dict[str, float]:
+        """Durées (secondes): attente en file, décodage, cryptage, écriture, total"""
+        timings = {}
+        if self.started_at:
+            timings["queue_wait"] = self.started_at - self.created_at
+        timings.update(self.burn_progress.timings)
+        if self.started_at and self.completed_at:
+            timings["total"] = self.completed_at - self.started_at
+        return {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        
     def to_dict(self):
         return {
             "job_id": self.job_id,
@@ -39,29 +77,49 @@ class PhantomJob:
             "filename": self.filename,
             "status": self.status.value,
             "progress": self.progress,
+            "fragments_done": self.burn_progress.done,
+            "fragments_total": self.burn_progress.total,
             "created_at": self.created_at,
             "started_at": self.started_at,
             "completed_at": self.completed_at,
+            "timings": self.timings(),
             "result": self.result,
             "error": self.error
         }
 
 class AsyncPhantomProcessor:
-    def __init__(self, phantom_urn_system):
+    def __init__(self, phantom_urn_system, burn_workers: int = DEFAULT_BURN_WORKERS,
+                 max_concurrent_jobs: int = DEFAULT_MAX_CONCURRENT_JOBS,
+                 per_user_limit: int = DEFAULT_JOBS_PER_USER):
         self.phantom_urn_system = phantom_urn_system
         self.jobs: Dict[str, PhantomJob] = {}
-        self.processing_queue = asyncio.Queue()
         self.is_running = False
-        self.worker_task = None
+        self.worker_tasks = []
+        
+        # Pool de processus partagé par tous les burns
+        self.burn_pool = ParallelBurnPool(burn_workers)
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.per_user_limit = max(1, per_user_limit)
         
-    def submit_job(self, user_id: str, filename: str, file_path: str) -> str:
-        """Soumettre un job de traitement URN"""
+        # File par utilisateur + tourniquet des utilisateurs en attente
+        self.pending_by_user: Dict[str, Deque[PhantomJob]] = {}
+        self.user_rotation: Deque[str] = deque()
+        self.active_by_user: Dict[str, int] = {}
+        self._jobs_available = asyncio.Event()
+        
+    def submit_job(self, user_id: str, filename: str, file_path: str,
+                   authorized_node: Optional[str] = None) -> str:
+        """Soumettre un job de traitement URN pour un utilisateur (nom authentifié)"""
         job_id = str(uuid.uuid4())
-        job = PhantomJob(job_id, user_id, filename, file_path)
+        job = PhantomJob(job_id, user_id, filename, file_path, authorized_node)
         self.jobs[job_id] = job
         
-        # Ajouter à la queue
-        asyncio.create_task(self.processing_queue.put(job))
+        # Ajouter à la file de l'utilisateur
+        if user_id not in self.pending_by_user:
+            self.pending_by_user[user_id] = deque()
+            self.user_rotation.append(user_id)
+        self.pending_by_user[user_id].append(job)
+        self._jobs_available.set()
         
         return job_id
     
@@ -74,35 +132,115 @@ class AsyncPhantomProcessor:
         """Récupérer tous les jobs d'un utilisateur"""
         return [job.to_dict() for job in self.jobs.values() if job.user_id == user_id]
     
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Annuler un job: retiré de la file s'il attend, sinon le burn s'arrête
+        à la prochaine bande et supprime son URN partielle.
+        False si le job est inconnu ou déjà terminé.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.is_finished:
+            return False
+        
+        job.burn_progress.cancel()
+        
+        queue = self.pending_by_user.get(job.user_id)
+        if job.status == JobStatus.PENDING and queue is not None and job in queue:
+            queue.remove(job)
+            if not queue:
+                del self.pending_by_user[job.user_id]
+                self.user_rotation.remove(job.user_id)
+            self._finish_cancelled(job)
+        
+        print(f"🛑 Annulation demandée pour job {job_id}")
+        return True
+    
+    def _finish_cancelled(self, job: PhantomJob):
+        job.status = JobStatus.CANCELLED
+        job.completed_at = time.time()
+        self._remove_upload(job)
+    
+    def _remove_upload(self, job: PhantomJob):
+        """Nettoyer le fichier temporaire de l'upload"""
+        try:
+            if os.path.exists(job.file_path):
+                os.unlink(job.file_path)
+        except OSError:
+            pass
+    
+    def get_queue_stats(self) -> Dict:
+        """État de l'ordonnanceur (jobs en attente / actifs par utilisateur)"""
+        return {
+            "burn_workers": self.burn_pool.workers,
+            "max_concurrent_jobs": self.max_concurrent_jobs,
+            "per_user_limit": self.per_user_limit,
+            "pending": {user_id: len(queue) for user_id, queue in self.pending_by_user.items()},
+            "active": {user_id: count for user_id, count in self.active_by_user.items() if count}
+        }
+    
     async def start_worker(self):
-        """Démarrer le worker de traitement en arrière-plan"""
+        """Démarrer les workers de traitement en arrière-plan"""
         if self.is_running:
             return
             
         self.is_running = True
-        self.worker_task = asyncio.create_task(self._process_jobs())
-        print("🔥 AsyncPhantomProcessor worker started")
+        self.worker_tasks = [
+            asyncio.create_task(self._process_jobs()) for _ in range(self.max_concurrent_jobs)
+        ]
+        print(f"🔥 AsyncPhantomProcessor started: {self.max_concurrent_jobs} jobs, "
+              f"{self.burn_pool.workers} burn processes, {self.per_user_limit} job(s)/user")
     
     async def stop_worker(self):
-        """Arrêter le worker"""
+        """Arrêter les workers"""
         self.is_running = False
-        if self.worker_task:
-            self.worker_task.cancel()
+        for task in self.worker_tasks:
+            task.cancel()
+        for task in self.worker_tasks:
             try:
-                await self.worker_task
+                await task
             except asyncio.CancelledError:
                 pass
+        self.worker_tasks = []
+        self.burn_pool.shutdown(wait=False)
         print("🛑 AsyncPhantomProcessor worker stopped")
     
+    def _next_runnable_job(self) -> Optional[PhantomJob]:
+        """Prochain job d'un utilisateur sous sa limite (tourniquet entre utilisateurs)"""
+        for _ in range(len(self.user_rotation)):
+            user_id = self.user_rotation[0]
+            self.user_rotation.rotate(-1)
+            
+            if self.active_by_user.get(user_id, 0) >= self.per_user_limit:
+                continue
+            
+            queue = self.pending_by_user[user_id]
+            job = queue.popleft()
+            if not queue:
+                del self.pending_by_user[user_id]
+                self.user_rotation.remove(user_id)
+            return job
+        return None
+    
     async def _process_jobs(self):
         """Worker qui traite les jobs en arrière-plan"""
         while self.is_running:
             try:
-                # Attendre un job (avec timeout pour vérifier is_running)
-                job = await asyncio.wait_for(self.processing_queue.get(), timeout=1.0)
+                job = self._next_runnable_job()
+                if job is None:
+                    # Attendre un job ou une place libre (avec timeout pour vérifier is_running)
+                    self._jobs_available.clear()
+                    await asyncio.wait_for(self._jobs_available.wait(), timeout=1.0)
+                    continue
                 
-                # Traiter le job
-                await self._process_single_job(job)
+                self.active_by_user[job.user_id] = self.active_by_user.get(job.user_id, 0) + 1
+                try:
+                    # Traiter le job
+                    await self._process_single_job(job)
+                finally:
+                    self.active_by_user[job.user_id] -= 1
+                    if not self.active_by_user[job.user_id]:
+                        del self.active_by_user[job.user_id]
+                    self._jobs_available.set()
                 
             except asyncio.TimeoutError:
                 # Timeout normal, continuer la boucle
@@ -119,26 +257,27 @@ class AsyncPhantomProcessor:
             # Marquer comme en cours
             job.status = JobStatus.PROCESSING
             job.started_at = time.time()
-            job.progress = 10
+            job.progress = 0
             
-            # Simulation des étapes de traitement
-            await asyncio.sleep(0.5)  # Lecture image
-            job.progress = 30
-            
-            # Traitement URN (dans un thread pour éviter de bloquer)
+            # Traitement URN (thread de coordination, cryptage dans le pool de processus)
             def burn_sync():
                 return self.phantom_urn_system.burn_image_to_phantom_urn(
                     image_path=job.file_path,
                     phantom_name=job.filename,
-                    authorized_node=job.user_id
+                    authorized_node=job.authorized_node,
+                    burn_pool=self.burn_pool,
+                    progress=job.burn_progress
                 )
             
-            # Exécuter le traitement lourd dans un thread
+            # Exécuter le traitement lourd hors de la boucle d'événements
             loop = asyncio.get_event_loop()
-            job.progress = 50
-            
             burn_result = await loop.run_in_executor(None, burn_sync)
-            job.progress = 90
+            
+            # Annulation arrivée après la dernière bande: détruire l'URN complète
+            if job.burn_progress.cancelled:
+                if hasattr(self.phantom_urn_system, "delete_phantom_urn"):
+                    self.phantom_urn_system.delete_phantom_urn(burn_result["phantom_id"])
+                raise BurnCancelled()
             
             # Finaliser
             job.status = JobStatus.COMPLETED
@@ -161,6 +300,11 @@ class AsyncPhantomProcessor:
             
             print(f"✅ Job {job.job_id} terminé: {burn_result['total_fragments']} fragments")
             
+        except BurnCancelled:
+            print(f"🛑 Job {job.job_id} annulé ({job.burn_progress.done}/{job.burn_progress.total} cendres)")
+            job.status = JobStatus.CANCELLED
+            job.completed_at = time.time()
+            
         except Exception as e:
             print(f"❌ Erreur job {job.job_id}: {e}")
             job.status = JobStatus.FAILED
@@ -168,18 +312,22 @@ class AsyncPhantomProcessor:
             job.completed_at = time.time()
         
         finally:
-            # Nettoyer le fichier temporaire
-            try:
-                if os.path.exists(job.file_path):
-                    os.unlink(job.file_path)
-            except:
-                pass
+            self._remove_upload(job)
 
 # Instance globale
 async_processor = None
 
-def initialize_async_processor(phantom_urn_system):
-    """Initialiser le processeur asynchrone"""
+def initialize_async_processor(phantom_urn_system, burn_workers: Optional[int] = None,
+                               max_concurrent_jobs: Optional[int] = None,
+                               per_user_limit: Optional[int] = None):
+    """Initialiser le processeur asynchrone (défauts surchargeables par variables d'environnement)"""
     global async_processor
-    async_processor = AsyncPhantomProcessor(phantom_urn_system)
+    async_processor = AsyncPhantomProcessor(
+        phantom_urn_system,
+        burn_workers=burn_workers or int(os.getenv("OPENRED_BURN_WORKERS", DEFAULT_BURN_WORKERS)),
+        max_concurrent_jobs=max_concurrent_jobs or int(
+            os.getenv("OPENRED_MAX_BURN_JOBS", DEFAULT_MAX_CONCURRENT_JOBS)
+        ),
+        per_user_limit=per_user_limit or int(os.getenv("OPENRED_BURN_JOBS_PER_USER", DEFAULT_JOBS_PER_USER))
+    )
     return async_processor
\ No newline at end of file
@@ -16,6 +16,7 @@ SÉCURITÉ: Aucune image physique stockée, seulement fragments cryptés
 """
 
 import os
+import sys
 import json
 import hashlib
 import secrets
@@ -23,9 +24,9 @@ import time
 import uuid
 import base64
 import threading
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Any
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from PIL import Image
 import numpy as np
 from cryptography.fernet import Fernet
@@ -34,16 +35,34 @@ from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.backends import default_backend
 import logging
 
+from ash_container import AshContainer, remove_urn_directory
+from bulk_ash_cipher import (
+    CIPHER_MODE_BULK, CIPHER_MODE_FERNET, derive_batch_key, derive_fragment_key
+)
+# Modules partagés avec le cœur P2P (racine du dépôt)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from core.fragment_granularity import GRANULARITY_PIXEL, FragmentGranularity, split_tiles
+from phantom_cache import DEFAULT_CACHE_BYTES, DEFAULT_PROJECTION_TTL, BoundedPhantomCache, EncryptedSpillStore
+from parallel_burn import (
+    BurnCancelled, BurnProgress, ParallelBurnPool, burn_bulk_ashes, row_shards, run_shards, write_shards
+)
+from parallel_resurrection import ResurrectionBand, stream_resurrection
+from preview_pyramid import (
+    DEFAULT_PYRAMID_LEVELS, PyramidLevel, TargetSize, build_pyramid, encrypt_pyramid_level, select_level
+)
+
 logger = logging.getLogger(__name__)
 
 @dataclass
 class AshFragment:
-    """Fragment de cendre - un pixel crypté avec chaînage"""
+    """Fragment de cendre - un pixel (ou une tuile) crypté avec chaînage"""
     color_rgb: Tuple[int, int, int]
     position: Tuple[int, int]  # (x, y)
     next_fragment_name: str
     next_decrypt_key: bytes
     creation_timestamp: float
+    tile_size: Tuple[int, int] = (1, 1)  # (largeur, hauteur) effective du fragment
+    tile_rgb: str = ""  # pixels de la tuile (base64) si granularité > 1x1
 
 @dataclass
 class UrnConfig:
@@ -55,6 +74,10 @@ class UrnConfig:
     authorized_node: str
     burn_after_reads: int = 1
     phantom_id: str = ""
+    cipher_mode: str = CIPHER_MODE_FERNET
+    granularity: str = GRANULARITY_PIXEL
+    tile_size: Tuple[int, int] = (1, 1)  # (largeur, hauteur) des tuiles
+    pyramid: List[Tuple[int, int]] = field(default_factory=list)  # dimensions des niveaux d'aperçu 1..n
 
 @dataclass
 class OrpMetadata:
@@ -66,44 +89,132 @@ class OrpMetadata:
     access_token: Optional[str] = None
     created_at: str = ""
 
+def _encrypt_fragment(fragment_name: str, fragment: AshFragment, phantom_id: str) -> bytes:
+    """Crypte un fragment avec sa clé dérivée"""
+    try:
+        # Sérialiser fragment
+        fragment_data = asdict(fragment)
+        
+        # Encoder bytes en base64 pour JSON
+        if isinstance(fragment_data['next_decrypt_key'], bytes):
+            fragment_data['next_decrypt_key'] = base64.b64encode(fragment_data['next_decrypt_key']).decode()
+        
+        fragment_json = json.dumps(fragment_data)
+        
+        # Crypter avec clé dérivée
+        cipher = Fernet(derive_fragment_key(fragment_name, phantom_id))
+        return cipher.encrypt(fragment_json.encode())
+        
+    except Exception as e:
+        logger.error(f"❌ Erreur cryptage fragment {fragment_name}: {e}")
+        raise
+
+def _fragment_shard(shard_array: np.ndarray, row_offset: int, tile_size: Tuple[int, int],
+                    phantom_id: str, fragment_names: List[str]) -> List[Tuple[str, bytes]]:
+    """
+    Cendres chaînées d'une bande de lignes (exécutable dans un processus worker).
+    fragment_names: noms des fragments de la bande + nom du fragment suivant la bande
+    """
+    tiles, xs, ys, widths, heights = split_tiles(shard_array, *tile_size)
+    is_pixel = tuple(tile_size) == (1, 1)
+    ashes = []
+    
+    for fragment_index in range(len(tiles)):
+        x, y = int(xs[fragment_index]), int(ys[fragment_index]) + row_offset
+        w, h = int(widths[fragment_index]), int(heights[fragment_index])
+        tile = tiles[fragment_index, :h, :w]
+        
+        # Créer fragment atomique (chaînage vers le nom suivant)
+        fragment = AshFragment(
+            color_rgb=tuple(tile[0, 0].tolist()),
+            position=(x, y),
+            next_fragment_name=fragment_names[fragment_index + 1],
+            next_decrypt_key=Fernet.generate_key(),
+            creation_timestamp=time.time(),
+            tile_size=(w, h),
+            tile_rgb="" if is_pixel else base64.b64encode(tile.tobytes()).decode()
+        )
+        
+        fragment_name = fragment_names[fragment_index]
+        ashes.append((fragment_name, _encrypt_fragment(fragment_name, fragment, phantom_id)))
+    
+    return ashes
+
 class AuthenticPhantomUrnSystem:
     """
     Système URN Phantom authentique pour l'API Web
     """
     
-    def __init__(self, storage_dir: str = "phantom_urns", projection_server_url: str = "http://localhost:8002"):
+    # Nombre de cendres écrites par appel au conteneur packé
+    ASH_WRITE_BATCH = 4096
+    
+    # Octets de cendres lus par lot pendant la résurrection
+    RESURRECTION_READ_BYTES = 4 * 1024 * 1024
+    
+    def __init__(self, storage_dir: str = "phantom_urns", projection_server_url: str = "http://localhost:8002",
+                 cipher_mode: str = CIPHER_MODE_BULK, granularity: str = GRANULARITY_PIXEL,
+                 cache_max_bytes: int = DEFAULT_CACHE_BYTES, cache_ttl: Optional[float] = DEFAULT_PROJECTION_TTL,
+                 cache_spill_dir: Optional[str] = None,
+                 resurrection_pool: Optional[ParallelBurnPool] = None,
+                 pyramid_levels: int = DEFAULT_PYRAMID_LEVELS):
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(exist_ok=True)
         
         self.projection_server_url = projection_server_url
+        self.cipher_mode = cipher_mode  # aes-ctr-bulk (lots vectorisés) ou fernet (un JSON par pixel)
+        self.granularity = FragmentGranularity.parse(granularity)  # taille des cendres (1x1, NxN, scanline)
+        self.pyramid_levels = pyramid_levels  # niveaux d'aperçu cryptés (0: aucun)
         
         # Registre des URNs actives
         self.active_urns: Dict[str, UrnConfig] = {}
-        self.urn_fragments: Dict[str, Dict[str, str]] = {}  # urn_id -> {fragment_name -> filepath}
+        self.urn_fragments: Dict[str, Dict[str, str]] = {}  # urn_id -> {fragment_name -> segment}
+        self.ash_containers: Dict[str, AshContainer] = {}  # urn_id -> conteneur packé
+        self.pyramid_fragments: Dict[str, Dict[int, List[str]]] = {}  # urn_id -> {niveau -> lots}
         
-        # Cache pour projection
-        self.phantom_cache: Dict[str, np.ndarray] = {}
+        # Cache pour projection (borné en octets, TTL, débordement disque crypté optionnel)
+        self.phantom_cache = BoundedPhantomCache(
+            "phantom_cache", max_bytes=cache_max_bytes, ttl=cache_ttl,
+            spill=EncryptedSpillStore(cache_spill_dir) if cache_spill_dir else None
+        )
+        
+        # Pool de processus pour décrypter les cendres (None: thread appelant)
+        self.resurrection_pool = resurrection_pool
+        
+        # Abonnés prévenus à la suppression (caches de frames encodées)
+        self.invalidation_listeners: List[Callable[[str], None]] = []
         
         # Clés d'activation
         self.activation_keys: Dict[str, Tuple[Any, Any]] = {}  # urn_id -> (private_key, public_key)
         
         logger.info(f"🔥 Phantom URN System initialisé - Storage: {self.storage_dir}")
     
-    def burn_image_to_phantom_urn(self, image_path: str, phantom_name: str, authorized_node: str) -> Dict[str, Any]:
+    def burn_image_to_phantom_urn(self, image_path: str, phantom_name: str, authorized_node: str,
+                                  granularity: Optional[str] = None,
+                                  burn_pool: Optional[ParallelBurnPool] = None,
+                                  progress: Optional[BurnProgress] = None) -> Dict[str, Any]:
         """
         🔥 BRÛLE une image en URN Phantom avec fragmentation atomique
+        granularity: taille des cendres pour ce burn (défaut: granularité du système)
+        burn_pool: pool de processus pour crypter les bandes de lignes en parallèle
+        progress: progression (cendres écrites), durées par étape et annulation
         """
+        progress = progress or BurnProgress()
         try:
             logger.info(f"🔥 Début combustion: {phantom_name}")
             
             # Charger et préparer l'image
-            original_image = Image.open(image_path)
-            if original_image.mode != 'RGB':
-                original_image = original_image.convert('RGB')
-            
-            img_array = np.array(original_image)
+            with progress.stage("decode"):
+                original_image = Image.open(image_path)
+                if original_image.mode != 'RGB':
+                    original_image = original_image.convert('RGB')
+                
+                img_array = np.array(original_image)
             height, width, _ = img_array.shape
             
+            fragment_granularity = FragmentGranularity.parse(granularity or self.granularity)
+            tile_width, tile_height = fragment_granularity.resolve(width, height)
+            total_fragments = -(-width // tile_width) * -(-height // tile_height)
+            
             # Générer ID unique pour cette URN
             image_hash = hashlib.sha256(open(image_path, 'rb').read()).hexdigest()
             phantom_id = f"phantom_{secrets.token_hex(8)}_{int(time.time())}"
@@ -111,28 +222,55 @@ class AuthenticPhantomUrnSystem:
             # Configuration URN
             config = UrnConfig(
                 image_hash=image_hash,
-                total_fragments=width * height,
+                total_fragments=total_fragments,
                 image_dimensions=(width, height),
                 creation_time=time.time(),
                 authorized_node=authorized_node,
-                phantom_id=phantom_id
+                phantom_id=phantom_id,
+                cipher_mode=self.cipher_mode,
+                granularity=fragment_granularity.label,
+                tile_size=(tile_width, tile_height)
             )
             
             # Créer dossier URN
             urn_dir = self.storage_dir / phantom_id
             urn_dir.mkdir(exist_ok=True)
             
-            # Générer clés d'activation RSA
-            private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=2048,
-                backend=default_backend()
-            )
-            public_key = private_key.public_key()
-            self.activation_keys[phantom_id] = (private_key, public_key)
-            
-            # Fragmentation atomique
-            fragment_chain = self._atomic_fragmentation(img_array, urn_dir, phantom_id)
+            try:
+                progress.start(total_fragments)
+                
+                # Générer clés d'activation RSA
+                private_key = rsa.generate_private_key(
+                    public_exponent=65537,
+                    key_size=2048,
+                    backend=default_backend()
+                )
+                public_key = private_key.public_key()
+                self.activation_keys[phantom_id] = (private_key, public_key)
+                
+                # Fragmentation atomique
+                if self.cipher_mode == CIPHER_MODE_BULK:
+                    fragment_chain = self._bulk_atomic_fragmentation(
+                        img_array, urn_dir, phantom_id, config.tile_size, burn_pool, progress
+                    )
+                else:
+                    fragment_chain = self._atomic_fragmentation(
+                        img_array, urn_dir, phantom_id, config.tile_size, burn_pool, progress
+                    )
+                progress.check_cancelled()
+                
+                # Aperçus cryptés (niveaux mip) dans le même conteneur
+                with progress.stage("pyramid"):
+                    pyramid = self._burn_preview_pyramid(original_image, urn_dir, phantom_id)
+                config.pyramid = [level.dimensions for level in pyramid]
+            except Exception:
+                # Burn interrompu ou en échec: pas d'URN partielle sur disque
+                self.pyramid_fragments.pop(phantom_id, None)
+                self.activation_keys.pop(phantom_id, None)
+                remove_urn_directory(urn_dir, self.ash_containers.pop(phantom_id, None))
+                raise
+            finally:
+                self._close_container_writer(phantom_id)
             
             # Registre URN
             self.active_urns[phantom_id] = config
@@ -168,92 +306,107 @@ class AuthenticPhantomUrnSystem:
                 "access_token": orp_metadata.access_token
             }
             
+        except BurnCancelled:
+            logger.info(f"🛑 Combustion annulée: {phantom_name}")
+            raise
         except Exception as e:
             logger.error(f"❌ Erreur combustion: {e}")
             raise
     
-    def _atomic_fragmentation(self, img_array: np.ndarray, urn_dir: Path, phantom_id: str) -> Dict[str, str]:
+    def _atomic_fragmentation(self, img_array: np.ndarray, urn_dir: Path, phantom_id: str,
+                              tile_size: Tuple[int, int] = (1, 1),
+                              burn_pool: Optional[ParallelBurnPool] = None,
+                              progress: Optional[BurnProgress] = None) -> Dict[str, str]:
         """
-        Fragmentation atomique des pixels avec chaînage cryptographique
+        Fragmentation atomique des pixels (ou tuiles) avec chaînage cryptographique
         """
         height, width, _ = img_array.shape
-        total_pixels = width * height
+        total_fragments = -(-width // tile_size[0]) * -(-height // tile_size[1])
         
         # Générer noms de fragments aléatoires
-        fragment_names = [f"ash_{secrets.token_hex(16)}.pxl" for _ in range(total_pixels)]
+        fragment_names = [f"ash_{secrets.token_hex(16)}.pxl" for _ in range(total_fragments)]
         np.random.shuffle(fragment_names)
         
-        logger.info(f"🧬 Fragmentation atomique: {total_pixels} cendres")
+        logger.info(f"🧬 Fragmentation atomique: {total_fragments} cendres")
         
         fragments_map = {}
+        container = self._get_container(phantom_id, urn_dir)
         
-        # Créer chaîne de fragments
-        for i in range(height):
-            for j in range(width):
-                pixel_index = i * width + j
-                
-                # Couleur du pixel
-                color = tuple(img_array[i, j].tolist())
-                
-                # Clé et nom suivant (chaînage circulaire)
-                next_index = (pixel_index + 1) % total_pixels
-                next_key = Fernet.generate_key()
-                next_name = fragment_names[next_index]
-                
-                # Créer fragment atomique
-                fragment = AshFragment(
-                    color_rgb=color,
-                    position=(j, i),
-                    next_fragment_name=next_name,
-                    next_decrypt_key=next_key,
-                    creation_timestamp=time.time()
-                )
-                
-                # Crypter et sauvegarder fragment
-                fragment_path = self._save_encrypted_fragment(
-                    fragment_names[pixel_index], 
-                    fragment, 
-                    urn_dir, 
-                    phantom_id
-                )
-                
-                fragments_map[fragment_names[pixel_index]] = str(fragment_path)
+        # Chaque bande reçoit ses noms + le nom suivant (chaînage circulaire global)
+        shard_args = []
+        first_fragment = 0
+        for row_offset, shard in row_shards(img_array, tile_size, burn_pool,
+                                            max_shard_fragments=self.ASH_WRITE_BATCH):
+            shard_fragments = -(-width // tile_size[0]) * -(-shard.shape[0] // tile_size[1])
+            names = fragment_names[first_fragment:first_fragment + shard_fragments]
+            names.append(fragment_names[(first_fragment + shard_fragments) % total_fragments])
+            shard_args.append((shard, row_offset, tile_size, phantom_id, names))
+            first_fragment += shard_fragments
+        
+        write_shards(run_shards(_fragment_shard, shard_args, burn_pool), container, progress)
+        
+        for fragment_name, (segment_id, _, _) in container.index.items():
+            fragments_map[fragment_name] = str(container.segment_path(segment_id))
         
         return fragments_map
     
-    def _save_encrypted_fragment(self, fragment_name: str, fragment: AshFragment, urn_dir: Path, phantom_id: str) -> Path:
-        """Sauvegarde un fragment crypté"""
-        try:
-            # Sérialiser fragment
-            fragment_data = asdict(fragment)
-            
-            # Encoder bytes en base64 pour JSON
-            if isinstance(fragment_data['next_decrypt_key'], bytes):
-                fragment_data['next_decrypt_key'] = base64.b64encode(fragment_data['next_decrypt_key']).decode()
-            
-            fragment_json = json.dumps(fragment_data)
-            
-            # Crypter avec clé dérivée
-            fragment_key = self._derive_fragment_key(fragment_name, phantom_id)
-            cipher = Fernet(fragment_key)
-            encrypted_data = cipher.encrypt(fragment_json.encode())
-            
-            # Sauvegarder
-            fragment_path = urn_dir / fragment_name
-            with open(fragment_path, 'wb') as f:
-                f.write(encrypted_data)
-            
-            return fragment_path
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde fragment {fragment_name}: {e}")
-            raise
+    def _bulk_atomic_fragmentation(self, img_array: np.ndarray, urn_dir: Path, phantom_id: str,
+                                   tile_size: Tuple[int, int] = (1, 1),
+                                   burn_pool: Optional[ParallelBurnPool] = None,
+                                   progress: Optional[BurnProgress] = None) -> Dict[str, str]:
+        """
+        Fragmentation atomique vectorisée: un enregistrement par pixel (16 octets)
+        ou par tuile, ordre de stockage mélangé, cryptage AES-CTR par lots.
+        Chaque lot a un nom aléatoire et sa clé dérivée du nom.
+        """
+        logger.info(f"🧬 Fragmentation atomique vectorisée: {img_array.shape[1]}x{img_array.shape[0]}")
+        
+        container = self._get_container(phantom_id, urn_dir)
+        shard_fragments, shard_batches = burn_bulk_ashes(img_array, tile_size, phantom_id, burn_pool)
+        batch_names = write_shards(shard_batches, container, progress, shard_fragments)
+        
+        return {
+            batch_name: str(container.segment_path(container.index[batch_name][0]))
+            for batch_name in batch_names
+        }
+    
+    def _burn_preview_pyramid(self, image: Image.Image, urn_dir: Path, phantom_id: str) -> List[PyramidLevel]:
+        """Crypte les niveaux d'aperçu (1/4, 1/16, 1/64...) comme ensembles de cendres séparés"""
+        container = self._get_container(phantom_id, urn_dir)
+        levels = {}
+        pyramid = []
+        
+        for level, level_array in build_pyramid(image, self.pyramid_levels):
+            batches = encrypt_pyramid_level(level_array, phantom_id)
+            container.put_many(batches)
+            levels[level.level] = [batch_name for batch_name, _ in batches]
+            pyramid.append(level)
+        container.flush()
+        
+        self.pyramid_fragments[phantom_id] = levels
+        return pyramid
+    
+    def _close_container_writer(self, phantom_id: str):
+        """Fin du burn: index et segment en ajout fermés, le conteneur en cache reste lisible"""
+        container = self.ash_containers.get(phantom_id)
+        if container is not None:
+            container.close_writer()
+    
+    def _get_container(self, phantom_id: str, urn_dir: Optional[Path] = None) -> AshContainer:
+        """Conteneur packé de l'URN (ouvert paresseusement)"""
+        container = self.ash_containers.get(phantom_id)
+        if container is None:
+            container = AshContainer(urn_dir or self.storage_dir / phantom_id)
+            self.ash_containers[phantom_id] = container
+        return container
     
     def _derive_fragment_key(self, fragment_name: str, phantom_id: str) -> bytes:
         """Dérive une clé de cryptage pour un fragment"""
-        key_material = f"{fragment_name}:{phantom_id}".encode()
-        digest = hashlib.sha256(key_material).digest()
-        return base64.urlsafe_b64encode(digest[:32])
+        return derive_fragment_key(fragment_name, phantom_id)
+    
+    def _derive_batch_key(self, batch_name: str, phantom_id: str) -> bytes:
+        """Clé AES-256 brute d'un lot (même dérivation que les cendres Fernet)"""
+        return derive_batch_key(batch_name, phantom_id)
     
     def _generate_orp_file(self, metadata: OrpMetadata, urn_dir: Path) -> Path:
         """Génère un fichier .orp authentique"""
@@ -296,88 +449,155 @@ class AuthenticPhantomUrnSystem:
         
         return orp_path
     
-    def get_phantom_for_projection(self, phantom_id: str, access_token: str) -> Optional[np.ndarray]:
+    def get_phantom_for_projection(self, phantom_id: str, access_token: str,
+                                   pool: Optional[ParallelBurnPool] = None,
+                                   target_size: Optional[TargetSize] = None) -> Optional[np.ndarray]:
         """
         🔄 PHOENIX - Reconstruction d'image pour projection
+        pool: pool de processus pour décrypter les lots de cendres en parallèle
+        target_size: (largeur, hauteur) d'affichage → plus petit niveau d'aperçu suffisant
+        """
+        image = None
+        for band in self.iter_phantom_for_projection(phantom_id, access_token, pool, target_size):
+            image = band.image
+        return image
+    
+    def authorize_projection(self, phantom_id: str, access_token: str) -> bool:
+        """Contrôle d'accès d'une projection (sans résurrection)"""
+        if phantom_id not in self.active_urns:
+            logger.error(f"URN {phantom_id} non trouvée")
+            return False
+        
+        # Vérifier token d'accès (simulation)
+        if not access_token:
+            logger.error("Token d'accès requis")
+            return False
+        
+        return True
+    
+    def select_projection_level(self, phantom_id: str, target_size: Optional[TargetSize] = None) -> PyramidLevel:
+        """Niveau de pyramide ressuscité pour une taille cible (0 = pleine résolution)"""
+        config = self.active_urns[phantom_id]
+        stored = self.pyramid_fragments.get(phantom_id, {})
+        levels = [
+            PyramidLevel(level, tuple(dimensions))
+            for level, dimensions in enumerate(config.pyramid, start=1) if level in stored
+        ]
+        return select_level(config.image_dimensions, levels, target_size)
+    
+    def iter_phantom_for_projection(self, phantom_id: str, access_token: str,
+                                    pool: Optional[ParallelBurnPool] = None,
+                                    target_size: Optional[TargetSize] = None) -> Iterator[ResurrectionBand]:
+        """
+        🔄 PHOENIX en flux - bandes de lignes produites dès qu'elles sont complètes
+        (une seule bande couvrant l'image si elle est déjà en cache).
+        L'image n'est mise en cache que si le flux est consommé jusqu'au bout.
         """
         try:
-            if phantom_id not in self.active_urns:
-                logger.error(f"URN {phantom_id} non trouvée")
-                return None
+            if not self.authorize_projection(phantom_id, access_token):
+                return
             
-            # Vérifier token d'accès (simulation)
-            if not access_token:
-                logger.error("Token d'accès requis")
-                return None
+            level = self.select_projection_level(phantom_id, target_size)
+            cache_key = phantom_id if level.level == 0 else (phantom_id, level.level)
             
             # Check cache
-            if phantom_id in self.phantom_cache:
-                logger.info(f"🔄 Cache hit pour {phantom_id}")
-                return self.phantom_cache[phantom_id]
+            cached = self.phantom_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"🔄 Cache hit pour {phantom_id} (niveau {level.level})")
+                yield ResurrectionBand(0, cached.shape[0], cached, cached, True, 0, 0)
+                return
             
             # Reconstruction depuis fragments
             config = self.active_urns[phantom_id]
-            fragments_map = self.urn_fragments[phantom_id]
-            
-            logger.info(f"🔄 Reconstruction Phoenix: {phantom_id}")
-            
-            # Reconstruire image
-            width, height = config.image_dimensions
+            width, height = level.dimensions
             reconstructed = np.zeros((height, width, 3), dtype=np.uint8)
             
-            urn_dir = self.storage_dir / phantom_id
+            logger.info(f"🔄 Reconstruction Phoenix: {phantom_id} (niveau {level.level}, {width}x{height})")
             
-            # Décrypter et assembler fragments
-            for fragment_name, fragment_path in fragments_map.items():
-                try:
-                    fragment = self._load_encrypted_fragment(fragment_name, phantom_id, urn_dir)
-                    if fragment:
-                        x, y = fragment.position
-                        if 0 <= x < width and 0 <= y < height:
-                            reconstructed[y, x] = fragment.color_rgb
-                except Exception as e:
-                    logger.warning(f"Erreur fragment {fragment_name}: {e}")
-                    continue
+            # Lecture groupée → décryptage parallèle → scatter vectorisé
+            if level.level == 0:
+                chunks = self._iter_ash_chunks(phantom_id)
+                tile_size, cipher_mode = tuple(config.tile_size), config.cipher_mode
+            else:
+                chunks = self._get_container(phantom_id).iter_chunks(
+                    self.pyramid_fragments[phantom_id][level.level], self.RESURRECTION_READ_BYTES
+                )
+                tile_size, cipher_mode = (1, 1), CIPHER_MODE_BULK
+            
+            yield from stream_resurrection(
+                chunks, phantom_id, (width, height), tile_size, cipher_mode,
+                pool or self.resurrection_pool, reconstructed
+            )
             
             # Cache pour projections futures
-            self.phantom_cache[phantom_id] = reconstructed
+            self.phantom_cache[cache_key] = reconstructed
             
             logger.info(f"✅ Phoenix terminé: {phantom_id}")
-            return reconstructed
             
         except Exception as e:
             logger.error(f"❌ Erreur reconstruction Phoenix: {e}")
-            return None
+    
+    def _iter_ash_chunks(self, phantom_id: str) -> Iterator[List[Tuple[str, bytes]]]:
+        """Lots de cendres cryptées: conteneur packé (lectures groupées), puis .pxl non migrées"""
+        urn_dir = self.storage_dir / phantom_id
+        container = self._get_container(phantom_id, urn_dir)
+        fragments_map = self.urn_fragments[phantom_id]
+        
+        yield from container.iter_chunks(fragments_map.keys(), self.RESURRECTION_READ_BYTES)
+        
+        legacy: List[Tuple[str, bytes]] = []
+        legacy_bytes = 0
+        for fragment_name in fragments_map:
+            if fragment_name in container:
+                continue
+            fragment_path = urn_dir / fragment_name
+            if not fragment_path.exists():
+                continue
+            encrypted_data = fragment_path.read_bytes()
+            legacy.append((fragment_name, encrypted_data))
+            legacy_bytes += len(encrypted_data)
+            if legacy_bytes >= self.RESURRECTION_READ_BYTES:
+                yield legacy
+                legacy, legacy_bytes = [], 0
+        if legacy:
+            yield legacy
     
     def _load_encrypted_fragment(self, fragment_name: str, phantom_id: str, urn_dir: Path) -> Optional[AshFragment]:
         """Charge et décrypte un fragment"""
         try:
-            fragment_path = urn_dir / fragment_name
-            if not fragment_path.exists():
-                return None
-            
-            # Charger données cryptées
-            with open(fragment_path, 'rb') as f:
-                encrypted_data = f.read()
+            # Charger données cryptées (conteneur packé, sinon fichier .pxl historique)
+            encrypted_data = self._get_container(phantom_id, urn_dir).get(fragment_name)
+            if encrypted_data is None:
+                fragment_path = urn_dir / fragment_name
+                if not fragment_path.exists():
+                    return None
+                with open(fragment_path, 'rb') as f:
+                    encrypted_data = f.read()
             
-            # Décrypter
-            fragment_key = self._derive_fragment_key(fragment_name, phantom_id)
-            cipher = Fernet(fragment_key)
-            decrypted_json = cipher.decrypt(encrypted_data).decode()
-            
-            # Désérialiser
-            fragment_data = json.loads(decrypted_json)
-            
-            # Décoder clé suivante
-            if isinstance(fragment_data['next_decrypt_key'], str):
-                fragment_data['next_decrypt_key'] = base64.b64decode(fragment_data['next_decrypt_key'])
-            
-            return AshFragment(**fragment_data)
+            return self._decrypt_fragment(fragment_name, phantom_id, encrypted_data)
             
         except Exception as e:
             logger.error(f"❌ Erreur chargement fragment {fragment_name}: {e}")
             return None
     
+    def _decrypt_fragment(self, fragment_name: str, phantom_id: str, encrypted_data: bytes) -> AshFragment:
+        """Décrypte une cendre avec sa clé dérivée"""
+        fragment_key = self._derive_fragment_key(fragment_name, phantom_id)
+        cipher = Fernet(fragment_key)
+        decrypted_json = cipher.decrypt(encrypted_data).decode()
+        
+        # Désérialiser
+        fragment_data = json.loads(decrypted_json)
+        
+        # Décoder clé suivante
+        if isinstance(fragment_data['next_decrypt_key'], str):
+            fragment_data['next_decrypt_key'] = base64.b64decode(fragment_data['next_decrypt_key'])
+        
+        if 'tile_size' in fragment_data:
+            fragment_data['tile_size'] = tuple(fragment_data['tile_size'])
+        
+        return AshFragment(**fragment_data)
+    
     def list_active_phantoms(self) -> List[Dict[str, Any]]:
         """Liste des URNs Phantom actives"""
         phantoms = []
@@ -386,31 +606,48 @@ class AuthenticPhantomUrnSystem:
                 "phantom_id": phantom_id,
                 "dimensions": config.image_dimensions,
                 "total_fragments": config.total_fragments,
+                "granularity": config.granularity,
+                "preview_levels": config.pyramid,
                 "created_at": config.creation_time,
                 "authorized_node": config.authorized_node
             })
         return phantoms
     
+    def add_invalidation_listener(self, listener: Callable[[str], None]):
+        """listener(phantom_id) appelé quand une URN est supprimée"""
+        self.invalidation_listeners.append(listener)
+    
+    def _notify_invalidation(self, phantom_id: str):
+        for listener in list(self.invalidation_listeners):
+            try:
+                listener(phantom_id)
+            except Exception as e:
+                logger.error(f"❌ Erreur invalidation {phantom_id}: {e}")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """📊 Métriques du cache de projection"""
+        return self.phantom_cache.stats()
+    
     def delete_phantom_urn(self, phantom_id: str) -> bool:
         """Supprime une URN Phantom (destruction complète)"""
         try:
             if phantom_id not in self.active_urns:
                 return False
             
-            # Supprimer dossier URN
+            # Supprimer dossier URN (segments + index)
             urn_dir = self.storage_dir / phantom_id
-            if urn_dir.exists():
-                import shutil
-                shutil.rmtree(urn_dir)
+            remove_urn_directory(urn_dir, self.ash_containers.pop(phantom_id, None))
             
             # Nettoyer registres
             del self.active_urns[phantom_id]
             if phantom_id in self.urn_fragments:
                 del self.urn_fragments[phantom_id]
-            if phantom_id in self.phantom_cache:
-                del self.phantom_cache[phantom_id]
+            for level in self.pyramid_fragments.pop(phantom_id, {}):
+                self.phantom_cache.invalidate((phantom_id, level))
+            self.phantom_cache.invalidate(phantom_id)
             if phantom_id in self.activation_keys:
                 del self.activation_keys[phantom_id]
+            self._notify_invalidation(phantom_id)
             
             logger.info(f"🔥 URN Phantom détruite: {phantom_id}")
             return True
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+⚡ BENCHMARK - Cryptage vectorisé des cendres Phantom
+=====================================================
+Compare burn + résurrection d'AuthenticPhantomUrnSystem:
+- fernet        : un JSON crypté Fernet par pixel (historique)
+- aes-ctr-bulk  : enregistrements NumPy cryptés par lots AES-CTR
+
+Le mode Fernet est mesuré sur un échantillon puis extrapolé au nombre de
+pixels de l'image cible (un burn Fernet 4K complet dure des heures).
+
+Usage:
+    python benchmark_bulk_cipher.py                  # 4K (3840x2160)
+    python benchmark_bulk_cipher.py --width 1920 --height 1080
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from authentic_phantom_urn_system import AuthenticPhantomUrnSystem
+from bulk_ash_cipher import CIPHER_MODE_BULK, CIPHER_MODE_FERNET
+
+TARGET_SPEEDUP = 100
+
+
+def _synthetic_image(path: str, width: int, height: int):
+    rng = np.random.default_rng(42)
+    Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)).save(path)
+
+
+def _run(cipher_mode: str, image_path: str, storage_dir: str):
+    """Retourne (secondes burn, secondes résurrection, image reconstruite)"""
+    system = AuthenticPhantomUrnSystem(storage_dir, cipher_mode=cipher_mode)
+
+    start = time.perf_counter()
+    result = system.burn_image_to_phantom_urn(image_path, "benchmark", "benchmark_node")
+    burn_seconds = time.perf_counter() - start
+
+    system.phantom_cache.clear()
+    start = time.perf_counter()
+    reconstructed = system.get_phantom_for_projection(result["phantom_id"], "benchmark_token")
+    resurrect_seconds = time.perf_counter() - start
+
+    system.delete_phantom_urn(result["phantom_id"])
+    return burn_seconds, resurrect_seconds, reconstructed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cryptage vectorisé des cendres Phantom")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--fernet-sample", type=int, default=128,
+                        help="Côté de l'échantillon mesuré en mode Fernet (extrapolé)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix="phantom_bench_")
+
+    try:
+        target_pixels = args.width * args.height
+        sample_pixels = args.fernet_sample * args.fernet_sample
+
+        target_path = os.path.join(work_dir, "target.png")
+        sample_path = os.path.join(work_dir, "sample.png")
+        _synthetic_image(target_path, args.width, args.height)
+        _synthetic_image(sample_path, args.fernet_sample, args.fernet_sample)
+
+        print(f"⚡ Benchmark cendres Phantom: {args.width}x{args.height} ({target_pixels} pixels)")
+        print("=" * 60)
+
+        fernet_burn, fernet_resurrect, _ = _run(CIPHER_MODE_FERNET, sample_path, os.path.join(work_dir, "fernet"))
+        scale = target_pixels / sample_pixels
+        fernet_burn *= scale
+        fernet_resurrect *= scale
+        print(f"🐢 {CIPHER_MODE_FERNET:13s} burn {fernet_burn:10.2f}s  résurrection {fernet_resurrect:10.2f}s"
+              f"  (extrapolé depuis {args.fernet_sample}x{args.fernet_sample})")
+
+        bulk_burn, bulk_resurrect, reconstructed = _run(CIPHER_MODE_BULK, target_path, os.path.join(work_dir, "bulk"))
+        print(f"⚡ {CIPHER_MODE_BULK:13s} burn {bulk_burn:10.2f}s  résurrection {bulk_resurrect:10.2f}s")
+
+        original = np.array(Image.open(target_path).convert('RGB'))
+        identical = reconstructed is not None and np.array_equal(original, reconstructed)
+        print(f"🔍 Reconstruction identique: {identical}")
+
+        burn_speedup = fernet_burn / bulk_burn
+        resurrect_speedup = fernet_resurrect / bulk_resurrect
+        print("=" * 60)
+        print(f"🚀 Accélération burn: x{burn_speedup:.0f}   résurrection: x{resurrect_speedup:.0f}"
+              f"   (objectif x{TARGET_SPEEDUP})")
+
+        ok = identical and burn_speedup >= TARGET_SPEEDUP and resurrect_speedup >= TARGET_SPEEDUP
+        print("✅ Objectif atteint" if ok else "❌ Objectif non atteint")
+        return 0 if ok else 1
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
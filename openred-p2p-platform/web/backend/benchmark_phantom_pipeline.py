@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+📊 BENCHMARK - Pipeline Phantom URN (burn / résurrection / suppression)
+======================================================================
+Harnais autonome (aucun serveur requis) couvrant les trois systèmes:
+- enhanced  : EnhancedPhantomUrnSystem (cendres + Phoenix de Schrödinger)
+- authentic : AuthenticPhantomUrnSystem (cendres + projection Phoenix)
+- engine    : PhantomImageURNEngine (cendres en mémoire, racine Merkle)
+
+Chaque cas (système × taille) tourne dans un processus neuf: le pic RSS
+(ru_maxrss) est celui du cas seul. Images synthétiques déterministes.
+
+Mesures par cas:
+- durées et débit (mégapixels/s) du burn, de la résurrection à froid
+  (caches vidés) et à chaud, et de la suppression
+- pic RSS, fichiers et octets sur disque après burn, restes après suppression
+
+Sortie JSON stable (clés triées, un cas par système × taille) pour
+comparer deux versions avec un simple diff.
+
+Usage:
+    python benchmark_phantom_pipeline.py
+    python benchmark_phantom_pipeline.py --systems authentic,enhanced --sizes 64x64,1920x1080
+    python benchmark_phantom_pipeline.py --output bench.json --no-limits
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BACKEND_DIR, "..", ".."))
+sys.path.append(REPO_ROOT)
+
+SYSTEMS = ("enhanced", "authentic", "engine")
+DEFAULT_SIZES = "64x64,256x256,1024x1024,1920x1080,3840x2160"
+
+# Pixels max par défaut: le moteur crypte un JSON Fernet par pixel (en mémoire)
+DEFAULT_MAX_PIXELS = {
+    "enhanced": None,
+    "authentic": None,
+    "engine": 1024 * 1024,
+}
+
+BENCHMARK_OWNER = "benchmark_node"
+BENCHMARK_USER = "benchmark_user"
+
+
+def parse_sizes(text: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for item in text.split(","):
+        width, _, height = item.strip().lower().partition("x")
+        sizes.append((int(width), int(height or width)))
+    return sizes
+
+
+def synthetic_image(path: str, width: int, height: int):
+    """Image PNG déterministe (dégradés + bruit: compressible mais non triviale)"""
+    rng = np.random.default_rng(width * 100003 + height)
+    ys, xs = np.mgrid[0:height, 0:width]
+    image = np.stack([
+        (xs * 255 // max(1, width - 1)),
+        (ys * 255 // max(1, height - 1)),
+        rng.integers(0, 256, (height, width)),
+    ], axis=-1).astype(np.uint8)
+    Image.fromarray(image).save(path)
+
+
+def disk_usage(path: Path) -> Dict[str, int]:
+    files = 0
+    total = 0
+    if path.exists():
+        for entry in path.rglob("*"):
+            if entry.is_file():
+                files += 1
+                total += entry.stat().st_size
+    return {"files": files, "bytes": total}
+
+
+def peak_rss_bytes() -> int:
+    """Pic RSS du processus courant (ru_maxrss: Ko sous Linux, octets sous macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _timed(function: Callable[[], Any]) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+# ----------------------------------------------------------------------
+# Adaptateurs: burn / résurrection froide / chaude / suppression
+# ----------------------------------------------------------------------
+
+def _run_authentic(image_path: str, storage_dir: Path, options: Dict[str, Any]) -> Dict[str, Any]:
+    from authentic_phantom_urn_system import AuthenticPhantomUrnSystem
+
+    system = AuthenticPhantomUrnSystem(str(storage_dir), cipher_mode=options["cipher_mode"],
+                                       granularity=options["granularity"])
+    burn, result = _timed(lambda: system.burn_image_to_phantom_urn(image_path, "benchmark", BENCHMARK_OWNER))
+    phantom_id = result["phantom_id"]
+    system.phantom_cache.clear()
+    on_disk = disk_usage(storage_dir)
+
+    cold, image = _timed(lambda: system.get_phantom_for_projection(phantom_id, "benchmark_token"))
+    warm, _ = _timed(lambda: system.get_phantom_for_projection(phantom_id, "benchmark_token"))
+    delete, deleted = _timed(lambda: system.delete_phantom_urn(phantom_id))
+    system.phantom_cache.close()
+
+    return {"burn": burn, "resurrect_cold": cold, "resurrect_warm": warm, "delete": delete,
+            "deleted": deleted, "image": image, "disk": on_disk}
+
+
+def _run_enhanced(image_path: str, storage_dir: Path, options: Dict[str, Any]) -> Dict[str, Any]:
+    from enhanced_phantom_urn_system import EnhancedPhantomUrnSystem
+
+    system = EnhancedPhantomUrnSystem(str(storage_dir), cipher_mode=options["cipher_mode"],
+                                      granularity=options["granularity"])
+    burn, result = _timed(lambda: system.burn_image_to_phantom_urn(image_path, "benchmark", BENCHMARK_OWNER))
+    phantom_id = result["phantom_id"]
+    system.phoenix_projections.clear()
+    on_disk = disk_usage(storage_dir)
+
+    nck = system.authorize_user_for_phoenix(phantom_id, BENCHMARK_USER)
+    cold, image = _timed(lambda: system.request_phoenix_resurrection(phantom_id, BENCHMARK_USER, nck))
+    # Après rotation, la NCK attendue est la nouvelle NCK courante
+    rotated_nck = system.authorization_registry.user_authorizations[BENCHMARK_USER][phantom_id]["current_nck"]
+    warm, _ = _timed(lambda: system.request_phoenix_resurrection(phantom_id, BENCHMARK_USER, rotated_nck))
+    delete, deleted = _timed(lambda: system.delete_phantom_urn(phantom_id))
+    system.authorization_registry.running = False
+    system.schrodinger_cache.close()
+    system.phoenix_projections.close()
+
+    return {"burn": burn, "resurrect_cold": cold, "resurrect_warm": warm, "delete": delete,
+            "deleted": deleted, "image": image, "disk": on_disk}
+
+
+def _run_engine(image_path: str, storage_dir: Path, options: Dict[str, Any]) -> Dict[str, Any]:
+    from phantom_image_urn_system import PhantomImageURNEngine
+
+    async def scenario():
+        engine = PhantomImageURNEngine(None, BENCHMARK_OWNER, str(storage_dir), granularity=options["granularity"])
+        with open(image_path, "rb") as f:
+            image_data = f.read()
+
+        burn, result = await _timed_async(engine.burn_image_to_phantom_urn(image_data, "benchmark.png", BENCHMARK_OWNER))
+        urn_id = result["urn_id"]
+        on_disk = disk_usage(storage_dir)
+        in_memory = sum(
+            len(fragment.encrypted_color) + len(fragment.next_decrypt_key)
+            for fragment in engine.ash_fragments[urn_id].values()
+        )
+
+        token = await engine.request_authorization(urn_id, BENCHMARK_OWNER)
+        cold, image = await _timed_async(engine.phoenix_resurrection(urn_id, token))
+        warm, _ = await _timed_async(engine.phoenix_resurrection(urn_id, token))
+        delete, _ = await _timed_async(engine._burn_urn_completely(urn_id))
+
+        return {"burn": burn, "resurrect_cold": cold, "resurrect_warm": warm, "delete": delete,
+                "deleted": urn_id not in engine.active_urns, "image": image, "disk": on_disk,
+                "memory_ash_bytes": in_memory}
+
+    return asyncio.run(scenario())
+
+
+async def _timed_async(awaitable) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = await awaitable
+    return time.perf_counter() - start, result
+
+
+RUNNERS = {
+    "authentic": _run_authentic,
+    "enhanced": _run_enhanced,
+    "engine": _run_engine,
+}
+
+
+def run_case(system_name: str, width: int, height: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Un cas complet, exécuté dans un processus neuf (pic RSS isolé)"""
+    sys.path.insert(0, BACKEND_DIR)
+    logging.basicConfig(level=logging.WARNING)
+    # Les systèmes historiques affichent beaucoup: sortie standard du cas muette
+    sys.stdout = open(os.devnull, "w")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="phantom_pipeline_bench_"))
+    try:
+        image_path = str(work_dir / "source.png")
+        synthetic_image(image_path, width, height)
+        storage_dir = work_dir / "storage"
+        storage_dir.mkdir()
+        rss_before = peak_rss_bytes()
+
+        measures = RUNNERS[system_name](image_path, storage_dir, options)
+
+        pixels = width * height
+        megapixels = pixels / 1e6
+        image = measures.pop("image")
+        leftover = disk_usage(storage_dir)
+        case = {
+            "system": system_name,
+            "width": width,
+            "height": height,
+            "pixels": pixels,
+            "seconds": {stage: round(measures[stage], 4)
+                        for stage in ("burn", "resurrect_cold", "resurrect_warm", "delete")},
+            "throughput_mpix_s": {
+                stage: round(megapixels / measures[stage], 3) if measures[stage] > 0 else None
+                for stage in ("burn", "resurrect_cold", "resurrect_warm")
+            },
+            "peak_rss_bytes": peak_rss_bytes(),
+            "baseline_rss_bytes": rss_before,
+            "disk_files": measures["disk"]["files"],
+            "disk_bytes": measures["disk"]["bytes"],
+            "leftover_files_after_delete": leftover["files"],
+            "deleted": bool(measures["deleted"]),
+            "resurrected": image is not None,
+            "status": "ok",
+        }
+        if "memory_ash_bytes" in measures:
+            case["memory_ash_bytes"] = measures["memory_ash_bytes"]
+        return case
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def _print_case(case: Dict[str, Any]):
+    label = f"{case['system']:9s} {case['width']}x{case['height']}"
+    if case["status"] != "ok":
+        print(f"⏭️  {label:22s} {case['status']}")
+        return
+    seconds = case["seconds"]
+    throughput = case["throughput_mpix_s"]
+    print(f"📊 {label:22s} burn {seconds['burn']:8.3f}s ({throughput['burn'] or 0:8.2f} MPix/s)"
+          f"  résurrection {seconds['resurrect_cold']:8.3f}s ({throughput['resurrect_cold'] or 0:8.2f} MPix/s)"
+          f"  RSS {case['peak_rss_bytes'] / 2**20:7.1f} Mo"
+          f"  disque {case['disk_files']} fichiers / {case['disk_bytes'] / 2**20:.1f} Mo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark burn / résurrection / suppression Phantom URN")
+    parser.add_argument("--systems", default=",".join(SYSTEMS),
+                        help=f"Systèmes à mesurer parmi {', '.join(SYSTEMS)}")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Tailles LxH séparées par des virgules")
+    parser.add_argument("--cipher-mode", default="aes-ctr-bulk",
+                        help="Mode de cryptage des cendres (enhanced, authentic)")
+    parser.add_argument("--granularity", default="1x1", help="Granularité des cendres (1x1, 16, scanline...)")
+    parser.add_argument("--no-limits", action="store_true",
+                        help="Ignore les plafonds de pixels par système (moteur: cryptage Fernet par pixel)")
+    parser.add_argument("--output", help="Fichier JSON de résultats (sinon sortie standard)")
+    args = parser.parse_args()
+
+    systems = [name.strip() for name in args.systems.split(",") if name.strip()]
+    unknown = set(systems) - set(SYSTEMS)
+    if unknown:
+        parser.error(f"Systèmes inconnus: {', '.join(sorted(unknown))}")
+
+    options = {"cipher_mode": args.cipher_mode, "granularity": args.granularity}
+    report = {
+        "benchmark": "phantom_pipeline",
+        "environment": _environment(),
+        "options": options,
+        "cases": [],
+    }
+
+    print("📊 Benchmark pipeline Phantom URN", file=sys.stderr)
+    context = multiprocessing.get_context("spawn")
+    for system_name in systems:
+        for width, height in parse_sizes(args.sizes):
+            max_pixels = None if args.no_limits else DEFAULT_MAX_PIXELS[system_name]
+            if max_pixels is not None and width * height > max_pixels:
+                case = {"system": system_name, "width": width, "height": height,
+                        "pixels": width * height, "status": f"skipped (> {max_pixels} pixels, --no-limits)"}
+            else:
+                # Un processus par cas: pic RSS et état (caches, pools) isolés
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    try:
+                        case = executor.submit(run_case, system_name, width, height, options).result()
+                    except Exception as e:
+                        case = {"system": system_name, "width": width, "height": height,
+                                "pixels": width * height, "status": f"error: {e}"}
+            report["cases"].append(case)
+            with redirect_stdout(sys.stderr):
+                _print_case(case)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"💾 Résultats: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    return 0 if all(case["status"] == "ok" or case["status"].startswith("skipped") for case in report["cases"]) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
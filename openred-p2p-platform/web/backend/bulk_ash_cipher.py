@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+⚡ CRYPTAGE VECTORISÉ DES CENDRES - Phantom URN
+===============================================
+Chemin de cryptage en masse des fragments pixel: au lieu d'un dict JSON
+crypté par Fernet pour chaque pixel, les fragments sont des enregistrements
+NumPy de 16 octets cryptés par lots en AES-CTR.
+
+Propriété conservée: chaque fragment se décrypte indépendamment.
+- Un lot = une clé AES dérivée (même dérivation que les cendres Fernet)
+  + un préfixe de nonce aléatoire de 8 octets
+- Fragment i du lot = bloc compteur `préfixe || i × blocs par enregistrement`
+  → n'importe quel fragment se décrypte seul, sans lire ses voisins
+
+Granularité: un enregistrement par pixel (16 octets) ou par tuile
+(en-tête 16 octets + pixels de la tuile, complété à un multiple de 16).
+
+Format d'un lot (blob stocké dans le conteneur packé):
+    magic (4) | préfixe nonce (8) | nombre d'enregistrements (u32)
+    | taille d'enregistrement (u32, lots ORB2 uniquement) | enregistrements
+"""
+
+import os
+import sys
+import base64
+import hashlib
+import secrets
+import struct
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+# Modules partagés avec le cœur P2P (racine du dépôt)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from core.fragment_granularity import split_tiles, place_tiles
+
+CIPHER_MODE_BULK = "aes-ctr-bulk"
+CIPHER_MODE_FERNET = "fernet"
+
+BATCH_MAGIC = b"ORB1"          # enregistrements pixel de 16 octets
+TILE_BATCH_MAGIC = b"ORB2"     # taille d'enregistrement dans l'en-tête
+_BATCH_HEADER = struct.Struct("<4s8sI")
+_TILE_BATCH_HEADER = struct.Struct("<4s8sII")
+AES_BLOCK = 16
+
+# Un enregistrement = un bloc AES (16 octets): position, chaînage, couleur
+ASH_RECORD_DTYPE = np.dtype([
+    ("x", "<u4"),
+    ("y", "<u4"),
+    ("next", "<u4"),      # index de stockage du fragment suivant (chaînage)
+    ("rgb", "u1", (3,)),
+    ("marker", "u1"),     # contrôle de décryptage
+])
+RECORD_MARKER = 0xA5
+RECORD_SIZE = ASH_RECORD_DTYPE.itemsize
+
+assert RECORD_SIZE == 16
+
+# Octets d'enregistrements par lot crypté
+DEFAULT_BATCH_BYTES = 4 * 1024 * 1024
+
+
+def derive_fragment_key(fragment_name: str, phantom_id: str) -> bytes:
+    """Clé Fernet (base64) d'une cendre ou d'un lot, dérivée de son nom et de l'URN"""
+    key_material = f"{fragment_name}:{phantom_id}".encode()
+    digest = hashlib.sha256(key_material).digest()
+    return base64.urlsafe_b64encode(digest[:32])
+
+
+def derive_batch_key(batch_name: str, phantom_id: str) -> bytes:
+    """Clé AES-256 brute d'un lot (même dérivation que les cendres Fernet)"""
+    return base64.urlsafe_b64decode(derive_fragment_key(batch_name, phantom_id))
+
+
+def tile_record_dtype(tile_width: int, tile_height: int) -> np.dtype:
+    """Enregistrement d'une tuile: en-tête 16 octets + pixels, aligné sur un bloc AES"""
+    if tile_width == 1 and tile_height == 1:
+        return ASH_RECORD_DTYPE
+
+    fields = [
+        ("x", "<u4"),
+        ("y", "<u4"),
+        ("next", "<u4"),
+        ("w", "<u2"),     # largeur effective (tuiles de bord tronquées)
+        ("h", "<u2"),
+        ("rgb", "u1", (tile_height, tile_width, 3)),
+    ]
+    padding = -(16 + tile_width * tile_height * 3) % AES_BLOCK
+    if padding:
+        fields.append(("pad", "u1", (padding,)))
+    return np.dtype(fields)
+
+
+def _shuffled_chain(total: int, rng: np.random.Generator,
+                    shard_sizes: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ordre de stockage mélangé + chaînage: le fragment p pointe vers
+    l'emplacement de stockage du fragment p+1 (circulaire).
+    Retourne (storage_order, next) où storage_order[s] = fragment à l'emplacement s.
+
+    shard_sizes: mélange limité à chaque bande (fragments et emplacements
+    contigus par bande), le chaînage reste global à l'image.
+    """
+    if shard_sizes is None:
+        storage_order = rng.permutation(total).astype(np.uint32)
+    else:
+        offsets = np.concatenate(([0], np.cumsum(shard_sizes)[:-1]))
+        storage_order = np.concatenate([
+            offset + rng.permutation(size) for offset, size in zip(offsets, shard_sizes)
+        ]).astype(np.uint32)
+    slot_of_fragment = np.empty(total, dtype=np.uint32)
+    slot_of_fragment[storage_order] = np.arange(total, dtype=np.uint32)
+    return storage_order, slot_of_fragment[(storage_order.astype(np.int64) + 1) % total]
+
+
+def build_pixel_records(img_array: np.ndarray, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Enregistrements pixel (16 octets) d'une image (H, W, 3), en ordre de stockage mélangé"""
+    height, width, _ = img_array.shape
+    storage_order, next_slots = _shuffled_chain(width * height, rng or np.random.default_rng())
+    return build_shard_records(img_array, 0, 1, 1, storage_order, next_slots)
+
+
+def build_tile_records(img_array: np.ndarray, tile_width: int, tile_height: int,
+                       rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Enregistrements de tuiles d'une image (H, W, 3), même mélange et chaînage que les pixels"""
+    height, width, _ = img_array.shape
+    total = -(-width // tile_width) * -(-height // tile_height)
+    storage_order, next_slots = _shuffled_chain(total, rng or np.random.default_rng())
+    return build_shard_records(img_array, 0, tile_width, tile_height, storage_order, next_slots)
+
+
+def build_shard_records(shard_array: np.ndarray, row_offset: int, tile_width: int, tile_height: int,
+                        storage_order: np.ndarray, next_slots: np.ndarray) -> np.ndarray:
+    """
+    Enregistrements d'une bande de lignes (row_offset aligné sur tile_height).
+    storage_order: indices globaux (ligne par ligne) des tuiles de la bande, en ordre de stockage.
+    """
+    height, width, _ = shard_array.shape
+    tiles_x = -(-width // tile_width)
+    local_order = storage_order.astype(np.int64) - (row_offset // tile_height) * tiles_x
+
+    if tile_width == 1 and tile_height == 1:
+        records = np.empty(len(local_order), dtype=ASH_RECORD_DTYPE)
+        records["x"] = local_order % width
+        records["y"] = local_order // width + row_offset
+        records["next"] = next_slots
+        records["rgb"] = shard_array.reshape(-1, 3)[local_order]
+        records["marker"] = RECORD_MARKER
+        return records
+
+    tiles, xs, ys, widths, heights = split_tiles(shard_array, tile_width, tile_height)
+    records = np.zeros(len(local_order), dtype=tile_record_dtype(tile_width, tile_height))
+    records["x"] = xs[local_order]
+    records["y"] = ys[local_order] + row_offset
+    records["next"] = next_slots
+    records["w"] = widths[local_order]
+    records["h"] = heights[local_order]
+    records["rgb"] = tiles[local_order]
+    return records
+
+
+def _counter_block(nonce_prefix: bytes, index: int) -> bytes:
+    return nonce_prefix + index.to_bytes(8, "big")
+
+
+def encrypt_batch(key: bytes, records: np.ndarray) -> bytes:
+    """Crypte un lot d'enregistrements en un seul appel AES-CTR"""
+    nonce_prefix = os.urandom(8)
+    encryptor = Cipher(algorithms.AES(key), modes.CTR(_counter_block(nonce_prefix, 0))).encryptor()
+    ciphertext = encryptor.update(records.tobytes()) + encryptor.finalize()
+    if records.dtype == ASH_RECORD_DTYPE:
+        header = _BATCH_HEADER.pack(BATCH_MAGIC, nonce_prefix, len(records))
+    else:
+        header = _TILE_BATCH_HEADER.pack(TILE_BATCH_MAGIC, nonce_prefix, len(records), records.dtype.itemsize)
+    return header + ciphertext
+
+
+def parse_batch_header(blob: bytes) -> Tuple[bytes, int, int, int]:
+    """Retourne (préfixe nonce, nombre d'enregistrements, taille d'enregistrement, taille d'en-tête)"""
+    magic = bytes(blob[:4])
+    if magic == BATCH_MAGIC:
+        _, nonce_prefix, count = _BATCH_HEADER.unpack_from(blob, 0)
+        return nonce_prefix, count, RECORD_SIZE, _BATCH_HEADER.size
+    if magic == TILE_BATCH_MAGIC:
+        _, nonce_prefix, count, record_size = _TILE_BATCH_HEADER.unpack_from(blob, 0)
+        return nonce_prefix, count, record_size, _TILE_BATCH_HEADER.size
+    raise ValueError("Lot de cendres invalide")
+
+
+def _valid_records(records: np.ndarray) -> np.ndarray:
+    """Filtre les enregistrements mal décryptés (marqueur ou dimensions incohérentes)"""
+    if "marker" in records.dtype.names:
+        return records[records["marker"] == RECORD_MARKER]
+    tile_height, tile_width = records.dtype["rgb"].shape[:2]
+    valid = (records["w"] > 0) & (records["w"] <= tile_width) & (records["h"] > 0) & (records["h"] <= tile_height)
+    return records[valid]
+
+
+def decrypt_batch(key: bytes, blob: bytes, dtype: np.dtype = ASH_RECORD_DTYPE) -> np.ndarray:
+    """Décrypte un lot complet en un seul appel AES-CTR (enregistrements valides uniquement)"""
+    nonce_prefix, count, record_size, header_size = parse_batch_header(blob)
+    if record_size != dtype.itemsize:
+        raise ValueError(f"Taille d'enregistrement inattendue: {record_size} != {dtype.itemsize}")
+    decryptor = Cipher(algorithms.AES(key), modes.CTR(_counter_block(nonce_prefix, 0))).decryptor()
+    body = memoryview(blob)[header_size:header_size + count * record_size]
+    records = np.frombuffer(decryptor.update(body) + decryptor.finalize(), dtype=dtype)
+    return _valid_records(records)
+
+
+def decrypt_fragment(key: bytes, blob: bytes, index: int, dtype: np.dtype = ASH_RECORD_DTYPE) -> Optional[np.void]:
+    """Décrypte un seul fragment d'un lot (premier bloc compteur `préfixe || index * blocs`)"""
+    nonce_prefix, count, record_size, header_size = parse_batch_header(blob)
+    if not 0 <= index < count or record_size != dtype.itemsize:
+        return None
+    start = header_size + index * record_size
+    first_block = index * (record_size // AES_BLOCK)
+    decryptor = Cipher(algorithms.AES(key), modes.CTR(_counter_block(nonce_prefix, first_block))).decryptor()
+    plain = decryptor.update(blob[start:start + record_size]) + decryptor.finalize()
+    records = _valid_records(np.frombuffer(plain, dtype=dtype))
+    return records[0] if len(records) else None
+
+
+def iter_record_batches(records: np.ndarray, batch_bytes: int = DEFAULT_BATCH_BYTES) -> Iterable[np.ndarray]:
+    batch_size = max(1, batch_bytes // records.dtype.itemsize)
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+
+def encrypt_record_batches(records: np.ndarray, phantom_id: str,
+                           batch_bytes: int = DEFAULT_BATCH_BYTES) -> List[Tuple[str, bytes]]:
+    """Découpe et crypte des enregistrements en lots nommés aléatoirement (clé dérivée du nom)"""
+    batches = []
+    for batch_records in iter_record_batches(records, batch_bytes):
+        batch_name = f"ashbatch_{secrets.token_hex(16)}"
+        batches.append((batch_name, encrypt_batch(derive_batch_key(batch_name, phantom_id), batch_records)))
+    return batches
+
+
+def burn_record_shard(shard_array: np.ndarray, row_offset: int, tile_size: Tuple[int, int], phantom_id: str,
+                      storage_order: np.ndarray, next_slots: np.ndarray) -> List[Tuple[str, bytes]]:
+    """Construit et crypte les lots d'une bande de lignes (exécutable dans un processus worker)"""
+    records = build_shard_records(shard_array, row_offset, *tile_size, storage_order, next_slots)
+    return encrypt_record_batches(records, phantom_id)
+
+
+def scatter_records(target: np.ndarray, records: np.ndarray):
+    """Place les pixels ou tuiles décryptés dans l'image (scatter vectorisé)"""
+    if "marker" not in records.dtype.names:
+        place_tiles(target, records["x"], records["y"], records["rgb"])
+        return
+    height, width = target.shape[:2]
+    valid = (records["x"] < width) & (records["y"] < height)
+    records = records[valid]
+    target[records["y"], records["x"]] = records["rgb"]
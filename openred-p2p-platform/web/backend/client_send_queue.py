@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+📤 FILES D'ENVOI PAR CLIENT - WebSockets
+========================================
+Un client sur un lien lent ne doit pas retarder les autres: chaque
+connexion a sa file sortante bornée et sa tâche d'écriture. Diffuser un
+message revient à l'enfiler (sans attente) dans la file de chaque client.
+
+- coalesce-latest: un message portant une clé de fusion remplace, à sa
+  place dans la file, le message en attente de même clé (dernier statut,
+  dernière projection d'un phantom)
+- drop-oldest: file pleine → le plus ancien message jetable est abandonné
+- client lent: au-dessus du seuil haut plus de slow_after secondes (ou un
+  envoi bloqué aussi longtemps) → on_slow (déconnexion)
+- métriques par file: profondeur, envoyés, abandonnés, fusionnés...
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Payload = Union[str, bytes]
+
+DEFAULT_QUEUE_MESSAGES = 64
+
+# Seuil haut (messages en attente) au-delà duquel le client est surveillé
+DEFAULT_HIGH_WATER = 48
+
+# Durée tolérée au-dessus du seuil haut (ou pour un seul envoi)
+DEFAULT_SLOW_CLIENT_SECONDS = 10.0
+
+
+@dataclass
+class _Outgoing:
+    payload: Payload
+    coalesce_key: Optional[Hashable]
+    droppable: bool
+
+
+class ClientSendQueue:
+    """File sortante bornée d'une connexion WebSocket, vidée par une tâche d'écriture dédiée"""
+
+    def __init__(self, send: Callable[[Payload], Awaitable[None]],
+                 on_slow: Optional[Callable[[], Awaitable[None]]] = None, name: str = "client",
+                 max_messages: int = DEFAULT_QUEUE_MESSAGES, high_water: int = DEFAULT_HIGH_WATER,
+                 slow_after: float = DEFAULT_SLOW_CLIENT_SECONDS):
+        self.send = send
+        self.on_slow = on_slow
+        self.name = name
+        self.max_messages = max_messages
+        self.high_water = min(high_water, max_messages)
+        self.slow_after = slow_after
+
+        self.closed = False
+        self._items: Deque[_Outgoing] = deque()
+        self._pending_keys: Dict[Hashable, _Outgoing] = {}
+        self._ready = asyncio.Event()
+        self._over_since: Optional[float] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.metrics = {
+            "queued": 0, "sent": 0, "bytes_sent": 0, "dropped": 0, "coalesced": 0,
+            "max_depth": 0, "send_errors": 0, "slow_disconnects": 0,
+        }
+
+    def start(self) -> "ClientSendQueue":
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._run())
+        return self
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def put(self, payload: Payload, coalesce_key: Optional[Hashable] = None, droppable: bool = True) -> bool:
+        """Enfile sans attendre; False si le message est abandonné (file pleine, client fermé)"""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None and coalesce_key in self._pending_keys:
+            self._pending_keys[coalesce_key].payload = payload
+            self.metrics["coalesced"] += 1
+            return True
+
+        if len(self._items) >= self.max_messages:
+            victim = next((item for item in self._items if item.droppable), None)
+            if victim is not None:
+                self._items.remove(victim)
+                if victim.coalesce_key is not None:
+                    self._pending_keys.pop(victim.coalesce_key, None)
+                self.metrics["dropped"] += 1
+            elif droppable:
+                self.metrics["dropped"] += 1
+                return False
+            # Message de contrôle sur une file pleine de contrôle: dépassement, le seuil haut tranchera
+
+        item = _Outgoing(payload, coalesce_key, droppable)
+        self._items.append(item)
+        if coalesce_key is not None:
+            self._pending_keys[coalesce_key] = item
+        self.metrics["queued"] += 1
+        self.metrics["max_depth"] = max(self.metrics["max_depth"], len(self._items))
+        self._ready.set()
+        self._check_slow()
+        return True
+
+    def close(self):
+        """Arrête la tâche d'écriture; les messages en attente sont abandonnés"""
+        self.closed = True
+        self._items.clear()
+        self._pending_keys.clear()
+        if self._writer is not None:
+            self._writer.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"depth": self.depth, **self.metrics}
+
+    async def _run(self):
+        while not self.closed:
+            if not self._items:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            item = self._items.popleft()
+            if item.coalesce_key is not None and self._pending_keys.get(item.coalesce_key) is item:
+                del self._pending_keys[item.coalesce_key]
+
+            try:
+                await asyncio.wait_for(self.send(item.payload), self.slow_after)
+            except asyncio.TimeoutError:
+                self._mark_slow()
+                return
+            except Exception as e:
+                self.metrics["send_errors"] += 1
+                logger.warning(f"⚠️ Envoi impossible vers {self.name}: {e}")
+                self.close()
+                return
+
+            self.metrics["sent"] += 1
+            self.metrics["bytes_sent"] += len(item.payload)
+            self._check_slow()
+
+    def _check_slow(self):
+        if len(self._items) < self.high_water:
+            self._over_since = None
+            return
+        now = time.monotonic()
+        if self._over_since is None:
+            self._over_since = now
+        elif now - self._over_since > self.slow_after:
+            self._mark_slow()
+
+    def _mark_slow(self):
+        if self.closed:
+            return
+        self.metrics["slow_disconnects"] += 1
+        logger.warning(f"🐢 Client lent déconnecté: {self.name} ({self.depth} messages en attente)")
+        self.close()
+        if self.on_slow is not None:
+            asyncio.ensure_future(self.on_slow())
+
+
+class SendQueueRegistry:
+    """Files des connexions ouvertes + métriques cumulées des connexions fermées"""
+
+    def __init__(self, max_messages: int = DEFAULT_QUEUE_MESSAGES, high_water: int = DEFAULT_HIGH_WATER,
+                 slow_after: float = DEFAULT_SLOW_CLIENT_SECONDS):
+        self.max_messages = max_messages
+        self.high_water = high_water
+        self.slow_after = slow_after
+        self.queues: Dict[Hashable, ClientSendQueue] = {}
+        self._retired: Dict[str, int] = {}
+
+    def open(self, connection: Hashable, send: Callable[[Payload], Awaitable[None]],
+             on_slow: Optional[Callable[[], Awaitable[None]]] = None, name: str = "client") -> ClientSendQueue:
+        queue = ClientSendQueue(send, on_slow, name, self.max_messages, self.high_water, self.slow_after)
+        self.queues[connection] = queue.start()
+        return queue
+
+    def get(self, connection: Hashable) -> Optional[ClientSendQueue]:
+        return self.queues.get(connection)
+
+    def close(self, connection: Hashable):
+        queue = self.queues.pop(connection, None)
+        if queue is None:
+            return
+        queue.close()
+        for name, value in queue.metrics.items():
+            if name != "max_depth":
+                self._retired[name] = self._retired.get(name, 0) + value
+
+    def broadcast(self, payload: Payload, coalesce_key: Optional[Hashable] = None) -> int:
+        """Enfile le même message pour chaque connexion; retourne le nombre de files qui l'ont accepté"""
+        return sum(queue.put(payload, coalesce_key) for queue in list(self.queues.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        totals: Dict[str, Any] = dict(self._retired)
+        totals.update(connections=len(self.queues), depth=0, max_depth=0)
+        for queue in self.queues.values():
+            queue_stats = queue.stats()
+            totals["max_depth"] = max(totals["max_depth"], queue_stats.pop("max_depth"))
+            for name, value in queue_stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
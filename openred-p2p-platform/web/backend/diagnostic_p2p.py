@@ -62,7 +62,7 @@ async def test_p2p_discovery():
                     target_port = beacon.p2p_endpoint["port"]  # Extraire du dictionnaire
                     
                     print(f"   Tentative connexion {target_ip}:{target_port}")
-                    session_id = test_node.p2p_connection.connect_to_peer(target_ip, target_port, fp)
+                    session_id = await test_node.p2p_transport.connect_to_peer(target_ip, target_port, fp)
                     
                     if session_id:
                         print(f"   ✅ Connexion réussie: {session_id}")
@@ -74,7 +74,7 @@ async def test_p2p_discovery():
                             "timestamp": time.time()
                         }
                         
-                        success = test_node.p2p_connection.send_secure_message(session_id, test_message)
+                        success = await test_node.p2p_transport.send_secure_message(session_id, test_message)
                         print(f"   📤 Message test envoyé: {success}")
                         
                     else:
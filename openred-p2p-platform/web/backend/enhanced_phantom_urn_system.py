@@ -14,12 +14,12 @@ Innovation: Diego Morales Magri - Octobre 2025
 """
 
 import os
+import sys
 import json
-import hashlib
 import secrets
 import time
 import numpy as np
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, List, Tuple, Optional, Any
 from PIL import Image
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes, serialization
@@ -33,6 +33,19 @@ import threading
 import requests
 from pathlib import Path
 
+from ash_container import AshContainer, LEGACY_SUFFIX, remove_urn_directory
+from bulk_ash_cipher import CIPHER_MODE_BULK, derive_fragment_key
+# Modules partagés avec le cœur P2P (racine du dépôt)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from core.fragment_granularity import GRANULARITY_PIXEL, FragmentGranularity, split_tiles
+from phantom_cache import (
+    DEFAULT_CACHE_BYTES, DEFAULT_PROJECTION_TTL, DEFAULT_SPILL_BYTES, POLICY_LFU, BoundedPhantomCache,
+    EncryptedSpillStore
+)
+from parallel_burn import (
+    BurnCancelled, BurnProgress, ParallelBurnPool, burn_bulk_ashes, row_shards, run_shards, write_shards
+)
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -145,6 +158,18 @@ class AuthorizationRegistry:
         logger.info(f"🔄 NCK rotée pour {user_id} sur URN {urn_id[:8]}...")
         return True, auth_info["next_nck"]
     
+    def revoke_user_for_urn(self, user_id: str, urn_id: str) -> bool:
+        """Révoquer l'autorisation d'un utilisateur (NCKs invalidées)"""
+        auth_info = self.user_authorizations.get(user_id, {}).pop(urn_id, None)
+        if auth_info is None:
+            return False
+        
+        for nck_id in (auth_info["current_nck"], auth_info["next_nck"]):
+            self.active_ncks.pop(nck_id, None)
+        
+        logger.info(f"🚫 Autorisation révoquée pour {user_id} sur URN {urn_id[:8]}...")
+        return True
+    
     def start_continuous_verification(self):
         """Démarrer vérification continue des autorisations"""
         if self.verification_thread is None:
@@ -180,34 +205,107 @@ class AuthorizationRegistry:
                 logger.error(f"❌ Erreur vérification continue: {e}")
                 time.sleep(60)
 
+def _atomize_shard(shard_array: np.ndarray, row_offset: int, tile_size: Tuple[int, int],
+                   phantom_id: str) -> List[Tuple[str, bytes]]:
+    """⚛️ Cendres Fernet d'une bande de lignes (exécutable dans un processus worker)"""
+    tiles, xs, ys, widths, heights = split_tiles(shard_array, *tile_size)
+    is_pixel = tuple(tile_size) == (1, 1)
+    ashes = []
+    
+    for fragment_index in range(len(tiles)):
+        x, y = int(xs[fragment_index]), int(ys[fragment_index]) + row_offset
+        w, h = int(widths[fragment_index]), int(heights[fragment_index])
+        tile = tiles[fragment_index, :h, :w]
+        
+        # Créer fragment (cendre)
+        fragment_data = {
+            "phantom_id": phantom_id,
+            "position": [x, y],
+            "color_rgb": [int(c) for c in tile[0, 0]],
+            "timestamp": time.time()
+        }
+        if not is_pixel:
+            fragment_data["size"] = [w, h]
+            fragment_data["tile_rgb"] = base64.b64encode(tile.tobytes()).decode()
+        
+        # Crypter fragment
+        cipher = Fernet(derive_fragment_key(f"ash_{x}_{y}", phantom_id))
+        encrypted_fragment = cipher.encrypt(json.dumps(fragment_data).encode())
+        
+        # Nom aléatoire pour empêcher reconstruction (clé logique du conteneur)
+        ashes.append((f"ash_{secrets.token_hex(16)}.pxl", encrypted_fragment))
+    
+    return ashes
+
 class EnhancedPhantomUrnSystem:
     """🌀 Système URN Phantom amélioré avec Phoenix de Schrödinger et NCK"""
     
-    def __init__(self, storage_dir: str, projection_server_url: str = None):
+    # Nombre de cendres écrites par appel au conteneur packé
+    ASH_WRITE_BATCH = 4096
+    
+    def __init__(self, storage_dir: str, projection_server_url: str = None,
+                 cipher_mode: str = CIPHER_MODE_BULK, granularity: str = GRANULARITY_PIXEL,
+                 cache_max_bytes: int = DEFAULT_CACHE_BYTES, cache_ttl: Optional[float] = DEFAULT_PROJECTION_TTL,
+                 cache_spill_dir: Optional[str] = None, cache_spill_bytes: Optional[int] = DEFAULT_SPILL_BYTES):
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(exist_ok=True)
         self.projection_server_url = projection_server_url
+        self.cipher_mode = cipher_mode  # aes-ctr-bulk (lots vectorisés) ou fernet (un JSON par pixel)
+        self.granularity = FragmentGranularity.parse(granularity)  # taille des cendres (1x1, NxN, scanline)
         
         # Composants révolutionnaires
         self.authorization_registry = AuthorizationRegistry()
-        self.schrodinger_cache: Dict[str, SchrodingerPhoenix] = {}
         self.session_keys: Dict[str, bytes] = {}
         
+        # États Schrödinger: seule copie de la matrice cryptée → débordés sur disque
+        # (crypté) au-delà de la borne mémoire; le disque est lui aussi borné
+        # (cache_spill_bytes), les états débordés les plus anciens sont alors perdus
+        self.schrodinger_cache = BoundedPhantomCache(
+            "schrodinger_cache", max_bytes=cache_max_bytes, policy=POLICY_LFU,
+            spill=EncryptedSpillStore(
+                os.path.join(cache_spill_dir, "schrodinger") if cache_spill_dir else None,
+                max_bytes=cache_spill_bytes
+            )
+        )
+        
         # État système
         self.active_urns: Dict[str, dict] = {}
-        self.phoenix_projections: Dict[str, np.ndarray] = {}
+        # Projections décryptées: reconstructibles, bornées + TTL (débordement optionnel)
+        self.phoenix_projections = BoundedPhantomCache(
+            "phoenix_projections", max_bytes=cache_max_bytes, ttl=cache_ttl,
+            spill=EncryptedSpillStore(
+                os.path.join(cache_spill_dir, "projections"), max_bytes=cache_spill_bytes
+            ) if cache_spill_dir else None
+        )
+        self.ash_containers: Dict[str, AshContainer] = {}
+        
+        # Abonnés prévenus à la suppression / révocation (caches de frames encodées)
+        self.invalidation_listeners: List[Callable[[str], None]] = []
         
         # Démarrer vérification continue
         self.authorization_registry.start_continuous_verification()
         
         logger.info("🔥 Enhanced Phantom URN System initialisé avec Phoenix de Schrödinger")
     
-    def burn_image_to_phantom_urn(self, image_path: str, phantom_name: str, authorized_node: str) -> Dict[str, Any]:
-        """🔥 Brûler image → Phoenix de Schrödinger (jamais reconstruction complète)"""
+    def burn_image_to_phantom_urn(self, image_path: str, phantom_name: str, authorized_node: str,
+                                  granularity: Optional[str] = None,
+                                  burn_pool: Optional[ParallelBurnPool] = None,
+                                  progress: Optional[BurnProgress] = None) -> Dict[str, Any]:
+        """
+        🔥 Brûler image → Phoenix de Schrödinger (jamais reconstruction complète)
+        burn_pool: pool de processus pour crypter les bandes de lignes en parallèle
+        progress: progression (cendres écrites), durées par étape et annulation
+        """
+        progress = progress or BurnProgress()
         try:
-            image = Image.open(image_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            with progress.stage("decode"):
+                image = Image.open(image_path)
+                if image.mode != 'RGB':
+                    image = image.convert('RGB')
+                image.load()
+            
+            fragment_granularity = FragmentGranularity.parse(granularity or self.granularity)
+            tile_size = fragment_granularity.resolve(image.width, image.height)
             
             phantom_id = f"phantom_{secrets.token_hex(8)}_{int(time.time())}"
             
@@ -215,11 +313,30 @@ class EnhancedPhantomUrnSystem:
             urn_dir = self.storage_dir / phantom_id
             urn_dir.mkdir(exist_ok=True)
             
-            # Fragmentation atomique en cendres
-            fragments_created = self._atomize_to_ashes(image, urn_dir, phantom_id)
-            
-            # Générer Phoenix de Schrödinger (JAMAIS reconstruction complète)
-            schrodinger_phoenix = self._create_schrodinger_phoenix(image, phantom_id, authorized_node)
+            try:
+                progress.start(-(-image.width // tile_size[0]) * -(-image.height // tile_size[1]))
+                
+                # Fragmentation atomique en cendres
+                if self.cipher_mode == CIPHER_MODE_BULK:
+                    fragments_created = self._bulk_atomize_to_ashes(
+                        image, urn_dir, phantom_id, tile_size, burn_pool, progress
+                    )
+                else:
+                    fragments_created = self._atomize_to_ashes(
+                        image, urn_dir, phantom_id, tile_size, burn_pool, progress
+                    )
+                
+                # Générer Phoenix de Schrödinger (JAMAIS reconstruction complète)
+                with progress.stage("encrypt"):
+                    schrodinger_phoenix = self._create_schrodinger_phoenix(image, phantom_id, authorized_node)
+                progress.check_cancelled()
+            except Exception:
+                # Burn interrompu ou en échec: pas d'URN partielle sur disque
+                self.session_keys.pop(phantom_id, None)
+                remove_urn_directory(urn_dir, self.ash_containers.pop(phantom_id, None))
+                raise
+            finally:
+                self._close_container_writer(phantom_id)
             
             # Enregistrer dans cache
             self.schrodinger_cache[phantom_id] = schrodinger_phoenix
@@ -233,7 +350,10 @@ class EnhancedPhantomUrnSystem:
                 "creation_timestamp": time.time(),
                 "authorized_node": authorized_node,
                 "schrodinger_enabled": True,
-                "nck_system": True
+                "nck_system": True,
+                "cipher_mode": self.cipher_mode,
+                "granularity": fragment_granularity.label,
+                "tile_size": list(tile_size)
             }
             
             config_path = urn_dir / "urn_config.json"
@@ -257,6 +377,9 @@ class EnhancedPhantomUrnSystem:
                 "continuous_verification": True
             }
             
+        except BurnCancelled:
+            logger.info(f"🛑 Burn annulé: {phantom_name}")
+            raise
         except Exception as e:
             logger.error(f"❌ Erreur burn image: {e}")
             raise
@@ -298,16 +421,31 @@ class EnhancedPhantomUrnSystem:
         
         nck_id = self.authorization_registry.register_user_for_urn(user_id, phantom_id, permissions)
         
-        # Mettre à jour Phoenix
+        # Mettre à jour Phoenix (réécrit dans le cache: l'entrée peut être sur disque)
         phoenix = self.schrodinger_cache[phantom_id]
         phoenix.authorized_users[user_id] = {
             "permissions": permissions or {"view": True},
             "nck_id": nck_id,
             "authorized_at": datetime.now().isoformat()
         }
+        self.schrodinger_cache[phantom_id] = phoenix
         
         return nck_id
     
+    def revoke_user_access(self, phantom_id: str, user_id: str) -> bool:
+        """🚫 Révoquer l'accès d'un utilisateur: NCKs invalidées, projection évincée"""
+        revoked = self.authorization_registry.revoke_user_for_urn(user_id, phantom_id)
+        
+        phoenix = self.schrodinger_cache.get(phantom_id)
+        if phoenix is not None and phoenix.authorized_users.pop(user_id, None) is not None:
+            self.schrodinger_cache[phantom_id] = phoenix
+            revoked = True
+        
+        # Plus de projection décryptée en mémoire après révocation
+        self.phoenix_projections.invalidate(phantom_id)
+        self._notify_invalidation(phantom_id)
+        return revoked
+    
     def request_phoenix_resurrection(self, phantom_id: str, user_id: str, current_nck: str) -> Optional[np.ndarray]:
         """🌀→🦅 Demander résurrection Phoenix avec vérification NCK"""
         if phantom_id not in self.schrodinger_cache:
@@ -328,14 +466,19 @@ class EnhancedPhantomUrnSystem:
         phoenix = self.schrodinger_cache[phantom_id]
         
         if phantom_id in self.session_keys:
-            # Décryptage partiel pour projection (JAMAIS complet)
-            cipher = Fernet(self.session_keys[phantom_id])
-            decrypted_bytes = cipher.decrypt(phoenix.encrypted_matrix)
+            # Projection récente (cache borné avec TTL)
+            phoenix_matrix = self.phoenix_projections.get(phantom_id)
             
-            # Reconstruction en mémoire temporaire UNIQUEMENT
-            width, height = phoenix.dimensions
-            phoenix_matrix = np.frombuffer(decrypted_bytes, dtype=np.uint8)
-            phoenix_matrix = phoenix_matrix.reshape((height, width, 3))
+            if phoenix_matrix is None:
+                # Décryptage partiel pour projection (JAMAIS complet)
+                cipher = Fernet(self.session_keys[phantom_id])
+                decrypted_bytes = cipher.decrypt(phoenix.encrypted_matrix)
+                
+                # Reconstruction en mémoire temporaire UNIQUEMENT
+                width, height = phoenix.dimensions
+                phoenix_matrix = np.frombuffer(decrypted_bytes, dtype=np.uint8)
+                phoenix_matrix = phoenix_matrix.reshape((height, width, 3))
+                self.phoenix_projections[phantom_id] = phoenix_matrix
             
             logger.info(f"🌀 Phoenix de Schrödinger projeté pour {user_id} - NCK: {next_nck[:8]}...")
             
@@ -344,45 +487,50 @@ class EnhancedPhantomUrnSystem:
         
         return None
     
-    def _atomize_to_ashes(self, image: Image, urn_dir: Path, phantom_id: str) -> int:
-        """⚛️ Atomisation en cendres cryptées"""
-        width, height = image.size
-        image_array = np.array(image)
-        fragments_created = 0
-        
-        for y in range(height):
-            for x in range(width):
-                pixel_rgb = tuple(image_array[y, x])
-                
-                # Créer fragment (cendre)
-                fragment_data = {
-                    "phantom_id": phantom_id,
-                    "position": [int(x), int(y)],
-                    "color_rgb": [int(pixel_rgb[0]), int(pixel_rgb[1]), int(pixel_rgb[2])],
-                    "timestamp": time.time()
-                }
-                
-                # Crypter fragment
-                fragment_key = self._derive_fragment_key(f"ash_{x}_{y}", phantom_id)
-                cipher = Fernet(fragment_key)
-                encrypted_fragment = cipher.encrypt(json.dumps(fragment_data).encode())
-                
-                # Nom aléatoire pour empêcher reconstruction
-                fragment_name = f"ash_{secrets.token_hex(16)}.pxl"
-                fragment_path = urn_dir / fragment_name
-                
-                with open(fragment_path, 'wb') as f:
-                    f.write(encrypted_fragment)
-                
-                fragments_created += 1
-        
-        return fragments_created
+    def _atomize_to_ashes(self, image: Image, urn_dir: Path, phantom_id: str,
+                          tile_size: Tuple[int, int] = (1, 1),
+                          burn_pool: Optional[ParallelBurnPool] = None,
+                          progress: Optional[BurnProgress] = None) -> int:
+        """⚛️ Atomisation en cendres cryptées (pixels ou tuiles), bande par bande"""
+        container = self._get_container(phantom_id, urn_dir)
+        
+        shard_args = [
+            (shard, row_offset, tile_size, phantom_id)
+            for row_offset, shard in row_shards(np.array(image), tile_size, burn_pool,
+                                                max_shard_fragments=self.ASH_WRITE_BATCH)
+        ]
+        ash_names = write_shards(run_shards(_atomize_shard, shard_args, burn_pool), container, progress)
+        
+        return len(ash_names)
+    
+    def _bulk_atomize_to_ashes(self, image: Image, urn_dir: Path, phantom_id: str,
+                               tile_size: Tuple[int, int] = (1, 1),
+                               burn_pool: Optional[ParallelBurnPool] = None,
+                               progress: Optional[BurnProgress] = None) -> int:
+        """⚡ Atomisation vectorisée: enregistrements pixel/tuile cryptés par lots AES-CTR"""
+        container = self._get_container(phantom_id, urn_dir)
+        shard_fragments, shard_batches = burn_bulk_ashes(np.array(image), tile_size, phantom_id, burn_pool)
+        write_shards(shard_batches, container, progress, shard_fragments)
+        
+        return sum(shard_fragments)
+    
+    def _close_container_writer(self, phantom_id: str):
+        """Fin du burn: index et segment en ajout fermés, le conteneur en cache reste lisible"""
+        container = self.ash_containers.get(phantom_id)
+        if container is not None:
+            container.close_writer()
+    
+    def _get_container(self, phantom_id: str, urn_dir: Optional[Path] = None) -> AshContainer:
+        """Conteneur packé de l'URN (ouvert paresseusement)"""
+        container = self.ash_containers.get(phantom_id)
+        if container is None:
+            container = AshContainer(urn_dir or self.storage_dir / phantom_id)
+            self.ash_containers[phantom_id] = container
+        return container
     
     def _derive_fragment_key(self, fragment_name: str, phantom_id: str) -> bytes:
         """Dériver clé fragment"""
-        key_material = f"{fragment_name}:{phantom_id}".encode()
-        digest = hashlib.sha256(key_material).digest()
-        return base64.urlsafe_b64encode(digest[:32])
+        return derive_fragment_key(fragment_name, phantom_id)
     
     def _generate_phoenix_key(self, phantom_id: str, authorized_node: str) -> str:
         """Générer clé Phoenix pour autorisation"""
@@ -398,18 +546,65 @@ class EnhancedPhantomUrnSystem:
         if not urn_dir.exists():
             return {"status": "deleted", "active": False}
         
-        # Vérifier quelques fragments
-        fragments = list(urn_dir.glob("*.pxl"))
-        if len(fragments) == 0:
+        # Vérifier les fragments (index du conteneur, sinon .pxl non migrés)
+        fragments_count = len(self._get_container(phantom_id, urn_dir))
+        if fragments_count and self.active_urns[phantom_id].get("cipher_mode") == CIPHER_MODE_BULK:
+            # Index = lots de cendres, pas fragments individuels
+            fragments_count = self.active_urns[phantom_id]["total_fragments"]
+        if fragments_count == 0:
+            fragments_count = sum(1 for _ in urn_dir.glob(f"*{LEGACY_SUFFIX}"))
+        if fragments_count == 0:
             return {"status": "corrupted", "active": False}
         
         return {
             "status": "active",
             "active": True,
-            "fragments_count": len(fragments),
+            "fragments_count": fragments_count,
             "last_verification": datetime.now().isoformat()
         }
     
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """📊 Métriques des caches (hits, misses, évictions, octets, débordement)"""
+        return {
+            "schrodinger_cache": self.schrodinger_cache.stats(),
+            "phoenix_projections": self.phoenix_projections.stats()
+        }
+    
+    def delete_phantom_urn(self, phantom_id: str) -> bool:
+        """🔥 Supprime une URN Phantom (destruction complète)"""
+        try:
+            if phantom_id not in self.active_urns:
+                return False
+            
+            # Supprimer dossier URN (segments + index)
+            urn_dir = self.storage_dir / phantom_id
+            remove_urn_directory(urn_dir, self.ash_containers.pop(phantom_id, None))
+            
+            # Nettoyer registres
+            del self.active_urns[phantom_id]
+            self.schrodinger_cache.pop(phantom_id, None)
+            self.phoenix_projections.pop(phantom_id, None)
+            self.session_keys.pop(phantom_id, None)
+            self._notify_invalidation(phantom_id)
+            
+            logger.info(f"🔥 URN Phantom détruite: {phantom_id}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur destruction URN: {e}")
+            return False
+    
+    def add_invalidation_listener(self, listener: Callable[[str], None]):
+        """listener(phantom_id) appelé quand une URN est supprimée ou un accès révoqué"""
+        self.invalidation_listeners.append(listener)
+    
+    def _notify_invalidation(self, phantom_id: str):
+        for listener in list(self.invalidation_listeners):
+            try:
+                listener(phantom_id)
+            except Exception as e:
+                logger.error(f"❌ Erreur invalidation {phantom_id}: {e}")
+    
     def get_user_next_nck(self, user_id: str, phantom_id: str) -> Optional[str]:
         """🔑 Récupérer la prochaine NCK pour l'utilisateur"""
         if user_id in self.authorization_registry.user_authorizations:
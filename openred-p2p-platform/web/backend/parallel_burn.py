@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+🔥 BURN MULTI-PROCESSUS - Phantom URN
+=====================================
+Le burn d'une image est CPU-bound (cryptage par cendre) et limité à un cœur
+par le GIL. L'image est découpée en bandes de lignes (alignées sur la
+hauteur de tuile), chaque bande est cryptée dans un processus worker, et le
+processus parent fusionne les cendres dans le conteneur packé de l'URN.
+
+- Les workers ne touchent jamais au disque: ils retournent des
+  (nom, cendre cryptée) que le parent ajoute au conteneur (un seul écrivain)
+- Les résultats sont consommés dans l'ordre des bandes, au fil de l'eau
+- Le chaînage des cendres reste global à l'image (calculé par le parent)
+- Progression (cendres écrites), durées par étape et annulation entre
+  bandes via BurnProgress
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bulk_ash_cipher import _shuffled_chain, burn_record_shard
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BURN_WORKERS = os.cpu_count() or 1
+
+# Plus de bandes que de workers: équilibrage et mémoire parent bornée
+SHARDS_PER_WORKER = 4
+
+# Bande minimale: en dessous, le coût de transfert inter-processus domine
+MIN_SHARD_ROWS = 32
+
+
+# Intervalle minimal entre deux appels du callback de progression
+DEFAULT_PROGRESS_INTERVAL = 0.25
+
+
+class BurnCancelled(Exception):
+    """Burn interrompu à la demande (job annulé)"""
+
+
+class BurnProgress:
+    """
+    Suivi d'un burn: cendres écrites / total, durées par étape, annulation.
+    callback(fait, total) est appelé au plus toutes les min_interval secondes
+    (toujours au début et à la fin), depuis le thread du burn.
+    """
+
+    def __init__(self, callback: Optional[Callable[[int, int], None]] = None,
+                 min_interval: float = DEFAULT_PROGRESS_INTERVAL,
+                 cancel_event: Optional[threading.Event] = None):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.cancel_event = cancel_event or threading.Event()
+        self.total = 0
+        self.done = 0
+        self.timings: Dict[str, float] = {}
+        self._last_report = 0.0
+
+    def start(self, total: int):
+        self.total = total
+        self.done = 0
+        self.check_cancelled()
+        self._report(force=True)
+
+    def advance(self, count: int):
+        self.done += count
+        self.check_cancelled()
+        self._report(force=self.done >= self.total)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise BurnCancelled()
+
+    def add_time(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        """Chronomètre une étape (decode, encrypt, write...)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def _report(self, force: bool = False):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_report >= self.min_interval:
+            self._last_report = now
+            self.callback(self.done, self.total)
+
+
+def shard_row_ranges(height: int, tile_height: int, shards: int,
+                     min_rows: int = MIN_SHARD_ROWS) -> List[Tuple[int, int]]:
+    """Bandes de lignes [début, fin) alignées sur la hauteur de tuile"""
+    tile_rows = -(-height // tile_height)
+    min_tile_rows = max(1, -(-min_rows // tile_height))
+    shards = max(1, min(shards, tile_rows // min_tile_rows))
+    rows_per_shard = -(-tile_rows // shards)
+
+    return [
+        (start * tile_height, min(height, (start + rows_per_shard) * tile_height))
+        for start in range(0, tile_rows, rows_per_shard)
+    ]
+
+
+class ParallelBurnPool:
+    """
+    Pool de processus partagé par tous les burns (créé paresseusement).
+    workers=1: exécution directe dans le processus courant.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or DEFAULT_BURN_WORKERS)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: pas de fork d'un serveur multi-thread (verrous hérités)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"🔥 Pool de burn démarré: {self.workers} processus")
+            return self._executor
+
+    def shard_count(self) -> int:
+        return 1 if self.workers == 1 else self.workers * SHARDS_PER_WORKER
+
+    def map_shards(self, worker: Callable[..., Any], shard_args: Sequence[tuple]) -> Iterator[Any]:
+        """Exécute worker(*args) par bande; résultats produits dans l'ordre des bandes"""
+        if self.workers == 1 or len(shard_args) == 1:
+            for args in shard_args:
+                yield worker(*args)
+            return
+
+        futures = [self.executor.submit(worker, *args) for args in shard_args]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def imap_bounded(self, worker: Callable[..., Any], args_iter: Iterable[tuple],
+                     max_pending: Optional[int] = None) -> Iterator[Any]:
+        """
+        Comme map_shards, mais les arguments sont consommés au fil de l'eau:
+        au plus max_pending tâches en vol (mémoire bornée pour les lectures en flux)
+        """
+        if self.workers == 1:
+            for args in args_iter:
+                yield worker(*args)
+            return
+
+        max_pending = max_pending or self.workers * 2
+        pending: Deque[Future] = deque()
+        try:
+            for args in args_iter:
+                pending.append(self.executor.submit(worker, *args))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+def row_shards(img_array: np.ndarray, tile_size: Tuple[int, int], pool: Optional[ParallelBurnPool] = None,
+               max_shard_fragments: Optional[int] = None) -> List[Tuple[int, np.ndarray]]:
+    """
+    (ligne de début, bande) pour chaque bande de l'image.
+    max_shard_fragments: borne le nombre de cendres par bande (résultats
+    volumineux des modes Fernet), même sans pool.
+    """
+    height, width = img_array.shape[:2]
+    tile_width, tile_height = tile_size
+    shards = pool.shard_count() if pool else 1
+    min_rows = MIN_SHARD_ROWS
+
+    if max_shard_fragments:
+        total_fragments = -(-width // tile_width) * -(-height // tile_height)
+        shards = max(shards, -(-total_fragments // max_shard_fragments))
+        min_rows = tile_height
+
+    return [
+        (start, img_array[start:end])
+        for start, end in shard_row_ranges(height, tile_height, shards, min_rows)
+    ]
+
+
+def burn_bulk_ashes(img_array: np.ndarray, tile_size: Tuple[int, int], phantom_id: str,
+                    pool: Optional[ParallelBurnPool] = None
+                    ) -> Tuple[List[int], Iterator[List[Tuple[str, bytes]]]]:
+    """
+    Lots AES-CTR d'une image, bande par bande. Mélange de stockage limité à
+    chaque bande, chaînage `next` global: l'URN fusionnée est identique à
+    un burn mono-processus pour la résurrection.
+    Retourne (cendres par bande, itérateur des lots de chaque bande).
+    """
+    tile_width, tile_height = tile_size
+    tiles_x = -(-img_array.shape[1] // tile_width)
+    shards = row_shards(img_array, tile_size, pool)
+
+    shard_sizes = [tiles_x * -(-len(shard) // tile_height) for _, shard in shards]
+    storage_order, next_slots = _shuffled_chain(sum(shard_sizes), np.random.default_rng(), shard_sizes)
+
+    shard_args = []
+    slot = 0
+    for (row_offset, shard), size in zip(shards, shard_sizes):
+        shard_args.append((shard, row_offset, tile_size, phantom_id,
+                           storage_order[slot:slot + size], next_slots[slot:slot + size]))
+        slot += size
+
+    return shard_sizes, run_shards(burn_record_shard, shard_args, pool)
+
+
+def run_shards(worker: Callable[..., Any], shard_args: Sequence[tuple],
+               pool: Optional[ParallelBurnPool] = None) -> Iterator[Any]:
+    """map_shards sur le pool, ou directement dans le processus courant sans pool"""
+    if pool is None:
+        return (worker(*args) for args in shard_args)
+    return pool.map_shards(worker, shard_args)
+
+
+def write_shards(shard_results: Iterator[List[Tuple[str, bytes]]], container,
+                 progress: Optional[BurnProgress] = None,
+                 shard_fragments: Optional[Sequence[int]] = None) -> List[str]:
+    """
+    Fusionne les cendres de chaque bande dans le conteneur packé (un seul
+    écrivain). Temps d'attente des bandes → "encrypt", écritures → "write".
+    Une annulation arrête la consommation et annule les bandes non démarrées.
+    Retourne les noms écrits.
+    """
+    progress = progress or BurnProgress()
+    results = iter(shard_results)
+    names: List[str] = []
+
+    try:
+        shard_index = 0
+        while True:
+            with progress.stage("encrypt"):
+                ashes = next(results, None)
+            if ashes is None:
+                break
+
+            with progress.stage("write"):
+                container.put_many(ashes)
+            names.extend(name for name, _ in ashes)
+
+            progress.advance(shard_fragments[shard_index] if shard_fragments else len(ashes))
+            shard_index += 1
+
+        with progress.stage("write"):
+            container.flush()
+    finally:
+        close = getattr(results, "close", None)
+        if close is not None:
+            close()
+
+    return names
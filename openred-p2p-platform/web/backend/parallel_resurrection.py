@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+🔄 RÉSURRECTION PARALLÈLE EN FLUX - Phantom URN
+===============================================
+Reconstruction Phoenix d'une image depuis ses cendres, sans ouvrir,
+décrypter et parser les fragments un par un sur un seul thread:
+
+1. Lecture groupée du conteneur packé (AshContainer.iter_chunks)
+2. Décryptage des lots dans le pool de processus (ParallelBurnPool),
+   au plus quelques lots en vol (mémoire bornée)
+3. Scatter vectorisé des enregistrements dans une image préallouée
+
+Mode générateur: `stream_resurrection` produit des ResurrectionBand dès
+que des lignes (ou lignes de tuiles) sont complètes, pour que le serveur
+de projection commence à envoyer avant la fin de la reconstruction.
+Les cendres Fernet (JSON par fragment) sont converties en enregistrements
+du même format que les lots AES-CTR, puis placées par le même scatter.
+"""
+
+import json
+import base64
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from cryptography.fernet import Fernet
+
+from bulk_ash_cipher import (
+    CIPHER_MODE_BULK, RECORD_MARKER, decrypt_batch, derive_batch_key,
+    derive_fragment_key, scatter_records, tile_record_dtype
+)
+from parallel_burn import ParallelBurnPool
+
+logger = logging.getLogger(__name__)
+
+AshChunk = List[Tuple[str, bytes]]
+
+
+@dataclass
+class ResurrectionBand:
+    """Lignes [y_start, y_end) de l'image reconstruite"""
+    y_start: int
+    y_end: int
+    pixels: np.ndarray  # vue (y_end - y_start, largeur, 3) sur l'image reconstruite
+    image: np.ndarray   # image complète en cours de reconstruction
+    complete: bool      # False: lignes auxquelles il manque des cendres (fin du flux)
+    fragments_done: int
+    fragments_failed: int
+
+
+def decrypt_bulk_chunk(chunk: AshChunk, phantom_id: str,
+                       tile_size: Tuple[int, int]) -> Tuple[np.ndarray, int]:
+    """Décrypte des lots AES-CTR (exécutable dans un processus worker) → (enregistrements, échecs)"""
+    record_dtype = tile_record_dtype(*tile_size)
+    decrypted = []
+    failed = 0
+    for batch_name, blob in chunk:
+        try:
+            decrypted.append(decrypt_batch(derive_batch_key(batch_name, phantom_id), blob, record_dtype))
+        except Exception:
+            failed += 1
+    if not decrypted:
+        return np.empty(0, dtype=record_dtype), failed
+    return np.concatenate(decrypted), failed
+
+
+def decrypt_fernet_chunk(chunk: AshChunk, phantom_id: str,
+                         tile_size: Tuple[int, int]) -> Tuple[np.ndarray, int]:
+    """
+    Décrypte des cendres Fernet (exécutable dans un processus worker) et les
+    convertit en enregistrements pixel ou tuile → (enregistrements, échecs)
+    """
+    tile_width, tile_height = tile_size
+    records = np.zeros(len(chunk), dtype=tile_record_dtype(tile_width, tile_height))
+    is_pixel = "marker" in records.dtype.names
+    count = 0
+    failed = 0
+
+    for fragment_name, encrypted_data in chunk:
+        try:
+            cipher = Fernet(derive_fragment_key(fragment_name, phantom_id))
+            fragment = json.loads(cipher.decrypt(encrypted_data))
+            x, y = fragment["position"]
+            record = records[count]
+            record["x"], record["y"] = x, y
+
+            if is_pixel:
+                record["rgb"] = fragment["color_rgb"]
+                record["marker"] = RECORD_MARKER
+            else:
+                w, h = fragment.get("tile_size", (1, 1))
+                if not (0 < w <= tile_width and 0 < h <= tile_height):
+                    raise ValueError(f"tuile {w}x{h} hors format {tile_width}x{tile_height}")
+                if fragment.get("tile_rgb"):
+                    tile = np.frombuffer(base64.b64decode(fragment["tile_rgb"]), dtype=np.uint8)
+                    record["rgb"][:h, :w] = tile.reshape(h, w, 3)
+                else:
+                    record["rgb"][:h, :w] = fragment["color_rgb"]
+                record["w"], record["h"] = w, h
+            count += 1
+        except Exception:
+            failed += 1
+
+    return records[:count], failed
+
+
+class _RowCoverage:
+    """Pixels placés par ligne de tuiles: détecte les lignes complètes (vectorisé)"""
+
+    def __init__(self, width: int, height: int, tile_height: int):
+        self.width = width
+        self.height = height
+        self.tile_height = tile_height
+        self.tile_rows = -(-height // tile_height)
+        self.covered = np.zeros(self.tile_rows, dtype=np.int64)
+        self.emitted = np.zeros(self.tile_rows, dtype=bool)
+
+    def add(self, records: np.ndarray):
+        valid = (records["x"] < self.width) & (records["y"] < self.height)
+        rows = records["y"][valid].astype(np.int64) // self.tile_height
+        widths = records["w"][valid] if "w" in records.dtype.names else None
+        self.covered += np.bincount(rows, weights=widths, minlength=self.tile_rows).astype(np.int64)
+
+    def take_runs(self, complete: bool = True) -> List[Tuple[int, int]]:
+        """Plages [début, fin) de lignes de tuiles nouvellement complètes (ou restantes)"""
+        ready = ~self.emitted
+        if complete:
+            ready &= self.covered >= self.width
+        rows = np.flatnonzero(ready)
+        if not len(rows):
+            return []
+        self.emitted[rows] = True
+        breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+        return [(int(run[0]), int(run[-1]) + 1) for run in np.split(rows, breaks)]
+
+
+def stream_resurrection(chunks: Iterable[AshChunk], phantom_id: str, dimensions: Tuple[int, int],
+                        tile_size: Tuple[int, int] = (1, 1), cipher_mode: str = CIPHER_MODE_BULK,
+                        pool: Optional[ParallelBurnPool] = None,
+                        target: Optional[np.ndarray] = None) -> Iterator[ResurrectionBand]:
+    """
+    Reconstruit une image (largeur, hauteur) depuis des lots de cendres lus en
+    flux et produit les bandes de lignes au fur et à mesure qu'elles se
+    complètent. Les lignes incomplètes (cendres manquantes ou illisibles)
+    sont produites à la fin avec complete=False.
+    Les bandes sont des vues sur `target` (préallouée si absente).
+    """
+    width, height = dimensions
+    tile_height = tile_size[1]
+    if target is None:
+        target = np.zeros((height, width, 3), dtype=np.uint8)
+
+    worker = decrypt_bulk_chunk if cipher_mode == CIPHER_MODE_BULK else decrypt_fernet_chunk
+    args = ((chunk, phantom_id, tuple(tile_size)) for chunk in chunks)
+    results = pool.imap_bounded(worker, args) if pool is not None else (worker(*a) for a in args)
+
+    coverage = _RowCoverage(width, height, tile_height)
+    done = 0
+    failed = 0
+
+    def bands(runs: List[Tuple[int, int]], complete: bool) -> Iterator[ResurrectionBand]:
+        for first_row, end_row in runs:
+            y_start = first_row * tile_height
+            y_end = min(height, end_row * tile_height)
+            yield ResurrectionBand(y_start, y_end, target[y_start:y_end], target, complete, done, failed)
+
+    try:
+        for records, chunk_failed in results:
+            scatter_records(target, records)
+            coverage.add(records)
+            done += len(records)
+            failed += chunk_failed
+            yield from bands(coverage.take_runs(), True)
+
+        yield from bands(coverage.take_runs(complete=False), False)
+    finally:
+        close = getattr(results, "close", None)
+        if close is not None:
+            close()
+
+    if failed:
+        logger.warning(f"⚠️ {failed} cendre(s) illisible(s) pendant la résurrection de {phantom_id}")
+
+
+def resurrect_image(chunks: Iterable[AshChunk], phantom_id: str, dimensions: Tuple[int, int],
+                    tile_size: Tuple[int, int] = (1, 1), cipher_mode: str = CIPHER_MODE_BULK,
+                    pool: Optional[ParallelBurnPool] = None) -> np.ndarray:
+    """Reconstruction complète (consomme stream_resurrection)"""
+    width, height = dimensions
+    target = np.zeros((height, width, 3), dtype=np.uint8)
+    for _ in stream_resurrection(chunks, phantom_id, dimensions, tile_size, cipher_mode, pool, target):
+        pass
+    return target
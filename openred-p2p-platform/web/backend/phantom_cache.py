@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+🧠 CACHE BORNÉ DES RECONSTRUCTIONS - Phantom URN
+================================================
+Cache des matrices Phoenix (RGB décryptées) et des états Schrödinger,
+borné en octets au lieu d'un dict qui grossit sans limite.
+
+- Politique d'éviction LRU ou LFU, TTL optionnel par cache
+- Métriques: hits, misses, évictions, expirations, débordements disque
+- Débordement optionnel vers un stockage disque crypté (AES-GCM, clé
+  éphémère en mémoire: illisible après redémarrage du processus), lui aussi
+  borné en octets (les entrées débordées les plus anciennes sont perdues)
+- Invalidation explicite à la suppression d'une URN ou à la révocation
+
+Interface compatible dict (`in`, `[]`, `get`, `pop`, `len`, `clear`) pour
+les appelants existants.
+"""
+
+import os
+import time
+import pickle
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+import numpy as np
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+logger = logging.getLogger(__name__)
+
+POLICY_LRU = "lru"
+POLICY_LFU = "lfu"
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024  # 512 Mo par cache
+DEFAULT_PROJECTION_TTL = 300.0            # secondes
+DEFAULT_SPILL_BYTES = 4 * DEFAULT_CACHE_BYTES  # 2 Go de débordement disque par cache
+
+_NONCE_SIZE = 12
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Taille mémoire approximative: tableaux NumPy et octets (directs ou attributs)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    attributes = getattr(value, "__dict__", None)
+    if attributes:
+        return 256 + sum(
+            estimate_size(attribute) for attribute in attributes.values()
+            if isinstance(attribute, (np.ndarray, bytes, bytearray, memoryview))
+        )
+    return 256
+
+
+class EncryptedSpillStore:
+    """
+    Stockage disque crypté des entrées évincées de la mémoire.
+    Un fichier par clé (nom = hash de la clé), AES-GCM avec la clé en AAD.
+    Au-delà de max_bytes (None: illimité), les entrées les plus anciennes sont supprimées.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = DEFAULT_SPILL_BYTES):
+        self.max_bytes = max_bytes
+        self._owns_directory = directory is None
+        self.directory = Path(directory or tempfile.mkdtemp(prefix="phantom_cache_spill_"))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._cipher = AESGCM(AESGCM.generate_key(bit_length=256))
+        self._sizes: Dict[Hashable, int] = {}   # ordre d'écriture: les plus anciennes d'abord
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        if self._owns_directory:
+            # Dossier temporaire supprimé au plus tard à la sortie du processus
+            self._finalizer = weakref.finalize(self, shutil.rmtree, str(self.directory), True)
+
+    def _path(self, key: Hashable) -> Path:
+        return self.directory / f"{hashlib.sha256(repr(key).encode()).hexdigest()[:32]}.spill"
+
+    def put(self, key: Hashable, value: Any) -> List[Hashable]:
+        """
+        Crypte et écrit une entrée; retourne les clés supprimées pour rester sous
+        max_bytes (la clé écrite elle-même si elle dépasse seule la borne)
+        """
+        nonce = os.urandom(_NONCE_SIZE)
+        payload = nonce + self._cipher.encrypt(
+            nonce, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), repr(key).encode()
+        )
+        path = self._path(key)
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, 'wb') as f:
+            f.write(payload)
+        os.replace(temporary, path)
+
+        evicted = []
+        with self._lock:
+            self._total_bytes += len(payload) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(payload)
+            while self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                victim = next(iter(self._sizes))
+                self._total_bytes -= self._sizes.pop(victim)
+                evicted.append(victim)
+        for victim in evicted:
+            self._unlink(victim)
+        return evicted
+
+    def get(self, key: Hashable) -> Any:
+        """Lit et décrypte une entrée (_MISSING si absente ou illisible)"""
+        with self._lock:
+            if key not in self._sizes:
+                return _MISSING
+        try:
+            with open(self._path(key), 'rb') as f:
+                payload = f.read()
+            plain = self._cipher.decrypt(payload[:_NONCE_SIZE], payload[_NONCE_SIZE:], repr(key).encode())
+            return pickle.loads(plain)
+        except Exception as e:
+            logger.warning(f"⚠️ Entrée de cache débordée illisible ({key}): {e}")
+            self.delete(key)
+            return _MISSING
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._total_bytes -= self._sizes.pop(key, 0)
+        self._unlink(key)
+
+    def _unlink(self, key: Hashable):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._sizes
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes
+
+    def clear(self):
+        for key in list(self._sizes):
+            self.delete(key)
+
+    def close(self):
+        """Supprime les entrées (et le dossier s'il a été créé par le store)"""
+        self.clear()
+        if self._owns_directory:
+            self._finalizer()
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    size: int
+    expires_at: Optional[float]
+    hits: int = 0
+
+
+class BoundedPhantomCache:
+    """
+    Cache borné en octets, LRU ou LFU, avec TTL et débordement disque optionnel.
+    Sans débordement, une entrée évincée est perdue (à reconstruire).
+    """
+
+    def __init__(self, name: str, max_bytes: int = DEFAULT_CACHE_BYTES, ttl: Optional[float] = None,
+                 policy: str = POLICY_LRU, spill: Optional[EncryptedSpillStore] = None,
+                 sizeof: Callable[[Any], int] = estimate_size):
+        if policy not in (POLICY_LRU, POLICY_LFU):
+            raise ValueError(f"Politique de cache inconnue: {policy}")
+
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self.spill = spill
+        self.sizeof = sizeof
+
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._spilled_expiry: Dict[Hashable, Optional[float]] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.metrics = {
+            "hits": 0, "misses": 0, "spill_hits": 0, "evictions": 0,
+            "spills": 0, "spill_evictions": 0, "expirations": 0, "invalidations": 0, "rejected": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired(entry.expires_at):
+                    self._remove(key)
+                    self.metrics["expirations"] += 1
+                else:
+                    entry.hits += 1
+                    self._entries.move_to_end(key)
+                    self.metrics["hits"] += 1
+                    return entry.value
+
+            if key in self._spilled_expiry:
+                value = self._load_spilled(key)
+                if value is not _MISSING:
+                    self.metrics["spill_hits"] += 1
+                    return value
+
+            self.metrics["misses"] += 1
+            return default
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Présence (mémoire ou disque) sans compter de hit ni recharger"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return not self._expired(entry.expires_at)
+            expires_at = self._spilled_expiry.get(key, _MISSING)
+            return expires_at is not _MISSING and not self._expired(expires_at)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries) + len(self._spilled_expiry)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.keys())
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys()) + list(self._spilled_expiry.keys())
+
+    # ------------------------------------------------------------------
+    # Écriture / invalidation
+    # ------------------------------------------------------------------
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._store(key, value, expires_at)
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.put(key, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Invalidation explicite (URN supprimée, accès révoqué)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            value = entry.value if entry is not None else default
+            if entry is None and key in self._spilled_expiry:
+                value = self.spill.get(key)
+                value = default if value is _MISSING else value
+            if self._remove(key):
+                self.metrics["invalidations"] += 1
+            return value
+
+    def __delitem__(self, key: Hashable):
+        if key not in self:
+            raise KeyError(key)
+        self.pop(key)
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            removed = self._remove(key)
+            if removed:
+                self.metrics["invalidations"] += 1
+            return removed
+
+    def clear(self):
+        with self._lock:
+            for key in self.keys():
+                self._remove(key)
+
+    def close(self):
+        self.clear()
+        if self.spill is not None:
+            self.spill.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["spill_hits"] + self.metrics["misses"]
+            return {
+                "name": self.name,
+                "policy": self.policy,
+                "ttl": self.ttl,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "spilled_entries": len(self._spilled_expiry),
+                "spilled_bytes": self.spill.total_bytes if self.spill is not None else 0,
+                "hit_rate": round((self.metrics["hits"] + self.metrics["spill_hits"]) / lookups, 4) if lookups else 0.0,
+                **self.metrics,
+            }
+
+    # ------------------------------------------------------------------
+    # Interne
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _expired(expires_at: Optional[float]) -> bool:
+        return expires_at is not None and time.monotonic() >= expires_at
+
+    def _store(self, key: Hashable, value: Any, expires_at: Optional[float], hits: int = 0):
+        size = self.sizeof(value)
+        with self._lock:
+            self._remove(key)
+
+            if size > self.max_bytes:
+                # Plus grand que le cache entier: directement sur disque, sinon rejeté
+                if self.spill is not None:
+                    self._spill(key, value, expires_at)
+                else:
+                    self.metrics["rejected"] += 1
+                return
+
+            self._make_room(size)
+            self._entries[key] = _CacheEntry(value, size, expires_at, hits)
+            self._bytes += size
+
+    def _make_room(self, size: int):
+        """Expire puis évince (LRU/LFU) jusqu'à libérer `size` octets"""
+        if self._bytes + size <= self.max_bytes:
+            return
+
+        for key in [key for key, entry in self._entries.items() if self._expired(entry.expires_at)]:
+            self._remove(key)
+            self.metrics["expirations"] += 1
+
+        while self._entries and self._bytes + size > self.max_bytes:
+            if self.policy == POLICY_LFU:
+                # Moins utilisée; à égalité, la plus ancienne (ordre LRU)
+                victim = min(self._entries, key=lambda candidate: self._entries[candidate].hits)
+            else:
+                victim = next(iter(self._entries))
+
+            entry = self._entries[victim]
+            self._remove(victim)
+            self.metrics["evictions"] += 1
+            if self.spill is not None:
+                self._spill(victim, entry.value, entry.expires_at)
+
+    def _spill(self, key: Hashable, value: Any, expires_at: Optional[float]):
+        try:
+            evicted = self.spill.put(key, value)
+            if key not in evicted:
+                self._spilled_expiry[key] = expires_at
+                self.metrics["spills"] += 1
+            for victim in evicted:
+                self._spilled_expiry.pop(victim, None)
+            if evicted:
+                self.metrics["spill_evictions"] += len(evicted)
+                logger.warning(f"⚠️ Débordement disque plein ({self.name}): {len(evicted)} entrée(s) perdue(s)")
+        except OSError as e:
+            logger.error(f"❌ Débordement disque impossible ({self.name}/{key}): {e}")
+
+    def _load_spilled(self, key: Hashable) -> Any:
+        """Recharge une entrée débordée et la remet en mémoire"""
+        expires_at = self._spilled_expiry[key]
+        if self._expired(expires_at):
+            self._remove(key)
+            self.metrics["expirations"] += 1
+            return _MISSING
+
+        value = self.spill.get(key)
+        if value is _MISSING:
+            self._spilled_expiry.pop(key, None)
+            return _MISSING
+
+        self._store(key, value, expires_at, hits=1)
+        return value
+
+    def _remove(self, key: Hashable) -> bool:
+        removed = False
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            removed = True
+        if key in self._spilled_expiry:
+            del self._spilled_expiry[key]
+            self.spill.delete(key)
+            removed = True
+        return removed
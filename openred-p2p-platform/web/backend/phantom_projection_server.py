@@ -18,29 +18,109 @@ import base64
 import time
 import weakref
 import logging
-from typing import Dict, Set, Optional, Any
+from typing import Dict, Set, Optional, Any, Tuple
 from pathlib import Path
 import threading
-from aiohttp import web, WSMsgType
+from aiohttp import web, WSCloseCode, WSMsgType
 import aiohttp_cors
 from PIL import Image
 import numpy as np
 import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+
+from client_send_queue import Payload, SendQueueRegistry
+from phantom_cache import BoundedPhantomCache
+from preview_pyramid import PyramidLevel, parse_target_size
+from projection_frames import (
+    FRAME_KIND_BAND, FRAME_KIND_PROJECTION, FRAME_KIND_TILE, SUBPROTOCOLS, FrameChannel, PhantomFrame,
+    encode_frame, negotiate_frame_mode
+)
+from projection_variants import IMAGE_FORMATS, encode_variant, negotiate_format, parse_quality
+from projection_tiles import (
+    DEFAULT_PREFETCH_RING, DEFAULT_TILE_SIZE, Tile, Viewport, neighbor_tiles, tile_bounds, visible_tiles
+)
 
 logger = logging.getLogger(__name__)
 
+# Frames encodées partagées par tous les viewers (borne mémoire)
+DEFAULT_FRAME_CACHE_BYTES = 128 * 1024 * 1024
+
+# Tuiles encodées (projection par fenêtre des grandes images)
+DEFAULT_TILE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Threads d'encodage (PIL libère le GIL pendant l'encodage JPEG)
+DEFAULT_ENCODE_WORKERS = 4
+
+WS_JPEG_QUALITY = 85
+HTTP_JPEG_QUALITY = 90
+
+
+@dataclass
+class EncodedFrame:
+    """Projection encodée une fois, servie à tous les viewers"""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    preview_level: int = 0
+    
+    @cached_property
+    def data_base64(self) -> str:
+        """Calculé au premier client en mode JSON (inutile en mode binaire)"""
+        return base64.b64encode(self.data).decode()
+
+
+def _frame_size(frame: EncodedFrame) -> int:
+    # Place réservée pour la copie base64 (mode JSON)
+    return len(frame.data) * 7 // 3 + 256
+
+
 class PhantomProjectionServer:
     """
     Serveur de projection temps réel pour URNs Phantom
     """
     
-    def __init__(self, urn_system, port: int = 8002):
+    def __init__(self, urn_system, port: int = 8002, frame_cache_bytes: int = DEFAULT_FRAME_CACHE_BYTES,
+                 encode_workers: int = DEFAULT_ENCODE_WORKERS, tile_cache_bytes: int = DEFAULT_TILE_CACHE_BYTES,
+                 tile_size: int = DEFAULT_TILE_SIZE, prefetch_ring: int = DEFAULT_PREFETCH_RING):
         self.urn_system = urn_system
         self.port = port
         
+        # Cache des frames encodées: (phantom, niveau, format, qualité, taille max) → EncodedFrame
+        self.frame_cache = BoundedPhantomCache("projection_frames", max_bytes=frame_cache_bytes,
+                                               sizeof=_frame_size)
+        self.frame_renders: Dict[Tuple, asyncio.Future] = {}  # encodages en cours (un seul par clé)
+        self.frame_generations: Dict[str, int] = {}  # incrémenté à chaque invalidation
+        
+        # Tuiles encodées: (phantom, niveau, colonne, ligne, qualité) → EncodedFrame
+        self.tile_cache = BoundedPhantomCache("projection_tiles", max_bytes=tile_cache_bytes,
+                                              sizeof=_frame_size)
+        self.level_resurrections: Dict[Tuple, asyncio.Future] = {}  # (phantom, niveau, génération) en cours
+        self.tile_size = tile_size
+        self.prefetch_ring = prefetch_ring
+        self.viewport_tasks: Dict[web.WebSocketResponse, asyncio.Task] = {}  # dernière fenêtre par connexion
+        self.prefetch_tasks: Set[asyncio.Task] = set()
+        
+        # Résurrection + encodage hors de la boucle aiohttp
+        self.encode_executor = ThreadPoolExecutor(max_workers=encode_workers,
+                                                  thread_name_prefix="phantom_encode")
+        
+        # Suppression / révocation côté système URN → frames invalidées
+        add_listener = getattr(urn_system, 'add_invalidation_listener', None)
+        if add_listener is not None:
+            add_listener(self.invalidate_phantom)
+        
         # Connexions WebSocket actives
         self.active_connections: Set[web.WebSocketResponse] = set()
         
+        # Mode de frames négocié par connexion (binaire / JSON)
+        self.frame_channels: Dict[web.WebSocketResponse, FrameChannel] = {}
+        
+        # File d'envoi bornée + tâche d'écriture par connexion (un client lent ne bloque personne)
+        self.send_queues = SendQueueRegistry()
+        
         # Mapping viewer -> phantoms regardés
         self.viewer_phantoms: Dict[str, Set[str]] = {}
         
@@ -84,11 +164,15 @@ class PhantomProjectionServer:
     
     async def websocket_handler(self, request):
         """Handler principal WebSocket pour streaming ORP"""
-        ws = web.WebSocketResponse()
+        # Négociation binaire / JSON: sous-protocole, sinon ?frames=
+        ws = web.WebSocketResponse(protocols=SUBPROTOCOLS)
         await ws.prepare(request)
         
         self.active_connections.add(ws)
+        self.frame_channels[ws] = FrameChannel(negotiate_frame_mode(ws.ws_protocol, request.query.get('frames')))
         client_id = f"client_{len(self.active_connections)}_{int(time.time())}"
+        self.send_queues.open(ws, lambda payload: self._write(ws, payload),
+                              on_slow=lambda: self._disconnect_slow(ws), name=client_id)
         
         logger.info(f"🔌 Connexion WebSocket: {client_id}")
         
@@ -113,6 +197,11 @@ class PhantomProjectionServer:
         
         finally:
             self.active_connections.discard(ws)
+            self.frame_channels.pop(ws, None)
+            self.send_queues.close(ws)
+            viewport_task = self.viewport_tasks.pop(ws, None)
+            if viewport_task is not None:
+                viewport_task.cancel()
             if client_id in self.viewer_phantoms:
                 del self.viewer_phantoms[client_id]
             logger.info(f"🔌 Déconnexion: {client_id}")
@@ -129,10 +218,22 @@ class PhantomProjectionServer:
                 access_token = data.get('access_token')
                 
                 if phantom_id and access_token:
-                    await self.stream_phantom_to_client(ws, client_id, phantom_id, access_token)
+                    try:
+                        target_size = parse_target_size(data.get('target_size'))
+                    except (TypeError, ValueError):
+                        await self.send_error(ws, "target_size invalide")
+                        return
+                    
+                    if data.get('progressive') and hasattr(self.urn_system, 'iter_phantom_for_projection'):
+                        await self.stream_phantom_bands_to_client(ws, client_id, phantom_id, access_token, target_size)
+                    else:
+                        await self.stream_phantom_to_client(ws, client_id, phantom_id, access_token, target_size)
                 else:
                     await self.send_error(ws, "phantom_id et access_token requis")
             
+            elif message_type == 'viewport':
+                self.start_viewport(ws, client_id, data)
+            
             elif message_type == 'stop_phantom':
                 phantom_id = data.get('phantom_id')
                 if client_id in self.viewer_phantoms:
@@ -153,46 +254,26 @@ class PhantomProjectionServer:
             logger.error(f"❌ Erreur traitement message: {e}")
             await self.send_error(ws, "Erreur traitement message")
     
-    async def stream_phantom_to_client(self, ws: web.WebSocketResponse, client_id: str, phantom_id: str, access_token: str):
-        """Streaming d'un phantom vers un client via WebSocket"""
+    async def stream_phantom_to_client(self, ws: web.WebSocketResponse, client_id: str, phantom_id: str,
+                                       access_token: str, target_size: Optional[Tuple[int, int]] = None):
+        """Streaming d'un phantom vers un client via WebSocket (target_size: plus petit aperçu suffisant)"""
         try:
             logger.info(f"🎭 Début streaming {phantom_id} vers {client_id}")
             
-            # Reconstruction Phoenix depuis URN
-            phantom_image = self.urn_system.get_phantom_for_projection(phantom_id, access_token)
+            # Reconstruction Phoenix + encodage (une fois par frame, partagé par les viewers)
+            frame = await self.get_encoded_frame(phantom_id, access_token, target_size, quality=WS_JPEG_QUALITY)
             
-            if phantom_image is None:
+            if frame is None:
                 await self.send_error(ws, f"Phantom {phantom_id} non accessible")
                 return
             
-            # Conversion en image PIL
-            pil_image = Image.fromarray(phantom_image)
-            
-            # Convertir en base64 pour transmission
-            buffer = io.BytesIO()
-            pil_image.save(buffer, format='JPEG', quality=85)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode()
-            
             # Enregistrer viewer
             if client_id not in self.viewer_phantoms:
                 self.viewer_phantoms[client_id] = set()
             self.viewer_phantoms[client_id].add(phantom_id)
             
             # Envoyer projection
-            projection_data = {
-                'type': 'phantom_projection',
-                'phantom_id': phantom_id,
-                'data': image_base64,
-                'mime_type': 'image/jpeg',
-                'dimensions': {
-                    'width': phantom_image.shape[1],
-                    'height': phantom_image.shape[0]
-                },
-                'timestamp': time.time(),
-                'anti_capture_active': True
-            }
-            
-            await self.send_message(ws, projection_data)
+            await self.send_projection(ws, phantom_id, frame, target_size)
             
             logger.info(f"✅ Streaming {phantom_id} envoyé à {client_id}")
             
@@ -200,6 +281,401 @@ class PhantomProjectionServer:
             logger.error(f"❌ Erreur streaming {phantom_id}: {e}")
             await self.send_error(ws, f"Erreur streaming: {e}")
     
+    async def stream_phantom_bands_to_client(self, ws: web.WebSocketResponse, client_id: str,
+                                             phantom_id: str, access_token: str,
+                                             target_size: Optional[Tuple[int, int]] = None):
+        """
+        Streaming progressif: chaque bande de lignes reconstruite est envoyée
+        (message phantom_band) sans attendre la fin de la résurrection, puis
+        l'image complète (phantom_projection) pour les clients existants.
+        """
+        try:
+            logger.info(f"🎭 Début streaming progressif {phantom_id} vers {client_id}")
+            loop = asyncio.get_running_loop()
+            
+            # Frame déjà encodée: inutile de repasser par les bandes
+            if self._frame_key(phantom_id, target_size, 'jpeg', WS_JPEG_QUALITY) not in self.frame_cache:
+                bands = self.urn_system.iter_phantom_for_projection(phantom_id, access_token, target_size=target_size)
+                streamed = False
+                try:
+                    while True:
+                        # Décryptage + encodage bloquants hors de la boucle d'événements
+                        band = await loop.run_in_executor(self.encode_executor, next, bands, None)
+                        if band is None:
+                            break
+                        streamed = True
+                        band_data = await loop.run_in_executor(
+                            self.encode_executor, self._encode_jpeg, band.pixels, WS_JPEG_QUALITY
+                        )
+                        await self.send_band(ws, phantom_id, band, band_data)
+                finally:
+                    bands.close()
+                
+                if not streamed:
+                    await self.send_error(ws, f"Phantom {phantom_id} non accessible")
+                    return
+            
+            frame = await self.get_encoded_frame(phantom_id, access_token, target_size, quality=WS_JPEG_QUALITY)
+            if frame is None:
+                await self.send_error(ws, f"Phantom {phantom_id} non accessible")
+                return
+            
+            self.viewer_phantoms.setdefault(client_id, set()).add(phantom_id)
+            
+            await self.send_projection(ws, phantom_id, frame, target_size)
+            
+            logger.info(f"✅ Streaming progressif {phantom_id} envoyé à {client_id}")
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur streaming progressif {phantom_id}: {e}")
+            await self.send_error(ws, f"Erreur streaming: {e}")
+    
+    async def get_encoded_frame(self, phantom_id: str, access_token: str,
+                                target_size: Optional[Tuple[int, int]] = None,
+                                image_format: str = 'jpeg', quality: int = WS_JPEG_QUALITY,
+                                max_size: Optional[Tuple[int, int]] = None) -> Optional[EncodedFrame]:
+        """
+        Frame encodée d'un phantom: contrôle d'accès à chaque requête, puis
+        cache partagé; un seul encodage en cours par clé (les requêtes
+        simultanées l'attendent), exécuté hors de la boucle aiohttp.
+        target_size choisit le niveau d'aperçu, max_size réduit l'image
+        encodée pour tenir dans la boîte (chaque variante a sa clé).
+        """
+        loop = asyncio.get_running_loop()
+        authorize = getattr(self.urn_system, 'authorize_projection', None)
+        
+        if authorize is None:
+            # Système sans contrôle d'accès séparé: pas de partage entre viewers
+            return await loop.run_in_executor(
+                self.encode_executor, self._render_frame, phantom_id, access_token, target_size, image_format,
+                quality, max_size
+            )
+        
+        if not authorize(phantom_id, access_token):
+            return None
+        
+        key = self._frame_key(phantom_id, target_size, image_format, quality, max_size)
+        return await self._render_shared(self.frame_cache, key, phantom_id, self._render_frame,
+                                         phantom_id, access_token, target_size, image_format, quality, max_size)
+    
+    async def _render_shared(self, cache: BoundedPhantomCache, key: Tuple, phantom_id: str,
+                             render_function, *args) -> Optional[EncodedFrame]:
+        """Frame en cache, sinon un seul rendu en cours par clé (thread d'encodage), attendu par tous"""
+        frame = cache.get(key)
+        if frame is not None:
+            return frame
+        
+        render = self.frame_renders.get(key)
+        if render is None:
+            generation = self.frame_generations.get(phantom_id, 0)
+            render = asyncio.ensure_future(
+                asyncio.get_running_loop().run_in_executor(self.encode_executor, render_function, *args)
+            )
+            self.frame_renders[key] = render
+            render.add_done_callback(lambda done: self._store_frame(cache, key, phantom_id, generation, done))
+        
+        # shield: un viewer qui se déconnecte n'annule pas l'encodage des autres
+        return await asyncio.shield(render)
+    
+    def _store_frame(self, cache: BoundedPhantomCache, key: Tuple, phantom_id: str, generation: int,
+                     render: asyncio.Future):
+        self.frame_renders.pop(key, None)
+        if render.cancelled() or render.exception() is not None:
+            return
+        frame = render.result()
+        # Invalidé pendant l'encodage (suppression, révocation): pas de mise en cache
+        if frame is not None and self.frame_generations.get(phantom_id, 0) == generation:
+            cache.put(key, frame)
+    
+    def _frame_key(self, phantom_id: str, target_size: Optional[Tuple[int, int]],
+                   image_format: str, quality: int, max_size: Optional[Tuple[int, int]] = None) -> Tuple:
+        level = self._preview_info(phantom_id, target_size).get('preview_level', 0)
+        if image_format == 'png':
+            quality = 0  # sans perte: une seule variante PNG par taille
+        return (phantom_id, level, image_format, quality, max_size)
+    
+    def _render_frame(self, phantom_id: str, access_token: str, target_size: Optional[Tuple[int, int]],
+                      image_format: str, quality: int,
+                      max_size: Optional[Tuple[int, int]] = None) -> Optional[EncodedFrame]:
+        """Résurrection + réduction éventuelle + encodage (thread d'encodage)"""
+        phantom_image = self._resurrect(phantom_id, access_token, target_size)
+        if phantom_image is None:
+            return None
+        
+        data, (width, height) = encode_variant(phantom_image, image_format, quality, max_size)
+        return EncodedFrame(
+            data=data,
+            mime_type=IMAGE_FORMATS[image_format][1],
+            width=width,
+            height=height,
+            preview_level=self._preview_info(phantom_id, target_size).get('preview_level', 0)
+        )
+    
+    def invalidate_phantom(self, phantom_id: str):
+        """Oublie les frames et tuiles encodées d'un phantom (suppression, révocation); thread-safe"""
+        self.frame_generations[phantom_id] = self.frame_generations.get(phantom_id, 0) + 1
+        for cache in (self.frame_cache, self.tile_cache):
+            for key in cache.keys():
+                if key[0] == phantom_id:
+                    cache.invalidate(key)
+    
+    # ------------------------------------------------------------------
+    # Projection par tuiles (fenêtre + zoom du client)
+    # ------------------------------------------------------------------
+    
+    def start_viewport(self, ws: web.WebSocketResponse, client_id: str, data: dict):
+        """Nouvelle fenêtre: remplace l'envoi de la fenêtre précédente (pan rapide)"""
+        previous = self.viewport_tasks.pop(ws, None)
+        if previous is not None:
+            previous.cancel()
+        self.viewport_tasks[ws] = asyncio.ensure_future(self.stream_viewport_tiles(ws, client_id, data))
+    
+    async def stream_viewport_tiles(self, ws: web.WebSocketResponse, client_id: str, data: dict):
+        """
+        Envoie les tuiles visibles du niveau d'aperçu adapté au zoom (du centre
+        vers les bords, au fil des encodages), puis prépare les voisines en cache.
+        """
+        phantom_id = data.get('phantom_id')
+        access_token = data.get('access_token')
+        
+        try:
+            viewport = Viewport.from_message(data)
+        except (KeyError, TypeError, ValueError):
+            await self.send_error(ws, "Fenêtre de projection invalide")
+            return
+        
+        config = self.urn_system.active_urns.get(phantom_id)
+        authorize = getattr(self.urn_system, 'authorize_projection', None)
+        if config is None or authorize is None or not authorize(phantom_id, access_token):
+            await self.send_error(ws, f"Phantom {phantom_id} non accessible")
+            return
+        
+        try:
+            full_dimensions = tuple(config.image_dimensions)
+            level = self.urn_system.select_projection_level(phantom_id, viewport.target_size(full_dimensions))
+            tiles = visible_tiles(viewport, full_dimensions, level.dimensions, self.tile_size)
+            
+            self.viewer_phantoms.setdefault(client_id, set()).add(phantom_id)
+            await self.send_message(ws, {
+                'type': 'phantom_tiles',
+                'phantom_id': phantom_id,
+                'preview_level': level.level,
+                'dimensions': {'width': level.dimensions[0], 'height': level.dimensions[1]},
+                'full_dimensions': {'width': full_dimensions[0], 'height': full_dimensions[1]},
+                'tile_size': self.tile_size,
+                'tiles': [list(tile) for tile in tiles],
+                'timestamp': time.time()
+            }, droppable=False)
+            
+            renders = [self.get_encoded_tile(phantom_id, access_token, level, tile) for tile in tiles]
+            for render in asyncio.as_completed(renders):
+                tile, frame = await render
+                if frame is not None:
+                    await self.send_tile(ws, phantom_id, level, tile, frame)
+            
+            # Voisines: encodées en cache, envoyées au prochain pan
+            prefetch = asyncio.ensure_future(asyncio.gather(*(
+                self.get_encoded_tile(phantom_id, access_token, level, tile)
+                for tile in neighbor_tiles(tiles, level.dimensions, self.tile_size, self.prefetch_ring)
+            ), return_exceptions=True))
+            self.prefetch_tasks.add(prefetch)
+            prefetch.add_done_callback(self.prefetch_tasks.discard)
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erreur tuiles {phantom_id}: {e}")
+            await self.send_error(ws, f"Erreur tuiles: {e}")
+    
+    async def get_encoded_tile(self, phantom_id: str, access_token: str, level: PyramidLevel, tile: Tile,
+                               quality: int = WS_JPEG_QUALITY) -> Tuple[Tile, Optional[EncodedFrame]]:
+        """Tuile encodée (cache par phantom, un seul encodage en cours par tuile)"""
+        key = (phantom_id, level.level, tile[0], tile[1], quality)
+        frame = self.tile_cache.get(key)
+        if frame is not None:
+            return tile, frame
+        
+        level_image = await self._resurrect_level(phantom_id, access_token, level)
+        if level_image is None:
+            return tile, None
+        frame = await self._render_shared(self.tile_cache, key, phantom_id, self._render_tile,
+                                          level_image, level, tile, quality)
+        return tile, frame
+    
+    async def _resurrect_level(self, phantom_id: str, access_token: str,
+                               level: PyramidLevel) -> Optional[np.ndarray]:
+        """
+        Niveau ressuscité une seule fois à la fois par (phantom, niveau): les tuiles
+        d'une fenêtre froide attendent la même résurrection au lieu de décrypter
+        chacune le niveau entier (ordre de stockage des cendres mélangé: pas de
+        résurrection partielle possible). Résultat mis en cache par le système URN.
+        """
+        key = (phantom_id, level.level, self.frame_generations.get(phantom_id, 0))
+        resurrection = self.level_resurrections.get(key)
+        if resurrection is None:
+            resurrection = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(
+                self.encode_executor, self._resurrect, phantom_id, access_token,
+                level.dimensions if level.level else None
+            ))
+            self.level_resurrections[key] = resurrection
+            resurrection.add_done_callback(lambda _: self.level_resurrections.pop(key, None))
+        
+        # shield: un viewer qui change de fenêtre n'annule pas la résurrection des autres
+        return await asyncio.shield(resurrection)
+    
+    def _render_tile(self, level_image: np.ndarray, level: PyramidLevel, tile: Tile,
+                     quality: int) -> Optional[EncodedFrame]:
+        """Découpe + encodage d'une tuile du niveau ressuscité (thread d'encodage)"""
+        x, y, width, height = tile_bounds(tile, level.dimensions, self.tile_size)
+        buffer = io.BytesIO()
+        Image.fromarray(level_image[y:y + height, x:x + width]).save(buffer, format='JPEG', quality=quality)
+        return EncodedFrame(
+            data=buffer.getvalue(),
+            mime_type='image/jpeg',
+            width=width,
+            height=height,
+            preview_level=level.level
+        )
+    
+    async def send_tile(self, ws: web.WebSocketResponse, phantom_id: str, level: PyramidLevel, tile: Tile,
+                        frame: EncodedFrame):
+        """Tuile: frame binaire ou message JSON base64 selon la connexion"""
+        x, y, width, height = tile_bounds(tile, level.dimensions, self.tile_size)
+        coalesce_key = ('tile', phantom_id, level.level) + tuple(tile)
+        channel = self._channel(ws)
+        if channel.binary:
+            await self.send_binary(ws, encode_frame(PhantomFrame(
+                kind=FRAME_KIND_TILE,
+                phantom_id=phantom_id,
+                sequence=channel.next_sequence(),
+                mime_type=frame.mime_type,
+                width=level.dimensions[0],
+                height=level.dimensions[1],
+                data=frame.data,
+                x=x,
+                y=y,
+                cols=width,
+                rows=height,
+                preview_level=level.level
+            )), coalesce_key)
+            return
+        
+        await self.send_message(ws, {
+            'type': 'phantom_tile',
+            'phantom_id': phantom_id,
+            'preview_level': level.level,
+            'tile': list(tile),
+            'x': x,
+            'y': y,
+            'width': width,
+            'height': height,
+            'data': frame.data_base64,
+            'mime_type': frame.mime_type,
+            'timestamp': time.time()
+        }, coalesce_key)
+    
+    def _projection_message(self, phantom_id: str, frame: EncodedFrame,
+                            target_size: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        return {
+            'type': 'phantom_projection',
+            'phantom_id': phantom_id,
+            'data': frame.data_base64,
+            'mime_type': frame.mime_type,
+            'dimensions': {
+                'width': frame.width,
+                'height': frame.height
+            },
+            **self._preview_info(phantom_id, target_size),
+            'timestamp': time.time(),
+            'anti_capture_active': True
+        }
+    
+    def _resurrect(self, phantom_id: str, access_token: str,
+                   target_size: Optional[Tuple[int, int]] = None) -> Optional[np.ndarray]:
+        """Résurrection Phoenix, au plus petit niveau d'aperçu qui satisfait target_size"""
+        if target_size is None:
+            return self.urn_system.get_phantom_for_projection(phantom_id, access_token)
+        return self.urn_system.get_phantom_for_projection(phantom_id, access_token, target_size=target_size)
+    
+    def _preview_info(self, phantom_id: str, target_size: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+        """Niveau de pyramide servi et dimensions pleine résolution"""
+        select_level = getattr(self.urn_system, 'select_projection_level', None)
+        config = self.urn_system.active_urns.get(phantom_id)
+        if select_level is None or config is None:
+            return {}
+        return {
+            'preview_level': select_level(phantom_id, target_size).level,
+            'full_dimensions': {
+                'width': config.image_dimensions[0],
+                'height': config.image_dimensions[1]
+            }
+        }
+    
+    @staticmethod
+    def _encode_jpeg(pixels: np.ndarray, quality: int) -> bytes:
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
+    
+    def _channel(self, ws: web.WebSocketResponse) -> FrameChannel:
+        channel = self.frame_channels.get(ws)
+        if channel is None:
+            channel = self.frame_channels[ws] = FrameChannel()
+        return channel
+    
+    async def send_projection(self, ws: web.WebSocketResponse, phantom_id: str, frame: EncodedFrame,
+                              target_size: Optional[Tuple[int, int]] = None):
+        """Projection complète: frame binaire (image brute) ou message JSON base64 selon la connexion"""
+        channel = self._channel(ws)
+        coalesce_key = ('projection', phantom_id)  # seule la dernière projection d'un phantom compte
+        if not channel.binary:
+            await self.send_message(ws, self._projection_message(phantom_id, frame, target_size), coalesce_key)
+            return
+        
+        await self.send_binary(ws, encode_frame(PhantomFrame(
+            kind=FRAME_KIND_PROJECTION,
+            phantom_id=phantom_id,
+            sequence=channel.next_sequence(),
+            mime_type=frame.mime_type,
+            width=frame.width,
+            height=frame.height,
+            data=frame.data,
+            preview_level=frame.preview_level
+        )), coalesce_key)
+    
+    async def send_band(self, ws: web.WebSocketResponse, phantom_id: str, band, band_data: bytes):
+        """Bande de résurrection progressive (JPEG)"""
+        channel = self._channel(ws)
+        if channel.binary:
+            await self.send_binary(ws, encode_frame(PhantomFrame(
+                kind=FRAME_KIND_BAND,
+                phantom_id=phantom_id,
+                sequence=channel.next_sequence(),
+                mime_type='image/jpeg',
+                width=band.image.shape[1],
+                height=band.image.shape[0],
+                data=band_data,
+                y=band.y_start,
+                rows=band.y_end - band.y_start,
+                complete=band.complete
+            )))
+            return
+        
+        await self.send_message(ws, {
+            'type': 'phantom_band',
+            'phantom_id': phantom_id,
+            'y': band.y_start,
+            'height': band.y_end - band.y_start,
+            'complete': band.complete,
+            'data': base64.b64encode(band_data).decode(),
+            'mime_type': 'image/jpeg',
+            'dimensions': {
+                'width': band.image.shape[1],
+                'height': band.image.shape[0]
+            },
+            'timestamp': time.time()
+        })
+    
     async def send_phantom_list(self, ws: web.WebSocketResponse):
         """Envoie la liste des phantoms disponibles"""
         try:
@@ -210,22 +686,49 @@ class PhantomProjectionServer:
                 'phantoms': phantoms,
                 'server': 'Phantom Projection Server',
                 'protocol': 'ORP',
+                'frame_mode': self._channel(ws).mode,
                 'count': len(phantoms)
             }
             
-            await self.send_message(ws, message)
+            await self.send_message(ws, message, coalesce_key=('phantom_list',))
             
         except Exception as e:
             logger.error(f"❌ Erreur envoi liste phantoms: {e}")
     
-    async def send_message(self, ws: web.WebSocketResponse, data: dict):
-        """Envoie un message JSON via WebSocket"""
+    async def send_message(self, ws: web.WebSocketResponse, data: dict, coalesce_key: Optional[Tuple] = None,
+                           droppable: bool = True):
+        """Envoie un message JSON via la file de la connexion"""
+        await self._enqueue(ws, json.dumps(data), coalesce_key, droppable)
+    
+    async def send_binary(self, ws: web.WebSocketResponse, frame: bytes, coalesce_key: Optional[Tuple] = None):
+        """Envoie une frame binaire via la file de la connexion"""
+        await self._enqueue(ws, frame, coalesce_key, True)
+    
+    async def _enqueue(self, ws: web.WebSocketResponse, payload: Payload, coalesce_key: Optional[Tuple],
+                       droppable: bool):
+        queue = self.send_queues.get(ws)
+        if queue is not None:
+            queue.put(payload, coalesce_key, droppable)
+            return
+        
+        # Connexion sans file (fermée ou externe): envoi direct
         try:
-            message = json.dumps(data)
-            await ws.send_str(message)
+            await self._write(ws, payload)
         except Exception as e:
             logger.error(f"❌ Erreur envoi message: {e}")
     
+    @staticmethod
+    async def _write(ws: web.WebSocketResponse, payload: Payload):
+        if isinstance(payload, bytes):
+            await ws.send_bytes(payload)
+        else:
+            await ws.send_str(payload)
+    
+    async def _disconnect_slow(self, ws: web.WebSocketResponse):
+        """Client resté au-dessus du seuil haut de sa file: déconnexion"""
+        self.active_connections.discard(ws)
+        await ws.close(code=WSCloseCode.TRY_AGAIN_LATER, message=b"Client trop lent")
+    
     async def send_error(self, ws: web.WebSocketResponse, error_message: str):
         """Envoie un message d'erreur"""
         error_data = {
@@ -233,7 +736,7 @@ class PhantomProjectionServer:
             'message': error_message,
             'timestamp': time.time()
         }
-        await self.send_message(ws, error_data)
+        await self.send_message(ws, error_data, droppable=False)
     
     async def get_phantom_info(self, request):
         """Informations sur un phantom spécifique"""
@@ -257,31 +760,49 @@ class PhantomProjectionServer:
             return web.json_response({'error': 'Phantom non trouvé'}, status=404)
     
     async def stream_phantom(self, request):
-        """Endpoint HTTP pour streaming direct"""
+        """
+        Endpoint HTTP pour streaming direct. Variantes négociées:
+        ?size=/width=/height= (taille max), ?quality=low|medium|high|1-100,
+        ?format=jpeg|webp|png (sinon selon l'en-tête Accept)
+        """
         phantom_id = request.match_info['phantom_id']
         access_token = request.query.get('token')
         
         if not access_token:
             return web.json_response({'error': 'Token d\'accès requis'}, status=401)
         
-        phantom_image = self.urn_system.get_phantom_for_projection(phantom_id, access_token)
+        # Taille cible: ?size=256, ?size=256x144 ou ?width=256&height=144
+        try:
+            target_size = parse_target_size(
+                request.query.get('size')
+                or ({'width': request.query.get('width'), 'height': request.query.get('height')}
+                    if 'width' in request.query or 'height' in request.query else None)
+            )
+        except (TypeError, ValueError):
+            return web.json_response({'error': 'Taille cible invalide'}, status=400)
         
-        if phantom_image is None:
-            return web.json_response({'error': 'Phantom non accessible'}, status=404)
+        try:
+            quality = parse_quality(request.query.get('quality'), HTTP_JPEG_QUALITY)
+            image_format = negotiate_format(request.query.get('format'), request.headers.get('Accept'))
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
         
-        # Convertir en JPEG
-        pil_image = Image.fromarray(phantom_image)
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format='JPEG', quality=90)
-        buffer.seek(0)
+        frame = await self.get_encoded_frame(phantom_id, access_token, target_size, image_format=image_format,
+                                             quality=quality, max_size=target_size)
+        
+        if frame is None:
+            return web.json_response({'error': 'Phantom non accessible'}, status=404)
         
         return web.Response(
-            body=buffer.getvalue(),
-            content_type='image/jpeg',
+            body=frame.data,
+            content_type=frame.mime_type,
             headers={
                 'X-Phantom-ID': phantom_id,
+                'X-Phantom-Preview-Level': str(frame.preview_level),
+                'X-Phantom-Dimensions': f"{frame.width}x{frame.height}",
                 'X-Anti-Capture': 'active',
-                'Cache-Control': 'no-store, no-cache, must-revalidate'
+                'Cache-Control': 'no-store, no-cache, must-revalidate',
+                'Vary': 'Accept'
             }
         )
     
@@ -294,6 +815,9 @@ class PhantomProjectionServer:
             'active_connections': len(self.active_connections),
             'active_phantoms': len(self.urn_system.active_urns),
             'viewers_connected': len(self.viewer_phantoms),
+            'frame_cache': self.frame_cache.stats(),
+            'tile_cache': self.tile_cache.stats(),
+            'send_queues': self.send_queues.stats(),
             'timestamp': time.time()
         }
         
@@ -312,18 +836,15 @@ class PhantomProjectionServer:
         return web.json_response(response)
     
     async def broadcast_to_all(self, message: dict):
-        """Diffuse un message à tous les clients connectés"""
+        """
+        Diffuse un message à tous les clients connectés: enfilé dans la file de
+        chaque connexion (sans attendre les clients lents), le dernier message
+        d'un même type remplaçant celui encore en attente
+        """
         if not self.active_connections:
             return
         
-        message_str = json.dumps(message)
-        
-        for ws in self.active_connections.copy():
-            try:
-                await ws.send_str(message_str)
-            except Exception as e:
-                logger.error(f"❌ Erreur broadcast: {e}")
-                self.active_connections.discard(ws)
+        self.send_queues.broadcast(json.dumps(message), coalesce_key=('broadcast', message.get('type')))
     
     def start_server(self):
         """Démarre le serveur (bloquant)"""
@@ -364,4 +885,7 @@ class PhantomProjectionServer:
         """Arrête le serveur"""
         if self.runner:
             await self.runner.cleanup()
+        self.encode_executor.shutdown(wait=False, cancel_futures=True)
+        self.frame_cache.close()
+        self.tile_cache.close()
         logger.info("🛑 Serveur Projection arrêté")
\ No newline at end of file
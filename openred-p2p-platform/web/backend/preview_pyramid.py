@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+🔻 PYRAMIDE D'APERÇUS CRYPTÉE - Phantom URN
+===========================================
+Au burn, l'image est aussi réduite en niveaux mip (1/4, 1/16, 1/64 de la
+surface: chaque niveau divise largeur et hauteur par 2), stockés comme des
+ensembles de cendres séparés dans le conteneur de l'URN.
+
+- Mêmes clés que l'image pleine résolution (dérivées du nom du lot et de
+  l'URN) → même contrôle d'accès, détruits avec l'URN
+- Cendres AES-CTR par lots (pixels), quel que soit le mode de l'URN:
+  un aperçu est petit, le cryptage vectorisé suffit
+- Une projection avec taille cible ne ressuscite que le plus petit niveau
+  qui la satisfait (niveau 0 = pleine résolution)
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from bulk_ash_cipher import build_pixel_records, encrypt_record_batches
+
+DEFAULT_PYRAMID_LEVELS = 3
+
+# Côté minimal d'un niveau: en dessous, l'aperçu est inutile
+MIN_PYRAMID_SIDE = 16
+
+TargetSize = Tuple[int, int]
+
+
+@dataclass
+class PyramidLevel:
+    """Niveau mip k: dimensions ≈ pleine résolution / 2^k"""
+    level: int
+    dimensions: Tuple[int, int]  # (largeur, hauteur)
+
+
+def pyramid_dimensions(width: int, height: int, levels: int = DEFAULT_PYRAMID_LEVELS) -> List[PyramidLevel]:
+    """Niveaux 1..levels retenus pour une image (arrêt sous MIN_PYRAMID_SIDE)"""
+    result = []
+    for level in range(1, levels + 1):
+        level_width, level_height = -(-width // 2 ** level), -(-height // 2 ** level)
+        if min(level_width, level_height) < MIN_PYRAMID_SIDE:
+            break
+        result.append(PyramidLevel(level, (level_width, level_height)))
+    return result
+
+
+def build_pyramid(image: Image.Image, levels: int = DEFAULT_PYRAMID_LEVELS) -> List[Tuple[PyramidLevel, np.ndarray]]:
+    """Réductions successives 2x2 (filtre boîte) de l'image pleine résolution"""
+    pyramid = []
+    current = image
+    for level in pyramid_dimensions(image.width, image.height, levels):
+        current = current.reduce(2)
+        pyramid.append((level, np.asarray(current)))
+    return pyramid
+
+
+def encrypt_pyramid_level(level_array: np.ndarray, phantom_id: str) -> List[Tuple[str, bytes]]:
+    """Lots AES-CTR d'un niveau (ordre de stockage mélangé, noms aléatoires)"""
+    return encrypt_record_batches(build_pixel_records(level_array), phantom_id)
+
+
+def parse_target_size(value: Union[None, int, str, Sequence[int], Dict[str, Any]]) -> Optional[TargetSize]:
+    """
+    Taille cible d'une projection: 256, "256", "256x144", (256, 144) ou
+    {"width": 256, "height": 144}. Un seul côté → boîte carrée.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, dict):
+        width, height = value.get("width"), value.get("height")
+    elif isinstance(value, (list, tuple)):
+        width, height = value
+    elif isinstance(value, str) and "x" in value.lower():
+        width, _, height = value.lower().partition("x")
+    else:
+        width = height = value
+
+    width = int(width or height)
+    height = int(height or width)
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Taille cible invalide: {value}")
+    return width, height
+
+
+def select_level(full_dimensions: Tuple[int, int], levels: Sequence[PyramidLevel],
+                 target_size: Optional[TargetSize]) -> PyramidLevel:
+    """
+    Plus petit niveau couvrant l'image affichée dans une boîte target_size
+    (mise à l'échelle sans agrandissement); niveau 0 à défaut.
+    """
+    full = PyramidLevel(0, tuple(full_dimensions))
+    if target_size is None:
+        return full
+
+    width, height = full_dimensions
+    scale = min(1.0, target_size[0] / width, target_size[1] / height)
+    needed_width, needed_height = int(np.ceil(width * scale)), int(np.ceil(height * scale))
+
+    for level in sorted(levels, key=lambda candidate: candidate.level, reverse=True):
+        if level.dimensions[0] >= needed_width and level.dimensions[1] >= needed_height:
+            return level
+    return full
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+🎞️ FRAMES BINAIRES DE PROJECTION - Protocole ORP
+================================================
+Une projection envoyée en base64 dans un message JSON coûte ~33% de bande
+passante, un encodage base64 côté serveur et un décodage côté navigateur.
+En mode binaire, chaque frame est un message WebSocket binaire:
+
+    en-tête fixe (40 octets, big-endian) | phantom_id (UTF-8) | image brute
+
+    magic "ORPF" | version | type (projection, bande, tuile) | format (JPEG,
+    PNG, WebP) | drapeaux (complète, anti-capture) | niveau d'aperçu |
+    réservé | longueur phantom_id | séquence | largeur | hauteur | x | y |
+    colonnes | lignes
+
+largeur/hauteur: image projetée entière (au niveau d'aperçu); x/y/colonnes/
+lignes: région transportée (bande ou tuile; image entière pour une
+projection complète).
+
+Négociation à la connexion: sous-protocole WebSocket (orp.binary.v1 ou
+orp.json) ou paramètre ?frames=binary|json. Sans l'un ni l'autre, le mode
+JSON historique est conservé.
+"""
+
+import itertools
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+FRAME_MAGIC = b"ORPF"
+FRAME_VERSION = 1
+
+FRAME_MODE_BINARY = "binary"
+FRAME_MODE_JSON = "json"
+
+SUBPROTOCOL_BINARY = "orp.binary.v1"
+SUBPROTOCOL_JSON = "orp.json"
+
+# Ordre de préférence du serveur
+SUBPROTOCOLS = (SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON)
+
+FRAME_KIND_PROJECTION = 1
+FRAME_KIND_BAND = 2
+FRAME_KIND_TILE = 3
+
+FLAG_COMPLETE = 0x01
+FLAG_ANTI_CAPTURE = 0x02
+
+_FORMAT_CODES = {"image/jpeg": 1, "image/png": 2, "image/webp": 3}
+_FORMAT_MIME_TYPES = {code: mime_type for mime_type, code in _FORMAT_CODES.items()}
+
+# magic, version, type, format, drapeaux, niveau, réservé, len(id), séquence,
+# largeur, hauteur, x, y, colonnes, lignes
+_HEADER = struct.Struct("!4sBBBBBxHIIIIIII")
+HEADER_SIZE = _HEADER.size
+
+
+@dataclass
+class PhantomFrame:
+    """Frame de projection (image encodée + métadonnées de l'en-tête)"""
+    kind: int
+    phantom_id: str
+    sequence: int
+    mime_type: str
+    width: int
+    height: int
+    data: bytes
+    x: int = 0
+    y: int = 0
+    cols: int = 0  # 0: toute la largeur
+    rows: int = 0  # 0: toute la hauteur
+    preview_level: int = 0
+    complete: bool = True
+    anti_capture: bool = True
+
+
+def encode_frame(frame: PhantomFrame) -> bytes:
+    """En-tête + phantom_id + image brute (un seul message WebSocket binaire)"""
+    if frame.mime_type not in _FORMAT_CODES:
+        raise ValueError(f"Format de frame non supporté: {frame.mime_type}")
+
+    phantom_id = frame.phantom_id.encode("utf-8")
+    flags = (FLAG_COMPLETE if frame.complete else 0) | (FLAG_ANTI_CAPTURE if frame.anti_capture else 0)
+    header = _HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, frame.kind, _FORMAT_CODES[frame.mime_type], flags,
+        frame.preview_level, len(phantom_id), frame.sequence & 0xFFFFFFFF,
+        frame.width, frame.height, frame.x, frame.y, frame.cols or frame.width, frame.rows or frame.height
+    )
+    return b"".join((header, phantom_id, frame.data))
+
+
+def decode_frame(buffer: bytes) -> PhantomFrame:
+    """Inverse de encode_frame (clients Python, tests); ValueError si invalide"""
+    if len(buffer) < HEADER_SIZE:
+        raise ValueError("Frame tronquée")
+
+    (magic, version, kind, format_code, flags, preview_level, id_length,
+     sequence, width, height, x, y, cols, rows) = _HEADER.unpack_from(buffer)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise ValueError("Frame ORP invalide")
+    if format_code not in _FORMAT_MIME_TYPES:
+        raise ValueError(f"Format de frame inconnu: {format_code}")
+    if len(buffer) < HEADER_SIZE + id_length:
+        raise ValueError("Frame tronquée")
+
+    view = memoryview(buffer)
+    return PhantomFrame(
+        kind=kind,
+        phantom_id=bytes(view[HEADER_SIZE:HEADER_SIZE + id_length]).decode("utf-8"),
+        sequence=sequence,
+        mime_type=_FORMAT_MIME_TYPES[format_code],
+        width=width,
+        height=height,
+        data=bytes(view[HEADER_SIZE + id_length:]),
+        x=x,
+        y=y,
+        cols=cols,
+        rows=rows,
+        preview_level=preview_level,
+        complete=bool(flags & FLAG_COMPLETE),
+        anti_capture=bool(flags & FLAG_ANTI_CAPTURE)
+    )
+
+
+def negotiate_frame_mode(subprotocol: Optional[str] = None, requested_mode: Optional[str] = None) -> str:
+    """Mode d'une connexion: sous-protocole accepté, sinon ?frames=, sinon JSON"""
+    if subprotocol == SUBPROTOCOL_BINARY:
+        return FRAME_MODE_BINARY
+    if subprotocol == SUBPROTOCOL_JSON:
+        return FRAME_MODE_JSON
+    if requested_mode and requested_mode.lower() == FRAME_MODE_BINARY:
+        return FRAME_MODE_BINARY
+    return FRAME_MODE_JSON
+
+
+def select_subprotocol(offered: str) -> Optional[str]:
+    """Sous-protocole retenu parmi l'en-tête Sec-WebSocket-Protocol du client"""
+    offered_protocols = [protocol.strip() for protocol in (offered or "").split(",")]
+    for protocol in SUBPROTOCOLS:
+        if protocol in offered_protocols:
+            return protocol
+    return None
+
+
+class FrameChannel:
+    """Mode négocié d'une connexion WebSocket et numérotation de ses frames"""
+
+    def __init__(self, mode: str = FRAME_MODE_JSON):
+        self.mode = mode
+        self._sequence = itertools.count()
+
+    @property
+    def binary(self) -> bool:
+        return self.mode == FRAME_MODE_BINARY
+
+    def next_sequence(self) -> int:
+        return next(self._sequence)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+🧩 PROJECTION PAR TUILES - Protocole ORP
+========================================
+Pour une très grande image, le client n'affiche qu'une région: il envoie
+sa fenêtre (coordonnées pleine résolution) et son zoom, le serveur choisit
+le niveau d'aperçu adapté au zoom et n'encode/n'envoie que les tuiles
+visibles de ce niveau, puis prépare les tuiles voisines (pan sans attente).
+
+Géométrie uniquement: la résurrection du niveau et le cache des tuiles
+encodées sont gérés par PhantomProjectionServer.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_TILE_SIZE = 256
+
+# Anneau de tuiles voisines préparées autour de la fenêtre
+DEFAULT_PREFETCH_RING = 1
+
+# Zoom minimal accepté (1/2^10): au-delà, le plus petit aperçu suffit de toute façon
+MIN_ZOOM = 1.0 / 1024
+
+Tile = Tuple[int, int]  # (colonne, ligne) dans la grille du niveau
+
+
+@dataclass
+class Viewport:
+    """Fenêtre du client en pixels pleine résolution; zoom = pixels écran par pixel image"""
+    x: int
+    y: int
+    width: int
+    height: int
+    zoom: float = 1.0
+
+    @classmethod
+    def from_message(cls, data: Dict[str, Any]) -> "Viewport":
+        """Fenêtre d'un message viewport (ValueError si invalide)"""
+        viewport = cls(
+            x=max(0, int(data.get("x", 0))),
+            y=max(0, int(data.get("y", 0))),
+            width=int(data["width"]),
+            height=int(data["height"]),
+            zoom=float(data.get("zoom", 1.0))
+        )
+        if viewport.width <= 0 or viewport.height <= 0 or not viewport.zoom > 0:
+            raise ValueError("Fenêtre de projection invalide")
+        viewport.zoom = min(1.0, max(MIN_ZOOM, viewport.zoom))
+        return viewport
+
+    def target_size(self, full_dimensions: Tuple[int, int]) -> Tuple[int, int]:
+        """Taille de l'image entière affichée à ce zoom (choix du niveau d'aperçu)"""
+        return (max(1, round(full_dimensions[0] * self.zoom)),
+                max(1, round(full_dimensions[1] * self.zoom)))
+
+
+def tile_grid(level_dimensions: Tuple[int, int], tile_size: int = DEFAULT_TILE_SIZE) -> Tuple[int, int]:
+    """(colonnes, lignes) de tuiles d'un niveau"""
+    return -(-level_dimensions[0] // tile_size), -(-level_dimensions[1] // tile_size)
+
+
+def tile_bounds(tile: Tile, level_dimensions: Tuple[int, int],
+                tile_size: int = DEFAULT_TILE_SIZE) -> Tuple[int, int, int, int]:
+    """(x, y, largeur, hauteur) d'une tuile dans l'image du niveau (tuiles de bord tronquées)"""
+    x, y = tile[0] * tile_size, tile[1] * tile_size
+    return x, y, min(tile_size, level_dimensions[0] - x), min(tile_size, level_dimensions[1] - y)
+
+
+def visible_tiles(viewport: Viewport, full_dimensions: Tuple[int, int], level_dimensions: Tuple[int, int],
+                  tile_size: int = DEFAULT_TILE_SIZE) -> List[Tile]:
+    """Tuiles du niveau couvrant la fenêtre, du centre vers les bords"""
+    scale_x = level_dimensions[0] / full_dimensions[0]
+    scale_y = level_dimensions[1] / full_dimensions[1]
+    columns, rows = tile_grid(level_dimensions, tile_size)
+
+    first_column = min(columns - 1, int(viewport.x * scale_x) // tile_size)
+    first_row = min(rows - 1, int(viewport.y * scale_y) // tile_size)
+    last_column = min(columns - 1, (math.ceil((viewport.x + viewport.width) * scale_x) - 1) // tile_size)
+    last_row = min(rows - 1, (math.ceil((viewport.y + viewport.height) * scale_y) - 1) // tile_size)
+
+    center = ((first_column + last_column) / 2, (first_row + last_row) / 2)
+    tiles = [
+        (column, row)
+        for row in range(first_row, max(first_row, last_row) + 1)
+        for column in range(first_column, max(first_column, last_column) + 1)
+    ]
+    return sorted(tiles, key=lambda tile: (tile[0] - center[0]) ** 2 + (tile[1] - center[1]) ** 2)
+
+
+def neighbor_tiles(tiles: List[Tile], level_dimensions: Tuple[int, int],
+                   tile_size: int = DEFAULT_TILE_SIZE, ring: int = DEFAULT_PREFETCH_RING) -> List[Tile]:
+    """Tuiles à moins de `ring` tuiles de la fenêtre, hors fenêtre"""
+    if not tiles or ring <= 0:
+        return []
+    columns, rows = tile_grid(level_dimensions, tile_size)
+    first_column = max(0, min(column for column, _ in tiles) - ring)
+    last_column = min(columns - 1, max(column for column, _ in tiles) + ring)
+    first_row = max(0, min(row for _, row in tiles) - ring)
+    last_row = min(rows - 1, max(row for _, row in tiles) + ring)
+
+    visible = set(tiles)
+    return [
+        (column, row)
+        for row in range(first_row, last_row + 1)
+        for column in range(first_column, last_column + 1)
+        if (column, row) not in visible
+    ]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+📐 VARIANTES DE PROJECTION - Phantom URN
+========================================
+Un client mobile n'a que faire d'un JPEG pleine résolution qualité 90: il
+demande une taille maximale, un niveau de qualité et un format, le serveur
+réduit l'image (filtre rapide) avant l'encodage et met chaque variante en
+cache.
+
+- Taille: niveau de pyramide le plus proche, puis réduction dans la boîte
+  (sans agrandissement, proportions conservées)
+- Qualité: low / medium / high ou 1-100 (ignorée en PNG)
+- Format: ?format=jpeg|webp|png, sinon négocié sur l'en-tête Accept
+  (WebP si le client l'annonce), JPEG par défaut
+"""
+
+import io
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, features
+
+QUALITY_TIERS = {"low": 60, "medium": 75, "high": 90}
+
+# Format → (format PIL, type MIME)
+IMAGE_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+_FORMAT_ALIASES = {"jpg": "jpeg", "image/jpeg": "jpeg", "image/webp": "webp", "image/png": "png"}
+
+WEBP_AVAILABLE = features.check("webp")
+
+# Compression PNG: niveau rapide (le PNG sert surtout aux captures sans perte)
+PNG_COMPRESS_LEVEL = 3
+
+# Réduction en deux temps (reduce entier puis bilinéaire): rapide et sans crénelage marqué
+RESIZE_FILTER = Image.BILINEAR
+RESIZE_REDUCING_GAP = 2.0
+
+
+def parse_quality(value: Optional[str], default: int) -> int:
+    """Niveau de qualité (low, medium, high) ou valeur 1-100; ValueError si invalide"""
+    if value is None or value == "":
+        return default
+    if value.lower() in QUALITY_TIERS:
+        return QUALITY_TIERS[value.lower()]
+    quality = int(value)
+    if not 1 <= quality <= 100:
+        raise ValueError(f"Qualité invalide: {value}")
+    return quality
+
+
+def negotiate_format(requested: Optional[str] = None, accept: Optional[str] = None) -> str:
+    """Format demandé explicitement, sinon WebP si accepté par le client, sinon JPEG"""
+    if requested:
+        name = _FORMAT_ALIASES.get(requested.lower(), requested.lower())
+        if name not in IMAGE_FORMATS or (name == "webp" and not WEBP_AVAILABLE):
+            raise ValueError(f"Format non supporté: {requested}")
+        return name
+    if accept and WEBP_AVAILABLE and "image/webp" in accept:
+        return "webp"
+    return "jpeg"
+
+
+def fit_within(dimensions: Tuple[int, int], max_size: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """Dimensions (largeur, hauteur) réduites pour tenir dans max_size, sans agrandissement"""
+    width, height = dimensions
+    if max_size is None:
+        return width, height
+    scale = min(1.0, max_size[0] / width, max_size[1] / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def encode_variant(pixels: np.ndarray, image_format: str, quality: int,
+                   max_size: Optional[Tuple[int, int]] = None) -> Tuple[bytes, Tuple[int, int]]:
+    """Réduction éventuelle + encodage → (octets, (largeur, hauteur))"""
+    image = Image.fromarray(pixels)
+    size = fit_within(image.size, max_size)
+    if size != image.size:
+        image = image.resize(size, RESIZE_FILTER, reducing_gap=RESIZE_REDUCING_GAP)
+
+    pil_format, _ = IMAGE_FORMATS[image_format]
+    options = {"compress_level": PNG_COMPRESS_LEVEL} if pil_format == "PNG" else {"quality": quality}
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, **options)
+    return buffer.getvalue(), image.size
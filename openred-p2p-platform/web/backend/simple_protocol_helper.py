@@ -6,6 +6,7 @@ import sys
 import json
 import time
 import socket
+import asyncio
 import threading
 
 # Ajout du chemin pour les modules P2P
@@ -21,6 +22,8 @@ from friendship_protocol import Friendship, FriendshipStatus, FriendshipPermissi
 simple_protocol = None
 simple_server_socket = None
 server_thread = None
+simple_async_server = None
+server_task = None
 
 def initialize_simple_protocol(p2p_node: OpenRedP2PNode):
     """Initialise le protocole simple avec les clés du nœud P2P"""
@@ -32,6 +35,8 @@ def initialize_simple_protocol(p2p_node: OpenRedP2PNode):
             private_key=p2p_node.lighthouse.private_key,
             public_key=p2p_node.lighthouse.public_key
         )
+        # Messages reçus traités dans la boucle du nœud
+        simple_protocol.inbound_dispatcher = getattr(p2p_node, "inbound_dispatcher", None)
         print(f"✅ Simple protocol initialized for {p2p_node.lighthouse.fingerprint[:8]}...")
         
         # Démarrer serveur TCP simple en parallèle du serveur complexe
@@ -42,8 +47,24 @@ def initialize_simple_protocol(p2p_node: OpenRedP2PNode):
         return False
 
 def start_simple_server(port: int):
-    """Démarre un serveur TCP simple pour le protocole 3 phases"""
-    global simple_server_socket, server_thread
+    """
+    Démarre un serveur TCP simple pour le protocole 3 phases
+    Dans une boucle asyncio (FastAPI, nœud CLI): serveur asyncio, une tâche par connexion
+    Sinon: serveur à threads historique
+    """
+    global simple_server_socket, server_thread, server_task
+    
+    if simple_async_server is not None or server_task is not None or (server_thread is not None and server_thread.is_alive()):
+        print(f"ℹ️ Simple Protocol server already running")
+        return
+    
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        server_task = loop.create_task(start_simple_server_async(port))
+        return
     
     def server_loop():
         global simple_server_socket
@@ -78,6 +99,24 @@ def start_simple_server(port: int):
     server_thread = threading.Thread(target=server_loop, daemon=True)
     server_thread.start()
 
+async def start_simple_server_async(port: int):
+    """Serveur du protocole simple dans la boucle courante"""
+    global simple_async_server
+    
+    async def handle_client(reader, writer):
+        if not simple_protocol:
+            print("❌ Simple protocol not initialized for incoming message")
+            writer.close()
+            return
+        print(f"📥 Simple Protocol connection from {writer.get_extra_info('peername')}")
+        await simple_protocol.handle_incoming_stream(reader, writer)
+    
+    try:
+        simple_async_server = await asyncio.start_server(handle_client, "0.0.0.0", port)
+        print(f"🔐 Simple Protocol server (asyncio) listening on port {port}")
+    except Exception as e:
+        print(f"❌ Error starting simple server: {e}")
+
 async def send_friendship_request_simple(target_fingerprint: str, target_ip: str, target_port: int, request_data: dict) -> bool:
     """
     Envoie une demande d'amitié en utilisant le protocole simple 3 phases
@@ -101,7 +140,7 @@ async def send_friendship_request_simple(target_fingerprint: str, target_ip: str
         print(f"   Target: {target_ip}:{target_port + 1000}")  # Port décalé
         
         # Utilise le protocole simple pour envoyer (port décalé pour simple)
-        success = simple_protocol.send_simple_message(
+        success = await simple_protocol.send_simple_message_async(
             target_ip=target_ip,
             target_port=target_port + 1000,  # Port décalé
             target_node=target_fingerprint,
@@ -352,7 +391,12 @@ def process_pending_friendship_requests(friendship_system):
 
 def stop_simple_server():
     """Arrête le serveur simple"""
-    global simple_server_socket
+    global simple_server_socket, simple_async_server, server_task
+    server_task = None
+    if simple_async_server:
+        simple_async_server.close()
+        simple_async_server = None
+        print("🛑 Simple Protocol server stopped")
     if simple_server_socket:
         simple_server_socket.close()
         print("🛑 Simple Protocol server stopped")
\ No newline at end of file
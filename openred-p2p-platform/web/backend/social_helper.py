@@ -44,10 +44,12 @@ async def send_friendship_request_p2p_simple(p2p_node, target_fingerprint: str,
         
         print(f"📬 Queuing friendship request for {target_fingerprint}")
         
-        # Utiliser le nouveau système de mise en queue
-        p2p_node.queue_social_message(target_fingerprint, request_data)
+        # Boîte d'envoi durable: livraison dès que le pair est joignable
+        if not p2p_node.queue_social_message(target_fingerprint, request_data):
+            print(f"❌ Outbox full, friendship request not queued")
+            return False
         
-        print(f"✅ Friendship request queued and connection initiated")
+        print(f"✅ Friendship request queued for delivery")
         return True
         
     except Exception as e:
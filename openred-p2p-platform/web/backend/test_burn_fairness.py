@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+⚖️ TEST - Équité de l'ordonnanceur de burns (AsyncPhantomProcessor)
+===================================================================
+Deux utilisateurs authentifiés différents, même nœud autorisé:
+- leurs jobs tournent en même temps (limite par utilisateur, pas par nœud)
+- les jobs d'un même utilisateur restent sérialisés (1 job/utilisateur)
+- un gros uploader n'affame pas l'autre (tourniquet)
+Burn simulé (aucune image réelle, aucun pool de processus)
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from async_phantom_processor import AsyncPhantomProcessor
+
+BURN_SECONDS = 0.3
+NODE_FINGERPRINT = "0123456789abcdef"
+
+
+class FakePhantomSystem:
+    """Burn simulé: enregistre les intervalles d'exécution par image"""
+
+    def __init__(self):
+        self.intervals = {}
+        self.authorized_nodes = set()
+        self._lock = threading.Lock()
+
+    def burn_image_to_phantom_urn(self, image_path, phantom_name, authorized_node, burn_pool, progress):
+        start = time.perf_counter()
+        time.sleep(BURN_SECONDS)
+        with self._lock:
+            self.intervals[phantom_name] = (start, time.perf_counter())
+            self.authorized_nodes.add(authorized_node)
+        return {"phantom_id": phantom_name, "total_fragments": 1}
+
+
+def _upload() -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+        temp_file.write(b"fake")
+        return temp_file.name
+
+
+def _overlap(first, second) -> bool:
+    return first[0] < second[1] and second[0] < first[1]
+
+
+async def _run():
+    system = FakePhantomSystem()
+    processor = AsyncPhantomProcessor(system, burn_workers=1, max_concurrent_jobs=2, per_user_limit=1)
+    await processor.start_worker()
+    try:
+        # alice soumet 3 jobs, puis bob 1 job
+        job_ids = [processor.submit_job("alice", f"alice_{i}", _upload(), authorized_node=NODE_FINGERPRINT)
+                   for i in range(3)]
+        job_ids.append(processor.submit_job("bob", "bob_0", _upload(), authorized_node=NODE_FINGERPRINT))
+
+        deadline = time.time() + 10
+        while time.time() < deadline and not all(
+            processor.get_job_status(job_id)["status"] == "completed" for job_id in job_ids
+        ):
+            await asyncio.sleep(0.05)
+    finally:
+        await processor.stop_worker()
+    return system, processor, job_ids
+
+
+def test_two_users_run_concurrently():
+    """Jobs de deux utilisateurs simultanés, jobs d'un même utilisateur sérialisés"""
+    print("⚖️ TEST ÉQUITÉ DES BURNS")
+    print("=" * 50)
+
+    system, processor, job_ids = asyncio.run(_run())
+    statuses = [processor.get_job_status(job_id)["status"] for job_id in job_ids]
+    assert statuses == ["completed"] * 4, f"jobs non terminés: {statuses}"
+
+    intervals = system.intervals
+    assert _overlap(intervals["alice_0"], intervals["bob_0"]), "bob attend alice: limite partagée"
+    print("✅ alice et bob traités en même temps")
+
+    alice = sorted(intervals[f"alice_{i}"] for i in range(3))
+    assert not any(_overlap(a, b) for a, b in zip(alice, alice[1:])), "jobs d'alice simultanés"
+    print("✅ jobs d'alice sérialisés (1 job/utilisateur)")
+
+    assert intervals["bob_0"][1] <= alice[1][1], "bob affamé par alice"
+    print("✅ bob servi avant la fin de la file d'alice")
+
+    assert system.authorized_nodes == {NODE_FINGERPRINT}, "nœud autorisé perdu"
+    assert {job["user_id"] for job in processor.get_user_jobs("bob")} == {"bob"}
+    print("✅ URN autorisées pour le nœud, jobs rattachés à l'utilisateur")
+
+    leftovers = [job.file_path for job in processor.jobs.values() if os.path.exists(job.file_path)]
+    assert not leftovers, "uploads temporaires non supprimés"
+    print("\n🎉 TEST ÉQUITÉ TERMINÉ!")
+
+
+if __name__ == "__main__":
+    test_two_users_run_concurrently()
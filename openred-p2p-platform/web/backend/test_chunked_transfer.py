@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+📦 TEST - Transfert URN par morceaux (ChunkedUrnFetcher / UrnChunkProvider)
+==========================================================================
+Pairs fournisseurs loopback en processus (AsyncP2PTransport), demandeur via
+P2PConnectionPool:
+- récupération répartie entre plusieurs pairs
+- reprise d'un transfert interrompu au dernier morceau vérifié
+- morceaux altérés rejetés, récupérés chez un pair sain
+- manifestes incohérents ou minoritaires écartés
+"""
+
+import asyncio
+import base64
+import os
+import secrets
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core.p2p_security.async_transport import AsyncP2PTransport
+from core.p2p_security.connection_pool import P2PConnectionPool
+from core.p2p_security.three_phase_protocol import ThreePhaseHandshake
+from core.schrodinger_phoenix.chunked_transfer import (
+    CHUNK_REQUEST_TYPE, MANIFEST_REQUEST_TYPE, MIN_CHUNK_SIZE, ChunkedUrnFetcher, UrnChunkProvider,
+    UrnManifest, build_manifest
+)
+
+URN_ID = "urn:phantom:test"
+CHUNK_SIZE = MIN_CHUNK_SIZE
+PAYLOAD = secrets.token_bytes(CHUNK_SIZE * 12 + 1234)   # 13 morceaux, le dernier tronqué
+
+
+def _handshake(fingerprint: str) -> ThreePhaseHandshake:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    return ThreePhaseHandshake(fingerprint, private_key, private_key.public_key())
+
+
+def _corrupting(handler):
+    """Pair défaillant: premier octet de chaque morceau inversé"""
+    def handle(message):
+        response = handler(message)
+        if "data" in response:
+            data = bytearray(base64.b64decode(response["data"]))
+            data[0] ^= 0xFF
+            response["data"] = base64.b64encode(bytes(data)).decode()
+        return response
+    return handle
+
+
+class LoopbackNetwork:
+    """Fournisseurs loopback (ports libres) et demandeur partageant un pool de connexions"""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.providers = {}
+        self.transports = []
+        self.client = None
+        self.pool = None
+
+    async def add_provider(self, fingerprint: str, payload: bytes = PAYLOAD, corrupt: bool = False,
+                           manifest_override=None) -> UrnChunkProvider:
+        transport = AsyncP2PTransport(_handshake(fingerprint), 0, host="127.0.0.1")
+        provider = UrnChunkProvider(lambda urn_id: payload if urn_id == URN_ID else None)
+        chunk_handler = _corrupting(provider.handle_chunk_request) if corrupt else provider.handle_chunk_request
+
+        async def handle(session_id, message):
+            if message.get("type") == MANIFEST_REQUEST_TYPE:
+                if manifest_override is not None:
+                    return {"urn_id": URN_ID, "manifest": manifest_override}
+                return provider.handle_manifest_request(message)
+            if message.get("type") == CHUNK_REQUEST_TYPE:
+                return chunk_handler(message)
+            return None
+
+        transport.set_message_handler(handle)
+        await transport.start()
+        self.transports.append(transport)
+        self.endpoints[fingerprint] = ("127.0.0.1", transport.server.sockets[0].getsockname()[1])
+        self.providers[fingerprint] = provider
+        return provider
+
+    async def request(self, fingerprint: str, message):
+        if self.pool is None:
+            self.client = AsyncP2PTransport(_handshake("f" * 16), 0, host="127.0.0.1")
+            self.pool = P2PConnectionPool(self.client, resolve_endpoint=self.endpoints.get)
+        return await self.pool.request(fingerprint, message)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            await self.client.stop()
+        for transport in self.transports:
+            await transport.stop()
+
+
+def _run(scenario):
+    async def main():
+        network = LoopbackNetwork()
+        try:
+            with tempfile.TemporaryDirectory() as state_dir:
+                return await scenario(network, state_dir)
+        finally:
+            await network.close()
+    return asyncio.run(main())
+
+
+def test_multi_peer_fetch():
+    """Charge utile identique, morceaux répartis entre tous les pairs"""
+    async def scenario(network, state_dir):
+        fingerprints = [f"{i:016x}" for i in range(1, 4)]
+        for fingerprint in fingerprints:
+            await network.add_provider(fingerprint)
+        fetcher = ChunkedUrnFetcher(network.request, state_dir, chunk_size=CHUNK_SIZE, streams_per_peer=1)
+        data = await fetcher.fetch(URN_ID, fingerprints)
+        return data, fetcher, network.providers
+
+    data, fetcher, providers = _run(scenario)
+    manifest = build_manifest(URN_ID, PAYLOAD, CHUNK_SIZE)
+    assert data == PAYLOAD
+    assert fetcher.stats["chunks_fetched"] == manifest.chunk_count
+    served = [provider.stats["chunks_served"] for provider in providers.values()]
+    assert sum(served) == manifest.chunk_count
+    assert all(count > 0 for count in served), f"pair inutilisé: {served}"
+
+
+def test_resume_after_interrupted_transfer():
+    """Coupure à mi-transfert: seuls les morceaux manquants sont redemandés"""
+    async def scenario(network, state_dir):
+        fingerprint = "1" * 16
+        await network.add_provider(fingerprint)
+        manifest = build_manifest(URN_ID, PAYLOAD, CHUNK_SIZE)
+        drop_after = manifest.chunk_count // 2
+        served = {"count": 0}
+
+        async def dropping_request(peer, message):
+            if message.get("type") == CHUNK_REQUEST_TYPE:
+                served["count"] += 1
+                if served["count"] > drop_after:
+                    return None
+            return await network.request(peer, message)
+
+        interrupted = ChunkedUrnFetcher(dropping_request, state_dir, chunk_size=CHUNK_SIZE)
+        assert await interrupted.fetch(URN_ID, [fingerprint]) is None
+
+        resumed = ChunkedUrnFetcher(network.request, state_dir, chunk_size=CHUNK_SIZE)
+        data = await resumed.fetch(URN_ID, [fingerprint])
+        return manifest, interrupted, resumed, data
+
+    manifest, interrupted, resumed, data = _run(scenario)
+    kept = interrupted.stats["chunks_fetched"]
+    assert 0 < kept < manifest.chunk_count
+    assert data == PAYLOAD
+    assert resumed.stats["transfers_resumed"] == 1
+    assert resumed.stats["chunks_resumed"] == kept
+    assert resumed.stats["chunks_fetched"] == manifest.chunk_count - kept
+
+
+def test_corrupted_chunks_rejected():
+    """Morceaux altérés rejetés (SHA-256), récupérés chez un pair sain; seuls ils ne suffisent pas"""
+    async def scenario(network, state_dir):
+        corrupt, healthy = "c" * 16, "1" * 16
+        await network.add_provider(corrupt, corrupt=True)
+        await network.add_provider(healthy)
+
+        only_corrupt = ChunkedUrnFetcher(network.request, os.path.join(state_dir, "a"), chunk_size=CHUNK_SIZE)
+        alone = await only_corrupt.fetch(URN_ID, [corrupt])
+
+        mixed = ChunkedUrnFetcher(network.request, os.path.join(state_dir, "b"), chunk_size=CHUNK_SIZE)
+        data = await mixed.fetch(URN_ID, [corrupt, healthy])
+        return alone, only_corrupt, data, mixed
+
+    alone, only_corrupt, data, mixed = _run(scenario)
+    assert alone is None
+    assert only_corrupt.stats["chunks_rejected"] > 0 and only_corrupt.stats["chunks_fetched"] == 0
+    assert data == PAYLOAD
+    assert mixed.stats["chunks_rejected"] > 0
+
+
+def test_manifest_validation():
+    """Manifestes incohérents refusés; version majoritaire retenue, pairs minoritaires écartés"""
+    manifest = build_manifest(URN_ID, PAYLOAD, CHUNK_SIZE).to_dict()
+    assert UrnManifest.from_dict(manifest) is not None
+    assert UrnManifest.from_dict({**manifest, "payload_hash": "../../etc"}) is None
+    assert UrnManifest.from_dict({**manifest, "chunk_hashes": manifest["chunk_hashes"][:-1]}) is None
+    assert UrnManifest.from_dict({**manifest, "chunk_size": MIN_CHUNK_SIZE - 1}) is None
+    assert UrnManifest.from_dict({**manifest, "total_size": -1}) is None
+    assert UrnManifest.from_dict({key: value for key, value in manifest.items() if key != "urn_id"}) is None
+
+    other_payload = secrets.token_bytes(len(PAYLOAD))
+
+    async def scenario(network, state_dir):
+        honest = ["1" * 16, "2" * 16]
+        liar, invalid = "3" * 16, "4" * 16
+        for fingerprint in honest:
+            await network.add_provider(fingerprint)
+        await network.add_provider(liar, payload=other_payload)
+        await network.add_provider(invalid, manifest_override={**manifest, "chunk_hashes": ["zz"]})
+
+        fetcher = ChunkedUrnFetcher(network.request, state_dir, chunk_size=CHUNK_SIZE)
+        chosen, holders = await fetcher.fetch_manifest(URN_ID, honest + [liar, invalid])
+        data = await fetcher.fetch(URN_ID, honest + [liar, invalid])
+        return chosen, holders, honest, data
+
+    chosen, holders, honest, data = _run(scenario)
+    assert chosen.payload_hash == manifest["payload_hash"]
+    assert sorted(holders) == sorted(honest)
+    assert data == PAYLOAD
+
+
+if __name__ == "__main__":
+    for test in (test_multi_peer_fetch, test_resume_after_interrupted_transfer,
+                 test_corrupted_chunks_rejected, test_manifest_validation):
+        test()
+        print(f"✅ {test.__name__}")
+    print("\n🎉 TEST TRANSFERT PAR MORCEAUX TERMINÉ!")
@@ -31,6 +31,10 @@ from simple_protocol_helper import initialize_simple_protocol, send_friendship_r
 from user_profile import UserProfileManager, UserProfile, FriendGroup, PrivacyLevel
 from authentic_phantom_urn_system import AuthenticPhantomUrnSystem
 from phantom_projection_server import PhantomProjectionServer
+from client_send_queue import SendQueueRegistry
+from projection_frames import (
+    FRAME_KIND_PROJECTION, FrameChannel, PhantomFrame, encode_frame, negotiate_frame_mode, select_subprotocol
+)
 
 # Import du système d'authentification
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'core'))
@@ -93,33 +97,112 @@ class WebSocketManager:
     
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        # Mode de frames négocié par connexion (binaire / JSON)
+        self.frame_channels: Dict[WebSocket, FrameChannel] = {}
+        # File d'envoi bornée + tâche d'écriture par connexion
+        self.send_queues = SendQueueRegistry()
         
     async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+        # Négociation à la connexion: sous-protocole, sinon ?frames=
+        subprotocol = select_subprotocol(websocket.headers.get("sec-websocket-protocol"))
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections.append(websocket)
-        print(f"🔗 WebSocket connected. Total: {len(self.active_connections)}")
+        self.frame_channels[websocket] = FrameChannel(
+            negotiate_frame_mode(subprotocol, websocket.query_params.get("frames"))
+        )
+        self.send_queues.open(websocket, lambda payload: self._write(websocket, payload),
+                              on_slow=lambda: self._disconnect_slow(websocket),
+                              name=f"ws_{len(self.active_connections)}")
+        print(f"🔗 WebSocket connected ({self.frame_channels[websocket].mode}). Total: {len(self.active_connections)}")
         
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self.frame_channels.pop(websocket, None)
+        self.send_queues.close(websocket)
         print(f"🔗 WebSocket disconnected. Total: {len(self.active_connections)}")
+    
+    @staticmethod
+    async def _write(websocket: WebSocket, payload):
+        if isinstance(payload, bytes):
+            await websocket.send_bytes(payload)
+        else:
+            await websocket.send_text(payload)
+    
+    async def _disconnect_slow(self, websocket: WebSocket):
+        """Client resté au-dessus du seuil haut de sa file: déconnexion"""
+        self.disconnect(websocket)
+        try:
+            await websocket.close(code=1013)  # Try Again Later
+        except Exception:
+            pass
+    
+    def send(self, websocket: WebSocket, payload, coalesce_key=None, droppable: bool = True):
+        """Enfile un message (texte ou binaire) pour une connexion, sans attendre le client"""
+        queue = self.send_queues.get(websocket)
+        if queue is not None:
+            queue.put(payload, coalesce_key, droppable)
+    
+    def get_stats(self) -> dict:
+        """Profondeur des files, messages abandonnés / fusionnés, clients lents"""
+        return {
+            "active_connections": len(self.active_connections),
+            "frame_modes": {
+                mode: sum(1 for channel in self.frame_channels.values() if channel.mode == mode)
+                for mode in ("binary", "json")
+            },
+            "send_queues": self.send_queues.stats()
+        }
+    
+    async def send_projection(self, websocket: WebSocket, phantom_id: str, image_data: bytes,
+                              width: int, height: int, extra: dict):
+        """
+        Projection JPEG: frame binaire (image brute) précédée de ses métadonnées
+        JSON, ou message JSON base64 pour les clients en mode JSON
+        """
+        channel = self.frame_channels.get(websocket) or FrameChannel()
+        
+        if not channel.binary:
+            import base64
+            self.send(websocket, json.dumps({
+                "type": "phantom_projection",
+                "phantom_id": phantom_id,
+                "data": base64.b64encode(image_data).decode(),
+                "mime_type": "image/jpeg",
+                "dimensions": {"width": width, "height": height},
+                **extra
+            }), droppable=False)
+            return
+        
+        # Projection demandée par le client (NCK consommée): jamais abandonnée
+        sequence = channel.next_sequence()
+        if extra:
+            self.send(websocket, json.dumps({
+                "type": "phantom_projection_info",
+                "phantom_id": phantom_id,
+                "sequence": sequence,
+                **extra
+            }), droppable=False)
+        self.send(websocket, encode_frame(PhantomFrame(
+            kind=FRAME_KIND_PROJECTION,
+            phantom_id=phantom_id,
+            sequence=sequence,
+            mime_type="image/jpeg",
+            width=width,
+            height=height,
+            data=image_data
+        )), droppable=False)
         
     async def broadcast(self, message: dict):
-        """Diffuse message à tous les clients connectés"""
+        """
+        Diffuse message à tous les clients connectés: enfilé dans la file de
+        chaque connexion (un client lent ne retarde plus les autres), le
+        dernier message d'un même type remplaçant celui encore en attente
+        """
         if not self.active_connections:
             return
-            
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                print(f"[WARNING] WebSocket send error: {e}")
-                disconnected.append(connection)
-                
-        # Nettoyer connexions fermées
-        for conn in disconnected:
-            self.disconnect(conn)
+        
+        self.send_queues.broadcast(json.dumps(message), coalesce_key=("broadcast", message.get("type")))
 
 # Gestionnaire WebSocket global
 ws_manager = WebSocketManager()
@@ -224,7 +307,17 @@ async def send_friendship_request_p2p(target_fingerprint: str, request) -> bool:
             }
         }
         
-        # Utiliser le protocole simple 3 phases
+        # Connexion persistante du pool (handshake réutilisé entre messages)
+        ack = await p2p_node.connection_pool.request(
+            target_fingerprint,
+            {"type": "friendship_request", **request_data},
+            endpoint=(target_ip, target_port)
+        )
+        if ack and ack.get("status") == "received":
+            print(f"[OK] Friendship request sent via pooled P2P connection")
+            return True
+        
+        # Repli: protocole simple 3 phases
         print(f"[UPLOAD] Using Simple 3-Phase Protocol for friendship request")
         success = await send_friendship_request_simple(
             target_fingerprint=target_fingerprint,
@@ -270,7 +363,7 @@ async def send_friendship_request_p2p(target_fingerprint: str, request) -> bool:
             # Fallback: utiliser le système P2P existant mais avec retry
             print(f"🔄 Trying P2P fallback...")
             
-            session_id = p2p_node.p2p_connection.connect_to_peer(target_ip, target_port, target_fingerprint)
+            session_id = await p2p_node.p2p_transport.connect_to_peer(target_ip, target_port, target_fingerprint)
             
             if session_id:
                 print(f"[OK] P2P connection established, session_id: {session_id}")
@@ -279,7 +372,7 @@ async def send_friendship_request_p2p(target_fingerprint: str, request) -> bool:
                 await asyncio.sleep(1)
                 
                 # Envoyer via P2P
-                success = p2p_node.p2p_connection.send_secure_message(session_id, request_data)
+                success = await p2p_node.p2p_transport.send_secure_message(session_id, request_data)
                 
                 if success:
                     print(f"[OK] Friendship request sent via P2P to {target_fingerprint}")
@@ -464,7 +557,7 @@ async def real_time_monitoring():
                     "data": {
                         "node_status": status,
                         "discovered_nodes": len(discovered),
-                        "active_connections": len(p2p_node.p2p_connection.active_connections),
+                        "active_connections": len(p2p_node.p2p_transport.active_connections),
                         "constellation_map": [
                             {
                                 "fingerprint": fp,
@@ -1999,13 +2092,20 @@ Système dual opérationnel!`);
                 }
 
                 try {
-                    projectionWebSocket = new WebSocket('ws://localhost:8002/ws');
+                    // Frames binaires si le serveur les accepte, JSON sinon
+                    projectionWebSocket = new WebSocket('ws://localhost:8002/ws', ['orp.binary.v1', 'orp.json']);
+                    projectionWebSocket.binaryType = 'arraybuffer';
                     
                     projectionWebSocket.onopen = function() {
                         alert('[OK] Connecté au serveur de projection ORP!');
                     };
                     
                     projectionWebSocket.onmessage = function(event) {
+                        if (event.data instanceof ArrayBuffer) {
+                            const frame = decodeProjectionFrame(event.data);
+                            console.log(`[PROJECTION] Frame binaire: ${frame.phantomId} #${frame.sequence} (${frame.width}x${frame.height})`);
+                            return;
+                        }
                         const data = JSON.parse(event.data);
                         console.log('Message ORP:', data);
                         
@@ -2026,6 +2126,28 @@ Système dual opérationnel!`);
                 }
             }
 
+            // Frame ORP binaire: en-tête 40 octets + phantom_id + image brute
+            function decodeProjectionFrame(buffer) {
+                const view = new DataView(buffer);
+                const idLength = view.getUint16(10);
+                const mimeTypes = {1: 'image/jpeg', 2: 'image/png', 3: 'image/webp'};
+                const mimeType = mimeTypes[view.getUint8(6)];
+                return {
+                    kind: view.getUint8(5),
+                    complete: (view.getUint8(7) & 1) === 1,
+                    previewLevel: view.getUint8(8),
+                    sequence: view.getUint32(12),
+                    width: view.getUint32(16),
+                    height: view.getUint32(20),
+                    x: view.getUint32(24),
+                    y: view.getUint32(28),
+                    cols: view.getUint32(32),
+                    rows: view.getUint32(36),
+                    phantomId: new TextDecoder().decode(new Uint8Array(buffer, 40, idLength)),
+                    image: new Blob([new Uint8Array(buffer, 40 + idLength)], {type: mimeType})
+                };
+            }
+
             // Afficher info URN
             async function showUrnInfo(urnId) {
                 try {
@@ -2134,15 +2256,67 @@ Système dual opérationnel!`);
 # Section suivante : WebSocket endpoint
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket pour mises à jour temps réel"""
+    """WebSocket pour mises à jour temps réel (et projections Phoenix à la demande)"""
     await ws_manager.connect(websocket)
     try:
         while True:
-            # Maintenir connexion vivante
-            await websocket.receive_text()
+            message = await websocket.receive_text()
+            try:
+                data = json.loads(message)
+            except json.JSONDecodeError:
+                continue  # Keep-alive texte
+            
+            if isinstance(data, dict) and data.get("type") == "request_phantom":
+                await send_phoenix_projection(websocket, data)
     except WebSocketDisconnect:
         ws_manager.disconnect(websocket)
 
+async def send_phoenix_projection(websocket: WebSocket, data: dict):
+    """Projection Phoenix (NCK) sur le WebSocket, au format négocié à la connexion"""
+    phantom_id = data.get("phantom_id")
+    nck = data.get("nck")
+    
+    user_id = verify_auth_optional(websocket)
+    if not user_id:
+        ws_manager.send(websocket, json.dumps({"type": "error", "message": "Authentication required"}), droppable=False)
+        return
+    if not phantom_urn_system or not phantom_id or not nck:
+        ws_manager.send(websocket, json.dumps({"type": "error", "message": "phantom_id et nck requis"}), droppable=False)
+        return
+    
+    loop = asyncio.get_running_loop()
+    projection = await loop.run_in_executor(None, render_phoenix_jpeg, phantom_id, user_id, nck)
+    if projection is None:
+        ws_manager.send(websocket, json.dumps({
+            "type": "error", "phantom_id": phantom_id, "message": "[KEY] NCK invalide ou accès refusé"
+        }), droppable=False)
+        return
+    
+    image_data, (width, height) = projection
+    await ws_manager.send_projection(websocket, phantom_id, image_data, width, height, {
+        "next_nck": phantom_urn_system.get_user_next_nck(user_id, phantom_id),
+        "timestamp": time.time()
+    })
+
+def render_phoenix_jpeg(phantom_id: str, user_id: str, nck: str):
+    """Résurrection Phoenix + JPEG → (octets, (largeur, hauteur)), None si refusée"""
+    from PIL import Image
+    import io
+    
+    phoenix_matrix = phantom_urn_system.request_phoenix_resurrection(phantom_id, user_id, nck)
+    if phoenix_matrix is None:
+        return None
+    
+    buffer = io.BytesIO()
+    Image.fromarray(phoenix_matrix.astype('uint8')).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue(), (phoenix_matrix.shape[1], phoenix_matrix.shape[0])
+
+@app.get("/api/ws/stats")
+async def websocket_stats(request: Request):
+    """Files d'envoi WebSocket: profondeur, abandons, fusions, clients lents"""
+    verify_auth(request)
+    return ws_manager.get_stats()
+
 # === API Authentication Endpoints ===
 
 @app.get("/api/auth/status")
@@ -2359,7 +2533,7 @@ async def get_constellation():
         },
         "discovered_nodes": constellation_map,
         "total_discovered": len(constellation_map),
-        "active_connections": len(p2p_node.p2p_connection.active_connections)
+        "active_connections": len(p2p_node.p2p_transport.active_connections)
     }
 
 @app.get("/api/urn/stats")
@@ -2455,17 +2629,16 @@ async def phantom_status(request: Request):
 @app.post("/api/images/upload")
 async def upload_image(request: Request, file: UploadFile = File(...)):
     """Upload d'image et traitement asynchrone en URN Phantom"""
-    if not verify_auth(request):
-        raise HTTPException(status_code=401, detail="Authentication required")
+    username = verify_auth(request)
     
     global phantom_urn_system, async_processor
     
     if not phantom_urn_system:
         raise HTTPException(status_code=503, detail="Phantom URN System not initialized")
     
-    # Récupérer l'utilisateur
-    user_id = get_current_user_id(request)
-    if not user_id:
+    # Nœud autorisé de l'URN (fingerprint), distinct de l'utilisateur qui soumet le job
+    authorized_node = get_current_user_id(request)
+    if not authorized_node:
         raise HTTPException(status_code=401, detail="User not found")
     
     try:
@@ -2488,7 +2661,9 @@ async def upload_image(request: Request, file: UploadFile = File(...)):
             async_processor = initialize_async_processor(phantom_urn_system)
             await async_processor.start_worker()
         
-        job_id = async_processor.submit_job(user_id, file.filename or "phantom_image", temp_path)
+        # Limite de jobs et tourniquet par utilisateur authentifié (pas par nœud)
+        job_id = async_processor.submit_job(username, file.filename or "phantom_image", temp_path,
+                                            authorized_node=authorized_node)
         
         return {
             "success": True,
@@ -2520,22 +2695,46 @@ async def get_job_status(job_id: str, request: Request):
     
     return job_status
 
-@app.get("/api/images/my-jobs")  
+@app.delete("/api/images/job/{job_id}")
+async def cancel_job(job_id: str, request: Request):
+    """Annuler un job de traitement URN (arrêt du burn + suppression de l'URN partielle)"""
+    username = verify_auth(request)
+    if not username:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    global async_processor
+
+    if not async_processor:
+        raise HTTPException(status_code=503, detail="Async processor not initialized")
+
+    job_status = async_processor.get_job_status(job_id)
+    if not job_status:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job_status["user_id"] != username:
+        raise HTTPException(status_code=403, detail="Not your job")
+
+    if not async_processor.cancel_job(job_id):
+        raise HTTPException(status_code=409, detail=f"Job already {job_status['status']}")
+
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status": async_processor.get_job_status(job_id)["status"],
+        "message": "Annulation en cours"
+    }
+
+@app.get("/api/images/my-jobs")
 async def get_my_jobs(request: Request):
     """Récupérer mes jobs de traitement URN"""
-    if not verify_auth(request):
-        raise HTTPException(status_code=401, detail="Authentication required")
+    username = verify_auth(request)
     
     global async_processor
     
-    user_id = get_current_user_id(request)
-    if not user_id:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     if not async_processor:
         return {"jobs": []}
     
-    jobs = async_processor.get_user_jobs(user_id)
+    jobs = async_processor.get_user_jobs(username)
     return {"jobs": jobs}
 
 @app.get("/api/images/my-urns")
@@ -2924,8 +3123,7 @@ async def burn_image_enhanced(
     description: str = Form(None)
 ):
     """[BURN] Burn Enhanced : Image → Phoenix de Schrödinger avec NCK"""
-    if not verify_auth(request):
-        raise HTTPException(status_code=401, detail="Authentication required")
+    username = verify_auth(request)
     
     global phantom_urn_system
     
@@ -2954,10 +3152,9 @@ async def burn_image_enhanced(
             )
             
             # Autoriser l'utilisateur connecté
-            user_id = "Diego"  # TODO: Récupérer depuis token
             nck_id = phantom_urn_system.authorize_user_for_phoenix(
                 burn_result["phantom_id"],
-                user_id,
+                username,
                 {"view": True, "download": True}
             )
             
@@ -3001,8 +3198,7 @@ async def view_phoenix_schrodinger(
     nck: str = Form(...)
 ):
     """[PHOENIX]→🦅 Voir Phoenix de Schrödinger avec vérification NCK"""
-    if not verify_auth(request):
-        raise HTTPException(status_code=401, detail="Authentication required")
+    user_id = verify_auth(request)
     
     global phantom_urn_system
     
@@ -3010,8 +3206,6 @@ async def view_phoenix_schrodinger(
         raise HTTPException(status_code=503, detail="Enhanced Phantom URN System not initialized")
     
     try:
-        user_id = "Diego"  # TODO: Récupérer depuis token
-        
         # Demander résurrection Phoenix avec NCK
         phoenix_matrix = phantom_urn_system.request_phoenix_resurrection(
             phantom_id, user_id, nck
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+⚡ BENCHMARK - Protection anti-caméra par aliasing
+=================================================
+Frames protégées par seconde (TrueAntiCameraAliasing) en 1080p et 4K:
+- historique : meshgrid + porteuse float64 recalculés à chaque appel,
+               boucle Python par canal (référence reproduite ici)
+- froid      : première frame, porteuse et masque à calculer
+- chaud      : même phase, porteuse et masque en cache
+- flux       : iter_protected_frames, phases successives (cycle en cache)
+- cadencé    : iter_protected_frames à --fps (fps effectivement tenus)
+
+Usage:
+    python benchmark_anticamera_aliasing.py
+    python benchmark_anticamera_aliasing.py --frames 60 --fps 30
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from true_aliasing_anticamera import DEFAULT_PHASE_STEPS, TrueAntiCameraAliasing
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+
+MESSAGE = "🔒 PHANTOM PROTECTED"
+
+
+def _legacy_protect(system: TrueAntiCameraAliasing, img_array: np.ndarray, message: str) -> np.ndarray:
+    """Algorithme d'origine (avant cache et vectorisation), pour comparaison"""
+    height, width = img_array.shape[:2]
+    message_mask = system.create_aliasing_message_pattern(width, height, message)
+
+    x, y = np.meshgrid(np.arange(width), np.arange(height))
+    ultra_freq = 1.2
+    carrier = (np.sin(2 * np.pi * x / ultra_freq) + np.sin(2 * np.pi * y / ultra_freq)
+               + np.sin(2 * np.pi * (x + y) / (ultra_freq * 1.4))
+               + np.sin(2 * np.pi * (x - y) / (ultra_freq * 1.4))) / 4
+    carrier = ((carrier + 1) / 2).astype(np.float32)
+
+    pattern = np.zeros((height, width), dtype=np.float32)
+    background = message_mask < 0.1
+    pattern[background] = carrier[background] * system.invisible_amplitude
+    pattern[~background] = carrier[~background] * (system.invisible_amplitude * 8)
+
+    result = img_array.astype(np.float32)
+    for channel in range(3):
+        result[:, :, channel] = np.clip(result[:, :, channel] + pattern * 255, 0, 255)
+    return result.astype(np.uint8)
+
+
+def _fps(function, frames: int) -> float:
+    start = time.perf_counter()
+    for _ in range(frames):
+        function()
+    return frames / (time.perf_counter() - start)
+
+
+def _bench_resolution(width: int, height: int, frames: int, fps: float):
+    rng = np.random.default_rng(42)
+    img_array = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    system = TrueAntiCameraAliasing()
+
+    legacy_fps = _fps(lambda: _legacy_protect(system, img_array, MESSAGE), max(1, frames // 10))
+
+    start = time.perf_counter()
+    first = system.protect_array(img_array, MESSAGE)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    if not np.array_equal(first, _legacy_protect(system, img_array, MESSAGE)):
+        raise AssertionError("Frame protégée différente de l'algorithme d'origine")
+
+    warm_fps = _fps(lambda: system.protect_array(img_array, MESSAGE), frames)
+
+    # Préchauffage du cycle de phases, puis flux libre
+    for _ in system.iter_protected_frames(img_array, MESSAGE, fps=None, max_frames=DEFAULT_PHASE_STEPS):
+        pass
+    start = time.perf_counter()
+    for _ in system.iter_protected_frames(img_array, MESSAGE, fps=None, max_frames=frames):
+        pass
+    stream_fps = frames / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in system.iter_protected_frames(img_array, MESSAGE, fps=fps, max_frames=frames):
+        pass
+    paced_fps = frames / (time.perf_counter() - start)
+
+    return legacy_fps, cold_ms, warm_fps, stream_fps, paced_fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark protection anti-caméra par aliasing")
+    parser.add_argument("--frames", type=int, default=30, help="Frames mesurées par mode")
+    parser.add_argument("--fps", type=float, default=30.0, help="Cadence cible du mode flux cadencé")
+    parser.add_argument("--resolution", choices=sorted(RESOLUTIONS), action="append",
+                        help="Résolution(s) à mesurer (défaut: toutes)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    print(f"{'':8} {'historique':>11} {'froid':>10} {'chaud':>10} {'flux':>10} {'cadencé':>14}")
+    for name in args.resolution or RESOLUTIONS:
+        width, height = RESOLUTIONS[name]
+        legacy_fps, cold_ms, warm_fps, stream_fps, paced_fps = _bench_resolution(
+            width, height, args.frames, args.fps
+        )
+        print(f"{name:8} {legacy_fps:7.1f} fps {cold_ms:7.0f} ms {warm_fps:6.1f} fps {stream_fps:6.1f} fps "
+              f"{paced_fps:5.1f}/{args.fps:.0f} fps   (x{stream_fps / legacy_fps:.1f})")
+
+
+if __name__ == "__main__":
+    main()
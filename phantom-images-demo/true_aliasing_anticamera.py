@@ -15,14 +15,67 @@ import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageTk
 import tkinter as tk
 import math
+import time
+import asyncio
 import logging
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Hashable, Iterator, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Porteuses / masques gardés en mémoire (une porteuse 4K float32 ≈ 33 Mo)
+CARRIER_CACHE_ENTRIES = 16
+MESSAGE_CACHE_ENTRIES = 8
+
+# Patterns entiers prêts à appliquer (2 octets/pixel): un cycle de phases 4K ≈ 133 Mo
+PATTERN_CACHE_ENTRIES = 16
+
+# Mode flux: déphasages successifs de la porteuse (un cycle = PHASE_STEPS frames)
+DEFAULT_PHASE_STEPS = 8
+DEFAULT_STREAM_FPS = 30.0
+
+
+class _LruArrayCache:
+    """Petit cache LRU (thread-safe) de tableaux précalculés"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_create(self, key: Hashable, factory) -> np.ndarray:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        
+        value = factory()
+        value.setflags(write=False)  # partagé entre appels: lecture seule
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 class TrueAntiCameraAliasing:
     """
     Vrai système anti-caméra par aliasing
     Basé sur les principes de sous-échantillonnage
+    
+    Porteuses précalculées par (largeur, hauteur, fréquence, phase) et
+    gains du message par (largeur, hauteur, message): une frame protégée ne
+    coûte plus qu'une multiplication et une addition saturée vectorisées.
     """
     
     def __init__(self):
@@ -31,6 +84,15 @@ class TrueAntiCameraAliasing:
         self.invisible_amplitude = 0.01  # 1% seulement - quasi invisible
         self.camera_reveal_frequency = 1.5  # Fréquence optimale pour révélation
         
+        # Fréquence ULTRA haute (limite perception humaine)
+        # À 50cm de distance, l'œil ne peut pas résoudre < 1mm
+        # Sur écran, cela correspond à ~1-2 pixels
+        self.carrier_frequency = 1.2  # Plus haute fréquence possible
+        
+        self.carrier_cache = _LruArrayCache(CARRIER_CACHE_ENTRIES)
+        self.message_cache = _LruArrayCache(MESSAGE_CACHE_ENTRIES)
+        self.pattern_cache = _LruArrayCache(PATTERN_CACHE_ENTRIES)
+        
     def create_aliasing_message_pattern(self, width: int, height: int, message: str) -> np.ndarray:
         """
         Crée un pattern qui encode le message dans les fréquences d'aliasing
@@ -58,7 +120,7 @@ class TrueAntiCameraAliasing:
             draw.text((x, y), message, fill=255, font=font)
             
             # Convertir en masque binaire
-            message_mask = np.array(msg_img).astype(np.float32) / 255.0
+            message_mask = np.asarray(msg_img, dtype=np.float32) / np.float32(255.0)
             
             return message_mask
             
@@ -66,96 +128,115 @@ class TrueAntiCameraAliasing:
             logger.error(f"❌ Erreur création message: {e}")
             return np.zeros((height, width), dtype=np.float32)
     
-    def generate_ultra_high_frequency_carrier(self, width: int, height: int) -> np.ndarray:
+    def generate_ultra_high_frequency_carrier(self, width: int, height: int, phase: float = 0.0) -> np.ndarray:
         """
         Génère une porteuse ultra-haute fréquence
         Invisible à l'œil mais cause aliasing caméra
+        (précalculée et mise en cache par dimensions, fréquence et phase)
         """
+        key = (width, height, self.carrier_frequency, round(phase, 6))
         try:
-            # Grille de coordonnées
-            x, y = np.meshgrid(np.arange(width), np.arange(height))
-            
-            # Fréquence ULTRA haute (limite perception humaine)
-            # À 50cm de distance, l'œil ne peut pas résoudre < 1mm
-            # Sur écran, cela correspond à ~1-2 pixels
-            ultra_freq = 1.2  # Plus haute fréquence possible
-            
-            # Pattern multi-directionnel pour maximum d'aliasing
-            carrier_h = np.sin(2 * np.pi * x / ultra_freq)  # Horizontal
-            carrier_v = np.sin(2 * np.pi * y / ultra_freq)  # Vertical
-            carrier_d1 = np.sin(2 * np.pi * (x + y) / (ultra_freq * 1.4))  # Diagonal 1
-            carrier_d2 = np.sin(2 * np.pi * (x - y) / (ultra_freq * 1.4))  # Diagonal 2
-            
-            # Combiner toutes les directions
-            carrier = (carrier_h + carrier_v + carrier_d1 + carrier_d2) / 4
-            
-            # Normaliser entre 0 et 1
-            carrier = (carrier + 1) / 2
-            
-            return carrier.astype(np.float32)
-            
+            return self.carrier_cache.get_or_create(
+                key, lambda: self._compute_carrier(width, height, self.carrier_frequency, phase)
+            )
         except Exception as e:
             logger.error(f"❌ Erreur porteuse: {e}")
-            return np.ones((height, width), dtype=np.float32) * 0.5
+            return np.full((height, width), 0.5, dtype=np.float32)
+    
+    @staticmethod
+    def _compute_carrier(width: int, height: int, ultra_freq: float, phase: float) -> np.ndarray:
+        """
+        Pattern multi-directionnel (horizontal, vertical, deux diagonales),
+        normalisé entre 0 et 1. Calcul séparable, sans meshgrid:
+        sin(a(x+y)+φ) + sin(a(x-y)+φ) = 2·sin(ax+φ)·cos(ay)
+        """
+        x = np.arange(width, dtype=np.float32)
+        y = np.arange(height, dtype=np.float32)[:, None]
+        straight = np.float32(2 * np.pi / ultra_freq)
+        diagonal = np.float32(2 * np.pi / (ultra_freq * 1.4))
+        phase = np.float32(phase)
+        
+        carrier = np.sin(diagonal * x + phase) * (2 * np.cos(diagonal * y))  # Diagonales 1 + 2
+        carrier += np.sin(straight * x + phase)  # Horizontal
+        carrier += np.sin(straight * y + phase)  # Vertical
+        
+        # Combiner les 4 directions puis normaliser entre 0 et 1: (c/4 + 1) / 2
+        carrier *= np.float32(0.125)
+        carrier += np.float32(0.5)
+        return carrier
+    
+    def _message_gain(self, width: int, height: int, message: str) -> np.ndarray:
+        """
+        Amplitude (en niveaux 0-255) par pixel: porteuse très faible hors du
+        texte (invisible), plus forte dans le texte (révélée par aliasing)
+        """
+        def build() -> np.ndarray:
+            message_mask = self.create_aliasing_message_pattern(width, height, message)
+            weak = np.float32(self.invisible_amplitude * 255)
+            strong = np.float32(self.invisible_amplitude * 8 * 255)
+            return np.where(message_mask >= 0.1, strong, weak).astype(np.float32)
+        
+        return self.message_cache.get_or_create((width, height, message), build)
     
-    def encode_message_in_aliasing_frequencies(self, width: int, height: int, message: str) -> np.ndarray:
+    def encode_message_in_aliasing_frequencies(self, width: int, height: int, message: str,
+                                               phase: float = 0.0) -> np.ndarray:
         """
         Encode le message dans les fréquences qui créent de l'aliasing
+        (modulation d'amplitude de la porteuse dans les zones de texte)
         """
         try:
-            # 1. Créer le masque du message
-            message_mask = self.create_aliasing_message_pattern(width, height, message)
-            
-            # 2. Générer porteuse ultra-haute fréquence
-            carrier = self.generate_ultra_high_frequency_carrier(width, height)
-            
-            # 3. Moduler la porteuse avec le message
-            # Technique: Modulation d'amplitude dans les zones de texte
-            modulated_pattern = np.zeros((height, width), dtype=np.float32)
-            
-            # Zones sans texte: porteuse très faible (invisible)
-            background_mask = message_mask < 0.1
-            modulated_pattern[background_mask] = carrier[background_mask] * self.invisible_amplitude
-            
-            # Zones avec texte: porteuse plus forte (révélée par aliasing)
-            text_mask = message_mask >= 0.1
-            # Amplitude plus forte pour créer aliasing visible
-            modulated_pattern[text_mask] = carrier[text_mask] * (self.invisible_amplitude * 8)
-            
-            return modulated_pattern
+            carrier = self.generate_ultra_high_frequency_carrier(width, height, phase)
+            gain = self._message_gain(width, height, message)
+            return carrier * (gain / np.float32(255))
             
         except Exception as e:
             logger.error(f"❌ Erreur encodage aliasing: {e}")
             return np.zeros((height, width), dtype=np.float32)
     
-    def apply_true_anticamera_protection(self, image: Image.Image, message: str = "🔒 CAPTURE DETECTED") -> Image.Image:
+    def protect_array(self, img_array: np.ndarray, message: str = "🔒 CAPTURE DETECTED",
+                      phase: float = 0.0) -> np.ndarray:
+        """
+        Protection d'une image uint8 (H, W), (H, W, 3) ou (H, W, 4): les
+        canaux couleur reçoivent le même pattern en une seule opération
+        diffusée (alpha inchangé). Addition saturée à 255, tronquée comme
+        la conversion float → uint8.
+        """
+        img_array = np.asarray(img_array, dtype=np.uint8)
+        height, width = img_array.shape[:2]
+        pattern, headroom = self._integer_pattern(width, height, message, phase)
+        
+        protected = np.empty_like(img_array)
+        if img_array.ndim == 2:
+            source, color = img_array, protected
+        else:
+            source, color = img_array[..., :3], protected[..., :3]
+            pattern, headroom = pattern[..., None], headroom[..., None]
+            if img_array.shape[2] > 3:
+                protected[..., 3:] = img_array[..., 3:]
+        
+        # min(pixel, 255 - pattern) + pattern == min(pixel + pattern, 255) sans débordement uint8
+        np.minimum(source, headroom, out=color)
+        color += pattern
+        return protected
+    
+    def _integer_pattern(self, width: int, height: int, message: str, phase: float) -> np.ndarray:
+        """(pattern, 255 - pattern) en uint8: porteuse × gain du message, tronqué"""
+        def build() -> np.ndarray:
+            carrier = self.generate_ultra_high_frequency_carrier(width, height, phase)
+            gain = self._message_gain(width, height, message)
+            pattern = np.multiply(carrier, gain, dtype=np.float32).astype(np.uint8)
+            return np.stack((pattern, 255 - pattern))
+        
+        key = (width, height, self.carrier_frequency, round(phase, 6), message)
+        return self.pattern_cache.get_or_create(key, build)
+    
+    def apply_true_anticamera_protection(self, image: Image.Image, message: str = "🔒 CAPTURE DETECTED",
+                                         phase: float = 0.0) -> Image.Image:
         """
         Applique la vraie protection anti-caméra par aliasing
         """
         try:
-            # Convertir image en array
-            img_array = np.array(image).astype(np.float32)
-            height, width = img_array.shape[:2]
-            
-            # Générer pattern d'aliasing encodé
-            aliasing_pattern = self.encode_message_in_aliasing_frequencies(width, height, message)
-            
-            # Appliquer sur l'image
-            if len(img_array.shape) == 3:  # Image couleur
-                for channel in range(3):
-                    # Ajouter le pattern d'aliasing
-                    img_array[:, :, channel] = np.clip(
-                        img_array[:, :, channel] + (aliasing_pattern * 255),
-                        0, 255
-                    )
-            else:  # Image grayscale
-                img_array = np.clip(
-                    img_array + (aliasing_pattern * 255),
-                    0, 255
-                )
-            
-            # Reconvertir
-            protected_image = Image.fromarray(img_array.astype(np.uint8))
+            protected_image = Image.fromarray(self.protect_array(np.asarray(image), message, phase))
             
             logger.info("✅ Protection anti-caméra par aliasing appliquée")
             logger.info("👁️ Œil: invisible | 📷 Caméra: aliasing révèle le message")
@@ -165,6 +246,76 @@ class TrueAntiCameraAliasing:
         except Exception as e:
             logger.error(f"❌ Erreur protection aliasing: {e}")
             return image
+    
+    # ------------------------------------------------------------------
+    # Mode flux: frames déphasées successives (serveur de projection)
+    # ------------------------------------------------------------------
+    
+    def phase_for_frame(self, frame_index: int, phase_steps: int = DEFAULT_PHASE_STEPS) -> float:
+        """Phase de la frame n: un nombre fini de phases → porteuses toutes en cache"""
+        return 2 * math.pi * (frame_index % phase_steps) / phase_steps
+    
+    def iter_protected_frames(self, image, message: str = "🔒 CAPTURE DETECTED",
+                              fps: Optional[float] = DEFAULT_STREAM_FPS,
+                              phase_steps: int = DEFAULT_PHASE_STEPS,
+                              max_frames: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Frames protégées (index, tableau uint8) à phase décalée, cadencées à
+        `fps` (None: aussi vite que possible). Une frame en retard n'est pas
+        rattrapée: l'échéance suivante repart de maintenant.
+        """
+        img_array = np.asarray(image, dtype=np.uint8)
+        interval = 1.0 / fps if fps else 0.0
+        deadline = time.monotonic()
+        frame_index = 0
+        
+        while max_frames is None or frame_index < max_frames:
+            yield frame_index, self.protect_array(img_array, message, self.phase_for_frame(frame_index, phase_steps))
+            frame_index += 1
+            
+            if interval:
+                deadline += interval
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline = time.monotonic()
+    
+    async def stream_protected_frames(self, image, message: str = "🔒 CAPTURE DETECTED",
+                                      fps: float = DEFAULT_STREAM_FPS,
+                                      phase_steps: int = DEFAULT_PHASE_STEPS,
+                                      max_frames: Optional[int] = None,
+                                      executor=None) -> AsyncIterator[Tuple[int, np.ndarray]]:
+        """
+        Variante asyncio pour un serveur de projection: chaque frame est
+        calculée dans `executor` (pool de threads par défaut, NumPy libère
+        le GIL) et l'attente entre frames ne bloque pas la boucle.
+        """
+        loop = asyncio.get_running_loop()
+        img_array = np.asarray(image, dtype=np.uint8)
+        interval = 1.0 / fps
+        deadline = loop.time()
+        frame_index = 0
+        
+        while max_frames is None or frame_index < max_frames:
+            phase = self.phase_for_frame(frame_index, phase_steps)
+            frame = await loop.run_in_executor(executor, self.protect_array, img_array, message, phase)
+            yield frame_index, frame
+            frame_index += 1
+            
+            deadline += interval
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                deadline = loop.time()
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"hits": cache.hits, "misses": cache.misses, "entries": len(cache._entries)}
+            for name, cache in (("carriers", self.carrier_cache), ("messages", self.message_cache),
+                                ("patterns", self.pattern_cache))
+        }
 
 class AliasingProtectionDemo:
     """